@@ -44,6 +44,10 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",  # Debe estar lo más arriba posible
     "django.middleware.security.SecurityMiddleware",
+    "gestion.instrumentacion.ServerTimingMiddleware",  # Solo si INSTRUMENTACION_ETAPAS
+    "gestion.metricas.MetricasMiddleware",
+    "gestion.replicas.ReplicaMiddleware",  # Solo si hay réplica configurada
+    "gestion.shards.ShardMiddleware",  # Solo si hay shards configurados
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -83,6 +87,39 @@ DATABASES = {
     )
 }
 
+# Réplica de solo lectura (opcional). Las vistas de listas, reportes y
+# exportaciones marcadas en gestion.replicas leen de ella; en local basta con
+# otro archivo SQLite (DATABASE_REPLICA_URL=sqlite:///replica.sqlite3).
+DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        DATABASE_REPLICA_URL,
+        conn_max_age=600,
+        ssl_require=not DATABASE_REPLICA_URL.startswith('sqlite')
+    )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+# Segundos que un cliente sigue leyendo de la primaria después de escribir
+# (margen para el retraso de replicación)
+REPLICA_RETRASO_SEGUNDOS = int(os.getenv('REPLICA_RETRASO_SEGUNDOS', '5'))
+
+# Shards por empresa (opcional), "alias=url" separados por comas; en local
+# SHARDS_URLS="shard1=sqlite:///shard1.sqlite3,shard2=sqlite:///shard2.sqlite3".
+# La tabla UbicacionEmpresa (en default) dice en qué alias está cada empresa.
+SHARDS = []
+for _definicion in filter(None, os.getenv('SHARDS_URLS', '').split(',')):
+    _alias, _url = _definicion.strip().split('=', 1)
+    DATABASES[_alias] = dj_database_url.parse(_url, conn_max_age=600, ssl_require=not _url.startswith('sqlite'))
+    SHARDS.append(_alias)
+# Ids por base para empleados, nóminas y acumulados: la base en la posición i
+# de [default] + SHARDS asigna ids de (i*rango, (i+1)*rango], así un id (Folio
+# del CFDI, llave de idempotencia del PAC) es único entre bases. Los shards
+# nuevos se agregan al final de SHARDS_URLS.
+SHARDS_RANGO_IDS = int(os.getenv('SHARDS_RANGO_IDS', str(10 ** 12)))
+# Segundos que cada proceso conserva en memoria la tabla de ubicaciones
+SHARDS_CACHE_SEGUNDOS = int(os.getenv('SHARDS_CACHE_SEGUNDOS', '5'))
+
+DATABASE_ROUTERS = ['gestion.shards.RouterShards', 'gestion.replicas.RouterReplica']
+
 # ===============================
 # Validación de contraseñas
 # ===============================
@@ -141,7 +178,7 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ),
     "DEFAULT_RENDERER_CLASSES": (
-        "rest_framework.renderers.JSONRenderer",
+        "gestion.renderers.ORJSONRenderer",
     ),
 }
 
@@ -181,7 +218,7 @@ CORS_ALLOW_HEADERS = [
 ]
 
 # Headers expuestos
-CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken']
+CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken', 'Server-Timing', 'X-Dispersion-Registros', 'X-Dispersion-Omitidos']
 
 # Métodos permitidos
 CORS_ALLOW_METHODS = [
@@ -208,6 +245,53 @@ CSRF_COOKIE_SECURE = not DEBUG
 CSRF_COOKIE_SAMESITE = 'Lax'
 CSRF_USE_SESSIONS = False
 
+# ===============================
+# Instrumentación
+# ===============================
+# Tiempos por etapa (carga, cálculo, ISR, IMSS, persistencia...) en el
+# encabezado Server-Timing y en el log "gestion.instrumentacion"
+INSTRUMENTACION_ETAPAS = os.getenv("INSTRUMENTACION_ETAPAS", "False") == "True"
+
+# Métricas agregadas entre workers (endpoint /metrics, solo administradores).
+# Opcionales: escriben a un archivo en cada petición. Todos los workers deben
+# apuntar al mismo archivo.
+METRICAS_HABILITADAS = os.getenv("METRICAS_HABILITADAS", "False") == "True"
+METRICAS_ARCHIVO = os.getenv("METRICAS_ARCHIVO")  # Por defecto en el directorio temporal
+
+# ===============================
+# Timbrado de CFDI (PAC)
+# ===============================
+# Clase cliente (gestion.timbrado.ClientePAC); la de HTTP envía el XML por POST
+PAC_CLIENTE = os.getenv("PAC_CLIENTE", "gestion.timbrado.ClienteHTTP")
+PAC_URL = os.getenv("PAC_URL", "http://127.0.0.1:8765/timbrar")
+PAC_USUARIO = os.getenv("PAC_USUARIO", "")
+PAC_CLAVE = os.getenv("PAC_CLAVE", "")
+PAC_TIMEOUT = float(os.getenv("PAC_TIMEOUT", "30"))
+PAC_CONCURRENCIA = int(os.getenv("PAC_CONCURRENCIA", "20"))
+PAC_REINTENTOS = int(os.getenv("PAC_REINTENTOS", "4"))
+
+# ===============================
+# Dispersión bancaria
+# ===============================
+# Layouts adicionales o que reemplazan a los de gestion.dispersion.LAYOUTS,
+# con la misma estructura (formato, cuenta, encabezado, detalle, pie)
+DISPERSION_LAYOUTS = {}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'gestion.instrumentacion': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 # ===============================
 # Configuración de seguridad adicional para producción
 # ===============================
@@ -4,6 +4,7 @@ from rest_framework_simplejwt.views import TokenRefreshView # type: ignore
 from django.http import HttpResponse
 from django.conf import settings
 from django.conf.urls.static import static
+from gestion.metricas import metricas_view
 
 def get_jwt_view():
     from gestion.views import CustomTokenObtainPairView
@@ -20,6 +21,9 @@ urlpatterns = [
     # Incluye todas las rutas API de gestion
     path('api/', include('gestion.urls')),
     
+    # Métricas en formato Prometheus (solo administradores)
+    path('metrics', metricas_view, name='metricas'),
+
     # Ruta de verificación de funcionamiento
     path('', lambda request: HttpResponse("Backend funcionando"), name='home'),
 ]
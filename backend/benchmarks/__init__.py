@@ -0,0 +1,10 @@
+"""
+Benchmarks del motor de cálculo de nómina, de serialización de respuestas y de
+concurrencia de las vistas.
+
+Uso (desde backend/):
+    python -m benchmarks.motor_calculo --escalas 10,1k
+    python -m benchmarks.motor_calculo --escalas 10k --guardar-baseline
+    python -m benchmarks.serializacion --empleados 5000
+    python -m benchmarks.vistas_async --empresa 1
+"""
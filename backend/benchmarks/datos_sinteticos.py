@@ -0,0 +1,155 @@
+import os
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+# =============================================
+# CONFIGURACIÓN
+# =============================================
+
+ESCALAS = {
+    '10': 10,
+    '1k': 1_000,
+    '10k': 10_000,
+}
+
+# Patrones de descanso más comunes en planta (0=Lunes, 6=Domingo)
+PATRONES_DESCANSO = [
+    [6],        # Descansa domingo
+    [5, 6],     # Fin de semana completo
+    [0],        # Descansa lunes (trabaja domingo)
+    [2],        # Descansa miércoles (trabaja domingo)
+    [],         # Sin descanso configurado
+]
+
+# Densidad de faltas: probabilidad de que un día laborable sea falta
+DENSIDADES_FALTAS = [0.0, 0.0, 0.03, 0.08, 0.2]
+
+PERIODOS = ['SEMANAL', 'QUINCENAL', 'MENSUAL']
+ZONAS = ['general', 'general', 'general', 'frontera']
+
+LETRAS_RFC = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+NOMBRES = ['Juan', 'María', 'José', 'Ana', 'Luis', 'Carmen', 'Pedro', 'Laura', 'Jorge', 'Sofía']
+APELLIDOS = ['García', 'Hernández', 'López', 'Martínez', 'González', 'Pérez', 'Rodríguez', 'Sánchez']
+
+
+def configurar_django():
+    """Inicializa Django para poder instanciar modelos fuera de manage.py"""
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    django.setup()
+
+
+def periodo_de_referencia(tipo_periodo, fecha_referencia):
+    """Devuelve (fecha_inicio, fecha_fin) del periodo que contiene fecha_referencia"""
+    if tipo_periodo == 'SEMANAL':
+        inicio = fecha_referencia - timedelta(days=fecha_referencia.weekday())
+        return inicio, inicio + timedelta(days=6)
+
+    if fecha_referencia.month == 12:
+        siguiente_mes = date(fecha_referencia.year + 1, 1, 1)
+    else:
+        siguiente_mes = date(fecha_referencia.year, fecha_referencia.month + 1, 1)
+    fin_mes = siguiente_mes - timedelta(days=1)
+
+    if tipo_periodo == 'QUINCENAL':
+        if fecha_referencia.day <= 15:
+            return date(fecha_referencia.year, fecha_referencia.month, 1), date(fecha_referencia.year, fecha_referencia.month, 15)
+        return date(fecha_referencia.year, fecha_referencia.month, 16), fin_mes
+
+    return date(fecha_referencia.year, fecha_referencia.month, 1), fin_mes
+
+
+def generar_rfc(rng, indice):
+    """RFC de persona física válido y único por índice"""
+    bloque, resto = divmod(indice, 26 ** 4)
+    letras = ''
+    for _ in range(4):
+        resto, posicion = divmod(resto, 26)
+        letras += LETRAS_RFC[posicion]
+    fecha = date(1960, 1, 1) + timedelta(days=bloque)
+    homoclave = ''.join(rng.choice(LETRAS_RFC + '0123456789') for _ in range(3))
+    return f"{letras}{fecha.strftime('%y%m%d')}{homoclave}"
+
+
+def generar_valores_empleado(rng, indice, fecha_referencia, proporcion_ingreso_reciente=0.1):
+    """
+    Genera los valores de campo de un empleado sintético.
+
+    Mezcla periodo_nominal, zona_salarial, patrones de descanso, densidad de
+    faltas e ingresos a mitad del periodo de referencia.
+    """
+    periodo_nominal = rng.choice(PERIODOS)
+    zona_salarial = rng.choice(ZONAS)
+    dias_descanso = list(rng.choice(PATRONES_DESCANSO))
+    fecha_inicio, fecha_fin = periodo_de_referencia(periodo_nominal, fecha_referencia)
+
+    # Ingreso a mitad del periodo para una fracción de empleados
+    if rng.random() < proporcion_ingreso_reciente:
+        fecha_ingreso = fecha_inicio + timedelta(days=rng.randrange(1, (fecha_fin - fecha_inicio).days + 1))
+    else:
+        fecha_ingreso = fecha_inicio - timedelta(days=rng.randrange(30, 15 * 365))
+
+    # Salarios: muchos empleados en el mínimo, el resto distribuido
+    salario_minimo = Decimal('419.88') if zona_salarial == 'frontera' else Decimal('278.80')
+    if rng.random() < 0.3:
+        salario_diario = salario_minimo
+    else:
+        salario_diario = (salario_minimo * Decimal(str(round(rng.uniform(1.05, 8.0), 2)))).quantize(Decimal('0.01'))
+
+    # Faltas dentro del periodo (solo días laborables posteriores al ingreso)
+    densidad = rng.choice(DENSIDADES_FALTAS)
+    fechas_injustificadas = []
+    fechas_justificadas = []
+    dia = max(fecha_inicio, fecha_ingreso)
+    while dia <= fecha_fin:
+        if dia.weekday() not in dias_descanso and rng.random() < densidad:
+            if rng.random() < 0.7:
+                fechas_injustificadas.append(dia.isoformat())
+            else:
+                fechas_justificadas.append(dia.isoformat())
+        dia += timedelta(days=1)
+
+    return {
+        'nombre': rng.choice(NOMBRES),
+        'apellido_paterno': rng.choice(APELLIDOS),
+        'apellido_materno': f"{rng.choice(APELLIDOS)}{indice}",
+        'nss': f"{indice:011d}",
+        'rfc': generar_rfc(rng, indice),
+        'periodo_nominal': periodo_nominal,
+        'zona_salarial': zona_salarial,
+        'dias_descanso': dias_descanso,
+        'fecha_ingreso': fecha_ingreso,
+        'salario_diario': None if periodo_nominal == 'MENSUAL' else salario_diario,
+        'sueldo_mensual': (salario_diario * 30).quantize(Decimal('0.01')) if periodo_nominal == 'MENSUAL' else None,
+        'fechas_faltas_injustificadas': fechas_injustificadas,
+        'fechas_faltas_justificadas': fechas_justificadas,
+        'fechas_faltas': list(fechas_injustificadas),
+    }
+
+
+def generar_empleados(cantidad, semilla=2025, fecha_referencia=date(2025, 9, 16), empresa=None, id_inicial=1):
+    """
+    Genera empleados sintéticos (instancias Empleado sin guardar) de forma determinista.
+
+    Args:
+        cantidad: Número de empleados a generar
+        semilla: Semilla del generador aleatorio
+        fecha_referencia: Fecha dentro del periodo a calcular
+        empresa: Empresa opcional a asignar (no se consulta la base de datos)
+        id_inicial: Primer id asignado a los empleados
+
+    Returns:
+        list[Empleado]
+    """
+    from gestion.models import Empleado
+
+    rng = random.Random(semilla)
+    empleados = []
+    for i in range(cantidad):
+        valores = generar_valores_empleado(rng, id_inicial + i, fecha_referencia)
+        empleado = Empleado(id=id_inicial + i, **valores)
+        if empresa is not None:
+            empleado.empresa = empresa
+        empleados.append(empleado)
+    return empleados
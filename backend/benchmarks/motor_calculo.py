@@ -0,0 +1,200 @@
+"""
+Benchmark del motor de cálculo de nómina.
+
+Mide calcular_nomina_semanal/quincenal/mensual y sus etapas principales
+(ISR, IMSS, prima dominical) sobre empresas sintéticas de distintas escalas,
+y compara contra un baseline guardado para detectar regresiones.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+from benchmarks.datos_sinteticos import (
+    ESCALAS,
+    configurar_django,
+    generar_empleados,
+    periodo_de_referencia,
+)
+
+# =============================================
+# CONFIGURACIÓN
+# =============================================
+
+DIRECTORIO_BASELINES = Path(__file__).resolve().parent / 'baselines'
+ARCHIVO_BASELINE = DIRECTORIO_BASELINES / 'motor_calculo.json'
+FECHA_REFERENCIA = date(2025, 9, 16)
+UMBRAL_REGRESION = 0.20
+# Mediciones más cortas que esto son ruido y no se comparan contra el baseline
+TIEMPO_MINIMO_COMPARABLE = 0.05
+
+
+def _medir(funcion, argumentos, repeticiones):
+    """
+    Ejecuta funcion sobre cada tupla de argumentos y devuelve el mejor tiempo
+    total (segundos) de entre las repeticiones.
+
+    La salida estándar se descarta: el motor imprime trazas de depuración
+    que distorsionarían la medición.
+    """
+    from gestion.utils import limpiar_memo
+
+    mejor = None
+    for _ in range(repeticiones):
+        # Cada repetición es una corrida nueva: los memos de ISR e IMSS empiezan vacíos
+        limpiar_memo()
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            for args in argumentos:
+                funcion(*args)
+            transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return mejor
+
+
+def construir_casos(empleados):
+    """Agrupa a los empleados por función a medir con sus argumentos"""
+    from gestion import utils
+
+    por_periodo = {'SEMANAL': [], 'QUINCENAL': [], 'MENSUAL': []}
+    for empleado in empleados:
+        por_periodo[empleado.periodo_nominal].append(empleado)
+
+    casos = {
+        'calcular_nomina_semanal': (
+            lambda e: utils.calcular_nomina_semanal(e, fecha_referencia=FECHA_REFERENCIA),
+            [(e,) for e in por_periodo['SEMANAL']],
+        ),
+        'calcular_nomina_quincenal': (
+            lambda e: utils.calcular_nomina_quincenal(e, fecha_referencia=FECHA_REFERENCIA),
+            [(e,) for e in por_periodo['QUINCENAL']],
+        ),
+        'calcular_nomina_mensual': (
+            lambda e: utils.calcular_nomina_mensual(e, fecha_referencia=FECHA_REFERENCIA),
+            [(e,) for e in por_periodo['MENSUAL']],
+        ),
+    }
+
+    # Etapas individuales sobre todos los empleados
+    argumentos_isr = []
+    argumentos_imss = []
+    argumentos_prima = []
+    for empleado in empleados:
+        tipo = empleado.periodo_nominal
+        salario_diario = empleado.salario_diario or (empleado.sueldo_mensual / 30)
+        dias = {'SEMANAL': 7, 'QUINCENAL': 15, 'MENSUAL': 30}[tipo]
+        argumentos_isr.append((salario_diario * dias, tipo.lower(), FECHA_REFERENCIA.month))
+        argumentos_imss.append((salario_diario, dias))
+        fecha_inicio, fecha_fin = periodo_de_referencia(tipo, FECHA_REFERENCIA)
+        argumentos_prima.append((empleado, fecha_inicio, fecha_fin))
+
+    casos['calcular_isr'] = (utils.calcular_isr, argumentos_isr)
+    casos['calcular_imss'] = (utils.calcular_imss, argumentos_imss)
+    casos['calcular_prima_dominical'] = (utils.calcular_prima_dominical, argumentos_prima)
+    return casos
+
+
+def ejecutar(escalas, repeticiones, semilla):
+    """Corre el benchmark y devuelve {escala: {funcion: {...}}}"""
+    resultados = {}
+    for escala in escalas:
+        empleados = generar_empleados(ESCALAS[escala], semilla=semilla, fecha_referencia=FECHA_REFERENCIA)
+        resultados[escala] = {}
+        for nombre, (funcion, argumentos) in construir_casos(empleados).items():
+            if not argumentos:
+                continue
+            segundos = _medir(funcion, argumentos, repeticiones)
+            resultados[escala][nombre] = {
+                'llamadas': len(argumentos),
+                'segundos': round(segundos, 6),
+                'us_por_llamada': round(segundos / len(argumentos) * 1e6, 2),
+            }
+    return resultados
+
+
+def comparar(resultados, baseline, umbral):
+    """Devuelve la lista de regresiones (µs por llamada) que superan el umbral"""
+    regresiones = []
+    for escala, funciones in resultados.items():
+        for nombre, medicion in funciones.items():
+            referencia = baseline.get(escala, {}).get(nombre)
+            if not referencia or medicion['segundos'] < TIEMPO_MINIMO_COMPARABLE:
+                continue
+            anterior = referencia['us_por_llamada']
+            actual = medicion['us_por_llamada']
+            if anterior and (actual - anterior) / anterior > umbral:
+                regresiones.append((escala, nombre, anterior, actual))
+    return regresiones
+
+
+def imprimir(resultados, baseline):
+    print(f"{'escala':>6}  {'función':<28} {'llamadas':>8} {'total (s)':>10} {'µs/llamada':>12} {'vs base':>8}")
+    for escala, funciones in resultados.items():
+        for nombre, medicion in funciones.items():
+            referencia = baseline.get(escala, {}).get(nombre)
+            variacion = ''
+            if referencia and referencia['us_por_llamada']:
+                cambio = medicion['us_por_llamada'] / referencia['us_por_llamada'] - 1
+                variacion = f"{cambio:+.0%}"
+            print(f"{escala:>6}  {nombre:<28} {medicion['llamadas']:>8} "
+                  f"{medicion['segundos']:>10.3f} {medicion['us_por_llamada']:>12.1f} {variacion:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark del motor de cálculo de nómina')
+    parser.add_argument('--escalas', default='10,1k',
+                        help=f"Escalas separadas por coma ({', '.join(ESCALAS)})")
+    parser.add_argument('--repeticiones', type=int, default=3,
+                        help='Se reporta el mejor tiempo de N repeticiones')
+    parser.add_argument('--semilla', type=int, default=2025)
+    parser.add_argument('--umbral', type=float, default=UMBRAL_REGRESION,
+                        help='Regresión máxima tolerada respecto al baseline (0.20 = 20%%)')
+    parser.add_argument('--baseline', type=Path, default=ARCHIVO_BASELINE)
+    parser.add_argument('--guardar-baseline', action='store_true',
+                        help='Sobrescribe el baseline con los resultados de esta corrida')
+    opciones = parser.parse_args(argv)
+
+    escalas = [e.strip() for e in opciones.escalas.split(',') if e.strip()]
+    desconocidas = [e for e in escalas if e not in ESCALAS]
+    if desconocidas:
+        parser.error(f"Escalas no válidas: {', '.join(desconocidas)}")
+
+    configurar_django()
+    resultados = ejecutar(escalas, opciones.repeticiones, opciones.semilla)
+
+    baseline = {}
+    if opciones.baseline.exists():
+        baseline = json.loads(opciones.baseline.read_text()).get('resultados', {})
+
+    imprimir(resultados, baseline)
+
+    if opciones.guardar_baseline:
+        # Conserva las escalas que no se midieron en esta corrida
+        combinado = dict(baseline)
+        combinado.update(resultados)
+        opciones.baseline.parent.mkdir(parents=True, exist_ok=True)
+        opciones.baseline.write_text(json.dumps({
+            'python': platform.python_version(),
+            'maquina': platform.machine(),
+            'resultados': combinado,
+        }, indent=2, ensure_ascii=False) + '\n')
+        print(f"\nBaseline guardado en {os.path.relpath(opciones.baseline)}")
+        return 0
+
+    regresiones = comparar(resultados, baseline, opciones.umbral)
+    if regresiones:
+        print(f"\nRegresiones mayores a {opciones.umbral:.0%}:")
+        for escala, nombre, anterior, actual in regresiones:
+            print(f"  [{escala}] {nombre}: {anterior:.1f} → {actual:.1f} µs/llamada")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Benchmark de serialización de la respuesta de procesar_nomina.
+
+Calcula la nómina de N empleados sintéticos (sin base de datos), arma la
+respuesta igual que procesar_nomina (NominaSerializer de cada nómina más el
+resumen) y mide solo la escritura del JSON:
+
+- anterior: conversión recursiva de Decimal a float sobre cada resultado
+  (la que hacían los cálculos al terminar) y JSONRenderer de DRF.
+- drf: los resultados con sus Decimal y JSONRenderer de DRF.
+- orjson: los resultados con sus Decimal y ORJSONRenderer.
+
+Comprueba que las tres salidas decodifican al mismo JSON.
+
+Uso (desde backend/):
+    python -m benchmarks.serializacion
+    python -m benchmarks.serializacion --empleados 5000 --repeticiones 5
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+
+from benchmarks.datos_sinteticos import configurar_django, generar_empleados
+
+FECHA_REFERENCIA = date(2025, 9, 16)
+
+
+def _a_float(obj):
+    """La conversión recursiva que hacían los cálculos antes de devolver su resultado"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, dict):
+        return {k: _a_float(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_a_float(v) for v in obj]
+    return obj
+
+
+def construir_respuesta(cantidad):
+    """Datos de la respuesta de procesar_nomina para cantidad empleados"""
+    from gestion.models import Empresa, Nomina
+    from gestion.serializers import NominaSerializer
+    from gestion.utils import calcular_nomina_empleado
+
+    empresa = Empresa(id=1, nombre='Empresa Benchmark', rfc='EBE010101AB1')
+    nominas = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for empleado in generar_empleados(cantidad, fecha_referencia=FECHA_REFERENCIA, empresa=empresa):
+            calculos = calcular_nomina_empleado(
+                empleado, periodo=empleado.periodo_nominal.lower(), fecha_referencia=FECHA_REFERENCIA
+            )
+            nominas.append(Nomina(
+                id=empleado.id, empleado=empleado, empresa=empresa, tipo_nomina=empleado.periodo_nominal,
+                estado='PENDIENTE', calculos=calculos,
+                salario_neto=Decimal(str(calculos['resumen']['neto_a_pagar'])).quantize(Decimal('0.01'))
+            ))
+
+    datos = NominaSerializer(nominas, many=True).data
+    total = sum((n.salario_neto for n in nominas), Decimal('0'))
+    return {
+        'empresa': {'id': empresa.id, 'nombre': empresa.nombre, 'total_empleados': cantidad},
+        'nominas': datos,
+        'errores': [],
+        'resumen_financiero': {'total_nomina': str(total), 'promedio_nomina': str(total / len(nominas))},
+    }
+
+
+def _mejor(funcion, repeticiones):
+    mejor, salida = None, None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        salida = funcion()
+        transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return mejor, salida
+
+
+def medir(respuesta, repeticiones):
+    from rest_framework.renderers import JSONRenderer
+
+    from gestion.renderers import ORJSONRenderer, orjson
+
+    drf, rapido = JSONRenderer(), ORJSONRenderer()
+    casos = {
+        'anterior': lambda: drf.render({**respuesta, 'nominas': [_a_float(n) for n in respuesta['nominas']]}),
+        'drf': lambda: drf.render(respuesta),
+    }
+    if orjson is not None:
+        casos['orjson'] = lambda: rapido.render(respuesta)
+    else:
+        print('orjson: omitido, no está instalado')
+
+    resultados, esperado = {}, None
+    for nombre, funcion in casos.items():
+        segundos, salida = _mejor(funcion, repeticiones)
+        decodificado = json.loads(salida)
+        if esperado is None:
+            esperado = decodificado
+        elif decodificado != esperado:
+            raise SystemExit(f'{nombre}: la salida no coincide con la anterior')
+        resultados[nombre] = (segundos, len(salida))
+    return resultados
+
+
+def imprimir(resultados, cantidad):
+    base = resultados['anterior'][0]
+    print(f"\nRespuesta de procesar_nomina con {cantidad} empleados")
+    print(f"{'pipeline':<10} {'ms':>9} {'MB':>7} {'vs anterior':>12}")
+    for nombre, (segundos, tamano) in resultados.items():
+        print(f"{nombre:<10} {segundos * 1000:>9.1f} {tamano / 1e6:>7.2f} {base / segundos:>11.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serialización JSON de la respuesta de procesar_nomina')
+    parser.add_argument('--empleados', type=int, default=5000)
+    parser.add_argument('--repeticiones', type=int, default=5, help='Se reporta el mejor tiempo')
+    opciones = parser.parse_args(argv)
+
+    configurar_django()
+    respuesta = construir_respuesta(opciones.empleados)
+    imprimir(medir(respuesta, opciones.repeticiones), opciones.empleados)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Benchmark de concurrencia: vistas síncronas bajo WSGI (gunicorn) contra sus
+variantes async bajo ASGI (uvicorn).
+
+Levanta cada servidor como subproceso contra la base configurada (la misma
+que usa manage.py; p. ej. la generada con generar_datos_carga), lanza N
+peticiones GET con C conexiones concurrentes a cada endpoint y reporta
+peticiones por segundo y latencias p50/p95. Un servidor que no está
+instalado se omite.
+
+Uso (desde backend/):
+    python -m benchmarks.vistas_async --empresa 1
+    python -m benchmarks.vistas_async --empresa 1 --peticiones 1000 --concurrencia 100 --workers 2 --hilos 4
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+
+from benchmarks.datos_sinteticos import configurar_django
+
+HOST = '127.0.0.1'
+PUERTO_BASE = 8765
+ESPERA_ARRANQUE = 30
+
+# (nombre, ruta síncrona, ruta async); {empresa} y {empleado} se sustituyen
+ENDPOINTS = [
+    ('empleados', '/api/empleados/?empresa_id={empresa}', '/api/async/empleados/?empresa_id={empresa}'),
+    ('calendario', '/api/empleados/{empleado}/faltas/calendario-periodo/',
+     '/api/async/empleados/{empleado}/faltas/calendario-periodo/'),
+    ('periodos', '/api/nominas/list_periodos/?tipo=SEMANAL', '/api/async/nominas/list_periodos/?tipo=SEMANAL'),
+    ('dispersion', '/api/nominas/dispersion/?empresa_id={empresa}&fecha_inicio=2025-01-01&fecha_fin=2025-12-31',
+     '/api/async/nominas/dispersion/?empresa_id={empresa}&fecha_inicio=2025-01-01&fecha_fin=2025-12-31'),
+]
+
+
+def escenarios(opciones):
+    """(nombre, comando del servidor, usa rutas async)"""
+    return [
+        ('wsgi (gunicorn)', [
+            'gunicorn', 'backend.wsgi:application', '--bind', f'{HOST}:{{puerto}}',
+            '--workers', str(opciones.workers), '--threads', str(opciones.hilos), '--log-level', 'warning',
+        ], False),
+        ('asgi (uvicorn)', [
+            'uvicorn', 'backend.asgi:application', '--host', HOST, '--port', '{puerto}',
+            '--workers', str(opciones.workers), '--log-level', 'warning',
+        ], True),
+    ]
+
+
+def preparar(empresa_id):
+    """Token JWT de un usuario de la empresa y un empleado para el calendario"""
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from gestion.models import Empleado, Empresa, User
+
+    empresa = Empresa.objects.get(pk=empresa_id)
+    usuario = empresa.usuarios.first() or User.objects.filter(is_superuser=True).first()
+    if usuario is None:
+        raise SystemExit(f'La empresa {empresa_id} no tiene usuarios y no hay superusuario')
+    empleado = Empleado.objects.filter(empresa=empresa).values_list('id', flat=True).first()
+    return str(RefreshToken.for_user(usuario).access_token), empleado
+
+
+# =============================================
+# CLIENTE HTTP MÍNIMO
+# =============================================
+
+async def _peticion(puerto, ruta, token):
+    inicio = time.perf_counter()
+    lector, escritor = await asyncio.open_connection(HOST, puerto)
+    escritor.write((
+        f'GET {ruta} HTTP/1.1\r\nHost: {HOST}\r\nAuthorization: Bearer {token}\r\nConnection: close\r\n\r\n'
+    ).encode())
+    await escritor.drain()
+    estado = int((await lector.readline()).split()[1])
+    await lector.read()
+    escritor.close()
+    return estado, time.perf_counter() - inicio
+
+
+async def _carga(puerto, ruta, token, peticiones, concurrencia):
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def una():
+        async with semaforo:
+            return await _peticion(puerto, ruta, token)
+
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(una() for _ in range(peticiones)))
+    total = time.perf_counter() - inicio
+    latencias = sorted(segundos for _, segundos in resultados)
+    return {
+        'ok': sum(1 for estado, _ in resultados if estado == 200),
+        'rps': peticiones / total,
+        'p50_ms': latencias[len(latencias) // 2] * 1000,
+        'p95_ms': latencias[int(len(latencias) * 0.95) - 1] * 1000,
+    }
+
+
+async def _esperar_servidor(puerto, proceso):
+    limite = time.monotonic() + ESPERA_ARRANQUE
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f'El servidor terminó al arrancar (código {proceso.returncode})')
+        try:
+            _, escritor = await asyncio.open_connection(HOST, puerto)
+            escritor.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError('El servidor no respondió a tiempo')
+
+
+# =============================================
+# EJECUCIÓN
+# =============================================
+
+def ejecutar(opciones, token, empleado_id):
+    resultados = []
+    for i, (nombre, comando, usa_async) in enumerate(escenarios(opciones)):
+        if shutil.which(comando[0]) is None:
+            print(f'{nombre}: omitido, {comando[0]} no está instalado')
+            continue
+        puerto = PUERTO_BASE + i
+        proceso = subprocess.Popen([parte.format(puerto=puerto) for parte in comando], env=os.environ.copy())
+        try:
+            asyncio.run(_esperar_servidor(puerto, proceso))
+            for endpoint, ruta_sync, ruta_async in ENDPOINTS:
+                if endpoint not in opciones.endpoints:
+                    continue
+                ruta = (ruta_async if usa_async else ruta_sync).format(empresa=opciones.empresa, empleado=empleado_id)
+                asyncio.run(_carga(puerto, ruta, token, opciones.concurrencia, opciones.concurrencia))  # calentamiento
+                medicion = asyncio.run(_carga(puerto, ruta, token, opciones.peticiones, opciones.concurrencia))
+                resultados.append((nombre, endpoint, medicion))
+        finally:
+            proceso.send_signal(signal.SIGTERM)
+            proceso.wait(timeout=30)
+    return resultados
+
+
+def imprimir(resultados, peticiones):
+    print(f"\n{'servidor':<16} {'endpoint':<12} {'ok':>9} {'pet/s':>9} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+    for nombre, endpoint, medicion in resultados:
+        print(f"{nombre:<16} {endpoint:<12} {medicion['ok']:>4}/{peticiones:<4} {medicion['rps']:>9.1f} "
+              f"{medicion['p50_ms']:>9.1f} {medicion['p95_ms']:>9.1f}")
+
+
+def main(argv=None):
+    nombres = [endpoint for endpoint, _, _ in ENDPOINTS]
+    parser = argparse.ArgumentParser(description='Concurrencia de vistas síncronas (WSGI) contra async (ASGI)')
+    parser.add_argument('--empresa', type=int, required=True, help='Empresa con empleados y nóminas')
+    parser.add_argument('--peticiones', type=int, default=400)
+    parser.add_argument('--concurrencia', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=1, help='Procesos por servidor')
+    parser.add_argument('--hilos', type=int, default=4, help='Hilos por worker de gunicorn')
+    parser.add_argument('--endpoints', default=','.join(nombres), help=f"Separados por coma ({', '.join(nombres)})")
+    opciones = parser.parse_args(argv)
+    opciones.endpoints = [e.strip() for e in opciones.endpoints.split(',') if e.strip()]
+    desconocidos = [e for e in opciones.endpoints if e not in nombres]
+    if desconocidos:
+        parser.error(f"Endpoints no válidos: {', '.join(desconocidos)}")
+
+    configurar_django()
+    token, empleado_id = preparar(opciones.empresa)
+    imprimir(ejecutar(opciones, token, empleado_id), opciones.peticiones)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Acumulados anuales (YTD) por empleado.
+
+Cada nómina en estado PENDIENTE o PAGADA aporta sus percepciones, base
+gravable, exento, ISR retenido, subsidio e IMSS al renglón AcumuladoAnual de
+su empleado y año (el año de fecha_fin). Nomina.save() y Nomina.delete()
+aplican la diferencia entre el aporte anterior (leído con select_for_update)
+y el nuevo con expresiones F(), así dos guardados concurrentes no se pisan.
+Los caminos masivos (bulk_update) deben cargar las nóminas con
+select_for_update dentro de su transacción y llamar a registrar_cambios()
+con los aportes previos.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .shards import alias_actual
+
+ESTADOS_ACUMULABLES = ('PENDIENTE', 'PAGADA')
+CAMPOS = ('percepciones', 'base_gravable', 'exento', 'isr_retenido', 'subsidio_empleo', 'imss')
+CERO = Decimal('0')
+CENTAVO = Decimal('0.01')
+
+# Campos de Nomina necesarios para calcular el aporte
+CAMPOS_NOMINA = ('empleado_id', 'empresa_id', 'estado', 'fecha_inicio', 'fecha_fin', 'calculos')
+
+
+def _monto(valor):
+    try:
+        return Decimal(str(valor or 0)).quantize(CENTAVO)
+    except ArithmeticError:
+        return CERO
+
+
+def montos_de_calculos(calculos):
+    """
+    Extrae los importes fiscales de un JSON de cálculos de cualquier periodo
+    (semanal, quincenal, mensual o generado por carga).
+    """
+    calculos = calculos if isinstance(calculos, dict) else {}
+    deducciones = calculos.get('deducciones') or {}
+    detalle_isr = (deducciones.get('detalle') or {}).get('isr') or {}
+    total_percepciones = (calculos.get('resumen') or {}).get('total_percepciones') or {}
+
+    if 'Total' in total_percepciones:
+        percepciones = _monto(total_percepciones['Total'])
+    else:
+        percepciones = _monto((calculos.get('percepciones') or {}).get('total'))
+    base_gravable = _monto(detalle_isr['base_gravable']) if 'base_gravable' in detalle_isr else percepciones
+
+    # Cada cálculo guarda el subsidio con un nombre distinto
+    subsidio = detalle_isr.get('subsidio_empleo')
+    if isinstance(subsidio, dict):
+        subsidio = subsidio.get('monto_subsidio')
+    elif subsidio is None:
+        subsidio = detalle_isr.get('valor_subsidio', detalle_isr.get('subsidio_aplicado'))
+
+    return {
+        'percepciones': percepciones,
+        'base_gravable': base_gravable,
+        'exento': max(CERO, percepciones - base_gravable),
+        'isr_retenido': _monto(deducciones.get('isr')),
+        'subsidio_empleo': _monto(subsidio),
+        'imss': _monto(deducciones.get('imss')),
+    }
+
+
+def aporte(empleado_id, empresa_id, estado, fecha_inicio, fecha_fin, calculos):
+    """
+    Aporte de una nómina a los acumulados: ((empleado_id, anio), empresa_id, montos)
+    o None si no acumula.
+    """
+    fecha = fecha_fin or fecha_inicio
+    if estado not in ESTADOS_ACUMULABLES or not empleado_id or not fecha:
+        return None
+    return (empleado_id, fecha.year), empresa_id, montos_de_calculos(calculos)
+
+
+def aporte_de_nomina(nomina):
+    return aporte(*(getattr(nomina, campo) for campo in CAMPOS_NOMINA))
+
+
+def registrar_cambios(cambios):
+    """
+    Aplica a AcumuladoAnual la diferencia de una serie de (aporte_anterior,
+    aporte_nuevo). Se agrupa por empleado/año: una actualización por renglón.
+    """
+    deltas = {}
+    for anterior, nuevo in cambios:
+        for signo, aporte_nomina in ((-1, anterior), (1, nuevo)):
+            if aporte_nomina is None:
+                continue
+            clave, empresa_id, montos = aporte_nomina
+            delta = deltas.setdefault(clave, {'empresa_id': empresa_id, 'nominas': 0, **dict.fromkeys(CAMPOS, CERO)})
+            delta['nominas'] += signo
+            for campo in CAMPOS:
+                delta[campo] += signo * montos[campo]
+
+    for (empleado_id, anio), delta in deltas.items():
+        if not delta['nominas'] and not any(delta[campo] for campo in CAMPOS):
+            continue
+        _aplicar(empleado_id, anio, delta)
+
+
+def _aplicar(empleado_id, anio, delta):
+    from .models import AcumuladoAnual
+
+    incrementos = {campo: F(campo) + delta[campo] for campo in CAMPOS + ('nominas',)}
+    incrementos['fecha_actualizacion'] = timezone.now()
+    if AcumuladoAnual.objects.filter(empleado_id=empleado_id, anio=anio).update(**incrementos):
+        return
+    try:
+        with transaction.atomic(using=alias_actual()):
+            AcumuladoAnual.objects.create(
+                empleado_id=empleado_id, anio=anio, empresa_id=delta['empresa_id'],
+                **{campo: delta[campo] for campo in CAMPOS + ('nominas',)}
+            )
+    except IntegrityError:
+        # Otro proceso creó el renglón entre el update y el insert
+        AcumuladoAnual.objects.filter(empleado_id=empleado_id, anio=anio).update(**incrementos)
+
+
+def reconstruir(nominas, tamano_lote=2000):
+    """
+    Recalcula desde cero los acumulados de las nóminas dadas (queryset).
+    Devuelve la cantidad de renglones creados. El llamador borra antes los
+    renglones del mismo alcance.
+    """
+    from .models import AcumuladoAnual
+
+    totales = {}
+    filas = nominas.filter(estado__in=ESTADOS_ACUMULABLES).values_list(*CAMPOS_NOMINA)
+    for fila in filas.iterator(chunk_size=tamano_lote):
+        aporte_nomina = aporte(*fila)
+        if aporte_nomina is None:
+            continue
+        clave, empresa_id, montos = aporte_nomina
+        total = totales.setdefault(clave, {'empresa_id': empresa_id, 'nominas': 0, **dict.fromkeys(CAMPOS, CERO)})
+        total['nominas'] += 1
+        for campo in CAMPOS:
+            total[campo] += montos[campo]
+
+    AcumuladoAnual.objects.bulk_create(
+        [
+            AcumuladoAnual(empleado_id=empleado_id, anio=anio, **total)
+            for (empleado_id, anio), total in totales.items()
+        ],
+        batch_size=tamano_lote
+    )
+    return len(totales)
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Empresa, Empleado, Nomina, User
+from django.utils import timezone
 from django.utils.html import format_html
 from .forms import EmpresaForm
 from django.core.exceptions import FieldDoesNotExist
@@ -187,12 +188,12 @@ class EmpleadoAdmin(admin.ModelAdmin):
 
     @admin.action(description='Marcar empleados seleccionados como INACTIVOS')
     def marcar_como_inactivo(self, request, queryset):
-        updated = queryset.update(activo=False)
+        updated = queryset.update(activo=False, fecha_actualizacion=timezone.now())
         self.message_user(request, f"{updated} empleados marcados como inactivos")
 
     @admin.action(description='Marcar empleados seleccionados como ACTIVOS')
     def marcar_como_activo(self, request, queryset):
-        updated = queryset.update(activo=True)
+        updated = queryset.update(activo=True, fecha_actualizacion=timezone.now())
         self.message_user(request, f"{updated} empleados marcados como activos")
 
 @admin.register(Nomina)
@@ -0,0 +1,105 @@
+"""
+Ajuste anual de ISR por empresa (art. 97 LISR).
+
+Los totales del año salen de AcumuladoAnual en una sola consulta y la tarifa
+anual se aplica vectorizada sobre todos los empleados. La diferencia entre el
+ISR del ejercicio y el retenido es a cargo (se retiene) si es positiva y a
+favor (se devuelve) si es negativa.
+"""
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+
+from .models import AcumuladoAnual
+from .utils import calcular_isr_vectorizado
+
+# Con ingresos anuales mayores el trabajador presenta su propia declaración
+LIMITE_INGRESOS_AJUSTE = Decimal('400000.00')
+
+
+def _motivo_no_aplica(fecha_ingreso, activo, fecha_baja, percepciones, anio):
+    if percepciones > LIMITE_INGRESOS_AJUSTE:
+        return 'Ingresos mayores a $400,000: presenta declaración anual propia'
+    if fecha_ingreso and fecha_ingreso > date(anio, 1, 1):
+        return 'No laboró desde el 1 de enero'
+    if not activo and fecha_baja and fecha_baja < date(anio, 12, 1):
+        return 'Dejó de prestar servicios antes del 1 de diciembre'
+    return None
+
+
+def calcular_ajuste_anual(empresa_id, anio):
+    """
+    Calcula el ajuste anual de todos los empleados con acumulados en el año.
+
+    Returns:
+        dict con 'empleados' (uno por empleado) y 'resumen' de la empresa.
+    """
+    filas = list(
+        AcumuladoAnual.objects
+        .filter(empresa_id=empresa_id, anio=anio)
+        .order_by('empleado__apellido_paterno', 'empleado__nombre')
+        .values_list(
+            'empleado_id', 'empleado__nombre', 'empleado__apellido_paterno', 'empleado__apellido_materno',
+            'empleado__rfc', 'empleado__fecha_ingreso', 'empleado__activo', 'empleado__fecha_baja',
+            'nominas', 'percepciones', 'base_gravable', 'exento', 'isr_retenido', 'subsidio_empleo'
+        )
+    )
+
+    bases = np.fromiter((float(f[10]) for f in filas), dtype=float, count=len(filas))
+    retenidos = np.fromiter((float(f[12]) for f in filas), dtype=float, count=len(filas))
+    isr_anual = calcular_isr_vectorizado(bases, 'anual')
+    diferencias = np.round(isr_anual - retenidos, 2)
+
+    empleados = []
+    resumen = {
+        'empresa_id': int(empresa_id),
+        'anio': anio,
+        'empleados': len(filas),
+        'empleados_con_ajuste': 0,
+        'empleados_sin_ajuste': 0,
+        'isr_anual': 0.0,
+        'isr_retenido': 0.0,
+        'total_a_cargo': 0.0,
+        'total_a_favor': 0.0,
+    }
+    for fila, isr, diferencia in zip(filas, isr_anual.tolist(), diferencias.tolist()):
+        (empleado_id, nombre, paterno, materno, rfc, fecha_ingreso, activo, fecha_baja,
+         nominas, percepciones, base_gravable, exento, isr_retenido, subsidio) = fila
+        motivo = _motivo_no_aplica(fecha_ingreso, activo, fecha_baja, percepciones, anio)
+
+        empleado = {
+            'empleado_id': empleado_id,
+            'nombre_completo': f"{nombre} {paterno} {materno or ''}".strip(),
+            'rfc': rfc,
+            'nominas': nominas,
+            'percepciones': float(percepciones),
+            'exento': float(exento),
+            'base_gravable': float(base_gravable),
+            'isr_anual': isr,
+            'isr_retenido': float(isr_retenido),
+            'subsidio_empleo': float(subsidio),
+            'aplica': motivo is None,
+            'motivo_no_aplica': motivo,
+            'diferencia': 0.0,
+            'a_cargo': 0.0,
+            'a_favor': 0.0,
+        }
+        if motivo is None:
+            empleado['diferencia'] = diferencia
+            empleado['a_cargo'] = max(0.0, diferencia)
+            empleado['a_favor'] = max(0.0, -diferencia)
+            resumen['empleados_con_ajuste'] += 1
+            resumen['isr_anual'] += isr
+            resumen['isr_retenido'] += float(isr_retenido)
+            resumen['total_a_cargo'] += empleado['a_cargo']
+            resumen['total_a_favor'] += empleado['a_favor']
+        else:
+            resumen['empleados_sin_ajuste'] += 1
+        empleados.append(empleado)
+
+    for clave in ('isr_anual', 'isr_retenido', 'total_a_cargo', 'total_a_favor'):
+        resumen[clave] = round(resumen[clave], 2)
+    resumen['neto'] = round(resumen['total_a_cargo'] - resumen['total_a_favor'], 2)
+
+    return {'empleados': empleados, 'resumen': resumen}
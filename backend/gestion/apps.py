@@ -7,6 +7,10 @@ class GestionConfig(AppConfig):
     name = 'gestion'
     
     def ready(self):
+        from django.db.models.signals import post_migrate
+        from .shards import ajustar_secuencias_al_migrar
+        post_migrate.connect(ajustar_secuencias_al_migrar, sender=self)
+
         # Precargar tablas ISR en memoria (opcional)
         global TABLAS_ISR
         TABLAS_ISR = {
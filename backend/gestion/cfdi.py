@@ -0,0 +1,412 @@
+"""
+Generación masiva de CFDI 4.0 con complemento de nómina 1.2.
+
+Los datos de cada nómina se leen en una sola consulta y se convierten a
+diccionarios simples; cada XML se escribe de forma incremental con
+XMLGenerator (sin construir un DOM) y, si hay muchos, en paralelo en un pool
+de procesos. Cada documento se revisa localmente contra las restricciones del
+esquema (atributos requeridos, patrones y catálogos) y contra la consistencia
+de sus totales antes de entregarse.
+
+Los documentos se generan sin sello: el sellado y timbrado con el PAC son un
+paso posterior.
+"""
+import io
+import os
+import re
+import unicodedata
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time
+from decimal import Decimal
+from xml.etree import ElementTree
+from xml.sax.saxutils import XMLGenerator
+
+from . import acumulados
+from .models import Nomina
+
+# =============================================
+# CATÁLOGOS Y CONFIGURACIÓN
+# =============================================
+
+NS_CFDI = 'http://www.sat.gob.mx/cfd/4'
+NS_NOMINA = 'http://www.sat.gob.mx/nomina12'
+NS_XSI = 'http://www.w3.org/2001/XMLSchema-instance'
+SCHEMA_LOCATION = (
+    f'{NS_CFDI} http://www.sat.gob.mx/sitio_internet/cfd/4/cfdv40.xsd '
+    f'{NS_NOMINA} http://www.sat.gob.mx/sitio_internet/cfd/nomina/nomina12.xsd'
+)
+
+PERIODICIDAD_PAGO = {'SEMANAL': '02', 'QUINCENAL': '04', 'MENSUAL': '05'}
+PERIODICIDAD_EXTRAORDINARIA = '99'
+
+# Percepción por tipo de corrida (c_TipoPercepcion)
+TIPO_PERCEPCION = {
+    'AGUINALDO': ('002', 'Gratificación anual (aguinaldo)'),
+    'PRIMA_VAC': ('021', 'Prima vacacional'),
+    'PTU': ('003', 'Participación de los trabajadores en las utilidades PTU'),
+}
+PERCEPCION_ORDINARIA = ('001', 'Sueldos, salarios, rayas y jornales')
+DEDUCCION_IMSS = ('001', 'Seguridad social')
+DEDUCCION_ISR = ('002', 'ISR')
+
+# c_Estado por nombre de entidad (sin acentos, en mayúsculas)
+CLAVE_ENTIDAD = {
+    'AGUASCALIENTES': 'AGU', 'BAJA CALIFORNIA': 'BCN', 'BAJA CALIFORNIA SUR': 'BCS', 'CAMPECHE': 'CAM',
+    'CHIAPAS': 'CHP', 'CHIHUAHUA': 'CHH', 'CIUDAD DE MEXICO': 'CMX', 'CDMX': 'CMX', 'COAHUILA': 'COA',
+    'COLIMA': 'COL', 'DURANGO': 'DUR', 'GUANAJUATO': 'GUA', 'GUERRERO': 'GRO', 'HIDALGO': 'HID',
+    'JALISCO': 'JAL', 'ESTADO DE MEXICO': 'MEX', 'MEXICO': 'MEX', 'MICHOACAN': 'MIC', 'MORELOS': 'MOR',
+    'NAYARIT': 'NAY', 'NUEVO LEON': 'NLE', 'OAXACA': 'OAX', 'PUEBLA': 'PUE', 'QUERETARO': 'QUE',
+    'QUINTANA ROO': 'ROO', 'SAN LUIS POTOSI': 'SLP', 'SINALOA': 'SIN', 'SONORA': 'SON', 'TABASCO': 'TAB',
+    'TAMAULIPAS': 'TAM', 'TLAXCALA': 'TLA', 'VERACRUZ': 'VER', 'YUCATAN': 'YUC', 'ZACATECAS': 'ZAC',
+}
+
+ESTADOS_TIMBRABLES = ('PENDIENTE', 'PAGADA')
+MINIMO_PARA_POOL = 200  # Con menos documentos el pool cuesta más de lo que ahorra
+
+# =============================================
+# RESTRICCIONES DEL ESQUEMA
+# =============================================
+
+IMPORTE = r'[0-9]{1,18}(\.[0-9]{1,6})?'
+FECHA = r'[0-9]{4}-[0-9]{2}-[0-9]{2}'
+RFC = r'[A-ZÑ&]{3,4}[0-9]{2}(0[1-9]|1[012])(0[1-9]|[12][0-9]|3[01])[A-Z0-9]{2}[0-9A]'
+
+# Por elemento: atributo -> (requerido, patrón)
+ESQUEMA = {
+    'cfdi:Comprobante': {
+        'Version': (True, r'4\.0'), 'Folio': (True, r'[^|]{1,40}'),
+        'Fecha': (True, r'[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}'),
+        'SubTotal': (True, IMPORTE), 'Descuento': (False, IMPORTE), 'Moneda': (True, r'MXN'),
+        'Total': (True, IMPORTE), 'TipoDeComprobante': (True, r'N'), 'Exportacion': (True, r'01'),
+        'MetodoPago': (True, r'PUE'), 'LugarExpedicion': (True, r'[0-9]{5}'),
+    },
+    'cfdi:Emisor': {'Rfc': (True, RFC), 'Nombre': (True, r'.{1,254}'), 'RegimenFiscal': (True, r'[0-9]{3}')},
+    'cfdi:Receptor': {
+        'Rfc': (True, RFC), 'Nombre': (True, r'.{1,254}'), 'DomicilioFiscalReceptor': (True, r'[0-9]{5}'),
+        'RegimenFiscalReceptor': (True, r'605'), 'UsoCFDI': (True, r'CN01'),
+    },
+    'cfdi:Concepto': {
+        'ClaveProdServ': (True, r'84111505'), 'Cantidad': (True, r'1'), 'ClaveUnidad': (True, r'ACT'),
+        'Descripcion': (True, r'Pago de nómina'), 'ValorUnitario': (True, IMPORTE),
+        'Importe': (True, IMPORTE), 'Descuento': (False, IMPORTE), 'ObjetoImp': (True, r'01'),
+    },
+    'nomina12:Nomina': {
+        'Version': (True, r'1\.2'), 'TipoNomina': (True, r'[OE]'), 'FechaPago': (True, FECHA),
+        'FechaInicialPago': (True, FECHA), 'FechaFinalPago': (True, FECHA),
+        'NumDiasPagados': (True, r'[0-9]{1,5}(\.[0-9]{1,3})?'),
+        'TotalPercepciones': (False, IMPORTE), 'TotalDeducciones': (False, IMPORTE),
+    },
+    'nomina12:Emisor': {'RegistroPatronal': (False, r'[^|]{1,20}')},
+    'nomina12:Receptor': {
+        'Curp': (True, r'[A-Z][AEIOUX][A-Z]{2}[0-9]{6}[HM][A-Z]{5}[0-9A-Z][0-9]'),
+        'NumSeguridadSocial': (False, r'[0-9]{1,15}'), 'FechaInicioRelLaboral': (False, FECHA),
+        'Antigüedad': (False, r'P[1-9][0-9]{0,3}W'), 'TipoContrato': (True, r'0[1-9]|10|99'),
+        'TipoRegimen': (True, r'0[2-9]|1[0-3]|99'), 'NumEmpleado': (True, r'[^|]{1,15}'),
+        'PeriodicidadPago': (True, r'0[1-9]|10|99'), 'SalarioDiarioIntegrado': (False, IMPORTE),
+        'ClaveEntFed': (True, r'[A-Z]{3}'),
+    },
+    'nomina12:Percepciones': {
+        'TotalSueldos': (False, IMPORTE), 'TotalGravado': (True, IMPORTE), 'TotalExento': (True, IMPORTE),
+    },
+    'nomina12:Percepcion': {
+        'TipoPercepcion': (True, r'[0-9]{3}'), 'Clave': (True, r'[^|]{3,15}'), 'Concepto': (True, r'[^|]{1,100}'),
+        'ImporteGravado': (True, IMPORTE), 'ImporteExento': (True, IMPORTE),
+    },
+    'nomina12:Deducciones': {
+        'TotalOtrasDeducciones': (False, IMPORTE), 'TotalImpuestosRetenidos': (False, IMPORTE),
+    },
+    'nomina12:Deduccion': {
+        'TipoDeduccion': (True, r'[0-9]{3}'), 'Clave': (True, r'[^|]{3,15}'), 'Concepto': (True, r'[^|]{1,100}'),
+        'Importe': (True, IMPORTE),
+    },
+}
+ESQUEMA_COMPILADO = {
+    elemento: {atributo: (requerido, re.compile(patron)) for atributo, (requerido, patron) in atributos.items()}
+    for elemento, atributos in ESQUEMA.items()
+}
+PREFIJOS = {NS_CFDI: 'cfdi', NS_NOMINA: 'nomina12'}
+
+
+def _importe(valor):
+    return f'{Decimal(str(valor or 0)).quantize(Decimal("0.01")):f}'
+
+
+def _sin_acentos(texto):
+    return ''.join(c for c in unicodedata.normalize('NFD', texto or '') if unicodedata.category(c) != 'Mn').upper().strip()
+
+
+# =============================================
+# DATOS
+# =============================================
+
+def cargar_documentos(nominas):
+    """
+    Convierte las nóminas (queryset) a diccionarios simples, serializables
+    para el pool de procesos. Una sola consulta con empleado y empresa.
+    """
+    documentos = []
+    consulta = (
+        nominas
+        .filter(estado__in=ESTADOS_TIMBRABLES, fecha_inicio__isnull=False, fecha_fin__isnull=False)
+        .select_related('empleado', 'empresa', 'empleado__empresa')
+    )
+    for nomina in consulta.order_by('fecha_inicio', 'id').iterator(chunk_size=2000):
+        empleado = nomina.empleado
+        if empleado is None:
+            continue
+        empresa = nomina.empresa or empleado.empresa
+        calculos = nomina.calculos if isinstance(nomina.calculos, dict) else {}
+        montos = acumulados.montos_de_calculos(calculos)
+        fecha_pago = nomina.fecha_fin
+        documentos.append({
+            'nomina_id': nomina.id,
+            'tipo_nomina': nomina.tipo_nomina,
+            'fecha_inicio': nomina.fecha_inicio.isoformat(),
+            'fecha_fin': nomina.fecha_fin.isoformat(),
+            'fecha_pago': fecha_pago.isoformat(),
+            'fecha_emision': datetime.combine(fecha_pago, time(12)).isoformat(timespec='seconds'),
+            'dias_pagados': (calculos.get('empleado') or {}).get('dias_laborados')
+            or (nomina.fecha_fin - nomina.fecha_inicio).days + 1,
+            'percepciones': _importe(montos['percepciones']),
+            'gravado': _importe(montos['base_gravable']),
+            'exento': _importe(montos['exento']),
+            'isr': _importe(montos['isr_retenido']),
+            'imss': _importe(montos['imss']),
+            'sbc': _importe((calculos.get('sbc') or {}).get('diario')),
+            'emisor': {
+                'rfc': empresa.rfc, 'nombre': empresa.nombre, 'regimen_fiscal': empresa.regimen_fiscal,
+                'codigo_postal': empresa.codigo_postal, 'registro_patronal': empresa.registro_patronal,
+                'entidad': CLAVE_ENTIDAD.get(_sin_acentos(empresa.estado), ''),
+            },
+            'receptor': {
+                'id': empleado.id, 'rfc': empleado.rfc, 'curp': empleado.curp, 'nss': empleado.nss,
+                'nombre': f"{empleado.nombre} {empleado.apellido_paterno} {empleado.apellido_materno or ''}".strip().upper(),
+                'codigo_postal': empleado.codigo_postal, 'periodo_nominal': empleado.periodo_nominal,
+                'fecha_ingreso': empleado.fecha_ingreso.isoformat(),
+                'semanas': max(1, ((fecha_pago - empleado.fecha_ingreso).days + 1) // 7),
+            },
+        })
+    return documentos
+
+
+# =============================================
+# ESCRITURA INCREMENTAL
+# =============================================
+
+def escribir_xml(doc):
+    """XML sin sellar de un documento; se escribe elemento por elemento"""
+    salida = io.BytesIO()
+    xml = XMLGenerator(salida, encoding='UTF-8', short_empty_elements=True)
+
+    def abrir(nombre, atributos):
+        xml.startElement(nombre, {k: str(v) for k, v in atributos.items() if v not in (None, '')})
+
+    def vacio(nombre, atributos):
+        abrir(nombre, atributos)
+        xml.endElement(nombre)
+
+    percepciones = Decimal(doc['percepciones'])
+    deducciones = Decimal(doc['isr']) + Decimal(doc['imss'])
+    extraordinaria = doc['tipo_nomina'] in TIPO_PERCEPCION
+    tipo_percepcion, concepto_percepcion = TIPO_PERCEPCION.get(doc['tipo_nomina'], PERCEPCION_ORDINARIA)
+    emisor, receptor = doc['emisor'], doc['receptor']
+
+    xml.startDocument()
+    xml.startElement('cfdi:Comprobante', {
+        'xmlns:cfdi': NS_CFDI, 'xmlns:nomina12': NS_NOMINA, 'xmlns:xsi': NS_XSI,
+        'xsi:schemaLocation': SCHEMA_LOCATION, 'Version': '4.0', 'Folio': str(doc['nomina_id']),
+        'Fecha': doc['fecha_emision'], 'SubTotal': _importe(percepciones), 'Descuento': _importe(deducciones),
+        'Moneda': 'MXN', 'Total': _importe(percepciones - deducciones), 'TipoDeComprobante': 'N',
+        'Exportacion': '01', 'MetodoPago': 'PUE', 'LugarExpedicion': emisor['codigo_postal'],
+    })
+    vacio('cfdi:Emisor', {'Rfc': emisor['rfc'], 'Nombre': emisor['nombre'], 'RegimenFiscal': emisor['regimen_fiscal']})
+    vacio('cfdi:Receptor', {
+        'Rfc': receptor['rfc'], 'Nombre': receptor['nombre'], 'DomicilioFiscalReceptor': receptor['codigo_postal'],
+        'RegimenFiscalReceptor': '605', 'UsoCFDI': 'CN01',
+    })
+    xml.startElement('cfdi:Conceptos', {})
+    vacio('cfdi:Concepto', {
+        'ClaveProdServ': '84111505', 'Cantidad': '1', 'ClaveUnidad': 'ACT', 'Descripcion': 'Pago de nómina',
+        'ValorUnitario': _importe(percepciones), 'Importe': _importe(percepciones),
+        'Descuento': _importe(deducciones), 'ObjetoImp': '01',
+    })
+    xml.endElement('cfdi:Conceptos')
+
+    xml.startElement('cfdi:Complemento', {})
+    xml.startElement('nomina12:Nomina', {
+        'Version': '1.2', 'TipoNomina': 'E' if extraordinaria else 'O', 'FechaPago': doc['fecha_pago'],
+        'FechaInicialPago': doc['fecha_inicio'], 'FechaFinalPago': doc['fecha_fin'],
+        'NumDiasPagados': str(doc['dias_pagados']), 'TotalPercepciones': _importe(percepciones),
+        'TotalDeducciones': _importe(deducciones),
+    })
+    vacio('nomina12:Emisor', {'RegistroPatronal': emisor['registro_patronal']})
+    vacio('nomina12:Receptor', {
+        'Curp': receptor['curp'], 'NumSeguridadSocial': receptor['nss'],
+        'FechaInicioRelLaboral': receptor['fecha_ingreso'], 'Antigüedad': f"P{receptor['semanas']}W",
+        'TipoContrato': '01', 'TipoRegimen': '02', 'NumEmpleado': str(receptor['id']),
+        'PeriodicidadPago': PERIODICIDAD_EXTRAORDINARIA if extraordinaria else PERIODICIDAD_PAGO.get(receptor['periodo_nominal'], '99'),
+        'SalarioDiarioIntegrado': doc['sbc'] if Decimal(doc['sbc']) else None, 'ClaveEntFed': emisor['entidad'],
+    })
+
+    xml.startElement('nomina12:Percepciones', {
+        'TotalSueldos': _importe(percepciones), 'TotalGravado': doc['gravado'], 'TotalExento': doc['exento'],
+    })
+    vacio('nomina12:Percepcion', {
+        'TipoPercepcion': tipo_percepcion, 'Clave': tipo_percepcion, 'Concepto': concepto_percepcion,
+        'ImporteGravado': doc['gravado'], 'ImporteExento': doc['exento'],
+    })
+    xml.endElement('nomina12:Percepciones')
+
+    if deducciones:
+        abrir('nomina12:Deducciones', {
+            'TotalOtrasDeducciones': doc['imss'] if Decimal(doc['imss']) else None,
+            'TotalImpuestosRetenidos': doc['isr'] if Decimal(doc['isr']) else None,
+        })
+        for (tipo, concepto), importe in ((DEDUCCION_IMSS, doc['imss']), (DEDUCCION_ISR, doc['isr'])):
+            if Decimal(importe):
+                vacio('nomina12:Deduccion', {'TipoDeduccion': tipo, 'Clave': tipo, 'Concepto': concepto, 'Importe': importe})
+        xml.endElement('nomina12:Deducciones')
+
+    xml.endElement('nomina12:Nomina')
+    xml.endElement('cfdi:Complemento')
+    xml.endElement('cfdi:Comprobante')
+    xml.endDocument()
+    return salida.getvalue()
+
+
+# =============================================
+# VALIDACIÓN LOCAL
+# =============================================
+
+def validar_xml(contenido):
+    """
+    Revisa el XML contra ESQUEMA (atributos requeridos y patrones de cada
+    elemento) y la consistencia de los totales.
+
+    Returns:
+        lista de errores (vacía si es válido)
+    """
+    errores = []
+    try:
+        raiz = ElementTree.fromstring(contenido)
+    except ElementTree.ParseError as e:
+        return [f'XML mal formado: {e}']
+
+    nodos = {}
+    for nodo in raiz.iter():
+        espacio, _, local = nodo.tag[1:].partition('}')
+        nombre = f'{PREFIJOS.get(espacio, espacio)}:{local}'
+        nodos.setdefault(nombre, []).append(nodo)
+        reglas = ESQUEMA_COMPILADO.get(nombre)
+        if reglas is None:
+            continue
+        for atributo, (requerido, patron) in reglas.items():
+            valor = nodo.get(atributo)
+            if valor is None:
+                if requerido:
+                    errores.append(f'{nombre}: falta el atributo {atributo}')
+            elif not patron.fullmatch(valor):
+                errores.append(f'{nombre}: {atributo}="{valor}" no cumple el patrón')
+
+    if errores:
+        return errores
+
+    def total(nombre, atributo):
+        return sum((Decimal(n.get(atributo, '0')) for n in nodos.get(nombre, [])), Decimal('0'))
+
+    comprobante = nodos['cfdi:Comprobante'][0]
+    nomina = nodos['nomina12:Nomina'][0]
+    subtotal, descuento = Decimal(comprobante.get('SubTotal')), Decimal(comprobante.get('Descuento', '0'))
+    if Decimal(comprobante.get('Total')) != subtotal - descuento:
+        errores.append('Total debe ser SubTotal - Descuento')
+    if Decimal(nomina.get('TotalPercepciones', '0')) != total('nomina12:Percepcion', 'ImporteGravado') + total('nomina12:Percepcion', 'ImporteExento'):
+        errores.append('TotalPercepciones no coincide con el detalle de percepciones')
+    if Decimal(nomina.get('TotalDeducciones', '0')) != total('nomina12:Deduccion', 'Importe'):
+        errores.append('TotalDeducciones no coincide con el detalle de deducciones')
+    if subtotal != Decimal(nomina.get('TotalPercepciones', '0')):
+        errores.append('SubTotal debe ser igual a TotalPercepciones')
+    if nomina.get('FechaInicialPago') > nomina.get('FechaFinalPago'):
+        errores.append('FechaInicialPago posterior a FechaFinalPago')
+    return errores
+
+
+def generar_documento(doc):
+    """(nomina_id, nombre_archivo, xml, errores) de un documento; se ejecuta en el pool"""
+    contenido = escribir_xml(doc)
+    nombre = f"{doc['receptor']['rfc']}_{doc['fecha_inicio']}_{doc['nomina_id']}.xml"
+    return doc['nomina_id'], nombre, contenido, validar_xml(contenido)
+
+
+def generar_documentos(documentos, procesos=None):
+    """
+    Genera y valida los XML. Con muchos documentos se reparten en un pool de
+    procesos; el orden de salida es el de entrada.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    if procesos <= 1 or len(documentos) < MINIMO_PARA_POOL:
+        yield from map(generar_documento, documentos)
+        return
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        yield from pool.map(generar_documento, documentos, chunksize=max(1, len(documentos) // (procesos * 4)))
+
+
+def nominas_del_periodo(empresa_id, fecha_inicio, fecha_fin):
+    return Nomina.objects.filter(empresa_id=empresa_id, fecha_inicio__gte=fecha_inicio, fecha_fin__lte=fecha_fin)
+
+
+# =============================================
+# SALIDA
+# =============================================
+
+class _BufferZip:
+    """Destino no posicionable para ZipFile: acumula lo escrito hasta vaciarlo"""
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.partes)
+        self.partes = []
+        return datos
+
+
+def zip_en_streaming(resultados, errores):
+    """
+    Genera el ZIP por partes conforme se producen los XML. Los documentos que
+    no pasan la validación no se incluyen y se agregan a `errores`; al final
+    se incluye errores.txt si hubo alguno.
+    """
+    buffer = _BufferZip()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archivo:
+        for nomina_id, nombre, contenido, errores_doc in resultados:
+            if errores_doc:
+                errores.append({'nomina_id': nomina_id, 'archivo': nombre, 'errores': errores_doc})
+                continue
+            archivo.writestr(nombre, contenido)
+            yield buffer.vaciar()
+        if errores:
+            archivo.writestr('errores.txt', '\n'.join(
+                f"{e['archivo']}: {'; '.join(e['errores'])}" for e in errores
+            ))
+    yield buffer.vaciar()
+
+
+def escribir_en_directorio(resultados, directorio):
+    """Escribe los XML válidos en el directorio; devuelve (generados, errores)"""
+    os.makedirs(directorio, exist_ok=True)
+    generados, errores = 0, []
+    for nomina_id, nombre, contenido, errores_doc in resultados:
+        if errores_doc:
+            errores.append({'nomina_id': nomina_id, 'archivo': nombre, 'errores': errores_doc})
+            continue
+        with open(os.path.join(directorio, nombre), 'wb') as destino:
+            destino.write(contenido)
+        generados += 1
+    return generados, errores
@@ -0,0 +1,148 @@
+"""
+GET condicional (ETag / Last-Modified) para listas y detalle de modelos con
+fecha_actualizacion, y para los catálogos de periodos.
+
+La firma de una lista es el número de filas y la fecha_actualizacion más
+reciente de las filas y de las relaciones que salen en la respuesta
+(campos_firma), junto con la ruta completa y el usuario:
+
+- Si la petición trae If-None-Match, la firma sale de una consulta de
+  agregados y, si coincide, se responde 304 sin cargar ni serializar filas.
+- Si no, se calcula sobre las filas ya cargadas para la respuesta, sin
+  consultas extra.
+
+Las listas solo usan ETag: borrar una fila no mueve la fecha más reciente y
+Last-Modified tiene resolución de un segundo, así que If-Modified-Since
+daría 304 con listas viejas. El detalle sí envía Last-Modified.
+
+Las escrituras masivas (bulk_update, QuerySet.update) no pasan por auto_now:
+deben fijar fecha_actualizacion ellas mismas para que la firma cambie.
+"""
+import hashlib
+import json
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+# Cambiarla invalida todas las firmas (p. ej. si cambia la forma de las respuestas)
+VERSION_FIRMAS = 1
+CATALOGO_SEGUNDOS = 3600
+
+
+def _etag(*partes):
+    return 'W/' + quote_etag(hashlib.sha1(repr((VERSION_FIRMAS,) + partes).encode()).hexdigest())
+
+
+def es_condicional(request, solo_etag=False):
+    if solo_etag:
+        return 'HTTP_IF_NONE_MATCH' in request.META
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+# =============================================
+# FIRMAS DE LISTAS
+# =============================================
+
+def _firma(request, total, fechas):
+    """(etag, last_modified como timestamp o None)"""
+    ultima = max((f for f in fechas if f is not None), default=None)
+    etag = _etag(request.get_full_path(), request.user.pk, total, *[f.isoformat() if f else '' for f in fechas])
+    return etag, int(ultima.timestamp()) if ultima else None
+
+
+def firma_de_consulta(request, queryset, campos):
+    """Firma con una sola consulta de agregados (sin cargar filas)"""
+    valores = queryset.order_by().aggregate(
+        total=Count('pk'), **{f'campo_{i}': Max(campo) for i, campo in enumerate(campos)}
+    )
+    return _firma(request, valores['total'], [valores[f'campo_{i}'] for i in range(len(campos))])
+
+
+def _valor(objeto, ruta):
+    for parte in ruta.split('__'):
+        objeto = getattr(objeto, parte, None)
+        if objeto is None:
+            return None
+    return objeto
+
+
+def firma_de_objetos(request, objetos, campos):
+    """La misma firma que firma_de_consulta, sobre filas ya cargadas"""
+    fechas = []
+    for campo in campos:
+        fechas.append(max((v for v in (_valor(o, campo) for o in objetos) if v is not None), default=None))
+    return _firma(request, len(objetos), fechas)
+
+
+def _marcar(respuesta, etag, ultima):
+    respuesta['ETag'] = etag
+    if ultima is not None:
+        respuesta['Last-Modified'] = http_date(ultima)
+    # Siempre se revalida: la firma es barata y el contenido cambia en cualquier momento
+    patch_cache_control(respuesta, private=True, no_cache=True)
+    return respuesta
+
+
+def no_modificado(request, etag, ultima):
+    """Respuesta 304 (con sus encabezados) si el cliente ya tiene esta versión, si no None"""
+    respuesta = get_conditional_response(request, etag=etag, last_modified=ultima)
+    return _marcar(respuesta, etag, ultima) if respuesta is not None else None
+
+
+class ListaCondicionalMixin:
+    """
+    list y retrieve de un ModelViewSet con ETag/Last-Modified. campos_firma
+    incluye las relaciones cuyo contenido sale en el serializador; deben
+    venir en select_related para no costar consultas.
+    """
+    campos_firma = ('fecha_actualizacion',)
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        if es_condicional(request, solo_etag=True):
+            etag = firma_de_consulta(request, queryset, self.campos_firma)[0]
+            respuesta = no_modificado(request, etag, None)
+            if respuesta is not None:
+                return respuesta
+
+        objetos = list(queryset)
+        respuesta = Response(self.get_serializer(objetos, many=True).data)
+        return _marcar(respuesta, firma_de_objetos(request, objetos, self.campos_firma)[0], None)
+
+    def retrieve(self, request, *args, **kwargs):
+        if es_condicional(request):
+            valor = kwargs[self.lookup_url_kwarg or self.lookup_field]
+            consulta = self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: valor})
+            etag, ultima = firma_de_consulta(request, consulta, self.campos_firma)
+            # Sin filas (no existe o no es visible) sigue el camino normal hacia el 404
+            respuesta = no_modificado(request, etag, ultima) if ultima is not None else None
+            if respuesta is not None:
+                return respuesta
+
+        instancia = self.get_object()
+        respuesta = Response(self.get_serializer(instancia).data)
+        return _marcar(respuesta, *firma_de_objetos(request, [instancia], self.campos_firma))
+
+
+# =============================================
+# CATÁLOGOS
+# =============================================
+
+def respuesta_catalogo(request, anio, clave, construir, responder=Response):
+    """
+    Catálogo que solo depende de (clave, año) y del código. El ETag es un
+    hash del contenido, así que cambia con un despliegue que cambie el
+    catálogo; el cliente lo guarda una hora y después revalida.
+    """
+    datos = construir()
+    etag = _etag('catalogo', clave, anio, json.dumps(datos, sort_keys=True, default=str))
+    respuesta = get_conditional_response(request, etag=etag) if es_condicional(request) else None
+    if respuesta is None:
+        respuesta = responder(datos)
+    respuesta['ETag'] = etag
+    patch_cache_control(respuesta, private=True, max_age=CATALOGO_SEGUNDOS)
+    return respuesta
@@ -0,0 +1,284 @@
+"""
+Archivos de dispersión bancaria del neto de nómina.
+
+Cada layout se describe con datos (formato, cuenta a usar y campos del
+encabezado, detalle y pie) y se compila una sola vez a plantillas de texto;
+el detalle se escribe con str.format_map sobre cada renglón. Los renglones
+salen de una sola consulta values_list(...).iterator() sobre las nóminas del
+periodo, así que el archivo se genera en streaming sin cargar el periodo
+completo en memoria.
+
+Los layouts incluidos siguen la estructura general de los archivos de pago de
+nómina de cada banco; antes de usarlos en producción hay que cotejarlos con
+la versión vigente que entrega el banco y, si difiere, ajustarlos en
+settings.DISPERSION_LAYOUTS.
+"""
+import csv
+import unicodedata
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+
+from django.conf import settings
+
+from .models import Nomina
+
+ESTADOS_DISPERSABLES = ('PENDIENTE',)
+CONCEPTO = 'PAGO DE NOMINA'
+
+# Campos fijos: (campo, ancho, tipo). Tipo 'N' se alinea a la derecha con
+# ceros, 'A' a la izquierda con espacios; '=valor' es un literal. Solo los
+# textos (TRUNCABLES) se recortan al ancho; un número que no cabe (cuenta,
+# importe, secuencia...) es un ErrorDispersion.
+# Campos del detalle: secuencia, cuenta, tipo_cuenta (40 CLABE, 01 cuenta),
+# banco, nombre, rfc, importe, importe_centavos, referencia, concepto.
+# referencia es el id de la nómina; los ids de los shards empiezan en
+# SHARDS_RANGO_IDS (13 dígitos), así que los layouts de ancho fijo ponen la
+# secuencia del archivo en su campo de referencia.
+# Encabezado y pie: empresa, rfc_empresa, fecha_pago, registros, total,
+# total_centavos (registros y totales solo en el pie).
+# banco: clave SPEI del único banco que acepta el layout (archivos de mismo
+# banco); las cuentas de otros bancos se omiten.
+LAYOUTS = {
+    'csv': {
+        'nombre': 'CSV genérico',
+        'formato': 'csv',
+        'cuenta': 'clabe_o_cuenta',
+        'detalle': ['secuencia', 'cuenta', 'tipo_cuenta', 'banco', 'nombre', 'rfc', 'importe', 'referencia', 'concepto'],
+    },
+    'bbva': {
+        'nombre': 'BBVA nómina (cuentas BBVA)',
+        'formato': 'fijo',
+        'cuenta': 'cuenta',
+        'banco': '012',
+        'detalle': [
+            ('secuencia', 9, 'N'), ('rfc', 16, 'A'), ('=99', 2, 'N'), ('cuenta', 20, 'A'),
+            ('importe_centavos', 15, 'N'), ('nombre', 40, 'A'), ('=001', 3, 'N'), ('=001', 3, 'N'),
+        ],
+    },
+    'banorte': {
+        'nombre': 'Banorte nómina (SPEI y mismo banco)',
+        'formato': 'fijo',
+        'cuenta': 'clabe_o_cuenta',
+        'encabezado': [('=H', 1, 'A'), ('=NE', 2, 'A'), ('fecha_pago', 8, 'N'), ('rfc_empresa', 13, 'A'), ('empresa', 40, 'A')],
+        'detalle': [
+            ('=D', 1, 'A'), ('fecha_pago', 8, 'N'), ('secuencia', 10, 'N'), ('tipo_cuenta', 2, 'N'),
+            ('banco', 3, 'N'), ('cuenta', 18, 'N'), ('importe_centavos', 15, 'N'), ('nombre', 40, 'A'),
+            ('concepto', 30, 'A'),
+        ],
+        'pie': [('=T', 1, 'A'), ('registros', 6, 'N'), ('total_centavos', 15, 'N')],
+    },
+    'santander': {
+        'nombre': 'Santander nómina (SPEI y mismo banco)',
+        'formato': 'fijo',
+        'cuenta': 'clabe_o_cuenta',
+        'encabezado': [('=1', 1, 'N'), ('=00001', 5, 'N'), ('=E', 1, 'A'), ('fecha_pago', 8, 'N'), ('empresa', 40, 'A')],
+        'detalle': [
+            ('=2', 1, 'N'), ('secuencia', 5, 'N'), ('secuencia', 7, 'N'), ('nombre', 50, 'A'),
+            ('cuenta', 18, 'N'), ('importe_centavos', 18, 'N'),
+        ],
+        'pie': [('=3', 1, 'N'), ('registros', 5, 'N'), ('total_centavos', 18, 'N')],
+    },
+}
+
+COLUMNAS = (
+    'id', 'salario_neto', 'empleado__nombre', 'empleado__apellido_paterno', 'empleado__apellido_materno',
+    'empleado__rfc', 'empleado__banco', 'empleado__clabe', 'empleado__cuenta_bancaria',
+)
+
+TRUNCABLES = {'nombre', 'empresa', 'concepto'}
+
+Plantilla = namedtuple('Plantilla', 'clave cuenta banco encabezado detalle pie extension content_type')
+
+
+class ErrorDispersion(ValueError):
+    """Un valor no cabe en su campo del layout"""
+
+
+# =============================================
+# LAYOUTS
+# =============================================
+
+def layouts_disponibles():
+    return {**LAYOUTS, **settings.DISPERSION_LAYOUTS}
+
+
+class _Eco:
+    """Buffer que devuelve lo escrito, para csv.writer en streaming"""
+    def write(self, valor):
+        return valor
+
+
+def _compilar_fijo(campos):
+    """
+    Plantilla str.format de un renglón de ancho fijo; los literales quedan ya
+    rellenos y los campos que no se pueden recortar se revisan antes.
+    """
+    if not campos:
+        return None
+    partes = []
+    exactos = [(campo, ancho) for campo, ancho, _ in campos if not campo.startswith('=') and campo not in TRUNCABLES]
+    for campo, ancho, tipo in campos:
+        relleno, alineacion = ('0', '>') if tipo == 'N' else (' ', '<')
+        if campo.startswith('='):
+            literal = campo[1:].rjust(ancho, '0') if tipo == 'N' else campo[1:].ljust(ancho)
+            partes.append(literal[:ancho].replace('{', '{{').replace('}', '}}'))
+        else:
+            partes.append(f'{{{campo}:{relleno}{alineacion}{ancho}.{ancho}}}')
+    formato = (''.join(partes) + '\r\n').format_map
+
+    def renglon(valores):
+        for campo, ancho in exactos:
+            if len(valores[campo]) > ancho:
+                raise ErrorDispersion(f'{campo} {valores[campo]} no cabe en las {ancho} posiciones del layout')
+        return formato(valores)
+    return renglon
+
+
+def _compilar_csv(columnas):
+    escritor = csv.writer(_Eco(), lineterminator='\r\n')
+    return lambda fila: escritor.writerow([fila[c] for c in columnas])
+
+
+@lru_cache(maxsize=None)
+def obtener_plantilla(clave):
+    """Layout compilado; se compila una vez por proceso"""
+    layout = layouts_disponibles().get(clave)
+    if layout is None:
+        raise ValueError(f"Layout '{clave}' no existe. Disponibles: {', '.join(sorted(layouts_disponibles()))}")
+    if layout.get('cuenta') not in ('clabe', 'cuenta', 'clabe_o_cuenta'):
+        raise ValueError(f"Layout '{clave}': cuenta debe ser clabe, cuenta o clabe_o_cuenta")
+    banco = layout.get('banco') or None
+    if banco is not None and not (len(banco) == 3 and banco.isdigit()):
+        raise ValueError(f"Layout '{clave}': banco debe ser una clave de 3 dígitos")
+
+    if layout['formato'] == 'csv':
+        columnas = layout['detalle']
+        titulos = ','.join(columnas) + '\r\n'
+        return Plantilla(
+            clave, layout['cuenta'], banco, lambda contexto: titulos, _compilar_csv(columnas), None, 'csv', 'text/csv'
+        )
+    return Plantilla(
+        clave, layout['cuenta'], banco, _compilar_fijo(layout.get('encabezado')), _compilar_fijo(layout['detalle']),
+        _compilar_fijo(layout.get('pie')), 'txt', 'text/plain'
+    )
+
+
+def normalizar(texto):
+    """Mayúsculas sin acentos ni signos, como los aceptan los bancos"""
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode()
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in texto.upper()).split())
+
+
+# =============================================
+# ARCHIVO
+# =============================================
+
+def generar_dispersion(empresa, fecha_inicio, fecha_fin, clave_layout, fecha_pago=None,
+                       estados=ESTADOS_DISPERSABLES, omitidos=None, concepto=CONCEPTO):
+    """
+    Renglones del archivo de dispersión del periodo. La validación del layout
+    ocurre al llamar; los renglones se generan al consumir el iterador.
+
+    Args:
+        omitidos: lista donde se agregan las nóminas sin cuenta, con cuenta
+            de otro banco o sin neto (dicts con nomina_id, empleado y motivo)
+
+    Un número que no cabe en su campo (cuenta, importe, secuencia...) lanza
+    ErrorDispersion al consumir el iterador, en vez de recortarse.
+
+    Returns:
+        iterador de líneas de texto
+    """
+    plantilla = obtener_plantilla(clave_layout)
+    filas = (
+        Nomina.objects
+        .filter(empresa=empresa, fecha_inicio__gte=fecha_inicio, fecha_fin__lte=fecha_fin, estado__in=estados)
+        .order_by('empleado__apellido_paterno', 'empleado__nombre', 'id')
+        .values_list(*COLUMNAS)
+        .iterator(chunk_size=2000)
+    )
+    contexto = {
+        'empresa': normalizar(empresa.nombre),
+        'rfc_empresa': empresa.rfc or '',
+        'fecha_pago': (fecha_pago or date.today()).strftime('%Y%m%d'),
+    }
+    return _lineas(plantilla, filas, contexto, normalizar(concepto), omitidos if omitidos is not None else [])
+
+
+def revisar_dispersion(empresa, fecha_inicio, fecha_fin, clave_layout, fecha_pago=None,
+                       estados=ESTADOS_DISPERSABLES, concepto=CONCEPTO):
+    """
+    Recorre el archivo sin guardarlo, antes de enviarlo: lanza
+    ErrorDispersion si un valor no cabe y cuenta los renglones y omitidos.
+
+    Returns:
+        dict con 'registros' y 'omitidos' (ver generar_dispersion)
+    """
+    plantilla = obtener_plantilla(clave_layout)
+    omitidos = []
+    lineas = sum(1 for _ in generar_dispersion(
+        empresa, fecha_inicio, fecha_fin, clave_layout, fecha_pago, estados, omitidos, concepto
+    ))
+    registros = lineas - (plantilla.encabezado is not None) - (plantilla.pie is not None)
+    return {'registros': registros, 'omitidos': omitidos}
+
+
+def _lineas(plantilla, filas, contexto, concepto, omitidos):
+    """Cierra el cursor de las filas aunque un renglón lance ErrorDispersion"""
+    try:
+        yield from _renglones(plantilla, filas, contexto, concepto, omitidos)
+    finally:
+        filas.close()
+
+
+def _renglones(plantilla, filas, contexto, concepto, omitidos):
+    if plantilla.encabezado:
+        yield plantilla.encabezado(contexto)
+
+    usar_clabe = plantilla.cuenta in ('clabe', 'clabe_o_cuenta')
+    usar_cuenta = plantilla.cuenta in ('cuenta', 'clabe_o_cuenta')
+    registros, total = 0, 0
+    for nomina_id, neto, nombre, paterno, materno, rfc, banco, clabe, cuenta in filas:
+        nombre_completo = ' '.join(filter(None, (paterno, materno, nombre)))
+        if usar_clabe and clabe:
+            numero, tipo_cuenta = clabe, '40'
+        elif usar_cuenta and cuenta:
+            numero, tipo_cuenta = cuenta, '01'
+        else:
+            omitidos.append({'nomina_id': nomina_id, 'empleado': nombre_completo, 'motivo': 'Sin cuenta bancaria'})
+            continue
+        banco = banco or (clabe[:3] if clabe else '')
+        if plantilla.banco and banco != plantilla.banco:
+            omitidos.append({
+                'nomina_id': nomina_id, 'empleado': nombre_completo,
+                'motivo': f'Cuenta de otro banco ({banco or "sin clave"}); el layout solo acepta {plantilla.banco}',
+            })
+            continue
+        centavos = int((Decimal(neto or 0) * 100).to_integral_value())
+        if centavos <= 0:
+            omitidos.append({'nomina_id': nomina_id, 'empleado': nombre_completo, 'motivo': 'Neto en cero'})
+            continue
+
+        registros += 1
+        total += centavos
+        yield plantilla.detalle({
+            'secuencia': str(registros),
+            'cuenta': numero,
+            'tipo_cuenta': tipo_cuenta,
+            'banco': banco,
+            'nombre': normalizar(nombre_completo),
+            'rfc': rfc or '',
+            'importe': f'{centavos // 100}.{centavos % 100:02d}',
+            'importe_centavos': str(centavos),
+            'referencia': str(nomina_id),
+            'concepto': concepto,
+            'fecha_pago': contexto['fecha_pago'],
+        })
+
+    if plantilla.pie:
+        yield plantilla.pie({
+            **contexto, 'registros': str(registros),
+            'total': f'{total // 100}.{total % 100:02d}', 'total_centavos': str(total),
+        })
@@ -0,0 +1,424 @@
+"""
+Registro de faltas por conjuntos.
+
+Carga a todos los empleados en una consulta, valida las fechas en memoria,
+guarda las listas de faltas con bulk_update, crea las nóminas borrador que
+falten con un solo bulk_create y recalcula únicamente las nóminas abiertas
+cuyo periodo contiene alguna de las fechas registradas.
+"""
+import logging
+from datetime import date, datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+
+from . import acumulados
+from .instrumentacion import medir_etapa
+from .models import Empleado, Nomina
+from .shards import alias_actual, ids_empresas
+from .utils import DIAS_FESTIVOS_2025, calcular_nomina_mensual, calcular_nomina_quincenal, calcular_nomina_semanal
+
+logger = logging.getLogger(__name__)
+
+DIAS_SEMANA = {
+    0: "Lunes",
+    1: "Martes",
+    2: "Miércoles",
+    3: "Jueves",
+    4: "Viernes",
+    5: "Sábado",
+    6: "Domingo"
+}
+
+DIAS_POR_PERIODO = {'SEMANAL': 7, 'QUINCENAL': 15, 'MENSUAL': 30}
+ESTADOS_ABIERTOS = ['BORRADOR', 'PENDIENTE']
+
+CALCULADORAS = {
+    'SEMANAL': calcular_nomina_semanal,
+    'QUINCENAL': calcular_nomina_quincenal,
+    'MENSUAL': calcular_nomina_mensual,
+}
+
+
+def determinar_periodo(fecha, tipo_nomina):
+    """Periodo nominal (id, inicio, fin, tipo) que contiene la fecha"""
+    año = fecha.year
+    mes = fecha.month
+    dia = fecha.day
+
+    if tipo_nomina == 'SEMANAL':
+        inicio_semana = fecha - timedelta(days=fecha.weekday())
+        fin_semana = inicio_semana + timedelta(days=6)
+        semana_num = (inicio_semana.day - 1) // 7 + 1
+        return {
+            'id': f"{año}-SEM-{mes:02d}-{semana_num:02d}",
+            'inicio': inicio_semana,
+            'fin': fin_semana,
+            'tipo': 'SEMANAL'
+        }
+
+    fin_mes = date(año, mes + 1, 1) - timedelta(days=1) if mes < 12 else date(año + 1, 1, 1) - timedelta(days=1)
+    if tipo_nomina == 'QUINCENAL':
+        if dia <= 15:
+            inicio, fin, quincena = date(año, mes, 1), date(año, mes, 15), 1
+        else:
+            inicio, fin, quincena = date(año, mes, 16), fin_mes, 2
+        return {
+            'id': f"{año}-Q{quincena}-{mes:02d}",
+            'inicio': inicio,
+            'fin': fin,
+            'tipo': 'QUINCENAL'
+        }
+
+    return {
+        'id': f"{año}-M-{mes:02d}",
+        'inicio': date(año, mes, 1),
+        'fin': fin_mes,
+        'tipo': 'MENSUAL'
+    }
+
+
+def validar_fechas_empleado(empleado, fechas, campo_faltas):
+    """
+    Valida en memoria las fechas para un empleado.
+
+    Returns:
+        (fechas_validas, respuesta_error) donde respuesta_error es None o el
+        cuerpo de la respuesta 400 con el mismo formato que registrar_faltas.
+    """
+    faltas_existentes = set(getattr(empleado, campo_faltas) or [])
+    dias_descanso = set(empleado.dias_descanso)
+    fecha_ingreso = empleado.fecha_ingreso
+
+    errores_descanso = []
+    errores_fecha_ingreso = []
+    errores_duplicados = []
+    fechas_solicitud = set()
+    fechas_validas = []
+
+    for fecha_str, fecha in fechas:
+        dia_semana = fecha.weekday()
+
+        if fecha_str in fechas_solicitud:
+            errores_duplicados.append({
+                'fecha': fecha_str,
+                'dia_semana': DIAS_SEMANA[dia_semana],
+                'mensaje': 'Fecha duplicada en esta solicitud'
+            })
+            continue
+        fechas_solicitud.add(fecha_str)
+
+        if fecha_str in faltas_existentes:
+            errores_duplicados.append({
+                'fecha': fecha_str,
+                'dia_semana': DIAS_SEMANA[dia_semana],
+                'mensaje': 'El empleado ya tiene registrada una falta en esta fecha'
+            })
+            continue
+
+        if fecha < fecha_ingreso:
+            errores_fecha_ingreso.append({
+                'fecha': fecha_str,
+                'dia_semana': DIAS_SEMANA[dia_semana],
+                'fecha_ingreso': fecha_ingreso.strftime('%Y-%m-%d'),
+                'mensaje': 'La fecha es anterior al ingreso del empleado'
+            })
+            continue
+
+        if dia_semana in dias_descanso:
+            errores_descanso.append({
+                'fecha': fecha_str,
+                'dia_semana': DIAS_SEMANA[dia_semana],
+                'mensaje': f'El empleado {empleado.id} descansa este día'
+            })
+            continue
+
+        fechas_validas.append(fecha.isoformat())
+
+    if errores_duplicados:
+        return [], {
+            'error': 'No se pueden registrar múltiples faltas en la misma fecha',
+            'detalle': errores_duplicados,
+            'empleado': {
+                'id': empleado.id,
+                'nombre_completo': empleado.nombre_completo,
+                'faltas_registradas': list(faltas_existentes)
+            }
+        }
+
+    if errores_fecha_ingreso:
+        return [], {
+            'error': f'No se pueden registrar faltas a empleados antes de su fecha de ingreso ({fecha_ingreso.strftime("%Y-%m-%d")})',
+            'detalle': errores_fecha_ingreso,
+            'empleado': {
+                'id': empleado.id,
+                'nombre_completo': empleado.nombre_completo,
+                'fecha_ingreso': fecha_ingreso.strftime('%Y-%m-%d'),
+                'periodo_nominal': empleado.periodo_nominal
+            }
+        }
+
+    if errores_descanso:
+        return [], {
+            'error': f'No se pueden registrar faltas en días de descanso del empleado {empleado.id}',
+            'detalle': errores_descanso,
+            'dias_descanso_configurados': [DIAS_SEMANA[d] for d in sorted(empleado.dias_descanso)],
+            'empleado': {
+                'id': empleado.id,
+                'nombre_completo': empleado.nombre_completo,
+                'periodo_nominal': empleado.periodo_nominal
+            }
+        }
+
+    return fechas_validas, None
+
+
+def _sincronizar_contadores(empleado):
+    """Mismo ajuste de faltas_en_periodo/dias_laborados que hace Empleado.save()"""
+    periodo_dias = DIAS_POR_PERIODO.get(empleado.periodo_nominal, 0)
+    faltas = len(empleado.fechas_faltas_injustificadas)
+    empleado.faltas_en_periodo = min(faltas, periodo_dias)
+    empleado.dias_laborados = max(0, periodo_dias - empleado.faltas_en_periodo)
+
+
+def registrar_faltas_lote(empleados_ids, fechas_faltas, tipo_falta, usuario):
+    """
+    Registra las mismas fechas de falta para varios empleados.
+
+    Args:
+        empleados_ids: ids de empleados (en el orden de la respuesta)
+        fechas_faltas: fechas 'YYYY-MM-DD'
+        tipo_falta: 'injustificada' o 'justificada'
+        usuario: usuario que registra (permisos y creado_por de las nóminas)
+
+    Returns:
+        list[(empleado_id, status_http, datos)] con los mismos cuerpos que
+        devolvía registrar_faltas por empleado.
+    """
+    if tipo_falta == 'injustificada':
+        campo_faltas, campo_opuesto = 'fechas_faltas_injustificadas', 'fechas_faltas_justificadas'
+    else:
+        campo_faltas, campo_opuesto = 'fechas_faltas_justificadas', 'fechas_faltas_injustificadas'
+
+    # Las fechas se interpretan una sola vez para todos los empleados
+    fechas = []
+    for fecha_str in fechas_faltas:
+        try:
+            fechas.append((fecha_str, datetime.strptime(fecha_str, '%Y-%m-%d').date()))
+        except (ValueError, TypeError):
+            error = {'error': f'Formato de fecha inválido: {fecha_str}. Use YYYY-MM-DD'}
+            return [(empleado_id, status.HTTP_400_BAD_REQUEST, error) for empleado_id in empleados_ids]
+
+    # =============================================
+    # 1. CARGA DE EMPLEADOS (UNA CONSULTA)
+    # =============================================
+    with medir_etapa('carga'):
+        empleados = Empleado.objects.select_related('empresa').filter(pk__in=[
+            int(e) for e in empleados_ids if str(e).isdigit()
+        ])
+        if not usuario.is_superuser:
+            empleados = empleados.filter(empresa_id__in=ids_empresas(usuario))
+        por_id = {empleado.id: empleado for empleado in empleados}
+
+    # =============================================
+    # 2. VALIDACIÓN EN MEMORIA
+    # =============================================
+    resultados = {}
+    aceptados = []
+    for empleado_id in dict.fromkeys(empleados_ids):
+        empleado = por_id.get(int(empleado_id)) if str(empleado_id).isdigit() else None
+        if empleado is None:
+            resultados[empleado_id] = (status.HTTP_404_NOT_FOUND, {'error': 'Empleado no encontrado o sin permisos'})
+            continue
+        fechas_validas, error = validar_fechas_empleado(empleado, fechas, campo_faltas)
+        if error:
+            resultados[empleado_id] = (status.HTTP_400_BAD_REQUEST, error)
+            continue
+        aceptados.append((empleado_id, empleado, fechas_validas))
+
+    if not aceptados:
+        return [(e,) + resultados[e] for e in empleados_ids]
+
+    with transaction.atomic(using=alias_actual()):
+        # =============================================
+        # 3. FALTAS DE LOS EMPLEADOS (bulk_update)
+        # =============================================
+        with medir_etapa('persistencia'):
+            ahora = timezone.now()
+            for _, empleado, fechas_validas in aceptados:
+                opuesto = getattr(empleado, campo_opuesto)
+                for fecha_str in fechas_validas:
+                    if fecha_str in opuesto:
+                        opuesto.remove(fecha_str)
+                getattr(empleado, campo_faltas).extend(fechas_validas)
+                _sincronizar_contadores(empleado)
+                empleado.fecha_actualizacion = ahora
+
+            Empleado.objects.bulk_update(
+                [empleado for _, empleado, _ in aceptados],
+                ['fechas_faltas_injustificadas', 'fechas_faltas_justificadas', 'faltas_en_periodo', 'dias_laborados',
+                 'fecha_actualizacion']
+            )
+
+        # =============================================
+        # 4. NÓMINAS BORRADOR FALTANTES (bulk_create)
+        # =============================================
+        periodos = {}  # (empleado_id, inicio, fin) -> periodo
+        for _, empleado, fechas_validas in aceptados:
+            for fecha_str in fechas_validas:
+                periodo = determinar_periodo(date.fromisoformat(fecha_str), empleado.periodo_nominal)
+                periodos.setdefault((empleado.id, periodo['inicio'], periodo['fin']), periodo)
+
+        with medir_etapa('persistencia'):
+            # Bloqueadas: el aporte leído es el que se resta de los acumulados
+            existentes = {
+                (n.empleado_id, n.fecha_inicio, n.fecha_fin): n
+                for n in Nomina.objects.select_for_update().filter(
+                    empleado_id__in=[empleado.id for _, empleado, _ in aceptados],
+                    fecha_inicio__in={inicio for _, inicio, _ in periodos},
+                )
+            }
+            nuevas = []
+            for clave, periodo in periodos.items():
+                if clave in existentes:
+                    continue
+                empleado = por_id[clave[0]]
+                faltas_periodo = sorted(
+                    f for f in getattr(empleado, campo_faltas)
+                    if periodo['inicio'].isoformat() <= f <= periodo['fin'].isoformat()
+                )
+                nuevas.append(Nomina(
+                    empleado=empleado,
+                    empresa=empleado.empresa,
+                    tipo_nomina=empleado.periodo_nominal,
+                    fecha_inicio=periodo['inicio'],
+                    fecha_fin=periodo['fin'],
+                    estado='BORRADOR',
+                    creado_por=usuario,
+                    fecha_creacion=ahora,
+                    faltas_en_periodo=len(faltas_periodo),
+                    calculos={
+                        'empleado': {
+                            'fechas_faltas': faltas_periodo,
+                            'faltas_en_periodo': len(faltas_periodo),
+                            'dias_laborados': (periodo['fin'] - periodo['inicio']).days + 1 - len(faltas_periodo),
+                            'salario_diario': float(empleado.salario_diario) if empleado.salario_diario else 0.0
+                        }
+                    }
+                ))
+            for nomina in Nomina.objects.bulk_create(nuevas):
+                existentes[(nomina.empleado_id, nomina.fecha_inicio, nomina.fecha_fin)] = nomina
+
+        # =============================================
+        # 5. RECÁLCULO DE LAS NÓMINAS AFECTADAS (bulk_update)
+        # =============================================
+        recalculadas = []
+        for clave in periodos:
+            nomina = existentes[clave]
+            if nomina.estado not in ESTADOS_ABIERTOS:
+                continue  # Las nóminas pagadas o canceladas no se tocan
+            empleado = por_id[clave[0]]
+            try:
+                with medir_etapa('calculo'):
+                    nomina_data = CALCULADORAS[empleado.periodo_nominal](
+                        empleado,
+                        fecha_referencia=nomina.fecha_inicio,
+                        detalle=False
+                    )
+            except Exception as e:
+                logger.error(f"Error actualizando nómina {nomina.id}: {str(e)}", exc_info=True)
+                continue
+
+            # Mismo criterio que Nomina.save(): el conteo viene de los cálculos
+            faltas_periodo = [
+                f for f in getattr(empleado, campo_faltas)
+                if nomina.fecha_inicio.isoformat() <= f <= nomina.fecha_fin.isoformat()
+            ]
+            nomina.faltas_en_periodo = nomina_data.get('empleado', {}).get('faltas_en_periodo', len(faltas_periodo))
+            nomina.salario_neto = nomina_data.get('salario_neto', nomina_data.get('resumen', {}).get('neto_a_pagar', 0.0))
+            nomina.calculos = nomina_data
+            nomina.fecha_actualizacion = ahora
+            recalculadas.append(nomina)
+
+        with medir_etapa('persistencia'):
+            Nomina.objects.bulk_update(
+                recalculadas,
+                ['calculos', 'salario_neto', 'faltas_en_periodo', 'fecha_actualizacion'],
+                batch_size=500
+            )
+            # bulk_update no pasa por Nomina.save(): las PENDIENTE cambian sus acumulados
+            cambios = []
+            for nomina in recalculadas:
+                nuevo = acumulados.aporte_de_nomina(nomina)
+                cambios.append((getattr(nomina, '_aporte_guardado', None), nuevo))
+                nomina._aporte_guardado = nuevo
+            acumulados.registrar_cambios(cambios)
+
+    # =============================================
+    # 6. RESPUESTA POR EMPLEADO
+    # =============================================
+    for empleado_id, empleado, fechas_validas in aceptados:
+        descuento_total = (
+            float(empleado.salario_diario) * len(fechas_validas)
+            if empleado.salario_diario and tipo_falta == 'injustificada' else 0.0
+        )
+        periodos_afectados = list(dict.fromkeys(
+            determinar_periodo(date.fromisoformat(f), empleado.periodo_nominal)['id'] for f in fechas_validas
+        ))
+        resultados[empleado_id] = (status.HTTP_200_OK, {
+            'success': True,
+            'empleado_id': empleado.id,
+            'nombre': empleado.nombre,
+            'apellido_paterno': empleado.apellido_paterno,
+            'apellido_materno': empleado.apellido_materno or '',
+            'empresa_id': empleado.empresa_id,
+            'usuario_id': usuario.id,
+            'tipo_falta': tipo_falta,
+            'faltas_registradas': len(fechas_validas),
+            'fechas': fechas_validas,
+            'periodos_afectados': periodos_afectados,
+            'descuento_total': descuento_total,
+            'message': f'Faltas {tipo_falta} registradas correctamente y nóminas actualizadas'
+        })
+
+    return [(e,) + resultados[e] for e in empleados_ids]
+
+
+# =============================================
+# CALENDARIO DEL PERIODO
+# =============================================
+
+def calendario_del_periodo(empleado, fecha_referencia, periodo_solicitado='semanal'):
+    """
+    Días del periodo nominal del empleado que contiene fecha_referencia, con
+    descansos y festivos. Solo usa el empleado ya cargado (sin consultas), así
+    que sirve igual para la vista síncrona y la async.
+    """
+    periodo = determinar_periodo(fecha_referencia, empleado.periodo_nominal)
+    inicio, fin = periodo['inicio'], periodo['fin']
+    dias = [inicio + timedelta(days=i) for i in range((fin - inicio).days + 1)]
+    festivos = set(DIAS_FESTIVOS_2025)
+    calendario = [
+        {
+            'fecha': dia.isoformat(),
+            'dia_semana': dia.strftime('%A'),
+            'es_festivo': dia in festivos,
+            'es_descanso': dia.weekday() in empleado.dias_descanso
+        }
+        for dia in dias
+    ]
+    return {
+        'empleado_id': empleado.id,
+        'periodo_nominal': empleado.periodo_nominal,
+        'periodo_solicitado': periodo_solicitado,
+        'fecha_inicio': inicio.isoformat(),
+        'fecha_fin': fin.isoformat(),
+        'dias_periodo': len(dias),
+        'dias_trabajados': empleado.dias_laborados,
+        'faltas_en_periodo': empleado.faltas_en_periodo,
+        'calendario': calendario,
+        'dias_descanso': [empleado.get_dias_descanso_display()],
+        'festivos_en_periodo': sum(1 for dia in dias if dia in festivos),
+        'dias_laborables': len(dias) - sum(1 for d in calendario if d['es_descanso'] or d['es_festivo'])
+    }
@@ -0,0 +1,317 @@
+"""
+Importación masiva de empleados desde CSV o XLSX.
+
+Las filas se leen en streaming y se validan en memoria (formato de NSS/RFC,
+coherencia periodo/salario, duplicados dentro del archivo y contra la base
+de datos) sin pasar por Empleado.full_clean(), que hace una consulta por
+empleado. Los empleados válidos se insertan con bulk_create por lotes y las
+filas con errores se devuelven en un reporte con su número de fila.
+"""
+import csv
+import io
+import os
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .models import Empleado
+from .shards import alias_actual
+
+COLUMNAS_REQUERIDAS = ['nombre', 'apellido_paterno', 'nss', 'rfc', 'periodo_nominal', 'fecha_ingreso', 'dias_descanso']
+
+TAMANO_LOTE = 1000
+
+DIAS_POR_PERIODO = {'SEMANAL': 7, 'QUINCENAL': 15, 'MENSUAL': 30}
+NOMBRES_DIAS = {
+    nombre.lower(): numero for numero, nombre in Empleado.DIAS_DESCANSO_CHOICES
+}
+NOMBRES_DIAS.update({'miercoles': 2, 'sabado': 5})
+ZONAS = {clave for clave, _ in Empleado.ZONA_CHOICES}
+
+# Los mismos validadores declarados en el modelo
+REGEX_NSS = Empleado._meta.get_field('nss').validators[0].regex
+REGEX_RFC = Empleado._meta.get_field('rfc').validators[0].regex
+LARGOS = {campo: Empleado._meta.get_field(campo).max_length for campo in ('nombre', 'apellido_paterno', 'apellido_materno')}
+# Importes que caben en el DecimalField (max_digits - decimal_places enteros)
+MAXIMOS = {
+    campo: Decimal(10) ** (Empleado._meta.get_field(campo).max_digits - Empleado._meta.get_field(campo).decimal_places)
+    for campo in ('salario_diario', 'sueldo_mensual')
+}
+
+
+class ErrorArchivo(Exception):
+    """El archivo no se puede leer o le faltan columnas requeridas"""
+
+
+# =============================================
+# LECTURA EN STREAMING
+# =============================================
+
+def _normalizar_encabezado(valor):
+    return str(valor or '').strip().lower().replace(' ', '_')
+
+
+def _validar_encabezados(encabezados):
+    faltantes = [c for c in COLUMNAS_REQUERIDAS if c not in encabezados]
+    if faltantes:
+        raise ErrorArchivo(f"Faltan columnas requeridas: {', '.join(faltantes)}")
+
+
+def leer_csv(archivo):
+    """Genera (numero_fila, dict) desde un archivo CSV binario o de texto"""
+    if isinstance(archivo.read(0), bytes):
+        archivo = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    lector = csv.reader(archivo)
+    try:
+        encabezados = [_normalizar_encabezado(e) for e in next(lector, [])]
+        _validar_encabezados(encabezados)
+        for numero, valores in enumerate(lector, start=2):
+            if any(v.strip() for v in valores):
+                yield numero, dict(zip(encabezados, valores))
+    except UnicodeDecodeError:
+        raise ErrorArchivo('El archivo CSV debe estar codificado en UTF-8')
+    except csv.Error as e:
+        raise ErrorArchivo(f'CSV mal formado: {e}')
+
+
+def leer_xlsx(archivo):
+    """Genera (numero_fila, dict) desde la primera hoja de un XLSX en modo read_only"""
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError):
+        raise ErrorArchivo('El archivo no es un XLSX válido')
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezados = [_normalizar_encabezado(e) for e in next(filas, ())]
+        _validar_encabezados(encabezados)
+        for numero, valores in enumerate(filas, start=2):
+            if any(v not in (None, '') for v in valores):
+                yield numero, dict(zip(encabezados, valores))
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre):
+    extension = os.path.splitext(nombre or '')[1].lower()
+    if extension == '.csv':
+        return leer_csv(archivo)
+    if extension in ('.xlsx', '.xlsm'):
+        return leer_xlsx(archivo)
+    raise ErrorArchivo('Formato no soportado. Use un archivo .csv o .xlsx')
+
+
+# =============================================
+# VALIDACIÓN EN MEMORIA
+# =============================================
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _decimal(valor):
+    texto = _texto(valor).replace(',', '').replace('$', '')
+    if not texto:
+        return None
+    numero = Decimal(texto)
+    if not numero.is_finite():
+        raise InvalidOperation(texto)
+    return numero.quantize(Decimal('0.01'))
+
+
+def _fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = _texto(valor)
+    try:
+        return date.fromisoformat(texto)  # Mucho más rápido que strptime
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(texto, '%d/%m/%Y').date()
+    except ValueError:
+        pass
+    raise ValueError(f'Formato inválido: {texto}. Use YYYY-MM-DD o DD/MM/YYYY')
+
+
+def _dias_descanso(valor):
+    texto = _texto(valor)
+    if not texto:
+        return []
+    dias = []
+    for parte in texto.replace(';', ',').split(','):
+        parte = parte.strip().lower()
+        dia = int(parte) if parte.isdigit() else NOMBRES_DIAS.get(parte)
+        if dia is None or not 0 <= dia <= 6:
+            raise ValueError(f'Día inválido: {parte}. Rango permitido: 0-6 o nombre del día')
+        if dia not in dias:
+            dias.append(dia)
+    return sorted(dias)
+
+
+def validar_fila(fila):
+    """
+    Convierte una fila del archivo en los valores de un Empleado.
+
+    Returns:
+        (valores, errores): errores es un dict campo -> mensaje, vacío si la
+        fila es válida.
+    """
+    errores = {}
+    valores = {
+        'nombre': _texto(fila.get('nombre')),
+        'apellido_paterno': _texto(fila.get('apellido_paterno')),
+        'apellido_materno': _texto(fila.get('apellido_materno')) or None,
+        'nss': _texto(fila.get('nss')),
+        'rfc': _texto(fila.get('rfc')).upper(),
+        'periodo_nominal': _texto(fila.get('periodo_nominal')).upper() or 'QUINCENAL',
+        'zona_salarial': _texto(fila.get('zona_salarial')).lower() or 'general',
+    }
+
+    # Excel guarda el NSS como número y pierde los ceros a la izquierda
+    if isinstance(fila.get('nss'), (int, float)):
+        valores['nss'] = valores['nss'].zfill(11)
+
+    for campo, largo in LARGOS.items():
+        if not valores[campo]:
+            if campo != 'apellido_materno':
+                errores[campo] = 'Requerido'
+        elif len(valores[campo]) > largo:
+            errores[campo] = f'Máximo {largo} caracteres'
+
+    if not REGEX_NSS.match(valores['nss']):
+        errores['nss'] = 'El NSS debe tener 11 dígitos'
+    if not REGEX_RFC.match(valores['rfc']):
+        errores['rfc'] = 'RFC inválido para persona física. Formato requerido: 4 letras + 6 dígitos + 3 caracteres alfanuméricos'
+    if valores['periodo_nominal'] not in DIAS_POR_PERIODO:
+        errores['periodo_nominal'] = 'Use SEMANAL, QUINCENAL o MENSUAL'
+    if valores['zona_salarial'] not in ZONAS:
+        errores['zona_salarial'] = 'Use general o frontera'
+
+    try:
+        valores['fecha_ingreso'] = _fecha(fila.get('fecha_ingreso'))
+    except ValueError as e:
+        errores['fecha_ingreso'] = str(e)
+
+    try:
+        valores['dias_descanso'] = _dias_descanso(fila.get('dias_descanso'))
+    except ValueError as e:
+        errores['dias_descanso'] = str(e)
+    else:
+        if not valores['dias_descanso']:
+            errores['dias_descanso'] = 'Requerido'  # El modelo no admite la lista vacía
+
+    # Misma coherencia periodo/salario que Empleado.clean()
+    for campo in ('salario_diario', 'sueldo_mensual'):
+        try:
+            valores[campo] = _decimal(fila.get(campo))
+        except InvalidOperation:
+            errores[campo] = 'Importe inválido'
+            valores[campo] = None
+        else:
+            if valores[campo] is not None and valores[campo] < 0:
+                errores[campo] = 'No puede ser negativo'
+            elif valores[campo] is not None and valores[campo] >= MAXIMOS[campo]:
+                errores[campo] = f'Debe ser menor que {MAXIMOS[campo]:,}'
+
+    if valores['periodo_nominal'] == 'MENSUAL':
+        if valores['salario_diario'] is not None:
+            errores.setdefault('salario_diario', 'Debe estar vacío para periodo MENSUAL')
+        if not valores['sueldo_mensual']:
+            errores.setdefault('sueldo_mensual', 'Requerido para periodo MENSUAL')
+    else:
+        if valores['sueldo_mensual'] is not None:
+            errores.setdefault('sueldo_mensual', 'Debe estar vacío para este periodo')
+        if not valores['salario_diario']:
+            errores.setdefault('salario_diario', 'Requerido para este periodo')
+
+    return valores, errores
+
+
+# =============================================
+# IMPORTACIÓN
+# =============================================
+
+def importar_empleados(filas, empresa, tamano_lote=TAMANO_LOTE, solo_validar=False):
+    """
+    Importa empleados a una empresa.
+
+    Args:
+        filas: iterable de (numero_fila, dict), p. ej. leer_filas(...)
+        empresa: Empresa destino
+        tamano_lote: filas por bulk_create
+        solo_validar: si es True no se inserta nada
+
+    Returns:
+        dict con filas_procesadas, validos (filas sin errores), creados
+        (0 con solo_validar) y errores ([{'fila': n, 'errores': {campo: mensaje}}]).
+    """
+    # Un solo prefetch de RFC activos y nombres de la empresa; el NSS es
+    # único global y se consulta por lote.
+    rfcs = set(Empleado.objects.filter(empresa=empresa, activo=True).values_list('rfc', flat=True))
+    nombres = set(Empleado.objects.filter(empresa=empresa).values_list('nombre', 'apellido_paterno', 'apellido_materno'))
+    nss_archivo = set()
+
+    reporte = {'filas_procesadas': 0, 'validos': 0, 'creados': 0, 'errores': []}
+    lote = []
+
+    def insertar(lote):
+        existentes = set(
+            Empleado.objects.filter(nss__in=[e.nss for _, e in lote]).values_list('nss', flat=True)
+        )
+        nuevos = []
+        for numero, empleado in lote:
+            if empleado.nss in existentes:
+                reporte['errores'].append({'fila': numero, 'errores': {'nss': 'Ya existe un empleado con este NSS'}})
+            else:
+                nuevos.append(empleado)
+        reporte['validos'] += len(nuevos)
+        if not solo_validar:
+            Empleado.objects.bulk_create(nuevos, batch_size=tamano_lote)
+            reporte['creados'] += len(nuevos)
+
+    with transaction.atomic(using=alias_actual()):
+        for numero, fila in filas:
+            reporte['filas_procesadas'] += 1
+            valores, errores = validar_fila(fila)
+
+            if 'nss' not in errores and valores['nss'] in nss_archivo:
+                errores['nss'] = 'NSS duplicado en el archivo'
+            if 'rfc' not in errores and valores['rfc'] in rfcs:
+                errores['rfc'] = 'Ya existe un empleado activo con este RFC en la empresa'
+            # Como en la restricción unique_empleado_empresa, un apellido
+            # materno vacío (NULL) no choca con otros
+            clave_nombre = (valores['nombre'], valores['apellido_paterno'], valores['apellido_materno'])
+            if valores['apellido_materno'] and clave_nombre in nombres:
+                errores['nombre'] = 'Ya existe un empleado con este nombre en la empresa'
+
+            if errores:
+                reporte['errores'].append({'fila': numero, 'errores': errores})
+                continue
+
+            nss_archivo.add(valores['nss'])
+            rfcs.add(valores['rfc'])
+            nombres.add(clave_nombre)
+
+            # bulk_create no pasa por save(): se fijan los contadores iniciales
+            valores['dias_laborados'] = DIAS_POR_PERIODO[valores['periodo_nominal']]
+            lote.append((numero, Empleado(empresa=empresa, **valores)))
+            if len(lote) >= tamano_lote:
+                insertar(lote)
+                lote = []
+
+        if lote:
+            insertar(lote)
+
+    reporte['errores'].sort(key=lambda error: error['fila'])
+    return reporte
@@ -0,0 +1,238 @@
+"""
+Cuotas obrero-patronales IMSS e INFONAVIT por empresa.
+
+Los días cotizados y el SBC de cada empleado se agregan en la base de datos a
+partir de las nóminas guardadas (calculos.empleado.dias_laborados y
+calculos.sbc.diario), con una consulta agrupada por empleado; las cuotas se
+calculan vectorizadas sobre el resultado.
+
+- Mensual (liquidación IMSS): enfermedad y maternidad (cuota fija, excedente,
+  prestaciones en dinero, gastos médicos de pensionados), invalidez y vida,
+  riesgo de trabajo con la prima de la empresa y guarderías.
+- Bimestral: las cuotas mensuales de los dos meses más retiro, cesantía y
+  vejez patronal e INFONAVIT 5%.
+"""
+import calendar
+import csv
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import Count, F, FloatField, IntegerField, Max, Sum
+from django.db.models.fields.json import KT
+from django.db.models.functions import Cast, Coalesce
+
+from .acumulados import ESTADOS_ACUMULABLES
+from .models import Nomina
+from .utils import CalculadoraIMSS, SALARIO_MINIMO_GENERAL_2025, UMA_DIARIA_2025
+
+# =============================================
+# TASAS PATRONALES 2025 (LSS)
+# =============================================
+
+UMA = float(UMA_DIARIA_2025)
+TOPE_SBC_UMAS = 25
+
+CUOTAS_PATRONALES_MENSUALES = {
+    'prestaciones_dinero': 0.0070,
+    'gastos_medicos_pensionados': 0.0105,
+    'invalidez_vida': 0.0175,
+    'guarderias': 0.0100,
+}
+CUOTA_FIJA = 0.2040          # Sobre UMA por día
+EXCEDENTE_PATRONAL = 0.0110  # Sobre SBC excedente de 3 UMA
+RETIRO = 0.0200
+INFONAVIT = 0.0500
+
+# Cesantía y vejez patronal 2025 por SBC en veces UMA (transitorio reforma 2020)
+TABLA_CESANTIA_VEJEZ = [
+    (1.00, 0.03150),
+    (1.50, 0.03544),
+    (2.00, 0.04426),
+    (2.50, 0.04954),
+    (3.00, 0.05307),
+    (3.50, 0.05559),
+    (4.00, 0.05747),
+    (None, 0.06422),
+]
+
+TIPOS_ORDINARIOS = ('SEMANAL', 'QUINCENAL', 'MENSUAL')
+CONCEPTOS_MENSUALES = (
+    'cuota_fija', 'excedente_patronal', 'prestaciones_dinero', 'gastos_medicos_pensionados',
+    'invalidez_vida', 'riesgo_trabajo', 'guarderias', 'cuota_obrera'
+)
+CONCEPTOS_BIMESTRALES = ('retiro', 'cesantia_vejez_patronal', 'infonavit')
+
+COLUMNAS_LIQUIDACION = (
+    ['empleado_id', 'nss', 'rfc', 'nombre', 'dias', 'sbc']
+    + list(CONCEPTOS_MENSUALES) + list(CONCEPTOS_BIMESTRALES) + ['total_patronal']
+)
+
+
+# =============================================
+# AGREGACIÓN EN SQL
+# =============================================
+
+def meses_de(anio, mes=None, bimestre=None):
+    """Meses (1-12) del mes o bimestre solicitado; ValueError si el periodo no es válido"""
+    if not 1 <= anio <= 9999:
+        raise ValueError('El año debe estar entre 1 y 9999')
+    if bimestre is not None:
+        if not 1 <= bimestre <= 6:
+            raise ValueError('El bimestre debe estar entre 1 y 6')
+        return [bimestre * 2 - 1, bimestre * 2]
+    if not mes or not 1 <= mes <= 12:
+        raise ValueError('El mes debe estar entre 1 y 12')
+    return [mes]
+
+
+def agregar_cotizacion(empresa_id, anio, meses):
+    """
+    Días cotizados y SBC por empleado en los meses dados (por fecha_fin de la
+    nómina), agregados en la base de datos.
+
+    Returns:
+        lista de dicts: empleado_id, nss, rfc, nombre, dias, sbc, nominas
+    """
+    inicio = date(anio, meses[0], 1)
+    fin = date(anio, meses[-1], calendar.monthrange(anio, meses[-1])[1])
+    dias = Coalesce(Cast(KT('calculos__empleado__dias_laborados'), IntegerField()), 0)
+    sbc = Coalesce(Cast(KT('calculos__sbc__diario'), FloatField()), 0.0)
+
+    filas = (
+        Nomina.objects
+        .filter(
+            empleado__empresa_id=empresa_id, estado__in=ESTADOS_ACUMULABLES,
+            tipo_nomina__in=TIPOS_ORDINARIOS, fecha_fin__range=(inicio, fin)
+        )
+        .values('empleado_id')
+        .annotate(
+            nss=F('empleado__nss'), rfc=F('empleado__rfc'),
+            nombre=F('empleado__nombre'), apellido_paterno=F('empleado__apellido_paterno'),
+            apellido_materno=F('empleado__apellido_materno'),
+            periodo=F('empleado__periodo_nominal'),
+            salario_diario=F('empleado__salario_diario'), sueldo_mensual=F('empleado__sueldo_mensual'),
+            dias=Sum(dias), sbc=Max(sbc), nominas=Count('id'),
+        )
+        .order_by('empleado__apellido_paterno', 'empleado__nombre')
+    )
+    return list(filas), (fin - inicio).days + 1
+
+
+def _sbc_del_empleado(fila):
+    """SBC a partir del salario actual, para nóminas guardadas sin calculos.sbc"""
+    if fila['periodo'] == 'MENSUAL':
+        salario = Decimal(str(fila['sueldo_mensual'] or 0)) / 30
+    else:
+        salario = Decimal(str(fila['salario_diario'] or 0))
+    return float(CalculadoraIMSS(salario.quantize(Decimal('0.01'))).calcular_sbc())
+
+
+# =============================================
+# CÁLCULO VECTORIZADO
+# =============================================
+
+def tasa_cesantia_vejez(sbc):
+    """Tasa patronal de cesantía y vejez según el SBC en veces UMA"""
+    limites = np.array([limite for limite, _ in TABLA_CESANTIA_VEJEZ[:-1]])
+    tasas = np.array([tasa for _, tasa in TABLA_CESANTIA_VEJEZ])
+    veces = sbc / UMA
+    tasa = tasas[np.searchsorted(limites, veces, side='left')]
+    # Hasta un salario mínimo se aplica la tasa del primer renglón
+    return np.where(sbc <= float(SALARIO_MINIMO_GENERAL_2025) * float(CalculadoraIMSS.FACTOR_INTEGRACION), tasas[0], tasa)
+
+
+def calcular_cuotas(sbc, dias, prima_riesgo):
+    """
+    Cuotas patronales (y la obrera como referencia) para arreglos de SBC y
+    días cotizados.
+
+    Args:
+        prima_riesgo: prima de riesgo de trabajo de la empresa en porcentaje
+
+    Returns:
+        dict concepto -> numpy array redondeado a centavos
+    """
+    sbc = np.minimum(sbc, TOPE_SBC_UMAS * UMA)
+    base = sbc * dias
+    cuotas = {
+        'cuota_fija': UMA * CUOTA_FIJA * dias,
+        'excedente_patronal': np.maximum(sbc - 3 * UMA, 0) * EXCEDENTE_PATRONAL * dias,
+        'riesgo_trabajo': base * float(prima_riesgo) / 100,
+        'retiro': base * RETIRO,
+        'cesantia_vejez_patronal': base * tasa_cesantia_vejez(sbc),
+        'infonavit': base * INFONAVIT,
+    }
+    for concepto, tasa in CUOTAS_PATRONALES_MENSUALES.items():
+        cuotas[concepto] = base * tasa
+
+    obrera = np.zeros_like(base)
+    for concepto, tasa in CalculadoraIMSS.CUOTAS_IMSS.items():
+        if concepto != 'excedente_especies':
+            obrera += base * float(tasa)
+    obrera += np.maximum(sbc - 3 * UMA, 0) * float(CalculadoraIMSS.CUOTAS_IMSS['excedente_especies']) * dias
+    cuotas['cuota_obrera'] = obrera
+    return {concepto: np.round(valores, 2) for concepto, valores in cuotas.items()}
+
+
+def calcular_liquidacion(empresa, anio, mes=None, bimestre=None):
+    """
+    Cuotas por empleado del mes o bimestre.
+
+    Returns:
+        (filas, cuotas, conceptos): filas agregadas por empleado, dict de
+        arreglos por concepto y conceptos que aplican al periodo
+    """
+    meses = meses_de(anio, mes, bimestre)
+    filas, dias_periodo = agregar_cotizacion(empresa.id, anio, meses)
+
+    dias = np.array([min(f['dias'] or 0, dias_periodo) for f in filas], dtype=float)
+    sbc = np.array([f['sbc'] or _sbc_del_empleado(f) for f in filas], dtype=float)
+    for fila, valor, dias_fila in zip(filas, sbc.tolist(), dias.tolist()):
+        fila['sbc'], fila['dias'] = valor, int(dias_fila)
+
+    cuotas = calcular_cuotas(sbc, dias, empresa.prima_riesgo_trabajo)
+    conceptos = CONCEPTOS_MENSUALES + (CONCEPTOS_BIMESTRALES if bimestre is not None else ())
+    cuotas['total_patronal'] = np.round(sum(cuotas[c] for c in conceptos if c != 'cuota_obrera'), 2)
+    return filas, cuotas, conceptos
+
+
+def resumen_liquidacion(empresa, anio, mes=None, bimestre=None):
+    """Totales de la empresa por concepto para el mes o bimestre"""
+    filas, cuotas, conceptos = calcular_liquidacion(empresa, anio, mes, bimestre)
+    return {
+        'empresa_id': empresa.id,
+        'anio': anio,
+        'mes': mes,
+        'bimestre': bimestre,
+        'prima_riesgo_trabajo': float(empresa.prima_riesgo_trabajo),
+        'empleados': len(filas),
+        'dias_cotizados': sum(f['dias'] for f in filas),
+        'cuotas': {c: round(float(cuotas[c].sum()), 2) for c in conceptos},
+        'total_patronal': round(float(cuotas['total_patronal'].sum()), 2),
+    }
+
+
+# =============================================
+# ARCHIVO
+# =============================================
+
+class _Eco:
+    """Buffer que devuelve lo escrito, para csv.writer en streaming"""
+    def write(self, valor):
+        return valor
+
+
+def lineas_liquidacion(empresa, anio, bimestre):
+    """Genera el CSV de la liquidación bimestral renglón por renglón"""
+    filas, cuotas, _ = calcular_liquidacion(empresa, anio, bimestre=bimestre)
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUMNAS_LIQUIDACION)
+
+    columnas = {c: cuotas[c].tolist() for c in COLUMNAS_LIQUIDACION[6:]}
+    for i, fila in enumerate(filas):
+        nombre = f"{fila['nombre']} {fila['apellido_paterno']} {fila['apellido_materno'] or ''}".strip()
+        yield escritor.writerow(
+            [fila['empleado_id'], fila['nss'], fila['rfc'], nombre, fila['dias'], f"{fila['sbc']:.2f}"]
+            + [f'{columnas[c][i]:.2f}' for c in COLUMNAS_LIQUIDACION[6:]]
+        )
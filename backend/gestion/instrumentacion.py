@@ -0,0 +1,151 @@
+import json
+import logging
+import time
+from contextlib import ExitStack, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Etapas medidas en la petición actual: {nombre: [milisegundos, llamadas]}.
+# None cuando la instrumentación está desactivada o fuera de una petición.
+_etapas = ContextVar('etapas_server_timing', default=None)
+_NULO = nullcontext()
+
+
+# =============================================
+# MEDICIÓN DE ETAPAS
+# =============================================
+
+class _Etapa:
+    __slots__ = ('nombre', 'registro', 'inicio')
+
+    def __init__(self, nombre, registro):
+        self.nombre = nombre
+        self.registro = registro
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        transcurrido = (time.perf_counter() - self.inicio) * 1000
+        acumulado = self.registro.get(self.nombre)
+        if acumulado is None:
+            self.registro[self.nombre] = [transcurrido, 1]
+        else:
+            acumulado[0] += transcurrido
+            acumulado[1] += 1
+        return False
+
+
+def medir_etapa(nombre):
+    """
+    Context manager que acumula el tiempo de una etapa en la petición actual.
+    Sin instrumentación activa devuelve un nullcontext compartido.
+
+        with medir_etapa('persistencia'):
+            nomina.save()
+    """
+    registro = _etapas.get()
+    if registro is None:
+        return _NULO
+    return _Etapa(nombre, registro)
+
+
+def etapa(nombre):
+    """Decorador equivalente a envolver la función completa en medir_etapa(nombre)"""
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            registro = _etapas.get()
+            if registro is None:
+                return funcion(*args, **kwargs)
+            with _Etapa(nombre, registro):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+# =============================================
+# MIDDLEWARE
+# =============================================
+
+class ServerTimingMiddleware:
+    """
+    Publica las etapas medidas en el encabezado Server-Timing y en una línea
+    de log estructurada por petición. El tiempo de base de datos se mide
+    automáticamente como la etapa "db", en todas las bases configuradas
+    (réplicas y shards incluidos).
+
+    Bajo ASGI las etapas de las vistas async se miden igual (el registro
+    viaja en el contexto hasta los hilos del ORM), pero sus consultas corren
+    fuera del alcance de execute_wrapper y no suman a "db".
+
+    Se activa con INSTRUMENTACION_ETAPAS = True; si está desactivada el
+    middleware se retira de la cadena y no tiene costo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTACION_ETAPAS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        registro = {}
+        token = _etapas.set(registro)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as envolturas:
+                for alias in connections:
+                    envolturas.enter_context(connections[alias].execute_wrapper(self._medir_consulta))
+                response = self.get_response(request)
+        finally:
+            _etapas.reset(token)
+        return self._publicar(request, response, registro, inicio)
+
+    async def __acall__(self, request):
+        registro = {}
+        token = _etapas.set(registro)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _etapas.reset(token)
+        return self._publicar(request, response, registro, inicio)
+
+    @staticmethod
+    def _publicar(request, response, registro, inicio):
+        total = (time.perf_counter() - inicio) * 1000
+        metricas = [
+            f'{nombre};dur={ms:.1f};desc="{llamadas}x"'
+            for nombre, (ms, llamadas) in registro.items()
+        ]
+        metricas.append(f'total;dur={total:.1f}')
+        response['Server-Timing'] = ', '.join(metricas)
+
+        logger.info(json.dumps({
+            'evento': 'server_timing',
+            'metodo': request.method,
+            'ruta': request.path,
+            'status': response.status_code,
+            'total_ms': round(total, 1),
+            'etapas': {nombre: {'ms': round(ms, 1), 'llamadas': llamadas} for nombre, (ms, llamadas) in registro.items()},
+        }, ensure_ascii=False))
+        return response
+
+    @staticmethod
+    def _medir_consulta(execute, sql, params, many, context):
+        with medir_etapa('db'):
+            return execute(sql, params, many, context)
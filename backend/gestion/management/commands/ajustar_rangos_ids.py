@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.shards import ErrorMovimiento, aliases, ajustar_secuencias, rango_ids, shards_configurados
+
+
+class Command(BaseCommand):
+    help = "Deja la secuencia de ids de empleados, nóminas y acumulados de cada base dentro de su rango"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base', action='append', help='Alias a ajustar (por omisión todas las bases)')
+
+    def handle(self, *args, **opciones):
+        if not shards_configurados():
+            raise CommandError('No hay SHARDS configurados')
+        bases = opciones['base'] or aliases()
+        desconocidas = set(bases) - set(aliases())
+        if desconocidas:
+            raise CommandError(f"Bases no configuradas: {', '.join(sorted(desconocidas))}")
+
+        for alias in bases:
+            primero, ultimo = rango_ids(alias)
+            try:
+                resultado = ajustar_secuencias(alias)
+            except ErrorMovimiento as e:
+                raise CommandError(str(e))
+            for modelo, (siguiente, fuera) in resultado.items():
+                linea = f'{alias} {modelo}: rango {primero}-{ultimo}, siguiente id {siguiente}'
+                if fuera:
+                    # Renglones movidos de otra base, o de antes de los rangos (pueden chocar)
+                    linea += f', {fuera} renglones con ids de otro rango'
+                self.stdout.write(linea)
+        self.stdout.write(self.style.SUCCESS('Secuencias ajustadas'))
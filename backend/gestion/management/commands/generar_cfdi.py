@@ -0,0 +1,54 @@
+import os
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.cfdi import cargar_documentos, escribir_en_directorio, generar_documentos, nominas_del_periodo, zip_en_streaming
+from gestion.models import Empresa
+from gestion.replicas import en_replica
+from gestion.shards import en_empresa
+
+
+class Command(BaseCommand):
+    help = "Genera los CFDI de nómina (XML sin sellar) de una empresa y periodo, validados localmente"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, required=True, help='Id de la empresa')
+        parser.add_argument('--desde', required=True, help='Fecha inicial YYYY-MM-DD')
+        parser.add_argument('--hasta', required=True, help='Fecha final YYYY-MM-DD')
+        parser.add_argument('--salida', required=True, help='Directorio destino, o archivo .zip')
+        parser.add_argument('--procesos', type=int, default=None, help='Procesos del pool (por omisión, los CPU)')
+
+    def handle(self, *args, **opciones):
+        if not Empresa.objects.filter(pk=opciones['empresa']).exists():
+            raise CommandError(f"No existe la empresa {opciones['empresa']}")
+        try:
+            desde, hasta = date.fromisoformat(opciones['desde']), date.fromisoformat(opciones['hasta'])
+        except ValueError:
+            raise CommandError('Las fechas deben tener formato YYYY-MM-DD')
+
+        inicio = time.perf_counter()
+        with en_replica(), en_empresa(opciones['empresa']):
+            documentos = cargar_documentos(nominas_del_periodo(opciones['empresa'], desde, hasta))
+        resultados = generar_documentos(documentos, procesos=opciones['procesos'])
+
+        salida = opciones['salida']
+        if salida.lower().endswith('.zip'):
+            errores = []
+            with open(salida, 'wb') as destino:
+                for parte in zip_en_streaming(resultados, errores):
+                    destino.write(parte)
+            generados = len(documentos) - len(errores)
+        else:
+            generados, errores = escribir_en_directorio(resultados, salida)
+
+        for error in errores[:20]:
+            self.stderr.write(f"{error['archivo']}: {'; '.join(error['errores'])}")
+        if len(errores) > 20:
+            self.stderr.write(f"... y {len(errores) - 20} documentos más con errores")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"CFDI generados: {generados} de {len(documentos)} en {os.path.abspath(salida)}, "
+            f"{len(errores)} con errores en {time.perf_counter() - inicio:.1f}s"
+        ))
@@ -0,0 +1,307 @@
+import csv
+import io
+import json
+import random
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from benchmarks.datos_sinteticos import generar_valores_empleado
+from gestion import acumulados
+from gestion.models import Empleado, Empresa, Nomina, User
+from gestion.utils import CalculadoraIMSS, calcular_imss, calcular_isr
+
+# =============================================
+# CONFIGURACIÓN
+# =============================================
+
+FECHA_CORTE = date(2025, 9, 16)
+PASSWORD_CARGA = 'Carga2025!'
+GIROS = ['Manufactura', 'Comercio', 'Servicios', 'Construcción', 'Logística', 'Restaurantes']
+UBICACIONES = [
+    ('Monterrey', 'Nuevo León'), ('Guadalajara', 'Jalisco'), ('Tijuana', 'Baja California'),
+    ('Ciudad de México', 'CDMX'), ('Querétaro', 'Querétaro'), ('Mérida', 'Yucatán'),
+]
+MESES = [
+    "ENERO", "FEBRERO", "MARZO", "ABRIL", "MAYO", "JUNIO",
+    "JULIO", "AGOSTO", "SEPTIEMBRE", "OCTUBRE", "NOVIEMBRE", "DICIEMBRE"
+]
+DIAS_POR_TIPO = {'SEMANAL': 7, 'QUINCENAL': 15, 'MENSUAL': 30}
+COLUMNAS_NOMINA = [
+    'empleado_id', 'empresa_id', 'periodo_nominal', 'tipo_nomina', 'fecha_inicio', 'fecha_fin',
+    'faltas_en_periodo', 'salario_neto', 'calculos', 'estado', 'creado_por_id',
+    'fecha_creacion', 'fecha_actualizacion',
+    'estado_timbrado', 'uuid_cfdi', 'intentos_timbrado', 'error_timbrado',
+]
+
+
+def periodos_historicos(tipo_periodo, desde, hasta):
+    """
+    Genera (fecha_inicio, fecha_fin, etiqueta) de los periodos cerrados entre
+    desde y hasta para el tipo de nómina indicado.
+    """
+    if tipo_periodo == 'SEMANAL':
+        inicio = desde - timedelta(days=desde.weekday())
+        while inicio + timedelta(days=6) < hasta:
+            yield inicio, inicio + timedelta(days=6), f"SEMANA {inicio.isocalendar()[1]}"
+            inicio += timedelta(days=7)
+        return
+
+    año, mes = desde.year, desde.month
+    while True:
+        siguiente = date(año + (mes == 12), mes % 12 + 1, 1)
+        fin_mes = siguiente - timedelta(days=1)
+        if tipo_periodo == 'QUINCENAL':
+            tramos = [(date(año, mes, 1), date(año, mes, 15), '01'),
+                      (date(año, mes, 16), fin_mes, '02')]
+        else:
+            tramos = [(date(año, mes, 1), fin_mes, None)]
+        for inicio, fin, quincena in tramos:
+            if fin >= hasta:
+                return
+            etiqueta = f"{MESES[mes - 1]}/{quincena}" if quincena else MESES[mes - 1]
+            yield inicio, fin, etiqueta
+        año, mes = siguiente.year, siguiente.month
+
+
+def en_lotes(iterable, tamaño):
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamaño))
+        if not lote:
+            return
+        yield lote
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos de carga (empresas, usuarios, empleados, faltas y nóminas "
+        "históricas) con bulk_create y semilla determinista"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresas', type=int, default=10)
+        parser.add_argument('--empleados', type=int, default=100, help='Empleados por empresa')
+        parser.add_argument('--anios', type=int, default=1, help='Años de nóminas históricas')
+        parser.add_argument('--semilla', type=int, default=2025)
+        parser.add_argument('--lote', type=int, default=5000, help='Tamaño de lote para bulk_create')
+
+    def handle(self, *args, **opciones):
+        if opciones['empresas'] < 1 or opciones['empleados'] < 1 or opciones['anios'] < 0:
+            raise CommandError('--empresas y --empleados deben ser >= 1 y --anios >= 0')
+
+        self.rng = random.Random(opciones['semilla'])
+        self.lote = opciones['lote']
+        self.cache_deducciones = {}
+        inicio = time.perf_counter()
+
+        with transaction.atomic():
+            empresas, usuarios = self.crear_empresas(opciones['empresas'], opciones['semilla'])
+            empleados = self.crear_empleados(empresas, opciones['empleados'], opciones['anios'])
+            total_nominas = self.crear_nominas(empleados, usuarios, opciones['anios'])
+            # Las filas crudas no pasan por Nomina.save(): acumulados en bloque
+            acumulados.reconstruir(Nomina.objects.filter(empresa__in=empresas), tamano_lote=self.lote)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generados: {len(empresas)} empresas, {len(usuarios)} usuarios, "
+            f"{len(empleados)} empleados, {total_nominas} nóminas "
+            f"en {time.perf_counter() - inicio:.1f}s"
+        ))
+
+    # =============================================
+    # EMPRESAS Y USUARIOS
+    # =============================================
+
+    def crear_empresas(self, cantidad, semilla):
+        # El hash es lo más caro de crear un usuario: se calcula una sola vez
+        password = make_password(PASSWORD_CARGA)
+        ahora = timezone.now()
+
+        empresas = []
+        usuarios = []
+        for i in range(cantidad):
+            ciudad, estado = self.rng.choice(UBICACIONES)
+            empresas.append(Empresa(
+                nombre=f"Empresa Carga {semilla}-{i + 1}",
+                giro=self.rng.choice(GIROS),
+                ciudad=ciudad,
+                estado=estado,
+            ))
+            usuarios.append(User(
+                email=f"carga{semilla}-{i + 1}@ejemplo.mx",
+                password=password,
+                tipo_usuario='EMPRESA',
+                es_principal=True,
+                date_joined=ahora,
+            ))
+
+        empresas = Empresa.objects.bulk_create(empresas, batch_size=self.lote)
+        usuarios = User.objects.bulk_create(usuarios, batch_size=self.lote)
+
+        Relacion = Empresa.usuarios.through
+        Relacion.objects.bulk_create(
+            [Relacion(empresa_id=e.id, user_id=u.id) for e, u in zip(empresas, usuarios)],
+            batch_size=self.lote
+        )
+        return empresas, usuarios
+
+    # =============================================
+    # EMPLEADOS Y FALTAS
+    # =============================================
+
+    def crear_empleados(self, empresas, por_empresa, anios):
+        # Los índices arrancan después del último empleado para no chocar con el NSS único
+        indice = (Empleado.objects.aggregate(maximo=Max('id'))['maximo'] or 0) + 1
+        desde = date(FECHA_CORTE.year - anios, FECHA_CORTE.month, 1)
+
+        empleados = []
+        for empresa in empresas:
+            empresa.cantidad_empleados = por_empresa
+            for _ in range(por_empresa):
+                valores = generar_valores_empleado(self.rng, indice, FECHA_CORTE)
+                valores['fechas_faltas_injustificadas'] += self.faltas_historicas(
+                    valores['fecha_ingreso'], valores['dias_descanso'], desde
+                )
+                valores['fechas_faltas'] = list(valores['fechas_faltas_injustificadas'])
+                faltas = len(valores['fechas_faltas_injustificadas'])
+                dias_periodo = DIAS_POR_TIPO[valores['periodo_nominal']]
+                empleados.append(Empleado(
+                    empresa=empresa,
+                    faltas_en_periodo=min(faltas, dias_periodo),
+                    dias_laborados=max(0, dias_periodo - faltas),
+                    **valores
+                ))
+                indice += 1
+
+        Empresa.objects.bulk_update(empresas, ['cantidad_empleados'], batch_size=self.lote)
+        return Empleado.objects.bulk_create(empleados, batch_size=self.lote)
+
+    def faltas_historicas(self, fecha_ingreso, dias_descanso, desde):
+        """Entre 0 y 6 faltas injustificadas por año, en días laborables"""
+        inicio = max(desde, fecha_ingreso)
+        total_dias = (FECHA_CORTE - inicio).days
+        if total_dias <= 0:
+            return []
+        cantidad = self.rng.randint(0, 6 * max(1, total_dias // 365))
+        fechas = set()
+        for _ in range(cantidad):
+            dia = inicio + timedelta(days=self.rng.randrange(total_dias))
+            if dia.weekday() not in dias_descanso:
+                fechas.add(dia.isoformat())
+        return sorted(fechas)
+
+    # =============================================
+    # NÓMINAS HISTÓRICAS
+    # =============================================
+
+    def deducciones(self, salario_diario, tipo_periodo):
+        """
+        ISR e IMSS (en centavos) de un periodo completo. Se memorizan por
+        salario redondeado a 10 pesos: son representativos, no exactos por empleado.
+        """
+        base = max(10, int(salario_diario) // 10 * 10)
+        clave = (base, tipo_periodo)
+        if clave not in self.cache_deducciones:
+            dias = DIAS_POR_TIPO[tipo_periodo]
+            isr = calcular_isr(base * dias, tipo_periodo.lower(), FECHA_CORTE.month)
+            imss = calcular_imss(base, dias, incluir_detalle=False)['total_deduccion_imss']
+            self.cache_deducciones[clave] = (round(isr * 100), round(imss * 100))
+        return self.cache_deducciones[clave]
+
+    def filas_nominas(self, empleado, creado_por_id, desde):
+        """
+        Filas listas para insertar (en el orden de COLUMNAS_NOMINA) de las
+        nóminas históricas de un empleado. Los importes se llevan en centavos
+        enteros y el JSON de cálculos se arma con una plantilla por empleado.
+        """
+        tipo = empleado.periodo_nominal
+        salario_centavos = int(empleado.salario_diario_calculado * 100)
+        isr, imss = self.deducciones(empleado.salario_diario_calculado, tipo)
+        sbc = CalculadoraIMSS(empleado.salario_diario_calculado).calcular_sbc()
+        faltas = sorted(empleado.fechas_faltas_injustificadas)
+        plantilla = (
+            '{{"empleado": {{"faltas_en_periodo": {faltas}, "fechas_faltas": {fechas}, "dias_laborados": {dias_pagados}}}, '
+            '"periodo": {{"fecha_inicio": "{inicio}", "fecha_fin": "{fin}", "total_dias": {dias}}}, '
+            f'"sbc": {{{{"diario": {sbc}}}}}, '
+            '"percepciones": {{"sueldo": {sueldo}, "total": {sueldo}}}, '
+            f'"deducciones": {{{{"isr": {isr / 100}, "imss": {imss / 100}, "total": {(isr + imss) / 100}}}}}, '
+            '"resumen": {{"neto_a_pagar": {neto}}}, "origen": "generar_datos_carga"}}'
+        )
+
+        for fecha_inicio, fecha_fin, etiqueta in periodos_historicos(tipo, max(desde, empleado.fecha_ingreso), FECHA_CORTE):
+            inicio_iso, fin_iso = fecha_inicio.isoformat(), fecha_fin.isoformat()
+            faltas_periodo = faltas[bisect_left(faltas, inicio_iso):bisect_right(faltas, fin_iso)]
+            dias = 30 if tipo == 'MENSUAL' else (fecha_fin - fecha_inicio).days + 1
+            dias_pagados = max(0, dias - len(faltas_periodo))
+            sueldo = salario_centavos * dias_pagados
+            neto = max(0, sueldo - isr - imss)
+
+            calculos = plantilla.format(
+                faltas=len(faltas_periodo), fechas=json.dumps(faltas_periodo), dias_pagados=dias_pagados,
+                inicio=inicio_iso, fin=fin_iso, dias=dias, sueldo=sueldo / 100, neto=neto / 100,
+            )
+            yield (
+                empleado.id, empleado.empresa_id, etiqueta, tipo, inicio_iso, fin_iso,
+                len(faltas_periodo), f"{neto // 100}.{neto % 100:02d}", calculos, 'PAGADA',
+                creado_por_id, self.marca_tiempo(fecha_fin), self.ahora,
+                'SIN_TIMBRAR', '', 0, '',
+            )
+
+    def marca_tiempo(self, fecha):
+        """Fecha de creación (mediodía UTC del fin de periodo) ya adaptada a la base de datos"""
+        if fecha not in self.cache_fechas:
+            self.cache_fechas[fecha] = connection.ops.adapt_datetimefield_value(
+                datetime.combine(fecha, dt_time(12), tzinfo=dt_timezone.utc)
+            )
+        return self.cache_fechas[fecha]
+
+    def insertar_filas(self, tabla, columnas, filas):
+        """
+        Inserta filas crudas. bulk_create prepara cada campo de cada instancia
+        en Python y domina el tiempo total con cientos de miles de nóminas;
+        aquí se usa COPY en PostgreSQL y executemany en el resto de backends.
+        """
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(filas)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+            else:
+                cursor.executemany(
+                    f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join(['%s'] * len(columnas))})",
+                    filas
+                )
+
+    def crear_nominas(self, empleados, usuarios, anios):
+        if anios == 0:
+            return 0
+        # Cada empresa tiene un único usuario principal, creados en el mismo orden
+        empresa_ids = list(dict.fromkeys(e.empresa_id for e in empleados))
+        usuario_por_empresa = {empresa_id: u.id for empresa_id, u in zip(empresa_ids, usuarios)}
+
+        self.cache_fechas = {}
+        self.ahora = connection.ops.adapt_datetimefield_value(timezone.now())
+        desde = date(FECHA_CORTE.year - anios, FECHA_CORTE.month, 1)
+        filas = (
+            fila
+            for empleado in empleados
+            for fila in self.filas_nominas(empleado, usuario_por_empresa[empleado.empresa_id], desde)
+        )
+
+        total = 0
+        for lote in en_lotes(filas, self.lote):
+            self.insertar_filas(Nomina._meta.db_table, COLUMNAS_NOMINA, lote)
+            total += len(lote)
+            self.stdout.write(f"  {total} nóminas...", ending='\r')
+        self.stdout.write('')
+        return total
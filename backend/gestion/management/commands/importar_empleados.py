@@ -0,0 +1,53 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.importacion import TAMANO_LOTE, ErrorArchivo, importar_empleados, leer_filas
+from gestion.models import Empresa
+from gestion.shards import en_empresa
+
+
+class Command(BaseCommand):
+    help = "Importa empleados desde un archivo CSV o XLSX con validación en memoria y bulk_create por lotes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx')
+        parser.add_argument('--empresa', type=int, required=True, help='Id de la empresa destino')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Tamaño de lote para bulk_create')
+        parser.add_argument('--solo-validar', action='store_true', help='Valida el archivo sin insertar')
+        parser.add_argument('--reporte', help='Ruta donde guardar el reporte de errores en JSON')
+
+    def handle(self, *args, **opciones):
+        try:
+            empresa = Empresa.objects.get(pk=opciones['empresa'])
+        except Empresa.DoesNotExist:
+            raise CommandError(f"No existe la empresa {opciones['empresa']}")
+
+        inicio = time.perf_counter()
+        try:
+            with open(opciones['archivo'], 'rb') as archivo, en_empresa(empresa.id):
+                reporte = importar_empleados(
+                    leer_filas(archivo, opciones['archivo']),
+                    empresa,
+                    tamano_lote=opciones['lote'],
+                    solo_validar=opciones['solo_validar']
+                )
+        except (OSError, ErrorArchivo) as e:
+            raise CommandError(str(e))
+
+        if opciones['reporte']:
+            with open(opciones['reporte'], 'w', encoding='utf-8') as salida:
+                json.dump(reporte['errores'], salida, ensure_ascii=False, indent=2)
+
+        for error in reporte['errores'][:20]:
+            detalle = '; '.join(f"{campo}: {mensaje}" for campo, mensaje in error['errores'].items())
+            self.stderr.write(f"Fila {error['fila']}: {detalle}")
+        if len(reporte['errores']) > 20:
+            self.stderr.write(f"... y {len(reporte['errores']) - 20} filas más con errores")
+
+        accion, filas = ('Válidos', reporte['validos']) if opciones['solo_validar'] else ('Importados', reporte['creados'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{accion}: {filas} de {reporte['filas_procesadas']} filas, "
+            f"{len(reporte['errores'])} con errores en {time.perf_counter() - inicio:.1f}s"
+        ))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.models import Empresa
+from gestion.shards import ErrorMovimiento, mover_empresa
+
+
+class Command(BaseCommand):
+    help = "Mueve los empleados, nóminas y acumulados de una empresa a otro shard, por lotes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, required=True, help='Id de la empresa')
+        parser.add_argument('--destino', required=True, help="Alias de la base destino (default o uno de SHARDS)")
+        parser.add_argument('--lote', type=int, default=1000, help='Renglones por lote de copia y borrado')
+        parser.add_argument('--conservar-origen', action='store_true', help='No borrar los renglones del origen')
+        parser.add_argument(
+            '--espera', type=float, default=None,
+            help='Segundos a esperar tras bloquear escrituras (por omisión SHARDS_CACHE_SEGUNDOS)'
+        )
+
+    def handle(self, *args, **opciones):
+        if not Empresa.objects.filter(pk=opciones['empresa']).exists():
+            raise CommandError(f"No existe la empresa {opciones['empresa']}")
+
+        inicio = time.perf_counter()
+        try:
+            resumen = mover_empresa(
+                opciones['empresa'], opciones['destino'], lote=opciones['lote'],
+                conservar_origen=opciones['conservar_origen'], espera=opciones['espera'],
+                progreso=self.stdout.write if opciones['verbosity'] > 1 else None,
+            )
+        except ErrorMovimiento as e:
+            raise CommandError(str(e))
+
+        copiados = ', '.join(f'{modelo}: {total}' for modelo, total in resumen['copiados'].items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Empresa {opciones['empresa']} movida de {resumen['origen']} a {resumen['destino']} "
+            f"({copiados}) en {time.perf_counter() - inicio:.1f}s"
+        ))
@@ -0,0 +1,24 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from gestion.pac_simulado import PACSimulado
+
+
+class Command(BaseCommand):
+    help = "Levanta un PAC simulado local para probar el timbrado sin conexión"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--puerto', type=int, default=8765, help='Puerto a escuchar (por omisión 8765)')
+        parser.add_argument('--latencia', type=float, default=0.05, help='Segundos por respuesta')
+        parser.add_argument('--tasa-fallos', type=float, default=0.0, help='Probabilidad de responder 503 (0-1)')
+
+    def handle(self, *args, **opciones):
+        pac = PACSimulado(puerto=opciones['puerto'], latencia=opciones['latencia'], tasa_fallos=opciones['tasa_fallos'])
+        self.stdout.write(f"PAC simulado en {pac.url} (latencia {pac.latencia}s, fallos {pac.tasa_fallos:.0%})")
+        try:
+            asyncio.run(pac.servir())
+        except KeyboardInterrupt:
+            self.stdout.write(
+                f"Solicitudes: {pac.solicitudes}, timbrados: {len(pac.timbrados)}, fallos simulados: {pac.fallos}"
+            )
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from gestion import acumulados
+from gestion.models import AcumuladoAnual, Nomina
+from gestion.shards import aliases, alias_de_empresa, en_shard
+
+
+class Command(BaseCommand):
+    help = "Reconstruye la tabla AcumuladoAnual a partir de las nóminas PENDIENTE/PAGADA"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anio', type=int, help='Solo este año (por fecha_fin)')
+        parser.add_argument('--empresa', type=int, help='Solo esta empresa')
+        parser.add_argument('--lote', type=int, default=2000, help='Tamaño de lote de lectura y bulk_create')
+
+    def handle(self, *args, **opciones):
+        inicio = time.perf_counter()
+        creados = borrados = 0
+        # Con shards, cada base se reconstruye por separado
+        bases = [alias_de_empresa(opciones['empresa'])] if opciones['empresa'] else aliases()
+        for alias in bases:
+            with en_shard(alias):
+                creados_base, borrados_base = self.reconstruir(alias, opciones)
+            creados += creados_base
+            borrados += borrados_base
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Acumulados reconstruidos: {creados} renglones ({borrados} anteriores) "
+            f"en {time.perf_counter() - inicio:.1f}s"
+        ))
+
+    def reconstruir(self, alias, opciones):
+        nominas = Nomina.objects.all()
+        renglones = AcumuladoAnual.objects.all()
+        if opciones['anio']:
+            nominas = nominas.filter(fecha_fin__year=opciones['anio'])
+            renglones = renglones.filter(anio=opciones['anio'])
+        if opciones['empresa']:
+            # Por empleado: el acumulado es del empleado aunque la nómina no tenga empresa
+            nominas = nominas.filter(empleado__empresa_id=opciones['empresa'])
+            renglones = renglones.filter(empleado__empresa_id=opciones['empresa'])
+
+        with transaction.atomic(using=alias):
+            borrados, _ = renglones.delete()
+            creados = acumulados.reconstruir(nominas, tamano_lote=opciones['lote'])
+        return creados, borrados
@@ -0,0 +1,43 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.cfdi import nominas_del_periodo
+from gestion.models import Empresa
+from gestion.shards import en_empresa
+from gestion.timbrado import ClienteHTTP, timbrar_nominas
+
+
+class Command(BaseCommand):
+    help = "Timbra con el PAC los CFDI de nómina de una empresa y periodo; se puede volver a correr para reanudar"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, required=True, help='Id de la empresa')
+        parser.add_argument('--desde', required=True, help='Fecha inicial YYYY-MM-DD')
+        parser.add_argument('--hasta', required=True, help='Fecha final YYYY-MM-DD')
+        parser.add_argument('--concurrencia', type=int, default=None, help='Solicitudes simultáneas al PAC (por omisión PAC_CONCURRENCIA)')
+        parser.add_argument('--reintentos', type=int, default=None, help='Reintentos por errores temporales (por omisión PAC_REINTENTOS)')
+        parser.add_argument('--incluir-errores', action='store_true', help='Reintentar también las nóminas que quedaron en ERROR')
+        parser.add_argument('--url', default=None, help='URL del PAC (por omisión PAC_URL)')
+
+    def handle(self, *args, **opciones):
+        if not Empresa.objects.filter(pk=opciones['empresa']).exists():
+            raise CommandError(f"No existe la empresa {opciones['empresa']}")
+        try:
+            desde, hasta = date.fromisoformat(opciones['desde']), date.fromisoformat(opciones['hasta'])
+        except ValueError:
+            raise CommandError('Las fechas deben tener formato YYYY-MM-DD')
+
+        cliente = ClienteHTTP(url=opciones['url']) if opciones['url'] else None
+
+        with en_empresa(opciones['empresa']):
+            resumen = timbrar_nominas(
+                nominas_del_periodo(opciones['empresa'], desde, hasta), cliente=cliente,
+                concurrencia=opciones['concurrencia'], reintentos=opciones['reintentos'],
+                incluir_errores=opciones['incluir_errores'],
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Timbrados: {resumen['timbrados']} de {resumen['documentos']}, "
+            f"{resumen['errores']} con error del PAC, {resumen['invalidos']} inválidos, "
+            f"{resumen['intentos']} solicitudes en {resumen['segundos']:.1f}s"
+        ))
@@ -0,0 +1,313 @@
+"""
+Registro local de métricas (contadores e histogramas) agregadas entre los
+workers de gunicorn.
+
+Cada proceso acumula en memoria y vuelca periódicamente su estado completo a
+un archivo SQLite compartido, una fila por (pid, métrica, etiquetas). El
+endpoint /metrics suma las filas de todos los procesos y responde en formato
+de texto de Prometheus.
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.permissions import BasePermission
+from rest_framework.renderers import BaseRenderer
+
+logger = logging.getLogger(__name__)
+
+# =============================================
+# DEFINICIONES
+# =============================================
+
+BUCKETS_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICAS = {
+    'gestion_empleados_calculados_total': ('counter', 'Empleados con nómina calculada'),
+    'gestion_calculo_empleado_segundos': ('histogram', 'Tiempo de cálculo de nómina por empleado'),
+    'gestion_memo_calculos_total': ('counter', 'Aciertos y fallos de los memos de ISR, IMSS y calendario por calculo'),
+    'gestion_errores_nomina_total': ('counter', 'Errores al procesar nómina por tipo_error'),
+    'gestion_peticiones_total': ('counter', 'Peticiones atendidas por endpoint y status'),
+    'gestion_peticion_segundos': ('histogram', 'Duración de la petición por endpoint'),
+    'gestion_db_segundos_total': ('counter', 'Tiempo acumulado en base de datos por endpoint'),
+    'gestion_db_consultas_total': ('counter', 'Consultas SQL ejecutadas por endpoint'),
+}
+
+CUANTILES = (0.5, 0.99)
+INTERVALO_VOLCADO = 1.0  # segundos
+
+
+def habilitadas():
+    return getattr(settings, 'METRICAS_HABILITADAS', False)
+
+
+def _ruta_archivo():
+    return getattr(settings, 'METRICAS_ARCHIVO', None) or os.path.join(
+        tempfile.gettempdir(), 'gestor_nominas_metricas.sqlite3'
+    )
+
+
+# =============================================
+# REGISTRO EN PROCESO
+# =============================================
+
+class RegistroMetricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._histogramas = {}
+        self._ultimo_volcado = 0.0
+
+    @staticmethod
+    def _clave(nombre, etiquetas):
+        return nombre, tuple(sorted(etiquetas.items()))
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        clave = self._clave(nombre, etiquetas)
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, **etiquetas):
+        """Registra una observación en un histograma de BUCKETS_SEGUNDOS"""
+        clave = self._clave(nombre, etiquetas)
+        with self._lock:
+            datos = self._histogramas.get(clave)
+            if datos is None:
+                # [conteos por bucket..., +Inf, suma]
+                datos = self._histogramas[clave] = [0] * (len(BUCKETS_SEGUNDOS) + 1) + [0.0]
+            datos[bisect_left(BUCKETS_SEGUNDOS, valor)] += 1
+            datos[-1] += valor
+
+    def volcar(self, forzar=False):
+        """Escribe el estado de este proceso en el archivo compartido"""
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultimo_volcado < INTERVALO_VOLCADO:
+            return
+        self._ultimo_volcado = ahora
+
+        with self._lock:
+            filas = [
+                (os.getpid(), nombre, json.dumps(etiquetas), 'counter', json.dumps(valor))
+                for (nombre, etiquetas), valor in self._contadores.items()
+            ] + [
+                (os.getpid(), nombre, json.dumps(etiquetas), 'histogram', json.dumps(datos))
+                for (nombre, etiquetas), datos in self._histogramas.items()
+            ]
+        if not filas:
+            return
+
+        with _conectar() as conexion:
+            conexion.executemany(
+                "INSERT OR REPLACE INTO metricas (pid, nombre, etiquetas, tipo, valor) VALUES (?, ?, ?, ?, ?)",
+                filas
+            )
+
+
+registro = RegistroMetricas()
+incrementar = registro.incrementar
+observar = registro.observar
+
+
+def _conectar():
+    conexion = sqlite3.connect(_ruta_archivo(), timeout=5)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute(
+        "CREATE TABLE IF NOT EXISTS metricas ("
+        "pid INTEGER, nombre TEXT, etiquetas TEXT, tipo TEXT, valor TEXT, "
+        "PRIMARY KEY (pid, nombre, etiquetas))"
+    )
+    return conexion
+
+
+# =============================================
+# AGREGACIÓN Y FORMATO PROMETHEUS
+# =============================================
+
+def agregar():
+    """Suma las filas de todos los procesos: {(nombre, etiquetas): valor}"""
+    contadores = {}
+    histogramas = {}
+    with _conectar() as conexion:
+        filas = conexion.execute("SELECT nombre, etiquetas, tipo, valor FROM metricas").fetchall()
+
+    for nombre, etiquetas, tipo, valor in filas:
+        clave = (nombre, tuple(tuple(par) for par in json.loads(etiquetas)))
+        valor = json.loads(valor)
+        if tipo == 'counter':
+            contadores[clave] = contadores.get(clave, 0) + valor
+        else:
+            acumulado = histogramas.setdefault(clave, [0] * len(valor))
+            for i, v in enumerate(valor):
+                acumulado[i] += v
+    return contadores, histogramas
+
+
+def estimar_cuantil(conteos, cuantil):
+    """Cuantil por interpolación lineal dentro del bucket, como histogram_quantile"""
+    total = sum(conteos)
+    if not total:
+        return 0.0
+    objetivo = cuantil * total
+    acumulado = 0
+    for i, conteo in enumerate(conteos):
+        if acumulado + conteo >= objetivo:
+            if i >= len(BUCKETS_SEGUNDOS):
+                return BUCKETS_SEGUNDOS[-1]
+            inferior = BUCKETS_SEGUNDOS[i - 1] if i else 0.0
+            fraccion = (objetivo - acumulado) / conteo if conteo else 0
+            return inferior + (BUCKETS_SEGUNDOS[i] - inferior) * fraccion
+        acumulado += conteo
+    return BUCKETS_SEGUNDOS[-1]
+
+
+def _valor_etiqueta(valor):
+    """Escapa \\, " y salto de línea como pide el formato de texto de Prometheus"""
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(pares, extra=()):
+    pares = tuple(pares) + tuple(extra)
+    if not pares:
+        return ''
+    texto = ','.join(f'{k}="{_valor_etiqueta(v)}"' for k, v in pares)
+    return '{' + texto + '}'
+
+
+def formato_prometheus(contadores, histogramas):
+    lineas = []
+    for nombre, (tipo, ayuda) in METRICAS.items():
+        series_contador = sorted((e, v) for (n, e), v in contadores.items() if n == nombre)
+        series_histograma = sorted((e, v) for (n, e), v in histogramas.items() if n == nombre)
+        if not series_contador and not series_histograma:
+            continue
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+
+        for etiquetas, valor in series_contador:
+            lineas.append(f'{nombre}{_etiquetas(etiquetas)} {valor}')
+
+        for etiquetas, datos in series_histograma:
+            conteos, suma = datos[:-1], datos[-1]
+            acumulado = 0
+            for limite, conteo in zip(BUCKETS_SEGUNDOS + ('+Inf',), conteos):
+                acumulado += conteo
+                lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas, [("le", limite)])} {acumulado}')
+            lineas.append(f'{nombre}_sum{_etiquetas(etiquetas)} {suma}')
+            lineas.append(f'{nombre}_count{_etiquetas(etiquetas)} {acumulado}')
+
+        # Cuantiles precalculados para consultas rápidas sin PromQL
+        if series_histograma:
+            lineas.append(f'# TYPE {nombre}_cuantil gauge')
+            for etiquetas, datos in series_histograma:
+                for cuantil in CUANTILES:
+                    valor = estimar_cuantil(datos[:-1], cuantil)
+                    lineas.append(f'{nombre}_cuantil{_etiquetas(etiquetas, [("quantile", cuantil)])} {valor:.6f}')
+    return '\n'.join(lineas) + '\n'
+
+
+# =============================================
+# ENDPOINT Y MIDDLEWARE
+# =============================================
+
+class EsAdministrador(BasePermission):
+    def has_permission(self, request, view):
+        usuario = request.user
+        return bool(usuario and usuario.is_authenticated and (
+            usuario.is_superuser or getattr(usuario, 'tipo_usuario', None) == 'ADMIN'
+        ))
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data if isinstance(data, str) else json.dumps(data)
+
+
+@api_view(['GET'])
+@permission_classes([EsAdministrador])
+@renderer_classes([PrometheusRenderer])
+def metricas_view(request):
+    """Métricas de todos los workers en formato de texto de Prometheus"""
+    if not habilitadas():
+        return HttpResponse('Métricas deshabilitadas (METRICAS_HABILITADAS)\n', status=404, content_type='text/plain')
+    registro.volcar(forzar=True)
+    contadores, histogramas = agregar()
+    return HttpResponse(
+        formato_prometheus(contadores, histogramas),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+class MetricasMiddleware:
+    """
+    Cuenta peticiones, duración y tiempo de base de datos por endpoint
+    (nombre de la ruta resuelta). Solo se instala con METRICAS_HABILITADAS;
+    una falla al registrar se anota en el log y nunca cambia la respuesta.
+
+    Bajo ASGI las consultas corren en los hilos del ORM async, fuera del
+    alcance de execute_wrapper: solo se miden peticiones y duración.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not habilitadas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        db = [0.0, 0]
+
+        def medir_consulta(execute, sql, params, many, context):
+            inicio = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db[0] += time.perf_counter() - inicio
+                db[1] += 1
+
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(medir_consulta):
+            response = self.get_response(request)
+        self._registrar(request, response, time.perf_counter() - inicio, db)
+        return response
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        response = await self.get_response(request)
+        self._registrar(request, response, time.perf_counter() - inicio, None)
+        return response
+
+    def _registrar(self, request, response, duracion, db):
+        try:
+            self._registrar_peticion(request, response, duracion, db)
+        except Exception:  # Las métricas nunca deben tumbar una petición
+            logger.warning('No se pudieron registrar las métricas de la petición', exc_info=True)
+
+    def _registrar_peticion(self, request, response, duracion, db):
+        coincidencia = getattr(request, 'resolver_match', None)
+        endpoint = (coincidencia.view_name if coincidencia else None) or 'sin_ruta'
+        incrementar('gestion_peticiones_total', endpoint=endpoint, status=response.status_code)
+        observar('gestion_peticion_segundos', duracion, endpoint=endpoint)
+        if db is not None:
+            incrementar('gestion_db_segundos_total', db[0], endpoint=endpoint)
+            incrementar('gestion_db_consultas_total', db[1], endpoint=endpoint)
+        registro.volcar()
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0005_alter_empleado_rfc'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AcumuladoAnual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField()),
+                ('nominas', models.IntegerField(default=0, help_text='Nóminas PENDIENTE/PAGADA acumuladas')),
+                ('percepciones', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('base_gravable', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('exento', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('isr_retenido', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('subsidio_empleo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('imss', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('empleado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='acumulados', to='gestion.empleado')),
+                ('empresa', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='acumulados', to='gestion.empresa')),
+            ],
+            options={
+                'verbose_name': 'Acumulado anual',
+                'verbose_name_plural': 'Acumulados anuales',
+                'ordering': ['-anio', 'empleado'],
+                'indexes': [models.Index(fields=['empresa', 'anio'], name='gestion_acu_empresa_59f522_idx')],
+                'constraints': [models.UniqueConstraint(fields=('empleado', 'anio'), name='unique_acumulado_empleado_anio')],
+            },
+        ),
+    ]
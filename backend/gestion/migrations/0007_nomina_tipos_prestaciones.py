@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0006_acumuladoanual'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='nomina',
+            name='tipo_nomina',
+            field=models.CharField(choices=[('SEMANAL', 'Semanal (7 días)'), ('QUINCENAL', 'Quincenal (variable días)'), ('MENSUAL', 'Mensual (variable días)'), ('AGUINALDO', 'Aguinaldo'), ('PRIMA_VAC', 'Prima vacacional'), ('PTU', 'Reparto de utilidades (PTU)')], default='QUINCENAL', max_length=10),
+        ),
+    ]
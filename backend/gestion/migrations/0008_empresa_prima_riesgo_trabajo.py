@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:43
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0007_nomina_tipos_prestaciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empresa',
+            name='prima_riesgo_trabajo',
+            field=models.DecimalField(decimal_places=5, default=Decimal('0.54355'), help_text='Prima IMSS de riesgo de trabajo de la empresa, entre 0.5% y 15%', max_digits=7, validators=[django.core.validators.MinValueValidator(Decimal('0.5')), django.core.validators.MaxValueValidator(Decimal('15'))], verbose_name='Prima de riesgo de trabajo (%)'),
+        ),
+    ]
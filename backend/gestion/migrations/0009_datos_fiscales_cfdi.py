@@ -0,0 +1,44 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:44
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0008_empresa_prima_riesgo_trabajo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empleado',
+            name='codigo_postal',
+            field=models.CharField(blank=True, default='', help_text='Domicilio fiscal del receptor en el CFDI de nómina', max_length=5, validators=[django.core.validators.RegexValidator(message='El código postal debe tener 5 dígitos', regex='^\\d{5}$')], verbose_name='Código Postal Fiscal'),
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='curp',
+            field=models.CharField(blank=True, default='', help_text='Requerida para el CFDI de nómina', max_length=18, validators=[django.core.validators.RegexValidator(message='CURP inválida', regex='^[A-Z][AEIOUX][A-Z]{2}\\d{6}[HM][A-Z]{5}[0-9A-Z]\\d$')], verbose_name='CURP'),
+        ),
+        migrations.AddField(
+            model_name='empresa',
+            name='codigo_postal',
+            field=models.CharField(blank=True, default='', max_length=5, verbose_name='Código postal del lugar de expedición'),
+        ),
+        migrations.AddField(
+            model_name='empresa',
+            name='regimen_fiscal',
+            field=models.CharField(default='601', max_length=3, verbose_name='Régimen fiscal (catálogo SAT)'),
+        ),
+        migrations.AddField(
+            model_name='empresa',
+            name='registro_patronal',
+            field=models.CharField(blank=True, default='', max_length=20, verbose_name='Registro patronal IMSS'),
+        ),
+        migrations.AddField(
+            model_name='empresa',
+            name='rfc',
+            field=models.CharField(blank=True, default='', max_length=13, verbose_name='RFC'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0009_datos_fiscales_cfdi'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nomina',
+            name='error_timbrado',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='nomina',
+            name='estado_timbrado',
+            field=models.CharField(choices=[('SIN_TIMBRAR', 'Sin timbrar'), ('EN_PROCESO', 'Enviado al PAC'), ('TIMBRADO', 'Timbrado'), ('ERROR', 'Error de timbrado')], default='SIN_TIMBRAR', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='nomina',
+            name='fecha_timbrado',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='nomina',
+            name='intentos_timbrado',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='nomina',
+            name='uuid_cfdi',
+            field=models.CharField(blank=True, default='', max_length=36),
+        ),
+        migrations.AddIndex(
+            model_name='nomina',
+            index=models.Index(fields=['empresa', 'estado_timbrado'], name='gestion_nom_empresa_715da8_idx'),
+        ),
+    ]
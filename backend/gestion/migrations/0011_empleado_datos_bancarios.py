@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:53
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0010_nomina_timbrado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empleado',
+            name='banco',
+            field=models.CharField(blank=True, default='', help_text='Clave del banco (catálogo SPEI, p. ej. 012 BBVA, 072 Banorte)', max_length=3, validators=[django.core.validators.RegexValidator(message='La clave de banco debe tener 3 dígitos', regex='^\\d{3}$')], verbose_name='Banco'),
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='clabe',
+            field=models.CharField(blank=True, default='', help_text='Para dispersión interbancaria (SPEI)', max_length=18, validators=[django.core.validators.RegexValidator(message='La CLABE debe tener 18 dígitos', regex='^\\d{18}$')], verbose_name='CLABE'),
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='cuenta_bancaria',
+            field=models.CharField(blank=True, default='', help_text='Cuenta para depósitos del mismo banco', max_length=11, validators=[django.core.validators.RegexValidator(message='La cuenta debe tener 10 u 11 dígitos', regex='^\\d{10,11}$')], verbose_name='Cuenta Bancaria'),
+        ),
+    ]
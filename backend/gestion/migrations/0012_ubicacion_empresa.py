@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0011_empleado_datos_bancarios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UbicacionEmpresa',
+            fields=[
+                ('empresa', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ubicacion', serialize=False, to='gestion.empresa')),
+                ('alias', models.CharField(default='default', max_length=50, verbose_name='Alias de la base de datos')),
+                ('en_migracion', models.BooleanField(default=False, help_text='Mientras se mueve de shard no se permiten escrituras de la empresa', verbose_name='En migración')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Ubicación de empresa',
+                'verbose_name_plural': 'Ubicaciones de empresas',
+            },
+        ),
+        migrations.AlterField(
+            model_name='nomina',
+            name='creado_por',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='nominas_creadas', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0012_ubicacion_empresa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empleado',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Última actualización'),
+            preserve_default=False,
+        ),
+    ]
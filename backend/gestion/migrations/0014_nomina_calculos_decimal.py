@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-19 13:21
+
+import gestion.renderers
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0013_empleado_fecha_actualizacion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='nomina',
+            name='calculos',
+            field=models.JSONField(default=dict, encoder=gestion.renderers.CodificadorDecimal),
+        ),
+    ]
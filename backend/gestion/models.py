@@ -132,7 +132,19 @@ class Empresa(models.Model):
     cantidad_empleados = models.IntegerField(default=1, verbose_name="Cantidad de empleados (aproximadamente)")
     ciudad = models.CharField(max_length=100, default='Ciudad no especificada', verbose_name="Ciudad")
     estado = models.CharField(max_length=100, default='Estado no especificado', verbose_name="Estado")
+    rfc = models.CharField(max_length=13, blank=True, default='', verbose_name=_("RFC"))
+    regimen_fiscal = models.CharField(max_length=3, default='601', verbose_name=_("Régimen fiscal (catálogo SAT)"))
+    codigo_postal = models.CharField(max_length=5, blank=True, default='', verbose_name=_("Código postal del lugar de expedición"))
+    registro_patronal = models.CharField(max_length=20, blank=True, default='', verbose_name=_("Registro patronal IMSS"))
     activa = models.BooleanField(default=True, verbose_name=_("Activa"))
+    prima_riesgo_trabajo = models.DecimalField(
+        max_digits=7,
+        decimal_places=5,
+        default=Decimal('0.54355'),
+        validators=[MinValueValidator(Decimal('0.5')), MaxValueValidator(Decimal('15'))],
+        verbose_name=_("Prima de riesgo de trabajo (%)"),
+        help_text=_("Prima IMSS de riesgo de trabajo de la empresa, entre 0.5% y 15%")
+    )
     
     # Relación correcta con usuarios
     usuarios = models.ManyToManyField(
@@ -160,11 +172,44 @@ class Empresa(models.Model):
                 'cantidad_empleados': _("La empresa debe tener al menos 1 empleado")
             })
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Si la empresa está en un shard, su copia allá se mantiene al día
+        from .shards import sincronizar_empresa
+        sincronizar_empresa(self)
+
     def obtener_usuario_principal(self):
         """Devuelve el usuario principal de la empresa si existe"""
         return self.usuarios.filter(es_principal=True).first()
 
 
+class UbicacionEmpresa(models.Model):
+    """
+    Tabla de ruteo de empresas a shards (gestion/shards.py). Vive solo en la
+    base principal; una empresa sin renglón está en 'default'.
+    """
+    empresa = models.OneToOneField(
+        Empresa,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ubicacion'
+    )
+    alias = models.CharField(max_length=50, default='default', verbose_name=_("Alias de la base de datos"))
+    en_migracion = models.BooleanField(
+        default=False,
+        verbose_name=_("En migración"),
+        help_text=_("Mientras se mueve de shard no se permiten escrituras de la empresa")
+    )
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Ubicación de empresa")
+        verbose_name_plural = _("Ubicaciones de empresas")
+
+    def __str__(self):
+        return f"{self.empresa_id} -> {self.alias}"
+
+
 from django.db import models
 from django.core.validators import MinValueValidator, RegexValidator
 from django.core.exceptions import ValidationError
@@ -174,6 +219,12 @@ from datetime import datetime, date, timedelta
 from django.db.models import Q
 
 
+def clabe_valida(clabe):
+    """Dígito verificador de la CLABE: pesos 3, 7, 1 sobre los primeros 17 dígitos"""
+    suma = sum(int(d) * peso % 10 for d, peso in zip(clabe[:17], [3, 7, 1] * 6))
+    return (10 - suma % 10) % 10 == int(clabe[17])
+
+
 class Empleado(models.Model):
     PERIODO_NOMINAL_CHOICES = [
         ('SEMANAL', 'Semanal'),
@@ -216,6 +267,46 @@ class Empleado(models.Model):
     ],
     verbose_name=_('RFC')
 )
+    curp = models.CharField(
+        max_length=18,
+        blank=True,
+        default='',
+        validators=[RegexValidator(regex=r'^[A-Z][AEIOUX][A-Z]{2}\d{6}[HM][A-Z]{5}[0-9A-Z]\d$', message=_('CURP inválida'))],
+        verbose_name=_('CURP'),
+        help_text=_('Requerida para el CFDI de nómina')
+    )
+    codigo_postal = models.CharField(
+        max_length=5,
+        blank=True,
+        default='',
+        validators=[RegexValidator(regex=r'^\d{5}$', message=_('El código postal debe tener 5 dígitos'))],
+        verbose_name=_('Código Postal Fiscal'),
+        help_text=_('Domicilio fiscal del receptor en el CFDI de nómina')
+    )
+    banco = models.CharField(
+        max_length=3,
+        blank=True,
+        default='',
+        validators=[RegexValidator(regex=r'^\d{3}$', message=_('La clave de banco debe tener 3 dígitos'))],
+        verbose_name=_('Banco'),
+        help_text=_('Clave del banco (catálogo SPEI, p. ej. 012 BBVA, 072 Banorte)')
+    )
+    cuenta_bancaria = models.CharField(
+        max_length=11,
+        blank=True,
+        default='',
+        validators=[RegexValidator(regex=r'^\d{10,11}$', message=_('La cuenta debe tener 10 u 11 dígitos'))],
+        verbose_name=_('Cuenta Bancaria'),
+        help_text=_('Cuenta para depósitos del mismo banco')
+    )
+    clabe = models.CharField(
+        max_length=18,
+        blank=True,
+        default='',
+        validators=[RegexValidator(regex=r'^\d{18}$', message=_('La CLABE debe tener 18 dígitos'))],
+        verbose_name=_('CLABE'),
+        help_text=_('Para dispersión interbancaria (SPEI)')
+    )
 
     sueldo_mensual = models.DecimalField(
         max_digits=10, 
@@ -299,6 +390,7 @@ class Empleado(models.Model):
     activo = models.BooleanField(default=True, verbose_name=_('Activo'))
     fecha_baja = models.DateField(blank=True, null=True, verbose_name=_('Fecha de Baja'))
     motivo_baja = models.TextField(blank=True, null=True, verbose_name=_('Motivo de Baja'))
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name=_('Última actualización'))
 
     class Meta:
         verbose_name = _("Empleado")
@@ -427,6 +519,13 @@ class Empleado(models.Model):
                         _("Día inválido: {}. Rango permitido: 0-6").format(dia)
                     )
 
+        # Validación de datos bancarios para dispersión
+        if self.clabe and len(self.clabe) == 18 and self.clabe.isdigit():
+            if not clabe_valida(self.clabe):
+                errors['clabe'] = _("Dígito verificador de la CLABE incorrecto")
+            elif self.banco and self.clabe[:3] != self.banco:
+                errors['banco'] = _("La clave de banco no coincide con la CLABE")
+
         # Validación de periodo nominal vs salario
         if self.periodo_nominal == 'MENSUAL':
             if self.salario_diario is not None:
@@ -480,12 +579,15 @@ class Empleado(models.Model):
         self.full_clean()
         super().save(*args, **kwargs)
 
-from django.db import models
+from django.db import models, router, transaction
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import date, datetime, timedelta
 
+from . import acumulados
+from .renderers import CodificadorDecimal
+
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -497,6 +599,9 @@ class Nomina(models.Model):
         ('SEMANAL', 'Semanal (7 días)'),
         ('QUINCENAL', 'Quincenal (variable días)'),
         ('MENSUAL', 'Mensual (variable días)'),
+        ('AGUINALDO', 'Aguinaldo'),
+        ('PRIMA_VAC', 'Prima vacacional'),
+        ('PTU', 'Reparto de utilidades (PTU)'),
     ]
 
     ESTADO_NOMINA_CHOICES = [
@@ -506,6 +611,13 @@ class Nomina(models.Model):
         ('CANCELADA', 'Cancelada'),
     ]
 
+    ESTADO_TIMBRADO_CHOICES = [
+        ('SIN_TIMBRAR', 'Sin timbrar'),
+        ('EN_PROCESO', 'Enviado al PAC'),
+        ('TIMBRADO', 'Timbrado'),
+        ('ERROR', 'Error de timbrado'),
+    ]
+
     empleado = models.ForeignKey(
         'Empleado',
         on_delete=models.CASCADE,
@@ -539,7 +651,7 @@ class Nomina(models.Model):
     fecha_fin = models.DateField(null=True, blank=True)
     faltas_en_periodo = models.PositiveSmallIntegerField(default=0)
     salario_neto = models.DecimalField(max_digits=12, decimal_places=2, default=0)
-    calculos = models.JSONField(default=dict)
+    calculos = models.JSONField(default=dict, encoder=CodificadorDecimal)
     
     estado = models.CharField(
         max_length=10,
@@ -551,12 +663,24 @@ class Nomina(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
         null=True,
-        related_name='nominas_creadas'
+        related_name='nominas_creadas',
+        db_constraint=False  # Los usuarios viven en la base principal; la nómina puede estar en un shard
     )
     
     fecha_creacion = models.DateTimeField(null=True, blank=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
 
+    # Timbrado del CFDI con el PAC (gestion.timbrado)
+    estado_timbrado = models.CharField(
+        max_length=12,
+        choices=ESTADO_TIMBRADO_CHOICES,
+        default='SIN_TIMBRAR'
+    )
+    uuid_cfdi = models.CharField(max_length=36, blank=True, default='')
+    intentos_timbrado = models.PositiveSmallIntegerField(default=0)
+    error_timbrado = models.TextField(blank=True, default='')
+    fecha_timbrado = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         verbose_name = "Nómina"
         verbose_name_plural = "Nóminas"
@@ -565,6 +689,7 @@ class Nomina(models.Model):
         indexes = [
             models.Index(fields=['empleado', 'fecha_inicio']),
             models.Index(fields=['estado']),
+            models.Index(fields=['empresa', 'estado_timbrado']),
         ]
 
     def __str__(self):
@@ -623,7 +748,49 @@ class Nomina(models.Model):
         if not self.pk and not self.fecha_creacion:
             self.fecha_creacion = timezone.now()
         
-        super().save(*args, **kwargs)
+        # La nómina y su aporte a los acumulados anuales se guardan juntos,
+        # en la base (shard) de la nómina
+        from .shards import en_shard
+        db = kwargs.get('using') or router.db_for_write(Nomina, instance=self)
+        with transaction.atomic(using=db, savepoint=False), en_shard(db):
+            anterior = self._aporte_anterior(db)
+            super().save(*args, **kwargs)
+            nuevo = acumulados.aporte_de_nomina(self)
+            acumulados.registrar_cambios([(anterior, nuevo)])
+        self._aporte_guardado = nuevo
+
+    def delete(self, *args, **kwargs):
+        from .shards import en_shard
+        db = kwargs.get('using') or router.db_for_write(Nomina, instance=self)
+        with transaction.atomic(using=db, savepoint=False), en_shard(db):
+            anterior = self._aporte_anterior(db)
+            resultado = super().delete(*args, **kwargs)
+            acumulados.registrar_cambios([(anterior, None)])
+        self._aporte_guardado = None
+        return resultado
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Aporte tal como se leyó, para los caminos masivos (bulk_update) que
+        # cargan las nóminas con select_for_update dentro de su transacción
+        if all(campo in field_names for campo in acumulados.CAMPOS_NOMINA):
+            instancia._aporte_guardado = acumulados.aporte_de_nomina(instancia)
+        return instancia
+
+    def _aporte_anterior(self, db):
+        """
+        Aporte guardado en la base, leído con el renglón bloqueado: dos
+        guardados concurrentes de la misma nómina restan cada uno el aporte
+        que dejó el otro, no el que tenían al cargarla.
+        """
+        if self._state.adding or not self.pk:
+            return None
+        fila = (
+            Nomina.objects.using(db).select_for_update()
+            .filter(pk=self.pk).values_list(*acumulados.CAMPOS_NOMINA).first()
+        )
+        return acumulados.aporte(*fila) if fila else None
 
     def actualizar_faltas(self, fechas_faltas):
         """
@@ -670,3 +837,45 @@ class Nomina(models.Model):
         if self.fecha_inicio and self.fecha_fin:
             return f"{self.fecha_inicio.strftime('%d/%m/%Y')} - {self.fecha_fin.strftime('%d/%m/%Y')}"
         return self.periodo_nominal or "Sin periodo definido"
+
+
+class AcumuladoAnual(models.Model):
+    """
+    Totales del anio por empleado, mantenidos por Nomina.save()/delete()
+    (ver gestion/acumulados.py). Se reconstruyen con reconstruir_acumulados.
+    """
+    empleado = models.ForeignKey(
+        'Empleado',
+        on_delete=models.CASCADE,
+        related_name='acumulados'
+    )
+    empresa = models.ForeignKey(
+        'Empresa',
+        on_delete=models.CASCADE,
+        related_name='acumulados',
+        null=True,
+        blank=True
+    )
+    anio = models.PositiveSmallIntegerField()
+    nominas = models.IntegerField(default=0, help_text="Nóminas PENDIENTE/PAGADA acumuladas")
+    percepciones = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    base_gravable = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    exento = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    isr_retenido = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    subsidio_empleo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    imss = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Acumulado anual"
+        verbose_name_plural = "Acumulados anuales"
+        ordering = ['-anio', 'empleado']
+        constraints = [
+            models.UniqueConstraint(fields=['empleado', 'anio'], name='unique_acumulado_empleado_anio')
+        ]
+        indexes = [
+            models.Index(fields=['empresa', 'anio']),
+        ]
+
+    def __str__(self):
+        return f"Acumulado {self.anio} - empleado {self.empleado_id}"
@@ -0,0 +1,131 @@
+"""
+PAC simulado para pruebas y mediciones sin conexión.
+
+Servidor HTTP mínimo sobre asyncio que acepta POST /timbrar con el XML del
+CFDI y responde {"uuid": ...}. Permite agregar latencia y una tasa de fallos
+temporales (503) para verificar la concurrencia y los reintentos de
+gestion.timbrado. El UUID depende solo del folio (X-Folio), de modo que
+volver a timbrar el mismo folio devuelve el mismo UUID, como haría un PAC
+real con la llave de idempotencia.
+"""
+import asyncio
+import json
+import random
+import threading
+import uuid
+
+RUTA = '/timbrar'
+NS_UUID = uuid.UUID('6ba7b811-9dad-11d1-80b4-00c04fd430c8')
+
+
+class PACSimulado:
+    """
+    Args:
+        latencia: segundos que tarda cada respuesta
+        tasa_fallos: probabilidad (0-1) de responder 503
+        semilla: semilla del generador de fallos, para pruebas repetibles
+    """
+
+    def __init__(self, host='127.0.0.1', puerto=0, latencia=0.0, tasa_fallos=0.0, semilla=None):
+        self.host = host
+        self.puerto = puerto
+        self.latencia = latencia
+        self.tasa_fallos = tasa_fallos
+        self.azar = random.Random(semilla)
+        self.solicitudes = 0
+        self.fallos = 0
+        self.timbrados = {}
+        self._servidor = None
+        self._loop = None
+        self._hilo = None
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.puerto}{RUTA}'
+
+    # =============================================
+    # HTTP
+    # =============================================
+
+    async def _atender(self, lector, escritor):
+        try:
+            cabecera = await lector.readuntil(b'\r\n\r\n')
+            lineas = cabecera.decode('latin-1').split('\r\n')
+            metodo, ruta, _ = lineas[0].split(' ', 2)
+            encabezados = {}
+            for linea in lineas[1:]:
+                if ':' in linea:
+                    nombre, valor = linea.split(':', 1)
+                    encabezados[nombre.strip().lower()] = valor.strip()
+            cuerpo = await lector.readexactly(int(encabezados.get('content-length', 0)))
+            estado, respuesta = await self._responder(metodo, ruta, encabezados, cuerpo)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            estado, respuesta = 400, {'error': 'Solicitud mal formada'}
+
+        datos = json.dumps(respuesta).encode()
+        escritor.write(
+            f'HTTP/1.1 {estado} {"OK" if estado == 200 else "Error"}\r\n'
+            f'Content-Type: application/json\r\nContent-Length: {len(datos)}\r\n'
+            'Connection: close\r\n\r\n'.encode('latin-1') + datos
+        )
+        try:
+            await escritor.drain()
+        finally:
+            escritor.close()
+
+    async def _responder(self, metodo, ruta, encabezados, cuerpo):
+        self.solicitudes += 1
+        if metodo != 'POST' or ruta.split('?')[0] != RUTA:
+            return 404, {'error': f'{metodo} {ruta} no existe'}
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        if self.tasa_fallos and self.azar.random() < self.tasa_fallos:
+            self.fallos += 1
+            return 503, {'error': 'Servicio no disponible (simulado)'}
+
+        folio = encabezados.get('x-folio', '')
+        if not folio:
+            return 400, {'error': 'Falta el encabezado X-Folio'}
+        if b'cfdi:Comprobante' not in cuerpo:
+            return 400, {'error': 'El documento no es un CFDI'}
+        self.timbrados[folio] = str(uuid.uuid5(NS_UUID, folio)).upper()
+        return 200, {'uuid': self.timbrados[folio]}
+
+    # =============================================
+    # EJECUCIÓN
+    # =============================================
+
+    async def iniciar(self):
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto, backlog=1024)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+        return self
+
+    async def detener(self):
+        self._servidor.close()
+        await self._servidor.wait_closed()
+
+    async def servir(self):
+        await self.iniciar()
+        async with self._servidor:
+            await self._servidor.serve_forever()
+
+    def iniciar_en_hilo(self):
+        """Corre el servidor con su propio loop en un hilo; para código síncrono"""
+        listo = threading.Event()
+
+        def ejecutar():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.iniciar())
+            listo.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.detener())
+            self._loop.close()
+
+        self._hilo = threading.Thread(target=ejecutar, name='pac-simulado', daemon=True)
+        self._hilo.start()
+        listo.wait()
+        return self
+
+    def detener_hilo(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._hilo.join()
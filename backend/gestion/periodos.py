@@ -39,7 +39,18 @@ def generar_calendario_semanal_2025():
     
     return periodos
 
-def generar_periodos_nominales(tipo_periodo, año=2025):
+# Año de los catálogos cuando no se indica otro
+AÑO_CATALOGO = 2025
+
+
+def leer_año(valor, defecto=AÑO_CATALOGO):
+    """Año del parámetro ?año= (defecto si viene vacío); None si no es un entero entre 1 y 9999"""
+    if not valor:
+        return defecto
+    return int(valor) if valor.isdigit() and 1 <= int(valor) <= 9999 else None
+
+
+def generar_periodos_nominales(tipo_periodo, año=AÑO_CATALOGO):
     """Genera todos los periodos nominales del año especificado"""
     periodos = []
     meses = [
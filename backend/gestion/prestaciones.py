@@ -0,0 +1,300 @@
+"""
+Prestaciones anuales por empresa: aguinaldo, prima vacacional y PTU.
+
+Los empleados se cargan en una consulta y cada prestación se calcula en una
+sola pasada vectorizada (numpy) sobre todos ellos, incluyendo la parte
+exenta en UMAs, la gravable y el ISR. El ISR se determina como la diferencia
+entre la tarifa mensual aplicada al sueldo ordinario más lo gravable y la
+aplicada al sueldo ordinario solo.
+
+Las corridas se guardan como nóminas especiales (tipo_nomina AGUINALDO,
+PRIMA_VAC o PTU) con bulk_create y se reflejan en los acumulados anuales.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from . import acumulados
+from .models import Empleado, Nomina
+from .shards import alias_actual
+from .utils import MAX_AGUINALDO_EXENTO, MAX_PRIMA_VACACIONAL_EXENTA, UMA_DIARIA_2025, calcular_isr_vectorizado
+
+# =============================================
+# CONFIGURACIÓN
+# =============================================
+
+DIAS_AGUINALDO = 15
+PORCENTAJE_PRIMA_VACACIONAL = 0.25
+MAX_PTU_EXENTA = 15 * UMA_DIARIA_2025
+DIAS_TOPE_PTU = 90  # Tope de tres meses de salario (art. 127 fr. VIII LFT)
+DIAS_MES_ISR = 30.4
+
+# Días de vacaciones por años cumplidos (art. 76 LFT, reforma 2023)
+TABLA_VACACIONES = [(1, 12), (2, 14), (3, 16), (4, 18), (5, 20), (10, 22), (15, 24), (20, 26), (25, 28), (30, 30), (35, 32)]
+
+TIPOS = {
+    'aguinaldo': {'tipo_nomina': 'AGUINALDO', 'etiqueta': 'AGUINALDO', 'exento': MAX_AGUINALDO_EXENTO},
+    'prima_vacacional': {'tipo_nomina': 'PRIMA_VAC', 'etiqueta': 'PRIMA VAC', 'exento': MAX_PRIMA_VACACIONAL_EXENTA},
+    'ptu': {'tipo_nomina': 'PTU', 'etiqueta': 'PTU', 'exento': MAX_PTU_EXENTA},
+}
+
+
+# =============================================
+# CARGA
+# =============================================
+
+def cargar_empleados(empresa_id, desde, hasta):
+    """
+    Empleados que laboraron algún día entre desde y hasta, como arreglos
+    paralelos. Una sola consulta.
+    """
+    filas = list(
+        Empleado.objects
+        .filter(empresa_id=empresa_id, fecha_ingreso__lte=hasta)
+        .exclude(activo=False, fecha_baja__lt=desde)
+        .order_by('apellido_paterno', 'nombre')
+        .values_list(
+            'id', 'nombre', 'apellido_paterno', 'apellido_materno', 'periodo_nominal',
+            'salario_diario', 'sueldo_mensual', 'fecha_ingreso', 'activo', 'fecha_baja',
+            'fechas_faltas_injustificadas'
+        )
+    )
+    desde_iso, hasta_iso = desde.isoformat(), hasta.isoformat()
+
+    def salario(fila):
+        if fila[4] == 'MENSUAL':
+            return float(fila[6] or 0) / 30
+        return float(fila[5] or 0)
+
+    return {
+        'filas': filas,
+        'salario_diario': np.array([round(salario(f), 2) for f in filas], dtype=float),
+        'ingreso': np.array([f[7].toordinal() for f in filas], dtype=np.int64),
+        'baja': np.array([
+            f[9].toordinal() if not f[8] and f[9] else hasta.toordinal() for f in filas
+        ], dtype=np.int64),
+        'faltas': np.array([
+            sum(1 for falta in (f[10] or []) if desde_iso <= falta <= hasta_iso) for f in filas
+        ], dtype=np.int64),
+    }
+
+
+def dias_en_rango(datos, desde, hasta):
+    """Días de cada empleado dentro de [desde, hasta] según ingreso y baja"""
+    inicio = np.maximum(datos['ingreso'], desde.toordinal())
+    fin = np.minimum(datos['baja'], hasta.toordinal())
+    return np.clip(fin - inicio + 1, 0, None)
+
+
+# =============================================
+# CÁLCULO VECTORIZADO
+# =============================================
+
+def calcular_aguinaldo(datos, anio):
+    """15 días de salario proporcionales a los días laborados en el año"""
+    inicio, fin = date(anio, 1, 1), date(anio, 12, 31)
+    dias_anio = (fin - inicio).days + 1
+    dias = dias_en_rango(datos, inicio, fin)
+    dias_pagados = DIAS_AGUINALDO * dias / dias_anio
+    return np.round(datos['salario_diario'] * dias_pagados, 2), {'dias_laborados': dias, 'dias_pagados': np.round(dias_pagados, 2)}
+
+
+def dias_vacaciones(anios_cumplidos):
+    """Días de vacaciones según los años cumplidos (vectorizado)"""
+    limites = np.array([anios for anios, _ in TABLA_VACACIONES])
+    dias = np.array([dias for _, dias in TABLA_VACACIONES])
+    tramo = np.clip(np.searchsorted(limites, anios_cumplidos, side='left'), 0, len(dias) - 1)
+    return dias[tramo]
+
+
+def calcular_prima_vacacional(datos, fecha_calculo):
+    """
+    25% del salario de los días de vacaciones del año de servicio en curso;
+    con menos de un año se paga la parte proporcional.
+    """
+    antiguedad = np.clip(fecha_calculo.toordinal() - datos['ingreso'] + 1, 0, None)
+    anios = antiguedad // 365
+    dias_vac = dias_vacaciones(np.maximum(anios, 1)).astype(float)
+    dias_vac = np.where(anios >= 1, dias_vac, dias_vac * antiguedad / 365)
+    monto = datos['salario_diario'] * dias_vac * PORCENTAJE_PRIMA_VACACIONAL
+    return np.round(monto, 2), {'antiguedad_anios': anios, 'dias_vacaciones': np.round(dias_vac, 2)}
+
+
+def calcular_ptu(datos, anio, monto_repartir):
+    """
+    Reparto de PTU del ejercicio: la mitad en proporción a los días
+    trabajados y la otra mitad a los salarios devengados, con tope de tres
+    meses de salario por trabajador.
+    """
+    dias = np.clip(dias_en_rango(datos, date(anio, 1, 1), date(anio, 12, 31)) - datos['faltas'], 0, None)
+    salarios = datos['salario_diario'] * dias
+    mitad = float(monto_repartir) / 2
+    por_dias = mitad * dias / dias.sum() if dias.sum() else np.zeros(len(dias))
+    por_salarios = mitad * salarios / salarios.sum() if salarios.sum() else np.zeros(len(dias))
+    monto = np.minimum(por_dias + por_salarios, datos['salario_diario'] * DIAS_TOPE_PTU)
+    return np.round(monto, 2), {'dias_trabajados': dias, 'salarios_devengados': np.round(salarios, 2)}
+
+
+def desglose_fiscal(montos, salario_diario, tope_exento):
+    """Exento hasta el tope en UMAs, gravable e ISR marginal sobre el sueldo mensual"""
+    exento = np.minimum(montos, float(tope_exento))
+    gravable = montos - exento
+    ordinario = salario_diario * DIAS_MES_ISR
+    isr = calcular_isr_vectorizado(ordinario + gravable, 'mensual') - calcular_isr_vectorizado(ordinario, 'mensual')
+    isr = np.where(gravable > 0, np.round(np.maximum(isr, 0), 2), 0.0)
+    return np.round(exento, 2), np.round(gravable, 2), isr
+
+
+# =============================================
+# CORRIDA POR EMPRESA
+# =============================================
+
+def periodo_corrida(tipo, anio, fecha_calculo=None):
+    """(fecha_inicio, fecha_fin) con que se guarda la corrida especial"""
+    if tipo == 'aguinaldo':
+        return date(anio, 1, 1), date(anio, 12, 20)
+    if tipo == 'ptu':
+        return date(anio, 1, 1), date(anio + 1, 5, 30)
+    fecha_calculo = fecha_calculo or date(anio, 12, 31)
+    return fecha_calculo - timedelta(days=364), fecha_calculo
+
+
+def calcular_prestacion(empresa_id, tipo, anio, monto_ptu=None, fecha_calculo=None):
+    """
+    Calcula una prestación para todos los empleados de la empresa.
+
+    Args:
+        tipo: 'aguinaldo', 'prima_vacacional' o 'ptu'
+        anio: año (ejercicio en PTU)
+        monto_ptu: monto total a repartir (solo PTU)
+        fecha_calculo: fecha para la antigüedad (solo prima vacacional)
+
+    Returns:
+        dict con 'empleados' y 'resumen'
+    """
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de prestación no válido: {tipo}. Use {', '.join(TIPOS)}")
+    if tipo == 'ptu':
+        if monto_ptu is None:
+            raise ValueError('Para PTU se requiere monto_ptu')
+        monto_ptu = Decimal(str(monto_ptu))
+        if not monto_ptu.is_finite() or monto_ptu < 0:
+            raise ValueError('monto_ptu debe ser un número finito mayor o igual a cero')
+
+    fecha_inicio, fecha_fin = periodo_corrida(tipo, anio, fecha_calculo)
+    if tipo == 'prima_vacacional':
+        datos = cargar_empleados(empresa_id, fecha_fin, fecha_fin)
+        montos, extra = calcular_prima_vacacional(datos, fecha_fin)
+    elif tipo == 'aguinaldo':
+        datos = cargar_empleados(empresa_id, date(anio, 1, 1), date(anio, 12, 31))
+        montos, extra = calcular_aguinaldo(datos, anio)
+    else:
+        datos = cargar_empleados(empresa_id, date(anio, 1, 1), date(anio, 12, 31))
+        montos, extra = calcular_ptu(datos, anio, monto_ptu)
+
+    exento, gravable, isr = desglose_fiscal(montos, datos['salario_diario'], TIPOS[tipo]['exento'])
+    neto = np.round(montos - isr, 2)
+
+    columnas = {
+        'salario_diario': datos['salario_diario'], 'monto': montos, 'exento': exento,
+        'gravable': gravable, 'isr': isr, 'neto': neto, **extra
+    }
+    listas = {clave: valores.tolist() for clave, valores in columnas.items()}
+    empleados = []
+    for i, fila in enumerate(datos['filas']):
+        if not montos[i]:
+            continue
+        empleado = {
+            'empleado_id': fila[0],
+            'nombre_completo': f"{fila[1]} {fila[2]} {fila[3] or ''}".strip(),
+            'periodo_nominal': fila[4],
+        }
+        empleado.update({clave: valores[i] for clave, valores in listas.items()})
+        empleados.append(empleado)
+
+    return {
+        'empleados': empleados,
+        'resumen': {
+            'empresa_id': int(empresa_id),
+            'tipo': tipo,
+            'anio': anio,
+            'fecha_inicio': fecha_inicio.isoformat(),
+            'fecha_fin': fecha_fin.isoformat(),
+            'empleados': len(empleados),
+            'total': round(float(montos.sum()), 2),
+            'exento': round(float(exento.sum()), 2),
+            'gravable': round(float(gravable.sum()), 2),
+            'isr': round(float(isr.sum()), 2),
+            'neto': round(float(neto.sum()), 2),
+        }
+    }
+
+
+def guardar_prestacion(resultado, empresa, usuario):
+    """
+    Guarda la corrida como nóminas PENDIENTE con bulk_create. Una corrida
+    previa del mismo tipo y periodo que siga abierta se reemplaza; las ya
+    pagadas se conservan y esos empleados se omiten.
+
+    Returns:
+        (creadas, omitidas)
+    """
+    resumen = resultado['resumen']
+    tipo_nomina = TIPOS[resumen['tipo']]['tipo_nomina']
+    fecha_inicio = date.fromisoformat(resumen['fecha_inicio'])
+    fecha_fin = date.fromisoformat(resumen['fecha_fin'])
+    ahora = timezone.now()
+
+    with transaction.atomic(using=alias_actual()):
+        previas = list(Nomina.objects.select_for_update().filter(
+            empresa=empresa, tipo_nomina=tipo_nomina, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin
+        ))
+        abiertas = [n for n in previas if n.estado in ('BORRADOR', 'PENDIENTE')]
+        cerradas = {n.empleado_id for n in previas if n.estado not in ('BORRADOR', 'PENDIENTE')}
+        Nomina.objects.filter(pk__in=[n.pk for n in abiertas]).delete()
+
+        nuevas = [
+            Nomina(
+                empleado_id=empleado['empleado_id'],
+                empresa=empresa,
+                tipo_nomina=tipo_nomina,
+                periodo_nominal=f"{TIPOS[resumen['tipo']]['etiqueta']} {resumen['anio']}",
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+                estado='PENDIENTE',
+                creado_por=usuario,
+                fecha_creacion=ahora,
+                salario_neto=Decimal(str(empleado['neto'])),
+                calculos={
+                    'prestacion': resumen['tipo'],
+                    'empleado': {'id': empleado['empleado_id'], 'nombre_completo': empleado['nombre_completo']},
+                    'detalle': empleado,
+                    'percepciones': {'total': empleado['monto']},
+                    'deducciones': {
+                        'isr': empleado['isr'],
+                        'imss': 0.0,
+                        'total': empleado['isr'],
+                        'detalle': {'isr': {'base_gravable': empleado['gravable'], 'exento': empleado['exento']}}
+                    },
+                    'resumen': {
+                        'total_percepciones': {'Total': empleado['monto']},
+                        'deducciones': {'ISR': empleado['isr'], 'total_deducciones': empleado['isr']},
+                        'neto_a_pagar': empleado['neto']
+                    }
+                }
+            )
+            for empleado in resultado['empleados']
+            if empleado['empleado_id'] not in cerradas
+        ]
+        Nomina.objects.bulk_create(nuevas, batch_size=1000)
+
+        # Ni bulk_create ni el delete del queryset pasan por Nomina.save()/delete()
+        acumulados.registrar_cambios(
+            [(getattr(n, '_aporte_guardado', None), None) for n in abiertas] +
+            [(None, acumulados.aporte_de_nomina(n)) for n in nuevas]
+        )
+
+    return len(nuevas), len(resultado['empleados']) - len(nuevas)
@@ -0,0 +1,238 @@
+"""
+Validación previa de una corrida de procesar_nomina.
+
+Revisa de una vez a todos los empleados activos de la empresa con el periodo
+de la corrida y reporta:
+
+- bloqueos: datos con los que el empleado no debe procesarse (salario o
+  sueldo faltante o sobrante para su periodo, días de descanso fuera de
+  0-6, fechas_faltas que no son YYYY-MM-DD y harían fallar el cálculo).
+- advertencias: el cálculo sale, pero probablemente no como se espera
+  (fechas mal formadas en las faltas justificadas o injustificadas, que el
+  cálculo ignora; faltas del periodo anteriores al ingreso o en día de
+  descanso; ingreso posterior al periodo; nóminas pagadas o canceladas del
+  periodo, que la corrida regresa a PENDIENTE).
+
+Las revisiones se hacen con pandas sobre todas las filas a la vez: una
+consulta de empleados y otra de nóminas del periodo. procesar_nomina aplica
+las mismas revisiones a los empleados que ya cargó; en las nóminas de los que
+no tienen bloqueos omite validate_unique() y la consulta de las llaves
+foráneas, pero sigue revisando los campos calculados con clean_fields().
+"""
+import pandas as pd
+
+from .faltas import ESTADOS_ABIERTOS
+from .models import Empleado, Nomina
+
+CAMPOS = (
+    'id', 'nombre', 'apellido_paterno', 'apellido_materno', 'periodo_nominal', 'salario_diario',
+    'sueldo_mensual', 'fecha_ingreso', 'dias_descanso', 'fechas_faltas',
+    'fechas_faltas_injustificadas', 'fechas_faltas_justificadas',
+)
+# procesar_nomina interpreta cada fecha de fechas_faltas; en las otras listas
+# el cálculo se salta las fechas mal formadas
+LISTAS_FALTAS = {
+    'fechas_faltas': 'bloqueo',
+    'fechas_faltas_injustificadas': 'advertencia',
+    'fechas_faltas_justificadas': 'advertencia',
+}
+PATRON_FECHA = r'\d{4}-\d{2}-\d{2}'
+DIAS_VALIDOS = range(7)
+
+
+# =============================================
+# FILAS
+# =============================================
+
+def cargar_filas(empresa, tipo_periodo):
+    """Empleados activos del periodo como tuplas de CAMPOS. Una sola consulta."""
+    return list(
+        Empleado.objects
+        .filter(empresa=empresa, periodo_nominal=tipo_periodo, activo=True)
+        .values_list(*CAMPOS)
+    )
+
+
+def filas_de_empleados(empleados):
+    """Las mismas tuplas a partir de instancias ya cargadas (sin consultas)"""
+    return [tuple(getattr(empleado, campo) for campo in CAMPOS) for empleado in empleados]
+
+
+# =============================================
+# REVISIONES
+# =============================================
+
+class _Hallazgos:
+    """Acumula hallazgos como DataFrames (id_empleado, nivel, campo, codigo, mensaje)"""
+
+    def __init__(self):
+        self.partes = []
+
+    def agregar(self, ids, nivel, campo, codigo, mensaje):
+        if len(ids):
+            self.partes.append(pd.DataFrame({
+                'id_empleado': ids.to_numpy(), 'nivel': nivel, 'campo': campo, 'codigo': codigo,
+                'mensaje': mensaje.to_numpy() if isinstance(mensaje, pd.Series) else mensaje,
+            }))
+
+    def tabla(self):
+        if not self.partes:
+            return pd.DataFrame(columns=['id_empleado', 'nivel', 'campo', 'codigo', 'mensaje'])
+        return pd.concat(self.partes, ignore_index=True)
+
+
+def _es_lista(serie):
+    return serie.map(lambda valor: isinstance(valor, list))
+
+
+def _revisar_salarios(df, hallazgos):
+    mensual = df['periodo_nominal'].eq('MENSUAL')
+    salario = pd.to_numeric(df['salario_diario'], errors='coerce')
+    sueldo = pd.to_numeric(df['sueldo_mensual'], errors='coerce')
+    # Mismos mensajes que Empleado.clean()
+    revisiones = [
+        (~mensual & ~(salario > 0), 'salario_diario', 'salario_faltante', 'Requerido para este periodo'),
+        (~mensual & sueldo.notna(), 'sueldo_mensual', 'sueldo_sobrante', 'Debe estar vacío para este periodo'),
+        (mensual & ~(sueldo > 0), 'sueldo_mensual', 'sueldo_faltante', 'Requerido para periodo MENSUAL'),
+        (mensual & salario.notna(), 'salario_diario', 'salario_sobrante', 'Debe estar vacío para periodo MENSUAL'),
+    ]
+    for mascara, campo, codigo, mensaje in revisiones:
+        hallazgos.agregar(df.loc[mascara, 'id'], 'bloqueo', campo, codigo, mensaje)
+
+
+def _revisar_descanso(df, hallazgos):
+    """Días de descanso válidos como DataFrame (id, dia)"""
+    es_lista = _es_lista(df['dias_descanso'])
+    hallazgos.agregar(
+        df.loc[~es_lista, 'id'], 'bloqueo', 'dias_descanso', 'descanso_invalido', 'Debe ser una lista de días 0-6'
+    )
+    dias = df.loc[es_lista, ['id', 'dias_descanso']].explode('dias_descanso').dropna()
+    validos = dias['dias_descanso'].isin(DIAS_VALIDOS)
+    invalidos = dias[~validos]
+    hallazgos.agregar(
+        invalidos['id'], 'bloqueo', 'dias_descanso', 'descanso_invalido',
+        'Día inválido: ' + invalidos['dias_descanso'].astype(str) + '. Rango permitido: 0-6'
+    )
+    return dias[validos].astype({'dias_descanso': int})
+
+
+def _revisar_faltas(df, ingreso, descanso, fecha_inicio, fecha_fin, hallazgos):
+    inicio, fin = pd.Timestamp(fecha_inicio), pd.Timestamp(fecha_fin)
+    ingreso_por_id = pd.Series(ingreso.to_numpy(), index=df['id'].to_numpy())
+    dias_descanso = pd.MultiIndex.from_frame(descanso)
+
+    for lista, nivel in LISTAS_FALTAS.items():
+        es_lista = _es_lista(df[lista])
+        hallazgos.agregar(df.loc[~es_lista, 'id'], nivel, lista, 'faltas_invalidas', 'Debe ser una lista de fechas')
+
+        faltas = df.loc[es_lista, ['id', lista]].explode(lista).dropna()
+        texto = faltas[lista]
+        bien_formado = texto.map(type).eq(str) & texto.astype(str).str.fullmatch(PATRON_FECHA)
+        fechas = pd.to_datetime(texto.where(bien_formado), format='%Y-%m-%d', errors='coerce')
+
+        mal_formadas = fechas.isna()
+        hallazgos.agregar(
+            faltas.loc[mal_formadas, 'id'], nivel, lista, 'fecha_mal_formada',
+            'Fecha inválida: ' + texto[mal_formadas].astype(str) + ' (formato YYYY-MM-DD)'
+        )
+
+        # Solo las faltas de este periodo afectan la corrida
+        en_periodo = fechas.between(inicio, fin)
+        faltas, fechas = faltas[en_periodo], fechas[en_periodo]
+        antes_de_ingreso = fechas < faltas['id'].map(ingreso_por_id)
+        hallazgos.agregar(
+            faltas.loc[antes_de_ingreso, 'id'], 'advertencia', lista, 'falta_antes_de_ingreso',
+            'Falta anterior a la fecha de ingreso: ' + fechas[antes_de_ingreso].dt.strftime('%Y-%m-%d')
+        )
+        en_descanso = pd.MultiIndex.from_arrays([faltas['id'], fechas.dt.weekday]).isin(dias_descanso)
+        hallazgos.agregar(
+            faltas.loc[en_descanso, 'id'], 'advertencia', lista, 'falta_en_descanso',
+            'Falta en día de descanso: ' + fechas[en_descanso].dt.strftime('%Y-%m-%d')
+        )
+
+
+def revisar_empleados(filas, fecha_inicio, fecha_fin):
+    """
+    Revisa las filas (tuplas de CAMPOS) para un periodo.
+
+    Returns:
+        DataFrame con un hallazgo por renglón: id_empleado, nivel ('bloqueo'
+        o 'advertencia'), campo, codigo y mensaje
+    """
+    hallazgos = _Hallazgos()
+    if not filas:
+        return hallazgos.tabla()
+
+    df = pd.DataFrame(filas, columns=CAMPOS)
+    _revisar_salarios(df, hallazgos)
+    descanso = _revisar_descanso(df, hallazgos)
+
+    ingreso = pd.to_datetime(df['fecha_ingreso'])
+    hallazgos.agregar(
+        df.loc[ingreso > pd.Timestamp(fecha_fin), 'id'], 'advertencia', 'fecha_ingreso', 'ingreso_posterior',
+        f'Ingresa después del fin del periodo ({fecha_fin:%Y-%m-%d})'
+    )
+    _revisar_faltas(df, ingreso, descanso, fecha_inicio, fecha_fin, hallazgos)
+    return hallazgos.tabla()
+
+
+def ids_sin_bloqueos(empleados, fecha_inicio, fecha_fin):
+    """Ids de los empleados (instancias ya cargadas) que no tienen bloqueos en el periodo"""
+    tabla = revisar_empleados(filas_de_empleados(empleados), fecha_inicio, fecha_fin)
+    con_bloqueo = set(tabla.loc[tabla['nivel'] == 'bloqueo', 'id_empleado'])
+    return {empleado.id for empleado in empleados if empleado.id not in con_bloqueo}
+
+
+# =============================================
+# REPORTE
+# =============================================
+
+def _nominas_cerradas(empresa, tipo_periodo, fecha_inicio, fecha_fin):
+    """Nóminas del periodo que ya no están abiertas, como hallazgos. Una sola consulta."""
+    cerradas = pd.DataFrame(
+        list(
+            Nomina.objects
+            .filter(
+                empresa=empresa, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin,
+                empleado__periodo_nominal=tipo_periodo, empleado__activo=True
+            )
+            .exclude(estado__in=ESTADOS_ABIERTOS)
+            .values_list('empleado_id', 'estado')
+        ),
+        columns=['id_empleado', 'estado']
+    )
+    cerradas['nivel'], cerradas['campo'], cerradas['codigo'] = 'advertencia', 'nomina', 'nomina_cerrada'
+    cerradas['mensaje'] = 'La nómina del periodo está ' + cerradas['estado'] + '; la corrida la regresa a PENDIENTE'
+    return cerradas.drop(columns='estado')
+
+
+def validar_corrida(empresa, tipo_periodo, fecha_inicio, fecha_fin):
+    """Reporte de bloqueos y advertencias de una corrida de procesar_nomina, sin calcular ni guardar"""
+    filas = cargar_filas(empresa, tipo_periodo)
+    tabla = pd.concat(
+        [t for t in (revisar_empleados(filas, fecha_inicio, fecha_fin),
+                     _nominas_cerradas(empresa, tipo_periodo, fecha_inicio, fecha_fin)) if not t.empty]
+        or [revisar_empleados([], fecha_inicio, fecha_fin)],
+        ignore_index=True
+    )
+
+    nombres = {
+        fila[0]: f"{fila[1]} {fila[2]} {fila[3] or ''}".strip() for fila in filas
+    }
+    tabla.insert(1, 'empleado', tabla['id_empleado'].map(nombres))
+    tabla = tabla.sort_values(['empleado', 'id_empleado'], kind='stable')
+
+    bloqueos = tabla[tabla['nivel'] == 'bloqueo'].drop(columns='nivel')
+    advertencias = tabla[tabla['nivel'] == 'advertencia'].drop(columns='nivel')
+    return {
+        'total_empleados': len(filas),
+        'empleados_con_bloqueos': bloqueos['id_empleado'].nunique(),
+        'empleados_con_advertencias': advertencias['id_empleado'].nunique(),
+        'sin_bloqueos': bloqueos.empty,
+        'resumen': {
+            'bloqueos': bloqueos['codigo'].value_counts().to_dict(),
+            'advertencias': advertencias['codigo'].value_counts().to_dict(),
+        },
+        'bloqueos': bloqueos.to_dict('records'),
+        'advertencias': advertencias.to_dict('records'),
+    }
@@ -0,0 +1,76 @@
+"""
+Serialización JSON de las respuestas de la API y de Nomina.calculos.
+
+Los cálculos de nómina devuelven sus importes como Decimal y se convierten a
+float una sola vez, al escribir el JSON:
+
+- ORJSONRenderer (renderer por omisión de DRF) usa orjson con un gancho
+  para Decimal y textos diferidos; fechas, UUID y arreglos de numpy los
+  serializa orjson directamente. Sin orjson instalado se comporta como el
+  JSONRenderer de DRF.
+- CodificadorDecimal es el encoder de Nomina.calculos: guarda los Decimal
+  como número, igual que los guardaba la conversión previa a float.
+"""
+import json
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.functional import Promise
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+OPCIONES_ORJSON = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z
+) if orjson else 0
+
+
+def convertir(obj):
+    """Tipos que orjson no conoce (el equivalente de JSONEncoder.default)"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, Promise):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f'Tipo no serializable a JSON: {type(obj).__name__}')
+
+
+class CodificadorDecimal(DjangoJSONEncoder):
+    """DjangoJSONEncoder que escribe los Decimal como número y no como texto"""
+
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        return super().default(obj)
+
+
+def dumps(datos, indentar=False):
+    """JSON en bytes (UTF-8), con orjson si está disponible"""
+    if orjson is None:
+        return json.dumps(
+            datos, cls=CodificadorDecimal, ensure_ascii=False, separators=(',', ':'), indent=2 if indentar else None
+        ).encode()
+    return orjson.dumps(datos, default=convertir, option=OPCIONES_ORJSON | (orjson.OPT_INDENT_2 if indentar else 0))
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer de DRF sobre orjson. Con indentación pedida en el Accept
+    (application/json; indent=4) orjson solo sabe indentar a 2 espacios.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        indentar = self.get_indent(accepted_media_type or '', renderer_context or {}) is not None
+        contenido = dumps(data, indentar)
+        # Igual que DRF: U+2028/U+2029 son JSON válido pero no JavaScript válido
+        if b'\xe2\x80\xa8' in contenido or b'\xe2\x80\xa9' in contenido:
+            contenido = contenido.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return contenido
@@ -0,0 +1,159 @@
+"""
+Lecturas en réplica para listas, reportes y exportaciones.
+
+Las escrituras siempre van a 'default'. Una lectura va a la réplica solo si
+el código lo pidió explícitamente:
+
+- Vistas: LecturaReplicaMixin con acciones_replica en el ViewSet, o el
+  decorador lectura_en_replica en vistas de función. Solo aplica a GET/HEAD.
+- Fuera de una petición (comandos, scripts): with en_replica(): ...
+
+Read-your-writes: dentro de una petición, después de la primera escritura
+todas las lecturas vuelven a la primaria; y ReplicaMiddleware deja una
+cookie por REPLICA_RETRASO_SEGUNDOS para que las peticiones siguientes del
+mismo cliente también lean de la primaria mientras la réplica se pone al día.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+REPLICA = 'replica'
+PRIMARIA = 'default'
+COOKIE_PRIMARIA = 'leer_primaria'
+METODOS_LECTURA = ('GET', 'HEAD', 'OPTIONS')
+
+
+class _Estado:
+    __slots__ = ('replica', 'primaria', 'escribio')
+
+    def __init__(self, replica=False, primaria=False):
+        self.replica = replica
+        self.primaria = primaria
+        self.escribio = False
+
+
+# Estado de la petición o bloque actual; None fuera de ambos
+_estado = ContextVar('estado_replica', default=None)
+
+
+def replica_configurada():
+    return REPLICA in connections.settings
+
+
+def usar_replica():
+    """Marca la petición actual para leer de la réplica (sin efecto si no hay estado)"""
+    estado = _estado.get()
+    if estado is not None:
+        estado.replica = True
+
+
+@contextmanager
+def en_replica():
+    """Bloque cuyas lecturas van a la réplica, para código fuera de una petición"""
+    token = _estado.set(_Estado(replica=True))
+    try:
+        yield
+    finally:
+        _estado.reset(token)
+
+
+# =============================================
+# ROUTER
+# =============================================
+
+class RouterReplica:
+
+    def db_for_read(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None and estado.replica and not estado.primaria and replica_configurada():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None:
+            estado.primaria = estado.escribio = True
+        # Explícito: un objeto leído de la réplica se guarda en la primaria
+        # (los de otras bases, como los shards, se quedan en la suya)
+        instancia = hints.get('instance')
+        if instancia is not None and instancia._state.db not in (None, PRIMARIA, REPLICA):
+            return None
+        return PRIMARIA
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {PRIMARIA, REPLICA}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica se alimenta de la primaria; nunca se migra directamente
+        return False if db == REPLICA else None
+
+
+# =============================================
+# VISTAS
+# =============================================
+
+class ReplicaMiddleware:
+    """
+    Crea el estado de lectura de cada petición y fija la cookie de
+    read-your-writes cuando la petición escribió. No se restablece al salir:
+    las respuestas en streaming consultan después de que la vista regresa, y
+    cada petición nueva empieza con su propio estado.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_configurada():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        estado = self._iniciar(request)
+        return self._cookie(request, estado, self.get_response(request))
+
+    async def __acall__(self, request):
+        estado = self._iniciar(request)
+        return self._cookie(request, estado, await self.get_response(request))
+
+    def _iniciar(self, request):
+        estado = _Estado(primaria=COOKIE_PRIMARIA in request.COOKIES)
+        _estado.set(estado)
+        return estado
+
+    def _cookie(self, request, estado, response):
+        if estado.escribio or request.method not in METODOS_LECTURA:
+            response.set_cookie(
+                COOKIE_PRIMARIA, '1', max_age=settings.REPLICA_RETRASO_SEGUNDOS, httponly=True, samesite='Lax'
+            )
+        return response
+
+
+class LecturaReplicaMixin:
+    """ViewSet cuyas acciones en acciones_replica leen de la réplica en GET/HEAD"""
+    acciones_replica = ()
+
+    def initial(self, request, *args, **kwargs):
+        if request.method in METODOS_LECTURA and self.action in self.acciones_replica:
+            usar_replica()
+        super().initial(request, *args, **kwargs)
+
+
+def lectura_en_replica(vista):
+    """Decorador para vistas de función de solo lectura"""
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if request.method in METODOS_LECTURA:
+            usar_replica()
+        return vista(request, *args, **kwargs)
+    return envoltura
@@ -2,7 +2,7 @@ from datetime import datetime
 from decimal import Decimal, InvalidOperation
 from django.forms import ValidationError
 from rest_framework import serializers
-from .models import User, Empresa, Empleado, Nomina
+from .models import User, Empresa, Empleado, Nomina, AcumuladoAnual
 from django.contrib.auth import get_user_model
 from django.db import transaction
 import re
@@ -214,7 +214,7 @@ class EmpresaSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Empresa
-        fields = ['id', 'nombre', 'activa', 'fecha_registro', 'usuario_email']
+        fields = ['id', 'nombre', 'activa', 'prima_riesgo_trabajo', 'fecha_registro', 'usuario_email']
         read_only_fields = ['activa', 'fecha_registro']
 
     def get_usuario_email(self, obj):
@@ -476,9 +476,11 @@ class EmpleadoSerializer(serializers.ModelSerializer):
 
 
     
+import copy
 from datetime import datetime
 from rest_framework import serializers
 from .models import Nomina
+from .utils import explicar_calculos
 
 class NominaSerializer(serializers.ModelSerializer):
     id_nomina = serializers.IntegerField(source='id', read_only=True)
@@ -504,13 +506,15 @@ class NominaSerializer(serializers.ModelSerializer):
             'salario_neto',
             'calculos',
             'estado',
+            'estado_timbrado',
+            'uuid_cfdi',
             'fecha_creacion',
             'fecha_actualizacion',
             'empresa',
             'empresa_nombre',
             'creado_por'
         ]
-        read_only_fields = ['faltas_en_periodo']
+        read_only_fields = ['faltas_en_periodo', 'estado_timbrado', 'uuid_cfdi']
 
     def get_dias_laborados(self, obj):
         """
@@ -541,6 +545,15 @@ class NominaSerializer(serializers.ModelSerializer):
         if not isinstance(representation.get('calculos'), dict):
             representation['calculos'] = {}
         
+        # Las fórmulas, notas y metadatos no se guardan: se agregan solo si se
+        # pide el detalle (la vista lo indica en el contexto)
+        if self.context.get('detalle'):
+            fecha_calculo = instance.fecha_actualizacion or instance.fecha_creacion
+            representation['calculos'] = explicar_calculos(
+                copy.deepcopy(representation['calculos']),
+                fecha_calculo=fecha_calculo.strftime('%Y-%m-%d %H:%M:%S') if fecha_calculo else None
+            )
+        
         calculos = representation['calculos']
         
         # 3. LIMPIEZA CRÍTICA: Eliminar faltas_injustificadas de ajustes si existen
@@ -594,7 +607,7 @@ class NominaSerializer(serializers.ModelSerializer):
                         # Recalcular total_deducciones
                         if 'total_deducciones' in deducciones:
                             total_actual = deducciones['total_deducciones']
-                            deducciones['total_deducciones'] = total_actual + (salario_diario * faltas_count)
+                            deducciones['total_deducciones'] = float(total_actual) + (salario_diario * faltas_count)
         except (KeyError, TypeError, AttributeError):
             # Si hay algún error, continuar sin modificar
             pass
@@ -612,4 +625,13 @@ class NominaSerializer(serializers.ModelSerializer):
             data.get('fecha_fin') and 
             data.get('fecha_inicio') > data.get('fecha_fin')):
             raise serializers.ValidationError("La fecha de inicio no puede ser posterior a la fecha fin")
-        return data
\ No newline at end of file
+        return data
+
+class AcumuladoAnualSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AcumuladoAnual
+        fields = [
+            'empleado', 'empresa', 'anio', 'nominas', 'percepciones', 'base_gravable',
+            'exento', 'isr_retenido', 'subsidio_empleo', 'imss', 'fecha_actualizacion'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,469 @@
+"""
+Shards por empresa.
+
+Los empleados, nóminas y acumulados de cada empresa viven en la base que
+indica la tabla UbicacionEmpresa (en 'default'); una empresa sin renglón está
+en 'default'. Usuarios, empresas y la tabla de ruteo viven en la principal;
+cada shard guarda además una copia del renglón de sus empresas para las
+llaves foráneas y los select_related.
+
+RouterShards elige la base de los modelos por empresa con, en orden:
+
+1. La instancia de la consulta (hints): su empresa_id, o la empresa misma en
+   relaciones como empresa.empleados.
+2. La empresa de la petición o del bloque actual: EmpresaShardMixin la toma
+   de empresa_id (query string o cuerpo), del pk en EmpresaViewSet o de la
+   única empresa del usuario; en comandos y scripts, with en_empresa(id) o
+   with en_shard(alias).
+
+Sin SHARDS en settings el router no interviene. Las transacciones de código
+por empresa usan transaction.atomic(using=alias_actual()). Las listas por
+empresa sin empresa fijada (superusuarios, usuarios con varias empresas)
+responden 400 en vez de leer solo 'default'.
+
+Cada base asigna los ids de los modelos por empresa de su propio rango
+(rango_ids), así que un id es único entre todas las bases y una empresa se
+mueve conservando sus ids. migrate deja la secuencia dentro del rango;
+manage.py ajustar_rangos_ids la revisa y la corrige en bases ya migradas.
+Mantener el rango requiere secuencias de PostgreSQL: SQLite (solo para
+desarrollo) sigue asignando después del mayor id de la tabla, por eso
+mover_empresa no copia a una base SQLite ids de un rango mayor.
+
+Para mover una empresa: manage.py mover_empresa (ver mover_empresa()).
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections, transaction
+from django.db.models import Max, Q
+from rest_framework.exceptions import ValidationError
+
+from .replicas import METODOS_LECTURA, PRIMARIA, REPLICA
+
+MODELOS_POR_EMPRESA = {'empleado', 'nomina', 'acumuladoanual'}
+MODELOS_PRINCIPAL = {'ubicacionempresa'}
+SIN_EMPRESA = 'Con varias bases de datos se debe indicar empresa_id'
+
+
+class EmpresaEnMigracion(Exception):
+    """Escritura de una empresa que se está moviendo de shard"""
+
+
+class ErrorMovimiento(Exception):
+    pass
+
+
+# (empresa_id o None, alias) de la petición o bloque actual
+_destino = ContextVar('shard_destino', default=None)
+
+# (expira, {empresa_id: (alias, en_migracion)}) en memoria por proceso
+_cache = (0.0, {})
+
+
+# =============================================
+# TABLA DE RUTEO
+# =============================================
+
+def shards_configurados():
+    return bool(settings.SHARDS)
+
+
+def aliases():
+    """Todas las bases con datos por empresa"""
+    return [PRIMARIA] + [alias for alias in settings.SHARDS if alias != PRIMARIA]
+
+
+def _ubicaciones():
+    global _cache
+    expira, mapa = _cache
+    if time.monotonic() >= expira:
+        from .models import UbicacionEmpresa
+        mapa = {
+            empresa_id: (alias, en_migracion)
+            for empresa_id, alias, en_migracion in
+            UbicacionEmpresa.objects.using(PRIMARIA).values_list('empresa_id', 'alias', 'en_migracion')
+        }
+        _cache = (time.monotonic() + settings.SHARDS_CACHE_SEGUNDOS, mapa)
+    return mapa
+
+
+def invalidar_cache():
+    global _cache
+    _cache = (0.0, {})
+
+
+def ubicacion(empresa_id):
+    """(alias, en_migracion) de la empresa"""
+    if not shards_configurados():
+        return PRIMARIA, False
+    return _ubicaciones().get(int(empresa_id), (PRIMARIA, False))
+
+
+def alias_de_empresa(empresa_id):
+    return ubicacion(empresa_id)[0]
+
+
+def alias_actual():
+    """Base de la petición o bloque actual ('default' si no se fijó empresa)"""
+    destino = _destino.get()
+    return destino[1] if destino is not None else PRIMARIA
+
+
+def fijar_empresa(empresa_id):
+    """Empresa de la petición actual (None para ninguna)"""
+    _destino.set(None if empresa_id is None else (int(empresa_id), alias_de_empresa(empresa_id)))
+
+
+@contextmanager
+def en_empresa(empresa_id):
+    """Bloque cuyas consultas por empresa van al shard de la empresa"""
+    token = _destino.set(None if empresa_id is None else (int(empresa_id), alias_de_empresa(empresa_id)))
+    try:
+        yield
+    finally:
+        _destino.reset(token)
+
+
+@contextmanager
+def en_shard(alias):
+    """Bloque cuyas consultas por empresa van a un alias dado (p. ej. para recorrer todos)"""
+    actual = _destino.get()
+    token = _destino.set(actual if actual is not None and actual[1] == alias else (None, alias))
+    try:
+        yield
+    finally:
+        _destino.reset(token)
+
+
+def ids_empresas(usuario):
+    """
+    Ids de las empresas del usuario para filtrar con empresa_id__in. Sin
+    shards es una subconsulta (una sola consulta); con shards se leen antes
+    de 'default', porque el join con los usuarios no existe en un shard.
+    """
+    ids = usuario.empresas.values_list('id', flat=True)
+    return list(ids) if shards_configurados() else ids
+
+
+# =============================================
+# ROUTER
+# =============================================
+
+def _empresa_de(instancia):
+    if instancia is None:
+        return None
+    if instancia._meta.model_name == 'empresa':
+        return instancia.pk
+    return getattr(instancia, 'empresa_id', None)
+
+
+class RouterShards:
+
+    def _alias(self, model, hints, escritura):
+        nombre = model._meta.model_name
+        if nombre in MODELOS_PRINCIPAL:
+            return PRIMARIA
+        instancia = hints.get('instance')
+        if nombre not in MODELOS_POR_EMPRESA:
+            # Empresas y usuarios se leen de la principal aunque se llegue a
+            # ellos por una relación desde un objeto de un shard
+            if instancia is not None and instancia._state.db not in (None, PRIMARIA, REPLICA):
+                return PRIMARIA
+            return None
+        if not shards_configurados():
+            return None
+
+        empresa_id = _empresa_de(instancia)
+        if empresa_id is not None:
+            alias, en_migracion = ubicacion(empresa_id)
+        else:
+            destino = _destino.get()
+            if destino is None:
+                return None
+            empresa_id, alias = destino
+            en_migracion = empresa_id is not None and ubicacion(empresa_id)[1]
+
+        if escritura and en_migracion:
+            raise EmpresaEnMigracion(f'La empresa {empresa_id} se está moviendo de base de datos; intente más tarde')
+        return None if alias == PRIMARIA else alias
+
+    def db_for_read(self, model, **hints):
+        return self._alias(model, hints, escritura=False)
+
+    def db_for_write(self, model, **hints):
+        return self._alias(model, hints, escritura=True)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las relaciones hacia empresas y usuarios cruzan bases por diseño
+        if not {obj1._meta.model_name, obj2._meta.model_name} <= MODELOS_POR_EMPRESA:
+            return True
+        return None
+
+
+# =============================================
+# VISTAS
+# =============================================
+
+class ShardMiddleware:
+    """Empieza cada petición sin empresa fijada (ver ReplicaMiddleware sobre el streaming)"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not shards_configurados():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        _destino.set(None)
+        # Bajo ASGI get_response es una corrutina y se devuelve tal cual
+        return self.get_response(request)
+
+
+class EmpresaShardMixin:
+    """
+    Fija la empresa de la petición para el router: empresa_id (o empresa) de
+    la query string o del cuerpo, el kwarg campo_empresa_url de la ruta, o la
+    única empresa del usuario. Una lista de un modelo por empresa sin empresa
+    responde 400: solo vería los renglones de 'default'.
+    """
+    campo_empresa_url = None
+
+    def initial(self, request, *args, **kwargs):
+        empresa_id = None
+        if shards_configurados():
+            empresa_id = self._empresa_de_peticion(request)
+            fijar_empresa(empresa_id)
+        super().initial(request, *args, **kwargs)
+        if shards_configurados() and empresa_id is None and self.action == 'list' and self._modelo_por_empresa():
+            raise ValidationError({'empresa_id': SIN_EMPRESA})
+
+    def _modelo_por_empresa(self):
+        queryset = getattr(self, 'queryset', None)
+        return queryset is not None and queryset.model._meta.model_name in MODELOS_POR_EMPRESA
+
+    def _empresa_de_peticion(self, request):
+        valor = self.kwargs.get(self.campo_empresa_url) if self.campo_empresa_url else None
+        valor = valor or request.query_params.get('empresa_id') or request.query_params.get('empresa')
+        if not valor and request.method not in METODOS_LECTURA and hasattr(request.data, 'get'):
+            valor = request.data.get('empresa_id') or request.data.get('empresa')
+        if valor and str(valor).isdigit():
+            return int(valor)
+        return empresa_unica(request.user)
+
+
+def empresa_unica(usuario):
+    """Id de la empresa del usuario cuando tiene exactamente una (None si no)"""
+    if usuario.is_authenticated and not usuario.is_superuser:
+        empresas = list(usuario.empresas.values_list('id', flat=True)[:2])
+        if len(empresas) == 1:
+            return empresas[0]
+    return None
+
+
+# =============================================
+# RANGOS DE IDS
+# =============================================
+
+def _modelos_por_empresa():
+    from .models import AcumuladoAnual, Empleado, Nomina
+    return [Empleado, Nomina, AcumuladoAnual]
+
+
+def rango_ids(alias):
+    """(primero, último) id que asigna la base a los modelos por empresa"""
+    indice = aliases().index(alias)
+    return indice * settings.SHARDS_RANGO_IDS + 1, (indice + 1) * settings.SHARDS_RANGO_IDS
+
+
+def _conserva_rango(alias):
+    """Si la secuencia de la base puede quedar debajo de ids ya insertados"""
+    return connections[alias].vendor == 'postgresql'
+
+
+def _fijar_secuencia(alias, modelo, siguiente):
+    conexion = connections[alias]
+    tabla, columna = modelo._meta.db_table, modelo._meta.pk.column
+    with conexion.cursor() as cursor:
+        if conexion.vendor == 'postgresql':
+            cursor.execute('SELECT setval(pg_get_serial_sequence(%s, %s), %s, false)', [tabla, columna, siguiente])
+        elif conexion.vendor == 'sqlite':
+            cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s', [siguiente - 1, tabla])
+            if not cursor.rowcount:
+                cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [tabla, siguiente - 1])
+        else:
+            raise ErrorMovimiento(f'{alias}: no se pueden fijar rangos de ids en {conexion.vendor}')
+
+
+def ajustar_secuencias(alias):
+    """
+    Deja la secuencia de cada modelo por empresa de la base en su rango:
+    el siguiente id es el mayor ya usado dentro del rango más uno.
+
+    Returns:
+        {nombre del modelo: (siguiente id, renglones con ids fuera del rango)}
+    """
+    primero, ultimo = rango_ids(alias)
+    resultado = {}
+    for modelo in _modelos_por_empresa():
+        consulta = modelo._base_manager.using(alias)
+        mayor = consulta.filter(pk__range=(primero, ultimo)).aggregate(mayor=Max('pk'))['mayor']
+        siguiente = (mayor or primero - 1) + 1
+        if siguiente > ultimo:
+            raise ErrorMovimiento(f'{modelo.__name__}: se agotó el rango de ids de {alias}')
+        if not _conserva_rango(alias) and consulta.filter(pk__gt=ultimo).exists():
+            raise ErrorMovimiento(
+                f'{modelo.__name__}: {alias} tiene ids de un rango mayor y su secuencia no puede quedar en el suyo'
+            )
+        _fijar_secuencia(alias, modelo, siguiente)
+        resultado[modelo.__name__] = (siguiente, consulta.exclude(pk__range=(primero, ultimo)).count())
+    return resultado
+
+
+def ajustar_secuencias_al_migrar(sender, using, **kwargs):
+    """Receptor de post_migrate: una base nueva empieza a asignar ids en su rango"""
+    if shards_configurados() and using in aliases():
+        ajustar_secuencias(using)
+
+
+# =============================================
+# COPIA DE EMPRESAS Y MOVIMIENTO ENTRE SHARDS
+# =============================================
+
+def sincronizar_empresa(empresa):
+    """Actualiza (o crea) la copia del renglón de la empresa en su shard"""
+    if not shards_configurados():
+        return
+    alias = alias_de_empresa(empresa.pk)
+    if alias != PRIMARIA:
+        _copiar_empresa(empresa, alias)
+
+
+def _copiar_empresa(empresa, alias):
+    modelo = type(empresa)
+    campos = {
+        campo.attname: getattr(empresa, campo.attname)
+        for campo in modelo._meta.concrete_fields if not campo.primary_key
+    }
+    if not modelo._base_manager.using(alias).filter(pk=empresa.pk).update(**campos):
+        modelo._base_manager.using(alias).bulk_create([modelo(pk=empresa.pk, **campos)])
+
+
+def _filtros(empresa_id):
+    """Modelos por empresa en orden de dependencia, con el filtro de la empresa"""
+    from .models import AcumuladoAnual, Empleado, Nomina
+    return [
+        (Empleado, Q(empresa_id=empresa_id)),
+        (Nomina, Q(empresa_id=empresa_id) | Q(empleado__empresa_id=empresa_id)),
+        (AcumuladoAnual, Q(empleado__empresa_id=empresa_id)),
+    ]
+
+
+def _copiar_modelo(modelo, filtro, origen, destino, lote, progreso):
+    consulta = modelo._base_manager.using(origen).filter(filtro).order_by('pk')
+    ultimo, copiados = 0, 0
+    while True:
+        filas = list(consulta.filter(pk__gt=ultimo)[:lote])
+        if not filas:
+            break
+        ids = [fila.pk for fila in filas]
+        if modelo._base_manager.using(destino).filter(pk__in=ids).exists():
+            raise ErrorMovimiento(
+                f'{modelo.__name__}: hay ids del lote {ids[0]}-{ids[-1]} ocupados en {destino}; '
+                'revise los rangos con manage.py ajustar_rangos_ids'
+            )
+        with transaction.atomic(using=destino):
+            modelo._base_manager.using(destino).bulk_create(filas)
+        ultimo, copiados = ids[-1], copiados + len(filas)
+        if progreso:
+            progreso(f'{modelo.__name__}: {copiados} copiados')
+    return copiados
+
+
+def _borrar_modelo(modelo, filtro, alias, lote):
+    consulta = modelo._base_manager.using(alias).filter(filtro)
+    borrados = 0
+    while ids := list(consulta.values_list('pk', flat=True)[:lote]):
+        with transaction.atomic(using=alias):
+            modelo._base_manager.using(alias).filter(pk__in=ids).delete()
+        borrados += len(ids)
+    return borrados
+
+
+def mover_empresa(empresa_id, destino, lote=1000, conservar_origen=False, espera=None, progreso=None):
+    """
+    Mueve los empleados, nóminas y acumulados de una empresa a otro shard, en
+    lotes de pk ascendente.
+
+    1. Marca la empresa en_migracion (las escrituras fallan con
+       EmpresaEnMigracion) y espera a que los demás procesos lo vean.
+    2. Copia la empresa y cada modelo por lotes, cada lote en su transacción;
+       los ids se conservan (vienen del rango del origen, así que no chocan
+       con los del destino) y la secuencia del destino sigue en su rango.
+    3. Verifica los conteos, apunta la tabla de ruteo al destino y quita la
+       marca.
+    4. Borra los renglones del origen por lotes (salvo conservar_origen).
+
+    Si algo falla antes del paso 3, la empresa sigue en el origen; los
+    renglones copiados al destino se borran y se quita la marca.
+
+    Returns:
+        dict con origen, destino y conteos copiados/borrados por modelo
+    """
+    from .models import Empresa, UbicacionEmpresa
+
+    if destino not in aliases():
+        raise ErrorMovimiento(f"'{destino}' no es un shard configurado ({', '.join(aliases())})")
+    empresa = Empresa.objects.using(PRIMARIA).get(pk=empresa_id)
+    invalidar_cache()
+    origen, en_migracion = ubicacion(empresa_id)
+    if en_migracion:
+        raise ErrorMovimiento(f'La empresa {empresa_id} ya está en migración')
+    if origen == destino:
+        raise ErrorMovimiento(f'La empresa {empresa_id} ya está en {destino}')
+    filtros = _filtros(empresa_id)
+    if not _conserva_rango(destino):
+        ultimo = rango_ids(destino)[1]
+        for modelo, filtro in filtros:
+            if modelo._base_manager.using(origen).filter(filtro, pk__gt=ultimo).exists():
+                raise ErrorMovimiento(
+                    f'{modelo.__name__}: {destino} no puede recibir ids de un rango mayor sin salir del suyo'
+                )
+
+    UbicacionEmpresa.objects.using(PRIMARIA).update_or_create(
+        empresa_id=empresa_id, defaults={'alias': origen, 'en_migracion': True}
+    )
+    invalidar_cache()
+    time.sleep(settings.SHARDS_CACHE_SEGUNDOS if espera is None else espera)
+
+    resumen = {'origen': origen, 'destino': destino, 'copiados': {}, 'borrados': {}}
+    try:
+        if destino != PRIMARIA:
+            _copiar_empresa(empresa, destino)
+        for modelo, filtro in filtros:
+            resumen['copiados'][modelo.__name__] = _copiar_modelo(modelo, filtro, origen, destino, lote, progreso)
+            en_destino = modelo._base_manager.using(destino).filter(filtro).count()
+            if en_destino != modelo._base_manager.using(origen).filter(filtro).count():
+                raise ErrorMovimiento(f'{modelo.__name__}: los conteos de {origen} y {destino} no coinciden')
+        ajustar_secuencias(destino)
+    except BaseException:
+        for modelo, filtro in reversed(filtros):
+            _borrar_modelo(modelo, filtro, destino, lote)
+        UbicacionEmpresa.objects.using(PRIMARIA).filter(empresa_id=empresa_id).update(en_migracion=False)
+        invalidar_cache()
+        raise
+
+    UbicacionEmpresa.objects.using(PRIMARIA).filter(empresa_id=empresa_id).update(alias=destino, en_migracion=False)
+    invalidar_cache()
+
+    if not conservar_origen:
+        for modelo, filtro in reversed(filtros):
+            resumen['borrados'][modelo.__name__] = _borrar_modelo(modelo, filtro, origen, lote)
+    return resumen
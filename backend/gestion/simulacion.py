@@ -0,0 +1,278 @@
+"""
+Simulación de cambios salariales por empresa (qué pasaría si...).
+
+Aplica reglas de ajuste (porcentaje o monto diario fijo, filtradas por zona,
+periodo y banda salarial) a los salarios de los empleados activos y calcula en
+memoria, vectorizado, una nómina ordinaria completa antes y después: percepción
+bruta, ISR con subsidio, cuota obrera IMSS y neto, con las exenciones por
+salario mínimo. No se guarda nada.
+
+La nómina simulada es la de un periodo completo sin faltas ni pagos extra
+(7, 15 o 30 días según periodo_nominal); los totales de la empresa se expresan
+en su equivalente mensual para poder sumar periodos distintos.
+"""
+import math
+from datetime import date
+
+import numpy as np
+
+from .models import Empleado
+from .utils import (
+    LIMITE_SUBSIDIO_MENSUAL, SALARIO_MINIMO_FRONTERA_2025, SALARIO_MINIMO_GENERAL_2025, SUBSIDIO_QUINCENAL,
+    cargar_tabla_subsidio_semanal, calcular_imss_vectorizado, calcular_isr_vectorizado, obtener_subsidio_mensual
+)
+
+# =============================================
+# CONFIGURACIÓN
+# =============================================
+
+DIAS_PERIODO = {'SEMANAL': 7, 'QUINCENAL': 15, 'MENSUAL': 30}
+PERIODOS_POR_ANIO = {'SEMANAL': 52, 'QUINCENAL': 24, 'MENSUAL': 12}
+TIPOS_REGLA = ('porcentaje', 'monto')
+CONCEPTOS = ('percepciones', 'isr', 'imss', 'neto')
+PERCENTILES = (10, 25, 50, 75, 90)
+# Límite de valor, salario_min y salario_max de una regla (en valor absoluto)
+LIMITE_REGLA = 1_000_000
+# Rangos en veces el salario mínimo de la zona
+RANGOS_SALARIO_MINIMO = ((0, 1), (1, 2), (2, 3), (3, 5), (5, None))
+
+
+# =============================================
+# REGLAS
+# =============================================
+
+def validar_reglas(reglas):
+    """
+    Normaliza la lista de reglas. Cada regla:
+        tipo: 'porcentaje' (valor = % de aumento) o 'monto' (valor = pesos diarios)
+        valor: número, puede ser negativo (un porcentaje, no menor a -100)
+        zona_salarial, periodo_nominal: filtros opcionales
+        salario_min, salario_max: banda opcional sobre el salario diario actual
+
+    Raises:
+        ValueError: si alguna regla no es válida
+    """
+    if not isinstance(reglas, list) or not reglas:
+        raise ValueError('Se requiere al menos una regla de ajuste')
+
+    normalizadas = []
+    for indice, regla in enumerate(reglas, start=1):
+        if not isinstance(regla, dict):
+            raise ValueError(f'Regla {indice}: formato no válido')
+        tipo = str(regla.get('tipo', '')).lower()
+        if tipo not in TIPOS_REGLA:
+            raise ValueError(f"Regla {indice}: tipo debe ser {' o '.join(TIPOS_REGLA)}")
+        try:
+            valor = float(regla['valor'])
+            salario_min = float(regla['salario_min']) if regla.get('salario_min') not in (None, '') else None
+            salario_max = float(regla['salario_max']) if regla.get('salario_max') not in (None, '') else None
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'Regla {indice}: valor, salario_min y salario_max deben ser numéricos')
+        for numero in (valor, salario_min, salario_max):
+            if numero is not None and not (math.isfinite(numero) and abs(numero) <= LIMITE_REGLA):
+                raise ValueError(f'Regla {indice}: valor, salario_min y salario_max deben estar entre ±{LIMITE_REGLA:,}')
+        if tipo == 'porcentaje' and valor < -100:
+            raise ValueError(f'Regla {indice}: el porcentaje no puede ser menor a -100')
+
+        periodo = regla.get('periodo_nominal')
+        if periodo and (not isinstance(periodo, str) or periodo.upper() not in DIAS_PERIODO):
+            raise ValueError(f"Regla {indice}: periodo_nominal debe ser {', '.join(DIAS_PERIODO)}")
+        zona = regla.get('zona_salarial')
+        if zona and (not isinstance(zona, str) or zona.lower() not in ('general', 'frontera')):
+            raise ValueError(f'Regla {indice}: zona_salarial debe ser general o frontera')
+
+        normalizadas.append({
+            'tipo': tipo,
+            'valor': valor,
+            'periodo_nominal': periodo.upper() if periodo else None,
+            'zona_salarial': zona.lower() if zona else None,
+            'salario_min': salario_min,
+            'salario_max': salario_max,
+        })
+    return normalizadas
+
+
+def aplicar_reglas(datos, reglas):
+    """
+    Salarios diarios después de aplicar las reglas en orden. Los filtros se
+    evalúan sobre el salario actual, así dos reglas no se encadenan por banda.
+
+    Returns:
+        (salarios_nuevos, mascara_afectados)
+
+    Raises:
+        ValueError: si algún salario diario resultante pasa de LIMITE_REGLA
+            (porcentajes encadenados), que desbordaría los centavos en int64
+    """
+    actual = datos['salario_diario']
+    nuevo = actual.copy()
+    afectados = np.zeros(len(actual), dtype=bool)
+    for regla in reglas:
+        mascara = np.ones(len(actual), dtype=bool)
+        if regla['periodo_nominal']:
+            mascara &= datos['periodo'] == regla['periodo_nominal']
+        if regla['zona_salarial']:
+            mascara &= datos['zona'] == regla['zona_salarial']
+        if regla['salario_min'] is not None:
+            mascara &= actual >= regla['salario_min']
+        if regla['salario_max'] is not None:
+            mascara &= actual <= regla['salario_max']
+
+        if regla['tipo'] == 'porcentaje':
+            nuevo = np.where(mascara, nuevo * (1 + regla['valor'] / 100), nuevo)
+        else:
+            nuevo = np.where(mascara, nuevo + regla['valor'], nuevo)
+        afectados |= mascara
+    if len(nuevo) and nuevo.max() > LIMITE_REGLA:
+        raise ValueError(f'Las reglas llevan algún salario diario por encima de {LIMITE_REGLA:,}')
+    return np.round(np.maximum(nuevo, 0), 2), afectados
+
+
+# =============================================
+# MOTOR VECTORIZADO
+# =============================================
+
+def cargar_empleados(empresa_id):
+    """Empleados activos de la empresa como arreglos paralelos. Una sola consulta."""
+    filas = list(
+        Empleado.objects
+        .filter(empresa_id=empresa_id, activo=True)
+        .values_list('periodo_nominal', 'zona_salarial', 'salario_diario', 'sueldo_mensual')
+    )
+    return {
+        'periodo': np.array([f[0] for f in filas], dtype=object),
+        'zona': np.array([(f[1] or 'general').lower() for f in filas], dtype=object),
+        'salario_diario': np.array([
+            round(float(f[3] or 0) / 30, 2) if f[0] == 'MENSUAL' else float(f[2] or 0) for f in filas
+        ], dtype=float),
+    }
+
+
+def subsidio_semanal_vectorizado(bases):
+    """Subsidio de la tabla semanal para un arreglo de bases"""
+    tabla = cargar_tabla_subsidio_semanal()
+    inferiores = np.array([float(r['limite_inferior']) for r in tabla])
+    superiores = np.array([float(r['limite_superior']) for r in tabla])
+    subsidios = np.array([float(r['subsidio']) for r in tabla])
+    tramo = np.clip(np.searchsorted(inferiores, bases, side='right') - 1, 0, None)
+    return np.where((bases >= inferiores[0]) & (bases <= superiores[tramo]), subsidios[tramo], 0.0)
+
+
+def calcular_periodo_vectorizado(salarios, periodos, zonas, mes=None):
+    """
+    Nómina ordinaria de un periodo completo para todos los empleados.
+
+    Returns:
+        dict de numpy arrays: percepciones, isr, imss, neto y dias
+    """
+    mes = mes or date.today().month
+    dias = np.array([DIAS_PERIODO.get(p, 15) for p in periodos], dtype=np.int64)
+    bruto = np.round(salarios * dias, 2)
+    minimos = np.where(zonas == 'frontera', float(SALARIO_MINIMO_FRONTERA_2025), float(SALARIO_MINIMO_GENERAL_2025))
+    exento = salarios <= minimos
+
+    isr = np.zeros(len(salarios))
+    for periodo in DIAS_PERIODO:
+        mascara = (periodos == periodo) & ~exento
+        if not mascara.any():
+            continue
+        base = bruto[mascara]
+        determinado = calcular_isr_vectorizado(base, periodo.lower())
+        if periodo == 'SEMANAL':
+            subsidio = subsidio_semanal_vectorizado(base)
+        elif periodo == 'QUINCENAL':
+            subsidio = np.where(base / 15 * 30.4 <= float(LIMITE_SUBSIDIO_MENSUAL), float(SUBSIDIO_QUINCENAL), 0.0)
+        else:
+            # Mismo subsidio que calcular_isr (con ingreso en cero solo depende del mes)
+            monto = float(obtener_subsidio_mensual(0, mes))
+            subsidio = np.where(base <= float(LIMITE_SUBSIDIO_MENSUAL), monto, 0.0)
+        isr[mascara] = np.round(np.maximum(determinado - subsidio, 0), 2)
+
+    imss = np.where(exento | (salarios <= 0), 0.0, calcular_imss_vectorizado(salarios, dias))
+    return {
+        'dias': dias,
+        'percepciones': bruto,
+        'isr': isr,
+        'imss': imss,
+        'neto': np.round(bruto - isr - imss, 2),
+    }
+
+
+# =============================================
+# RESULTADOS
+# =============================================
+
+def _totales(resultado, factor_mensual, mascara=None):
+    mascara = np.ones(len(factor_mensual), dtype=bool) if mascara is None else mascara
+    return {
+        concepto: round(float((resultado[concepto][mascara] * factor_mensual[mascara]).sum()), 2)
+        for concepto in CONCEPTOS
+    }
+
+
+def _distribucion(salarios, neto_mensual, minimos):
+    if not len(salarios):
+        return {'salario_diario': {}, 'neto_mensual': {}, 'rangos_salario_minimo': {}}
+    veces = salarios / minimos
+    rangos = {}
+    for inferior, superior in RANGOS_SALARIO_MINIMO:
+        etiqueta = f'{inferior}-{superior}' if superior else f'{inferior}+'
+        mascara = veces > inferior if inferior else np.ones(len(veces), dtype=bool)
+        if superior:
+            mascara &= veces <= superior
+        rangos[etiqueta] = int(mascara.sum())
+    return {
+        'salario_diario': {f'p{p}': round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(salarios, PERCENTILES))},
+        'neto_mensual': {f'p{p}': round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(neto_mensual, PERCENTILES))},
+        'rangos_salario_minimo': rangos,
+    }
+
+
+def simular_ajuste_salarial(empresa_id, reglas, mes=None):
+    """
+    Simula las reglas de ajuste sobre los empleados activos de la empresa.
+
+    Returns:
+        dict con resumen, totales mensuales antes/después/diferencia, desglose
+        por periodo y distribuciones de salario y neto.
+    """
+    reglas = validar_reglas(reglas)
+    datos = cargar_empleados(empresa_id)
+    salarios_nuevos, afectados = aplicar_reglas(datos, reglas)
+
+    antes = calcular_periodo_vectorizado(datos['salario_diario'], datos['periodo'], datos['zona'], mes)
+    despues = calcular_periodo_vectorizado(salarios_nuevos, datos['periodo'], datos['zona'], mes)
+    factor_mensual = np.array([PERIODOS_POR_ANIO.get(p, 24) / 12 for p in datos['periodo']])
+    minimos = np.where(datos['zona'] == 'frontera', float(SALARIO_MINIMO_FRONTERA_2025), float(SALARIO_MINIMO_GENERAL_2025))
+
+    totales_antes = _totales(antes, factor_mensual)
+    totales_despues = _totales(despues, factor_mensual)
+    por_periodo = {}
+    for periodo in DIAS_PERIODO:
+        mascara = datos['periodo'] == periodo
+        if mascara.any():
+            por_periodo[periodo] = {
+                'empleados': int(mascara.sum()),
+                'afectados': int((mascara & afectados).sum()),
+                'antes': _totales(antes, np.ones(len(mascara)), mascara),
+                'despues': _totales(despues, np.ones(len(mascara)), mascara),
+            }
+
+    return {
+        'resumen': {
+            'empresa_id': int(empresa_id),
+            'empleados': len(datos['salario_diario']),
+            'empleados_afectados': int(afectados.sum()),
+            'reglas': reglas,
+        },
+        'totales_mensuales': {
+            'antes': totales_antes,
+            'despues': totales_despues,
+            'diferencia': {c: round(totales_despues[c] - totales_antes[c], 2) for c in CONCEPTOS},
+        },
+        'por_periodo': por_periodo,
+        'distribucion': {
+            'antes': _distribucion(datos['salario_diario'], antes['neto'] * factor_mensual, minimos),
+            'despues': _distribucion(salarios_nuevos, despues['neto'] * factor_mensual, minimos),
+        },
+    }
@@ -0,0 +1,101 @@
+from datetime import date
+from io import StringIO
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import AcumuladoAnual, Empleado, Empresa, Nomina, User
+from .utils import calcular_nomina_quincenal
+
+
+class AcumuladoAnualTest(TestCase):
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Empresa Acumulados')
+        self.usuario = User.objects.create_user(email='acumulados@ejemplo.mx', password='x')
+        self.empresa.usuarios.add(self.usuario)
+        self.empleado = Empleado.objects.create(
+            empresa=self.empresa, nombre='Ana', apellido_paterno='López',
+            nss='12345678901', rfc='LOAN800101AB1', periodo_nominal='QUINCENAL',
+            salario_diario=Decimal('600.00'), fecha_ingreso=date(2024, 1, 1), dias_descanso=[6]
+        )
+
+    def crear_nomina(self, inicio, fin, estado='PENDIENTE'):
+        return Nomina.objects.create(
+            empleado=self.empleado, empresa=self.empresa, tipo_nomina='QUINCENAL',
+            fecha_inicio=inicio, fecha_fin=fin, estado=estado, creado_por=self.usuario,
+            fecha_creacion=timezone.now(),
+            calculos=calcular_nomina_quincenal(self.empleado, fecha_referencia=inicio)
+        )
+
+    def acumulado(self):
+        return AcumuladoAnual.objects.get(empleado=self.empleado, anio=2025)
+
+    def test_guardar_y_cancelar(self):
+        primera = self.crear_nomina(date(2025, 9, 1), date(2025, 9, 15))
+        isr = Decimal(str(primera.calculos['deducciones']['isr'])).quantize(Decimal('0.01'))
+        self.assertEqual(self.acumulado().nominas, 1)
+        self.assertEqual(self.acumulado().isr_retenido, isr)
+
+        self.crear_nomina(date(2025, 9, 16), date(2025, 9, 30))
+        self.crear_nomina(date(2025, 10, 1), date(2025, 10, 15), estado='BORRADOR')
+        self.assertEqual(self.acumulado().nominas, 2)
+
+        # Guardar sin cambios no duplica el aporte
+        primera = Nomina.objects.get(pk=primera.pk)
+        primera.save()
+        self.assertEqual(self.acumulado().nominas, 2)
+
+        primera.estado = 'CANCELADA'
+        primera.save()
+        acumulado = self.acumulado()
+        self.assertEqual(acumulado.nominas, 1)
+        self.assertGreater(acumulado.percepciones, 0)
+        self.assertEqual(acumulado.percepciones, acumulado.base_gravable + acumulado.exento)
+
+    def test_guardados_de_copias_desactualizadas(self):
+        # Dos procesos que cargaron la misma nómina y la guardan uno tras otro
+        nomina = self.crear_nomina(date(2025, 9, 1), date(2025, 9, 15))
+        copia_a, copia_b = Nomina.objects.get(pk=nomina.pk), Nomina.objects.get(pk=nomina.pk)
+        copia_a.estado = 'CANCELADA'
+        copia_a.save()
+        copia_b.estado = 'PAGADA'
+        copia_b.save()
+
+        acumulado = self.acumulado()
+        self.assertEqual(acumulado.nominas, 1)
+        isr = Decimal(str(nomina.calculos['deducciones']['isr'])).quantize(Decimal('0.01'))
+        self.assertEqual(acumulado.isr_retenido, isr)
+
+    def test_reconstruir_coincide_con_incremental(self):
+        self.crear_nomina(date(2025, 9, 1), date(2025, 9, 15))
+        self.crear_nomina(date(2025, 9, 16), date(2025, 9, 30))
+        Nomina.objects.filter(fecha_inicio=date(2025, 9, 16)).first().delete()
+        self.crear_nomina(date(2025, 8, 16), date(2025, 8, 31), estado='PAGADA')
+        incremental = self.acumulado()
+
+        AcumuladoAnual.objects.update(isr_retenido=0, nominas=0)
+        call_command('reconstruir_acumulados', anio=2025, empresa=self.empresa.id, stdout=StringIO())
+        reconstruido = self.acumulado()
+
+        for campo in ('nominas', 'percepciones', 'base_gravable', 'exento', 'isr_retenido', 'subsidio_empleo', 'imss'):
+            self.assertEqual(getattr(reconstruido, campo), getattr(incremental, campo), campo)
+
+    def test_endpoint_acumulado(self):
+        self.crear_nomina(date(2025, 9, 1), date(2025, 9, 15))
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+
+        respuesta = client.get(f'/api/empleados/{self.empleado.id}/acumulado/', {'anio': 2025})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['nominas'], 1)
+
+        vacio = client.get(f'/api/empleados/{self.empleado.id}/acumulado/', {'anio': 2020})
+        self.assertEqual(vacio.data['nominas'], 0)
+
+        for anio in ('0', '10000', '99999999999999999999'):
+            invalido = client.get(f'/api/empleados/{self.empleado.id}/acumulado/', {'anio': anio})
+            self.assertEqual(invalido.status_code, 400, anio)
@@ -0,0 +1,66 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from .models import AcumuladoAnual, Empleado, Empresa, User
+from .utils import calcular_isr, calcular_isr_vectorizado
+
+
+class IsrVectorizadoTest(SimpleTestCase):
+
+    def test_tarifa_anual(self):
+        isr = calcular_isr_vectorizado([0, 100000, 500000], 'anual')
+        self.assertEqual(isr.tolist(), [0.0, 7074.82, 89487.53])
+
+    def test_coincide_con_calcular_isr_mensual(self):
+        # Arriba del tope de subsidio calcular_isr es solo la tarifa
+        bases = [10500.0, 25000.0, 60000.0, 400000.0]
+        esperado = [calcular_isr(base, 'mensual') for base in bases]
+        self.assertEqual(calcular_isr_vectorizado(bases, 'mensual').tolist(), esperado)
+
+
+class AjusteAnualTest(TestCase):
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Empresa Ajuste')
+        self.usuario = User.objects.create_user(email='ajuste@ejemplo.mx', password='x')
+        self.empresa.usuarios.add(self.usuario)
+
+    def crear(self, indice, base_gravable, isr_retenido, fecha_ingreso=date(2020, 1, 1)):
+        empleado = Empleado.objects.create(
+            empresa=self.empresa, nombre=f'Empleado{indice}', apellido_paterno='Prueba',
+            nss=f'{indice:011d}', rfc=f'PRUE80010{indice}AB1', periodo_nominal='MENSUAL',
+            sueldo_mensual=Decimal('10000.00'), fecha_ingreso=fecha_ingreso, dias_descanso=[6]
+        )
+        AcumuladoAnual.objects.create(
+            empleado=empleado, empresa=self.empresa, anio=2024, nominas=12,
+            percepciones=base_gravable, base_gravable=base_gravable, isr_retenido=isr_retenido
+        )
+
+    def test_ajuste_por_empleado_y_resumen(self):
+        self.crear(1, Decimal('100000.00'), Decimal('7000.00'))        # a cargo 74.82
+        self.crear(2, Decimal('100000.00'), Decimal('7100.00'))        # a favor 25.18
+        self.crear(3, Decimal('450000.00'), Decimal('70000.00'))       # > 400k: no aplica
+        self.crear(4, Decimal('100000.00'), Decimal('0.00'), fecha_ingreso=date(2024, 3, 1))
+
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        respuesta = client.get('/api/nominas/ajuste-anual/', {'empresa_id': self.empresa.id, 'anio': 2024})
+        self.assertEqual(respuesta.status_code, 200)
+
+        por_empleado = {e['rfc'][:10]: e for e in respuesta.data['empleados']}
+        self.assertEqual(por_empleado['PRUE800101']['a_cargo'], 74.82)
+        self.assertEqual(por_empleado['PRUE800102']['a_favor'], 25.18)
+        self.assertFalse(por_empleado['PRUE800103']['aplica'])
+        self.assertFalse(por_empleado['PRUE800104']['aplica'])
+
+        resumen = respuesta.data['resumen']
+        self.assertEqual(resumen['empleados_con_ajuste'], 2)
+        self.assertEqual(resumen['empleados_sin_ajuste'], 2)
+        self.assertEqual(resumen['neto'], 49.64)
+
+        for anio in (0, 10000):
+            fuera = client.get('/api/nominas/ajuste-anual/', {'empresa_id': self.empresa.id, 'anio': anio})
+            self.assertEqual(fuera.status_code, 400, anio)
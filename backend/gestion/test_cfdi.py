@@ -0,0 +1,100 @@
+import io
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+from xml.etree import ElementTree
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .cfdi import (
+    MINIMO_PARA_POOL, NS_NOMINA, cargar_documentos, generar_documento, generar_documentos, nominas_del_periodo
+)
+from .models import Empleado, Empresa, Nomina, User
+from .prestaciones import calcular_prestacion, guardar_prestacion
+from .utils import calcular_nomina_quincenal
+
+
+class CfdiNominaTest(TestCase):
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nombre='Empresa CFDI', rfc='ECF010101AB1', codigo_postal='06600',
+            registro_patronal='Y1234567890', estado='Nuevo León'
+        )
+        self.usuario = User.objects.create_user(email='cfdi@ejemplo.mx', password='x')
+        self.empresa.usuarios.add(self.usuario)
+        self.empleado = Empleado.objects.create(
+            empresa=self.empresa, nombre='Ana', apellido_paterno='López',
+            nss='12345678901', rfc='LOAN800101AB1', curp='LOAN800101MNLPNN09', codigo_postal='64000',
+            periodo_nominal='QUINCENAL', salario_diario=Decimal('600.00'),
+            fecha_ingreso=date(2024, 1, 1), dias_descanso=[6]
+        )
+        self.nomina = Nomina.objects.create(
+            empleado=self.empleado, empresa=self.empresa, tipo_nomina='QUINCENAL',
+            fecha_inicio=date(2025, 9, 1), fecha_fin=date(2025, 9, 15), estado='PENDIENTE',
+            fecha_creacion=timezone.now(),
+            calculos=calcular_nomina_quincenal(self.empleado, fecha_referencia=date(2025, 9, 1))
+        )
+
+    def documentos(self):
+        return cargar_documentos(nominas_del_periodo(self.empresa.id, date(2025, 9, 1), date(2025, 9, 30)))
+
+    def test_documento_valido(self):
+        nomina_id, nombre, contenido, errores = generar_documento(self.documentos()[0])
+        self.assertEqual(errores, [])
+        self.assertEqual(nombre, f'LOAN800101AB1_2025-09-01_{self.nomina.id}.xml')
+
+        raiz = ElementTree.fromstring(contenido)
+        nomina = raiz.find(f'.//{{{NS_NOMINA}}}Nomina')
+        receptor = nomina.find(f'{{{NS_NOMINA}}}Receptor')
+        self.assertEqual(nomina.get('TipoNomina'), 'O')
+        self.assertEqual(receptor.get('PeriodicidadPago'), '04')
+        self.assertEqual(receptor.get('ClaveEntFed'), 'NLE')
+        isr = Decimal(str(self.nomina.calculos['deducciones']['isr'])).quantize(Decimal('0.01'))
+        self.assertEqual(raiz.find(f'.//{{{NS_NOMINA}}}Deducciones').get('TotalImpuestosRetenidos'), str(isr))
+
+    def test_pool_de_procesos_igual_que_en_serie(self):
+        base = self.documentos()[0]
+        documentos = [{**base, 'nomina_id': base['nomina_id'] + i} for i in range(MINIMO_PARA_POOL + 10)]
+        serie = list(generar_documentos(documentos, procesos=1))
+        with mock.patch('gestion.cfdi.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            paralelo = list(generar_documentos(documentos, procesos=2))
+        pool.assert_called_once_with(max_workers=2)
+        self.assertEqual([resultado[0] for resultado in paralelo], [doc['nomina_id'] for doc in documentos])
+        self.assertEqual(paralelo, serie)
+
+    def test_nomina_extraordinaria_sin_imss(self):
+        Empleado.objects.filter(pk=self.empleado.pk).update(salario_diario=Decimal('3000.00'))
+        guardar_prestacion(calcular_prestacion(self.empresa.id, 'aguinaldo', 2024), self.empresa, self.usuario)
+        documentos = cargar_documentos(Nomina.objects.filter(tipo_nomina='AGUINALDO'))
+        self.assertEqual(len(documentos), 1)
+        self.assertEqual(Decimal(documentos[0]['imss']), 0)
+        self.assertGreater(Decimal(documentos[0]['isr']), 0)
+
+        nomina_id, nombre, contenido, errores = generar_documento(documentos[0])
+        self.assertEqual(errores, [])
+        raiz = ElementTree.fromstring(contenido)
+        self.assertEqual(raiz.find(f'.//{{{NS_NOMINA}}}Nomina').get('TipoNomina'), 'E')
+        deducciones = raiz.find(f'.//{{{NS_NOMINA}}}Deducciones')
+        self.assertIsNone(deducciones.get('TotalOtrasDeducciones'))
+        self.assertEqual(deducciones.get('TotalImpuestosRetenidos'), documentos[0]['isr'])
+
+    def test_datos_fiscales_faltantes(self):
+        Empleado.objects.filter(pk=self.empleado.pk).update(curp='')
+        errores = generar_documento(self.documentos()[0])[3]
+        self.assertEqual(errores, ['nomina12:Receptor: falta el atributo Curp'])
+
+    def test_zip_en_streaming(self):
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        respuesta = client.get('/api/nominas/cfdi/', {
+            'empresa_id': self.empresa.id, 'fecha_inicio': '2025-09-01', 'fecha_fin': '2025-09-30'
+        })
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        archivo = zipfile.ZipFile(io.BytesIO(b''.join(respuesta.streaming_content)))
+        self.assertEqual(archivo.namelist(), [f'LOAN800101AB1_2025-09-01_{self.nomina.id}.xml'])
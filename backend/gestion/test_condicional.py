@@ -0,0 +1,100 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Empleado, Empresa, Nomina, User
+
+
+class GetCondicionalTest(TestCase):
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Empresa ETag', rfc='EET010101AB1')
+        self.usuario = User.objects.create_user(email='etag@ejemplo.mx', password='x')
+        self.empresa.usuarios.add(self.usuario)
+        self.empleados = [
+            Empleado.objects.create(
+                empresa=self.empresa, nombre=nombre, apellido_paterno='Soto', nss=f'{12345678900 + i}',
+                rfc=f'SOTO8001{10 + i}AB1', periodo_nominal='QUINCENAL', salario_diario=Decimal('300.00'),
+                fecha_ingreso=date(2024, 1, 1), dias_descanso=[6]
+            )
+            for i, nombre in enumerate(['Ana', 'Luis'])
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def get(self, url, etag=None):
+        return self.client.get(url, **({'HTTP_IF_NONE_MATCH': etag} if etag else {}))
+
+    def test_lista_de_empleados(self):
+        respuesta = self.get('/api/empleados/')
+        etag = respuesta['ETag']
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('no-cache', respuesta['Cache-Control'])
+
+        # 304 con una sola consulta de agregados, sin cargar filas
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get('/api/empleados/', etag).status_code, 304)
+        # Otra ruta (filtros) es otra firma
+        self.assertEqual(self.get(f'/api/empleados/?empresa_id={self.empresa.id}', etag).status_code, 200)
+
+        cambios = [
+            lambda: self.empleados[0].save(),
+            lambda: Empresa.objects.get(pk=self.empresa.pk).save(),
+            lambda: self.empleados[1].delete(),
+        ]
+        for cambio in cambios:
+            cambio()
+            respuesta = self.get('/api/empleados/', etag)
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertNotEqual(respuesta['ETag'], etag)
+            etag = respuesta['ETag']
+            self.assertEqual(self.get('/api/empleados/', etag).status_code, 304)
+
+    def test_lista_ignora_if_modified_since(self):
+        respuesta = self.get('/api/empleados/')
+        self.assertNotIn('Last-Modified', respuesta)
+
+        # Borrar una fila no mueve la fecha más reciente: If-Modified-Since daría 304 con la lista vieja
+        self.empleados[1].delete()
+        respuesta = self.client.get('/api/empleados/', HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual((respuesta.status_code, len(respuesta.json())), (200, 1))
+
+    def test_detalle_de_nomina(self):
+        nomina = Nomina.objects.create(
+            empleado=self.empleados[0], empresa=self.empresa, tipo_nomina='QUINCENAL', estado='PENDIENTE',
+            fecha_inicio=date(2025, 9, 1), fecha_fin=date(2025, 9, 15), fecha_creacion=timezone.now(), calculos={}
+        )
+        url = f'/api/nominas/{nomina.id}/'
+        etag = self.get(url)['ETag']
+        self.assertEqual(self.get(url, etag).status_code, 304)
+        self.assertEqual(self.get(f'/api/nominas/{nomina.id + 1}/', etag).status_code, 404)
+
+        # El nombre del empleado sale en la nómina
+        self.empleados[0].nombre = 'Ana María'
+        self.empleados[0].save()
+        respuesta = self.get(url, etag)
+        self.assertEqual((respuesta.status_code, respuesta.json()['empleado_nombre']), (200, 'Ana María Soto'))
+
+    def test_catalogos_de_periodos(self):
+        cerrado = self.get('/api/nominas/list_periodos/?tipo=MENSUAL&año=2000')
+        self.assertEqual((cerrado.status_code, cerrado.json()['total']), (200, 12))
+        # Sale de constantes del código, que cambian con cada despliegue
+        self.assertNotIn('immutable', cerrado['Cache-Control'])
+        self.assertIn('max-age=3600', cerrado['Cache-Control'])
+        self.assertEqual(self.get('/api/nominas/list_periodos/?tipo=MENSUAL&año=2000', cerrado['ETag']).status_code, 304)
+
+        abierto = self.get('/api/periodos/?tipo=QUINCENAL&año=2999')
+        self.assertEqual((abierto.status_code, len(abierto.json()['periodos'])), (200, 24))
+        self.assertIn('max-age=3600', abierto['Cache-Control'])
+        self.assertEqual(self.get('/api/periodos/?tipo=QUINCENAL&año=2999', abierto['ETag']).status_code, 304)
+
+    def test_catalogos_con_año_invalido(self):
+        rutas = ('/api/nominas/list_periodos/', '/api/async/nominas/list_periodos/', '/api/periodos/')
+        for ruta in rutas:
+            for año in ('0', '99999', 'abc', '-1'):
+                with self.subTest(ruta=ruta, año=año):
+                    self.assertEqual(self.client.get(ruta, {'tipo': 'MENSUAL', 'año': año}).status_code, 400)
+            self.assertEqual(self.client.get(ruta, {'tipo': 'MENSUAL', 'año': '9999'}).status_code, 200)
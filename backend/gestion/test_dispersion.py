@@ -0,0 +1,112 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .dispersion import ErrorDispersion, generar_dispersion
+from .models import Empleado, Empresa, Nomina, User
+
+
+class DispersionBancariaTest(TestCase):
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Compañía Dispersión', rfc='CDI010101AB1')
+        self.usuario = User.objects.create_user(email='dispersion@ejemplo.mx', password='x')
+        self.empresa.usuarios.add(self.usuario)
+        datos = [
+            ('José', 'Núñez', 'NUJO800101AB1', {'clabe': '072580001234567895'}, Decimal('4321.50')),
+            ('Ana', 'Bravo', 'BRAN800101AB1', {'banco': '012', 'cuenta_bancaria': '0123456789'}, Decimal('1000.00')),
+            ('Luis', 'Cano', 'CALU800101AB1', {}, Decimal('900.00')),
+        ]
+        for i, (nombre, apellido, rfc, cuenta, neto) in enumerate(datos):
+            empleado = Empleado.objects.create(
+                empresa=self.empresa, nombre=nombre, apellido_paterno=apellido, nss=f'{12345678900 + i}',
+                rfc=rfc, periodo_nominal='QUINCENAL', salario_diario=Decimal('300.00'),
+                fecha_ingreso=date(2024, 1, 1), dias_descanso=[6], **cuenta
+            )
+            Nomina.objects.create(
+                empleado=empleado, empresa=self.empresa, tipo_nomina='QUINCENAL', estado='PENDIENTE',
+                fecha_inicio=date(2025, 9, 1), fecha_fin=date(2025, 9, 15), salario_neto=neto,
+                fecha_creacion=timezone.now(), calculos={}
+            )
+
+    def test_layout_ancho_fijo(self):
+        omitidos = []
+        lineas = list(generar_dispersion(
+            self.empresa, date(2025, 9, 1), date(2025, 9, 15), 'banorte', date(2025, 9, 16), omitidos=omitidos
+        ))
+        self.assertEqual(len(lineas), 4)
+        self.assertEqual(len({len(linea) for linea in lineas[1:3]}), 1)
+        self.assertTrue(lineas[0].startswith('HNE20250916CDI010101AB1 COMPANIA DISPERSION'))
+        # Orden por apellido: Bravo (cuenta) y Núñez (CLABE)
+        self.assertIn('01012' + '0' * 8 + '0123456789' + '0' * 9 + '100000BRAVO ANA', lineas[1])
+        self.assertIn('40072072580001234567895' + '000000000432150NUNEZ JOSE', lineas[2])
+        self.assertEqual(lineas[3], 'T000002000000000532150\r\n')
+        self.assertEqual([o['motivo'] for o in omitidos], ['Sin cuenta bancaria'])
+
+    def test_layout_de_mismo_banco(self):
+        Empleado.objects.filter(rfc='CALU800101AB1').update(banco='072', cuenta_bancaria='0987654321')
+        omitidos = []
+        lineas = list(generar_dispersion(
+            self.empresa, date(2025, 9, 1), date(2025, 9, 15), 'bbva', date(2025, 9, 16), omitidos=omitidos
+        ))
+        self.assertEqual(len(lineas), 1)
+        self.assertIn('0123456789', lineas[0])
+        self.assertEqual(sorted(o['motivo'] for o in omitidos), [
+            'Cuenta de otro banco (072); el layout solo acepta 012', 'Sin cuenta bancaria'
+        ])
+
+    def test_numeros_que_no_caben_no_se_recortan(self):
+        # La cuenta de Santander tiene 18 posiciones
+        Empleado.objects.filter(rfc='BRAN800101AB1').update(cuenta_bancaria='1' * 19)
+        lineas = generar_dispersion(self.empresa, date(2025, 9, 1), date(2025, 9, 15), 'santander')
+        with self.assertRaisesMessage(ErrorDispersion, f'cuenta {"1" * 19} no cabe en las 18 posiciones'):
+            list(lineas)
+
+    def test_csv_en_streaming(self):
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        parametros = {'empresa_id': self.empresa.id, 'fecha_inicio': '2025-09-01', 'fecha_fin': '2025-09-15'}
+
+        respuesta = client.get('/api/nominas/dispersion/', parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        lineas = b''.join(respuesta.streaming_content).decode().splitlines()
+        self.assertEqual(lineas[0].split(',')[:2], ['secuencia', 'cuenta'])
+        self.assertEqual(lineas[2], '2,072580001234567895,40,072,NUNEZ JOSE,NUJO800101AB1,4321.50,%d,PAGO DE NOMINA'
+                         % Nomina.objects.get(empleado__rfc='NUJO800101AB1').id)
+
+        invalido = client.get('/api/nominas/dispersion/', {**parametros, 'layout': 'inexistente'})
+        self.assertEqual(invalido.status_code, 400)
+
+    def test_omitidos_y_errores_antes_de_enviar(self):
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        parametros = {'empresa_id': self.empresa.id, 'fecha_inicio': '2025-09-01', 'fecha_fin': '2025-09-15'}
+
+        for prefijo in ('/api/nominas/', '/api/async/nominas/'):
+            with self.subTest(prefijo=prefijo):
+                respuesta = client.get(f'{prefijo}dispersion/', {**parametros, 'layout': 'bbva'})
+                self.assertEqual((respuesta['X-Dispersion-Registros'], respuesta['X-Dispersion-Omitidos']), ('1', '2'))
+                self.assertEqual(len(b''.join(respuesta).splitlines()), 1)
+
+                resumen = client.get(f'{prefijo}dispersion/', {**parametros, 'layout': 'bbva', 'resumen': 'true'})
+                self.assertEqual(resumen.json()['registros'], 1)
+                self.assertEqual(sorted(o['empleado'] for o in resumen.json()['omitidos']), ['Cano Luis', 'Núñez José'])
+
+        # Una cuenta que no cabe es un 400 antes de enviar el archivo
+        Empleado.objects.filter(rfc='BRAN800101AB1').update(cuenta_bancaria='1' * 21)
+        for prefijo in ('/api/nominas/', '/api/async/nominas/'):
+            with self.subTest(prefijo=prefijo):
+                respuesta = client.get(f'{prefijo}dispersion/', {**parametros, 'layout': 'bbva'})
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertFalse(respuesta.streaming)
+
+    def test_clabe_invalida(self):
+        empleado = Empleado.objects.get(rfc='NUJO800101AB1')
+        empleado.clabe = '072580001234567890'
+        with self.assertRaises(ValidationError):
+            empleado.save()
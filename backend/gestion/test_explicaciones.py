@@ -0,0 +1,72 @@
+import contextlib
+import io
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Empleado, Empresa, Nomina, User
+from .utils import calcular_nomina_empleado, explicar_calculos
+
+
+class ExplicacionesTest(TestCase):
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Empresa Detalle', rfc='EDE010101AB1')
+        self.usuario = User.objects.create_user(email='detalle@ejemplo.mx', password='x')
+        self.empresa.usuarios.add(self.usuario)
+        self.empleados = {
+            periodo: Empleado.objects.create(
+                empresa=self.empresa, nombre=periodo.title(), apellido_paterno='Ruiz', nss=f'{12345678900 + i}',
+                rfc=f'RUIZ8001{10 + i}AB1', periodo_nominal=periodo, salario_diario=Decimal('450.00'),
+                sueldo_mensual=Decimal('13500.00') if periodo == 'MENSUAL' else None,
+                fecha_ingreso=date(2024, 1, 1), dias_descanso=[6]
+            )
+            for i, periodo in enumerate(['SEMANAL', 'QUINCENAL', 'MENSUAL'])
+        }
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def calcular(self, empleado, detalle):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return calcular_nomina_empleado(
+                empleado, periodo=empleado.periodo_nominal.lower(), fecha_referencia=date(2025, 9, 16), detalle=detalle
+            )
+
+    def test_compacto_mas_explicacion_es_el_completo(self):
+        for periodo, empleado in self.empleados.items():
+            with self.subTest(periodo=periodo):
+                compacto = self.calcular(empleado, detalle=False)
+                self.assertNotIn('formula', compacto['sbc'])
+                self.assertNotIn('porcentajes', compacto['deducciones']['detalle']['imss'])
+
+                completo = self.calcular(empleado, detalle=True)
+                fecha = completo['resumen'].get('metadatos', {}).get('fecha_calculo')
+                self.assertEqual(explicar_calculos(compacto, fecha_calculo=fecha), completo)
+                # Aplicarla otra vez no cambia nada
+                self.assertEqual(explicar_calculos(compacto), completo)
+
+    def test_detalle_solo_al_abrir_una_nomina(self):
+        empleado = self.empleados['MENSUAL']
+        nomina = Nomina.objects.create(
+            empleado=empleado, empresa=self.empresa, tipo_nomina='MENSUAL', estado='PENDIENTE',
+            fecha_inicio=date(2025, 9, 1), fecha_fin=date(2025, 9, 30), fecha_creacion=timezone.now(),
+            calculos=self.calcular(empleado, detalle=False)
+        )
+
+        lista = self.client.get('/api/nominas/').json()[0]['calculos']
+        self.assertNotIn('formula', lista['sbc'])
+        self.assertNotIn('metadatos', lista['resumen'])
+
+        for url in (f'/api/nominas/{nomina.id}/', '/api/nominas/?detalle=1'):
+            with self.subTest(url=url):
+                respuesta = self.client.get(url).json()
+                calculos = (respuesta if isinstance(respuesta, dict) else respuesta[0])['calculos']
+                self.assertIn('formula', calculos['sbc'])
+                self.assertEqual(calculos['resumen']['metadatos']['empleado_id'], empleado.id)
+
+        # Lo guardado sigue compacto
+        nomina.refresh_from_db()
+        self.assertNotIn('formula', nomina.calculos['sbc'])
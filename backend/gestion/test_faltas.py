@@ -0,0 +1,84 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import Empleado, Empresa, Nomina, User
+
+
+class RegistroFaltasMultiplesTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.empresa = Empresa.objects.create(nombre='Empresa Faltas')
+        self.usuario = User.objects.create_user(email='faltas@ejemplo.mx', password='x')
+        self.empresa.usuarios.add(self.usuario)
+        self.client.force_authenticate(self.usuario)
+        self.empleados = [
+            Empleado.objects.create(
+                empresa=self.empresa, nombre=f'Empleado{i}', apellido_paterno='Prueba',
+                nss=f'{i:011d}', rfc=f'PRUE80010{i}AB1', periodo_nominal='QUINCENAL',
+                salario_diario=Decimal('500.00'), fecha_ingreso=date(2025, 1, 1),
+                dias_descanso=[6]
+            )
+            for i in range(1, 4)
+        ]
+
+    def registrar(self, empleados, fechas, tipo_falta='injustificada'):
+        return self.client.post('/api/faltas/registrar-multiples/', {
+            'empleados': [e.id for e in empleados],
+            'fechas_faltas': fechas,
+            'tipo_falta': tipo_falta,
+        }, format='json')
+
+    def test_registra_y_crea_nominas_borrador(self):
+        respuesta = self.registrar(self.empleados, ['2025-09-17', '2025-09-03'])
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['empleados_exitosos'], 3)
+        self.assertEqual(respuesta.data['total_faltas_registradas'], 6)
+        for empleado in self.empleados:
+            empleado.refresh_from_db()
+            self.assertEqual(empleado.fechas_faltas_injustificadas, ['2025-09-17', '2025-09-03'])
+            self.assertEqual(empleado.faltas_en_periodo, 2)
+            self.assertEqual(empleado.nominas.filter(estado='BORRADOR').count(), 2)
+
+        nomina = Nomina.objects.get(empleado=self.empleados[0], fecha_inicio=date(2025, 9, 16))
+        self.assertEqual(nomina.fecha_fin, date(2025, 9, 30))
+        self.assertEqual(nomina.faltas_en_periodo, 1)
+        self.assertGreater(nomina.salario_neto, 0)
+
+    def test_errores_por_empleado_no_bloquean_a_los_demas(self):
+        self.registrar(self.empleados[:1], ['2025-09-17'])
+        respuesta = self.registrar(self.empleados, ['2025-09-17'])
+        resultados = {r['empleado_id']: r for r in respuesta.data['resultados_individuales']}
+
+        self.assertFalse(resultados[self.empleados[0].id]['success'])
+        self.assertIn('misma fecha', resultados[self.empleados[0].id]['error'])
+        self.assertTrue(resultados[self.empleados[1].id]['success'])
+
+        # 2025-09-21 es domingo, día de descanso de todos
+        descanso = self.registrar(self.empleados[1:], ['2025-09-21'])
+        self.assertEqual(descanso.status_code, 207)
+        self.assertIn('descanso', descanso.data['resultados_individuales'][0]['error'])
+
+    def test_cambio_de_tipo_y_nominas_pagadas(self):
+        empleado = self.empleados[0]
+        pagada, = Nomina.objects.bulk_create([Nomina(
+            empleado=empleado, empresa=self.empresa, tipo_nomina='QUINCENAL',
+            fecha_inicio=date(2025, 9, 1), fecha_fin=date(2025, 9, 15),
+            estado='PAGADA', creado_por=self.usuario,
+            salario_neto=Decimal('7000.00'), calculos={'resumen': {'neto_a_pagar': 7000.0}}
+        )])
+        self.registrar([empleado], ['2025-09-03'])
+        respuesta = self.registrar([empleado], ['2025-09-03'], tipo_falta='justificada')
+
+        self.assertEqual(respuesta.status_code, 200)
+        empleado.refresh_from_db()
+        self.assertEqual(empleado.fechas_faltas_injustificadas, [])
+        self.assertEqual(empleado.fechas_faltas_justificadas, ['2025-09-03'])
+
+        pagada.refresh_from_db()
+        self.assertEqual(pagada.salario_neto, Decimal('7000.00'))
+        self.assertEqual(pagada.calculos, {'resumen': {'neto_a_pagar': 7000.0}})
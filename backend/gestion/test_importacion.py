@@ -0,0 +1,139 @@
+import io
+from datetime import date
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from openpyxl import Workbook
+from rest_framework.test import APIClient
+
+from .importacion import importar_empleados, leer_csv
+from .models import Empleado, Empresa, User
+
+ENCABEZADOS = 'nombre,apellido_paterno,apellido_materno,nss,rfc,periodo_nominal,salario_diario,sueldo_mensual,fecha_ingreso,dias_descanso\n'
+
+
+class ImportacionEmpleadosTest(TestCase):
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Empresa Importación')
+        self.usuario = User.objects.create_user(email='importa@ejemplo.mx', password='x')
+        self.empresa.usuarios.add(self.usuario)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def importar_csv(self, contenido, **kwargs):
+        return importar_empleados(leer_csv(io.BytesIO(contenido.encode('utf-8'))), self.empresa, **kwargs)
+
+    def test_reporte_por_fila(self):
+        Empleado.objects.create(
+            empresa=self.empresa, nombre='Existente', apellido_paterno='Previo',
+            nss='99999999999', rfc='EXIS800101AB1', periodo_nominal='QUINCENAL',
+            salario_diario=Decimal('400.00'), fecha_ingreso=date(2024, 1, 1), dias_descanso=[6]
+        )
+        reporte = self.importar_csv(
+            ENCABEZADOS +
+            'Ana,López,Ruiz,12345678901,LORA900101AB1,QUINCENAL,350.50,,2025-01-15,"5,6"\n'
+            'Luis,Pérez,,1234,PELU900101AB1,SEMANAL,300,,2025-01-15,domingo\n'
+            'Eva,Díaz,,12345678901,DIEV900101AB1,QUINCENAL,300,,2025-01-15,6\n'
+            'Otro,Nombre,,12345678903,EXIS800101AB1,QUINCENAL,300,,2025-01-15,6\n'
+            'Mar,Soto,,12345678904,SOMA900101AB1,MENSUAL,300,9000,15/01/2025,6\n'
+            'Ya,Existe,,99999999999,YAEX900101AB1,SEMANAL,300,,2025-01-15,6\n'
+            '\n'
+            'Leo,Cruz,,12345678905,CULE900101AB1,MENSUAL,,12000,2025-02-01,6\n'
+        )
+
+        self.assertEqual(reporte['filas_procesadas'], 7)
+        self.assertEqual(reporte['creados'], 2)
+        errores = {e['fila']: e['errores'] for e in reporte['errores']}
+        self.assertEqual(set(errores), {3, 4, 5, 6, 7})
+        self.assertIn('nss', errores[3])
+        self.assertEqual(errores[4]['nss'], 'NSS duplicado en el archivo')
+        self.assertIn('rfc', errores[5])
+        self.assertIn('salario_diario', errores[6])
+        self.assertEqual(errores[7]['nss'], 'Ya existe un empleado con este NSS')
+
+        ana = Empleado.objects.get(nss='12345678901')
+        self.assertEqual(ana.dias_descanso, [5, 6])
+        self.assertEqual(ana.salario_diario, Decimal('350.50'))
+        self.assertEqual(ana.dias_laborados, 15)
+        leo = Empleado.objects.get(nss='12345678905')
+        self.assertIsNone(leo.salario_diario)
+        self.assertEqual(leo.sueldo_mensual, Decimal('12000.00'))
+
+    def test_valores_fuera_de_rango(self):
+        reporte = self.importar_csv(
+            ENCABEZADOS +
+            'Ana,López,,12345678901,LORA900101AB1,QUINCENAL,NaN,,2025-01-15,6\n'
+            'Luis,Pérez,,12345678902,PELU900101AB1,QUINCENAL,Infinity,,2025-01-15,6\n'
+            'Eva,Díaz,,12345678903,DIEV900101AB1,QUINCENAL,1e20,,2025-01-15,6\n'
+            f'Mar,Soto,{"x" * 51},12345678904,SOMA900101AB1,QUINCENAL,300,,2025-01-15,6\n'
+        )
+        self.assertEqual(reporte['creados'], 0)
+        errores = {e['fila']: e['errores'] for e in reporte['errores']}
+        self.assertEqual(errores[2]['salario_diario'], 'Importe inválido')
+        self.assertEqual(errores[3]['salario_diario'], 'Importe inválido')
+        self.assertIn('salario_diario', errores[4])
+        self.assertEqual(errores[5]['apellido_materno'], 'Máximo 50 caracteres')
+
+    def test_archivos_ilegibles(self):
+        for nombre, contenido in [
+            ('empleados.csv', ENCABEZADOS.encode('latin-1') + 'Ana,Núñez,,12345678901\n'.encode('latin-1')),
+            ('empleados.xlsx', b'no es un zip'),
+        ]:
+            respuesta = self.client.post('/api/empleados/importar/', {
+                'empresa_id': self.empresa.id, 'archivo': SimpleUploadedFile(nombre, contenido),
+            }, format='multipart')
+            self.assertEqual(respuesta.status_code, 400, nombre)
+        self.assertFalse(Empleado.objects.exists())
+
+    def test_solo_validar_no_inserta(self):
+        reporte = self.importar_csv(
+            ENCABEZADOS + 'Ana,López,Ruiz,12345678901,LORA900101AB1,QUINCENAL,350,,2025-01-15,6\n',
+            solo_validar=True
+        )
+        self.assertEqual((reporte['validos'], reporte['creados']), (1, 0))
+        self.assertFalse(Empleado.objects.exists())
+
+    def test_endpoint_solo_validar(self):
+        def validar(contenido):
+            return self.client.post('/api/empleados/importar/', {
+                'empresa_id': self.empresa.id, 'solo_validar': 'true',
+                'archivo': SimpleUploadedFile('empleados.csv', contenido.encode()),
+            }, format='multipart')
+
+        valida = 'Ana,López,Ruiz,12345678901,LORA900101AB1,QUINCENAL,350,,2025-01-15,6\n'
+        respuesta = validar(ENCABEZADOS + valida)
+        self.assertEqual((respuesta.status_code, respuesta.data['validos'], respuesta.data['creados']), (200, 1, 0))
+
+        # Con filas inválidas un ensayo no es un 207: no se insertó nada
+        respuesta = validar(ENCABEZADOS + valida + 'Sin,Datos,,1,X,QUINCENAL,350,,2025-01-15,6\n')
+        self.assertEqual((respuesta.status_code, respuesta.data['validos'], respuesta.data['creados']), (400, 1, 0))
+        self.assertFalse(Empleado.objects.exists())
+
+    def test_endpoint_xlsx(self):
+        libro = Workbook()
+        hoja = libro.active
+        hoja.append(['Nombre', 'Apellido Paterno', 'NSS', 'RFC', 'Periodo Nominal', 'Salario Diario', 'Fecha Ingreso', 'Dias Descanso'])
+        hoja.append(['Ana', 'López', 1234567890, 'LORA900101AB1', 'semanal', 320.5, date(2025, 3, 1), 6])
+        contenido = io.BytesIO()
+        libro.save(contenido)
+
+        respuesta = self.client.post('/api/empleados/importar/', {
+            'empresa_id': self.empresa.id,
+            'archivo': SimpleUploadedFile('empleados.xlsx', contenido.getvalue()),
+        }, format='multipart')
+
+        self.assertEqual(respuesta.status_code, 201, respuesta.data)
+        empleado = Empleado.objects.get(empresa=self.empresa)
+        self.assertEqual(empleado.nss, '01234567890')
+        self.assertEqual(empleado.periodo_nominal, 'SEMANAL')
+        self.assertEqual(empleado.fecha_ingreso, date(2025, 3, 1))
+
+    def test_endpoint_columnas_faltantes(self):
+        respuesta = self.client.post('/api/empleados/importar/', {
+            'empresa_id': self.empresa.id,
+            'archivo': SimpleUploadedFile('empleados.csv', b'nombre,rfc\nAna,LORA900101AB1\n'),
+        }, format='multipart')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('apellido_paterno', respuesta.data['error'])
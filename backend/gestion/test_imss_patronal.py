@@ -0,0 +1,70 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .imss_patronal import resumen_liquidacion
+from .models import Empleado, Empresa, Nomina, User
+from .utils import calcular_nomina_quincenal
+
+
+class CuotasPatronalesTest(TestCase):
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Empresa IMSS', prima_riesgo_trabajo=Decimal('2.5'))
+        self.usuario = User.objects.create_user(email='imss@ejemplo.mx', password='x')
+        self.empresa.usuarios.add(self.usuario)
+        self.empleado = Empleado.objects.create(
+            empresa=self.empresa, nombre='Luis', apellido_paterno='Pérez',
+            nss='12345678901', rfc='PELU800101AB1', periodo_nominal='QUINCENAL',
+            salario_diario=Decimal('500.00'), fecha_ingreso=date(2020, 1, 1), dias_descanso=[6]
+        )
+        quincenas = [
+            (date(2025, 3, 1), date(2025, 3, 15)), (date(2025, 3, 16), date(2025, 3, 31)),
+            (date(2025, 4, 1), date(2025, 4, 15)), (date(2025, 4, 16), date(2025, 4, 30)),
+        ]
+        Nomina.objects.bulk_create([
+            Nomina(
+                empleado=self.empleado, empresa=self.empresa, tipo_nomina='QUINCENAL',
+                fecha_inicio=inicio, fecha_fin=fin, estado='PAGADA', fecha_creacion=timezone.now(),
+                calculos=calcular_nomina_quincenal(self.empleado, fecha_referencia=inicio)
+            )
+            for inicio, fin in quincenas
+        ])
+
+    def test_resumen_mensual(self):
+        resumen = resumen_liquidacion(self.empresa, 2025, mes=3)
+        self.assertEqual(resumen['empleados'], 1)
+        dias = resumen['dias_cotizados']
+        self.assertGreaterEqual(dias, 30)
+        cuotas = resumen['cuotas']
+        # SBC 524.65 = 500 * 1.0493; prima de riesgo 2.5%
+        self.assertEqual(cuotas['cuota_fija'], round(113.14 * 0.204 * dias, 2))
+        self.assertEqual(cuotas['riesgo_trabajo'], round(524.65 * dias * 0.025, 2))
+        self.assertNotIn('infonavit', cuotas)
+
+    def test_liquidacion_bimestral_streaming(self):
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+
+        respuesta = client.get(
+            f'/api/empresas/{self.empresa.id}/liquidacion-bimestral/', {'anio': 2025, 'bimestre': 2}
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        lineas = b''.join(respuesta.streaming_content).decode().splitlines()
+        self.assertEqual(len(lineas), 2)
+        columnas = dict(zip(lineas[0].split(','), lineas[1].split(',')))
+        self.assertEqual(columnas['nss'], '12345678901')
+        self.assertEqual(columnas['sbc'], '524.65')
+        self.assertEqual(Decimal(columnas['infonavit']), (Decimal('524.65') * int(columnas['dias']) * Decimal('0.05')).quantize(Decimal('0.01')))
+
+        invalido = client.get(f'/api/empresas/{self.empresa.id}/liquidacion-bimestral/', {'anio': 2025, 'bimestre': 7})
+        self.assertEqual(invalido.status_code, 400)
+        # El año se revisa antes de empezar el streaming
+        invalido = client.get(f'/api/empresas/{self.empresa.id}/liquidacion-bimestral/', {'anio': 0, 'bimestre': 2})
+        self.assertEqual(invalido.status_code, 400)
+        invalido = client.get(f'/api/empresas/{self.empresa.id}/cuotas-imss/', {'anio': 0, 'mes': 2})
+        self.assertEqual(invalido.status_code, 400)
@@ -0,0 +1,101 @@
+import json
+from datetime import date
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from .instrumentacion import ServerTimingMiddleware, _etapas, etapa, medir_etapa
+from .models import Empresa, User
+
+OTRA_BASE = 'instrumentacion'
+
+
+def etapas_del_encabezado(response):
+    """{nombre: (milisegundos, descripción)} del encabezado Server-Timing"""
+    etapas = {}
+    for metrica in response['Server-Timing'].split(', '):
+        nombre, *partes = metrica.split(';')
+        valores = dict(parte.split('=', 1) for parte in partes)
+        etapas[nombre] = (float(valores['dur']), valores.get('desc'))
+    return etapas
+
+
+@override_settings(INSTRUMENTACION_ETAPAS=True)
+class ServerTimingTest(TransactionTestCase):
+    """Una segunda base (copia del alias default) para medir consultas fuera de default"""
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings[OTRA_BASE] = {**connections['default'].settings_dict}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[OTRA_BASE].close()
+        del connections[OTRA_BASE]
+        del connections.settings[OTRA_BASE]
+
+    def test_sin_peticion_no_mide(self):
+        @etapa('calculo')
+        def calcular():
+            with medir_etapa('isr'):
+                return 1
+
+        self.assertIsNone(_etapas.get())
+        self.assertEqual(calcular(), 1)
+
+    def test_etapas_en_encabezado_y_log(self):
+        empresa = Empresa.objects.create(nombre='Empresa Timing')
+        usuario = User.objects.create_user(email='timing@ejemplo.mx', password='x')
+        empresa.usuarios.add(usuario)
+        client = APIClient()
+        client.force_authenticate(usuario)
+
+        with self.assertLogs('gestion.instrumentacion', 'INFO') as log:
+            respuesta = client.get('/api/nominas/ajuste-anual/', {'empresa_id': empresa.id, 'anio': 2024})
+        self.assertEqual(respuesta.status_code, 200)
+        etapas = etapas_del_encabezado(respuesta)
+        self.assertEqual(etapas['calculo'][1], '"1x"')
+        self.assertIn('db', etapas)
+        self.assertGreaterEqual(etapas['total'][0], etapas['calculo'][0])
+
+        linea = json.loads(log.records[-1].getMessage())
+        self.assertEqual((linea['evento'], linea['ruta'], linea['status']), ('server_timing', '/api/nominas/ajuste-anual/', 200))
+        self.assertEqual(set(linea['etapas']), set(etapas) - {'total'})
+        self.assertEqual(linea['etapas']['calculo']['llamadas'], 1)
+
+    def test_decorador_y_consultas_de_otras_bases(self):
+        @etapa('calculo')
+        def calcular():
+            with connections[OTRA_BASE].cursor() as cursor:
+                cursor.execute('SELECT 1')
+
+        def vista(request):
+            calcular()
+            calcular()
+            return HttpResponse()
+
+        with self.assertLogs('gestion.instrumentacion', 'INFO'):
+            respuesta = ServerTimingMiddleware(vista)(RequestFactory().get('/'))
+        etapas = etapas_del_encabezado(respuesta)
+        self.assertEqual((etapas['calculo'][1], etapas['db'][1]), ('"2x"', '"2x"'))
+
+    def test_vista_async(self):
+        def calcular():
+            with medir_etapa('calculo'):
+                return date.today()
+
+        async def vista(request):
+            await sync_to_async(calcular)()
+            return HttpResponse()
+
+        with self.assertLogs('gestion.instrumentacion', 'INFO'):
+            respuesta = async_to_sync(ServerTimingMiddleware(vista))(RequestFactory().get('/'))
+        etapas = etapas_del_encabezado(respuesta)
+        self.assertEqual(set(etapas), {'calculo', 'total'})
+        self.assertEqual(etapas['calculo'][1], '"1x"')
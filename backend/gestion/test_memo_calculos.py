@@ -0,0 +1,67 @@
+import contextlib
+import io
+from datetime import date
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from .models import Empleado
+from .utils import (
+    calcular_imss, calcular_isr, calcular_nomina_empleado, calcular_prima_dominical, estadisticas_memo, limpiar_memo
+)
+
+
+class MemoCalculosTest(SimpleTestCase):
+
+    def setUp(self):
+        limpiar_memo()
+
+    def test_plantilla_homogenea_calcula_cada_monto_una_vez(self):
+        empleados = [
+            Empleado(
+                id=i, nombre='Planta', apellido_paterno='Uno', periodo_nominal='QUINCENAL',
+                salario_diario=Decimal('300.00') if i % 2 else Decimal('350.00'),
+                fecha_ingreso=date(2024, 1, 1), dias_descanso=[6]
+            )
+            for i in range(50)
+        ]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for empleado in empleados:
+                calcular_nomina_empleado(empleado, 'quincenal', fecha_referencia=date(2025, 9, 1), detalle=False)
+
+        estadisticas = estadisticas_memo()
+        # Dos salarios distintos: el resto son aciertos
+        self.assertEqual(estadisticas['imss']['misses'], 2)
+        self.assertEqual(estadisticas['imss']['hits'], 48)
+        self.assertLessEqual(estadisticas['isr']['misses'], 2)
+
+    def test_resultados_iguales_e_independientes(self):
+        primero = calcular_imss(450, 15)
+        primero['sbc']['diario'] = 0
+        self.assertEqual(calcular_imss('450.00', 15), calcular_imss(450.0, 15))
+        self.assertNotEqual(calcular_imss(450, 15)['sbc']['diario'], 0)
+        self.assertEqual(estadisticas_memo()['imss']['misses'], 1)
+
+        # El mes solo forma parte de la llave en el periodo mensual
+        self.assertEqual(calcular_isr(7500, 'quincenal', 1), calcular_isr(7500, 'quincenal', 9))
+        self.assertEqual(estadisticas_memo()['isr']['misses'], 1)
+
+        # Con más de dos decimales no se memoiza
+        calcular_isr(7500.125, 'quincenal')
+        self.assertEqual(estadisticas_memo()['isr']['misses'], 1)
+
+    def test_calendario_por_patron_de_descanso(self):
+        inicio, fin = date(2025, 9, 1), date(2025, 9, 30)
+        empleados = [
+            Empleado(
+                id=i, nombre='Turno', apellido_paterno='Dos', periodo_nominal='MENSUAL', sueldo_mensual=Decimal('9000'),
+                dias_descanso=[0, 0] if i % 2 else [0], fecha_ingreso=date(2025, 9, 10) if i < 3 else date(2024, 1, 1),
+                fechas_faltas_injustificadas=['2025-09-21'] if i == 4 else []
+            )
+            for i in range(6)
+        ]
+        domingos = [calcular_prima_dominical(e, inicio, fin)['domingos_trabajados'] for e in empleados]
+        # Domingos 7, 14, 21 y 28: menos los anteriores al ingreso y las faltas
+        self.assertEqual(domingos, [3, 3, 3, 4, 3, 4])
+        # [0] y [0, 0] son el mismo patrón
+        self.assertEqual(estadisticas_memo()['calendario']['misses'], 1)
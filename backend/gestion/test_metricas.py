@@ -0,0 +1,74 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import metricas
+from .models import User
+
+
+class MetricasTest(TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.override = override_settings(
+            METRICAS_HABILITADAS=True, METRICAS_ARCHIVO=os.path.join(self.directorio.name, 'm.sqlite3')
+        )
+        self.override.enable()
+        self.client = APIClient()
+
+    def tearDown(self):
+        self.override.disable()
+        self.directorio.cleanup()
+
+    def test_cuantil_interpolado(self):
+        conteos = [0] * (len(metricas.BUCKETS_SEGUNDOS) + 1)
+        conteos[metricas.BUCKETS_SEGUNDOS.index(0.01)] = 100
+        self.assertAlmostEqual(metricas.estimar_cuantil(conteos, 0.5), 0.0075)
+
+    def test_escapa_valores_de_etiquetas(self):
+        self.assertEqual(metricas._etiquetas([('tipo_error', 'a"b\\c\nd')]), '{tipo_error="a\\"b\\\\c\\nd"}')
+
+    def test_falla_de_metricas_no_tumba_la_peticion(self):
+        usuario = User.objects.create_user(email='empresa@ejemplo.mx', password='x')
+        self.client.force_authenticate(usuario)
+        with mock.patch.object(metricas.registro, 'volcar', side_effect=OSError('disco lleno')), \
+                self.assertLogs('gestion.metricas', 'WARNING'):
+            self.assertEqual(self.client.get('/api/empleados/').status_code, 200)
+
+    def test_deshabilitadas(self):
+        admin = User.objects.create_superuser(email='admin@ejemplo.mx', password='x')
+        self.client.force_authenticate(admin)
+        with override_settings(METRICAS_HABILITADAS=False):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    def test_endpoint_solo_administradores(self):
+        usuario = User.objects.create_user(email='empresa@ejemplo.mx', password='x')
+        self.client.force_authenticate(usuario)
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    def test_agrega_varios_procesos(self):
+        metricas.incrementar('gestion_errores_nomina_total', tipo_error='ValueError')
+        metricas.registro.volcar(forzar=True)
+        # Simula otro worker con su propia fila
+        with metricas._conectar() as conexion:
+            conexion.execute(
+                "INSERT INTO metricas VALUES (?, ?, ?, ?, ?)",
+                (-1, 'gestion_errores_nomina_total', '[["tipo_error", "ValueError"]]', 'counter', '2')
+            )
+
+        admin = User.objects.create_superuser(email='admin@ejemplo.mx', password='x')
+        self.client.force_authenticate(admin)
+        self.client.get('/metrics')  # La petición previa ya queda medida por el middleware
+        respuesta = self.client.get('/metrics')
+
+        self.assertEqual(respuesta.status_code, 200)
+        texto = respuesta.content.decode()
+        total = next(
+            float(linea.split()[-1]) for linea in texto.splitlines()
+            if linea.startswith('gestion_errores_nomina_total{tipo_error="ValueError"}')
+        )
+        self.assertGreaterEqual(total, 3)
+        self.assertIn('gestion_peticion_segundos_bucket', texto)
@@ -0,0 +1,113 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import AcumuladoAnual, Empleado, Empresa, Nomina, User
+from .prestaciones import calcular_prestacion, dias_vacaciones
+
+
+class PrestacionesTest(TestCase):
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Empresa Prestaciones')
+        self.usuario = User.objects.create_user(email='prestaciones@ejemplo.mx', password='x')
+        self.empresa.usuarios.add(self.usuario)
+        self.antiguo = self.crear(1, date(2015, 3, 1), salario_diario=Decimal('1000.00'))
+        self.nuevo = self.crear(2, date(2024, 7, 2), salario_diario=Decimal('300.00'))
+        self.mensual = self.crear(3, date(2020, 1, 1), sueldo_mensual=Decimal('9000.00'))
+
+    def crear(self, indice, fecha_ingreso, salario_diario=None, sueldo_mensual=None):
+        return Empleado.objects.create(
+            empresa=self.empresa, nombre=f'Empleado{indice}', apellido_paterno='Prueba',
+            nss=f'{indice:011d}', rfc=f'PRUE80010{indice}AB1',
+            periodo_nominal='MENSUAL' if sueldo_mensual else 'QUINCENAL',
+            salario_diario=salario_diario, sueldo_mensual=sueldo_mensual,
+            fecha_ingreso=fecha_ingreso, dias_descanso=[6]
+        )
+
+    def por_empleado(self, resultado):
+        return {e['empleado_id']: e for e in resultado['empleados']}
+
+    def test_dias_vacaciones_por_antiguedad(self):
+        self.assertEqual(dias_vacaciones([1, 2, 5, 6, 10, 11, 16]).tolist(), [12, 14, 20, 22, 22, 24, 26])
+
+    def test_aguinaldo_proporcional_y_exento(self):
+        resultado = self.por_empleado(calcular_prestacion(self.empresa.id, 'aguinaldo', 2024))
+
+        antiguo = resultado[self.antiguo.id]
+        self.assertEqual(antiguo['monto'], 15000.0)
+        self.assertEqual(antiguo['exento'], 3394.2)  # 30 UMA
+        self.assertEqual(antiguo['gravable'], 11605.8)
+        self.assertGreater(antiguo['isr'], 0)
+
+        # Ingresó el 2 de julio: 183 de 366 días
+        nuevo = resultado[self.nuevo.id]
+        self.assertEqual(nuevo['dias_laborados'], 183)
+        self.assertEqual(nuevo['monto'], 2250.0)
+        self.assertEqual((nuevo['gravable'], nuevo['isr']), (0.0, 0.0))
+
+        self.assertEqual(resultado[self.mensual.id]['salario_diario'], 300.0)
+
+    def test_prima_vacacional_por_antiguedad(self):
+        resultado = self.por_empleado(
+            calcular_prestacion(self.empresa.id, 'prima_vacacional', 2025, fecha_calculo=date(2025, 3, 1))
+        )
+        # 10 años cumplidos: 22 días al 25%
+        self.assertEqual(resultado[self.antiguo.id]['monto'], 5500.0)
+        # Menos de un año: parte proporcional de 12 días
+        self.assertEqual(resultado[self.nuevo.id]['dias_vacaciones'], 7.99)
+
+    def test_ptu_reparto_y_tope(self):
+        resultado = self.por_empleado(calcular_prestacion(self.empresa.id, 'ptu', 2024, monto_ptu=Decimal('60000')))
+        # 50% por días (366, 183, 366) y 50% por salarios devengados
+        self.assertEqual(resultado[self.antiguo.id]['monto'], 32689.66)
+        self.assertEqual(resultado[self.nuevo.id]['monto'], 9103.45)
+
+        # Tope de tres meses de salario
+        topado = self.por_empleado(calcular_prestacion(self.empresa.id, 'ptu', 2024, monto_ptu=Decimal('600000')))
+        self.assertEqual(topado[self.nuevo.id]['monto'], 27000.0)
+        self.assertEqual(topado[self.antiguo.id]['monto'], 90000.0)
+
+        with self.assertRaises(ValueError):
+            calcular_prestacion(self.empresa.id, 'ptu', 2024)
+        for monto in ('-100000', 'NaN', 'Infinity'):
+            with self.assertRaises(ValueError):
+                calcular_prestacion(self.empresa.id, 'ptu', 2024, monto_ptu=Decimal(monto))
+
+    def test_guardar_corrida_reemplaza_y_acumula(self):
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        datos = {'empresa_id': self.empresa.id, 'tipo': 'aguinaldo', 'anio': 2024, 'guardar': True}
+
+        respuesta = client.post('/api/nominas/prestaciones/', datos, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.data['resumen']['nominas_creadas'], 3)
+
+        Nomina.objects.filter(empleado=self.antiguo).update(estado='PAGADA')
+        respuesta = client.post('/api/nominas/prestaciones/', datos, format='json')
+        self.assertEqual(respuesta.data['resumen']['nominas_creadas'], 2)
+        self.assertEqual(respuesta.data['resumen']['omitidas_pagadas'], 1)
+
+        self.assertEqual(Nomina.objects.filter(tipo_nomina='AGUINALDO').count(), 3)
+        acumulado = AcumuladoAnual.objects.get(empleado=self.nuevo, anio=2024)
+        self.assertEqual((acumulado.nominas, acumulado.percepciones), (1, Decimal('2250.00')))
+
+        invalido = client.post('/api/nominas/prestaciones/', {**datos, 'tipo': 'bono'}, format='json')
+        self.assertEqual(invalido.status_code, 400)
+
+    def test_parametros_invalidos(self):
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        datos = {'empresa_id': self.empresa.id, 'tipo': 'ptu', 'anio': 2024, 'monto_ptu': '1000', 'guardar': True}
+        invalidos = [
+            {'monto_ptu': '-100000'}, {'monto_ptu': 'NaN'}, {'monto_ptu': 'Infinity'}, {'monto_ptu': 'abc'},
+            {'tipo': ['x']}, {'tipo': 'prima_vacacional', 'fecha_calculo': 5},
+            {'tipo': 'prima_vacacional', 'fecha_calculo': '2024-13-01'},
+        ]
+        for cambio in invalidos:
+            with self.subTest(**cambio):
+                respuesta = client.post('/api/nominas/prestaciones/', {**datos, **cambio}, format='json')
+                self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(Nomina.objects.exists())
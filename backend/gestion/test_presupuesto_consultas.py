@@ -0,0 +1,247 @@
+"""
+Presupuestos de consultas SQL por endpoint.
+
+Cada endpoint se ejecuta con N y 10N unidades (empleados, fechas o nóminas
+según el caso) y el número de consultas debe quedar dentro de
+fijas + por_unidad * n. Un endpoint con por_unidad=0 no puede crecer con la
+cantidad de empleados. Al excederse se listan las consultas repetidas con la
+línea del código de gestion que las originó.
+"""
+import os
+import random
+import re
+import traceback
+from collections import Counter, namedtuple
+from datetime import date
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from benchmarks.datos_sinteticos import generar_rfc, generar_valores_empleado
+from .models import Empleado, Empresa, Nomina, User
+
+Presupuesto = namedtuple('Presupuesto', ['fijas', 'por_unidad'])
+
+N = 3
+FECHA_REFERENCIA = date(2025, 9, 16)
+DIRECTORIO_GESTION = os.path.dirname(os.path.abspath(__file__))
+
+# Presupuestos vigentes. Bajar un por_unidad es una mejora; subirlo debe
+# justificarse en la revisión.
+PRESUPUESTOS = {
+    # +5 por empleado desde AcumuladoAnual: el aporte se escribe en cada Nomina.save()
+    # -4 por empleado: los que pasan prevalidacion no repiten validate_unique() ni las 3 llaves foráneas
+    # +1 por empleado: Nomina.save() lee el aporte anterior con select_for_update
+    'procesar_nomina': Presupuesto(fijas=6, por_unidad=12),
+    'registrar_faltas': Presupuesto(fijas=10, por_unidad=0),
+    'registrar_faltas_multiples': Presupuesto(fijas=10, por_unidad=0),
+    'importar_empleados': Presupuesto(fijas=8, por_unidad=0),
+    'calcular_todos': Presupuesto(fijas=3, por_unidad=0),
+    'listar_empleados': Presupuesto(fijas=1, por_unidad=0),
+    'listar_nominas': Presupuesto(fijas=1, por_unidad=0),
+    'listar_empresas': Presupuesto(fijas=3, por_unidad=0),
+}
+
+
+class CapturaConsultas:
+    """
+    Registra cada consulta ejecutada junto con la línea de gestion/ (fuera de
+    los tests) más cercana en la pila.
+    """
+
+    def __init__(self):
+        self.consultas = []
+
+    def __enter__(self):
+        self._contexto = connection.execute_wrapper(self)
+        self._contexto.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._contexto.__exit__(*exc)
+
+    def __call__(self, execute, sql, params, many, context):
+        self.consultas.append((sql, self._ubicacion()))
+        return execute(sql, params, many, context)
+
+    def _ubicacion(self):
+        for frame in reversed(traceback.extract_stack()[:-2]):
+            if frame.filename.startswith(DIRECTORIO_GESTION) and '/test_' not in frame.filename:
+                return f"{os.path.relpath(frame.filename, DIRECTORIO_GESTION)}:{frame.lineno} ({frame.name})"
+        return 'django/rest_framework'
+
+    def __len__(self):
+        return len(self.consultas)
+
+    def reporte(self, limite=10):
+        """Consultas agrupadas por forma (sin literales) y ubicación, más repetidas primero"""
+        formas = Counter(
+            (re.sub(r"'[^']*'|\b\d+\b", '?', sql)[:160], ubicacion)
+            for sql, ubicacion in self.consultas
+        )
+        lineas = [
+            f"  {veces:>4}x  {ubicacion}\n        {sql}"
+            for (sql, ubicacion), veces in formas.most_common(limite)
+        ]
+        return '\n'.join(lineas)
+
+
+class PresupuestoConsultasTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.rng = random.Random(2025)
+        self.indice = 1
+        self.empresa = Empresa.objects.create(nombre='Empresa Presupuesto')
+        self.usuario = User.objects.create_user(
+            email='presupuesto@ejemplo.mx', password='x'
+        )
+        self.empresa.usuarios.add(self.usuario)
+        self.client.force_authenticate(self.usuario)
+
+    def crear_empleados(self, cantidad, periodo_nominal='QUINCENAL'):
+        empleados = []
+        for _ in range(cantidad):
+            valores = generar_valores_empleado(self.rng, self.indice, FECHA_REFERENCIA, proporcion_ingreso_reciente=0)
+            valores.update({
+                'periodo_nominal': periodo_nominal,
+                'dias_descanso': [6],
+                'fecha_ingreso': date(2020, 1, 1),
+                'salario_diario': valores['salario_diario'] or valores['sueldo_mensual'] / 30,
+                'sueldo_mensual': None,
+                'fechas_faltas_injustificadas': [],
+                'fechas_faltas_justificadas': [],
+                'fechas_faltas': [],
+            })
+            empleados.append(Empleado(empresa=self.empresa, **valores))
+            self.indice += 1
+        return Empleado.objects.bulk_create(empleados)
+
+    def medir(self, nombre, preparar):
+        """
+        Ejecuta preparar(n) -> llamada para n = N y 10N y verifica el
+        presupuesto en ambas escalas.
+        """
+        presupuesto = PRESUPUESTOS[nombre]
+        for n in (N, 10 * N):
+            llamada = preparar(n)
+            with CapturaConsultas() as captura:
+                respuesta = llamada()
+            self.assertLess(respuesta.status_code, 500, f"{nombre} devolvió {respuesta.status_code}")
+
+            limite = presupuesto.fijas + presupuesto.por_unidad * n
+            if len(captura) > limite:
+                self.fail(
+                    f"{nombre} con n={n}: {len(captura)} consultas, presupuesto "
+                    f"{presupuesto.fijas} + {presupuesto.por_unidad}·n = {limite}\n{captura.reporte()}"
+                )
+
+    # =============================================
+    # NÓMINAS
+    # =============================================
+
+    def test_procesar_nomina(self):
+        def preparar(n):
+            Empleado.objects.all().delete()
+            self.crear_empleados(n)
+            return lambda: self.client.post('/api/nominas/procesar_nomina/', {
+                'tipo_periodo': 'QUINCENAL',
+                'periodo_id': '2025-Q2-09',
+                'empresa_id': self.empresa.id,
+            }, format='json')
+        self.medir('procesar_nomina', preparar)
+
+    def test_calcular_todos(self):
+        def preparar(n):
+            Empleado.objects.all().delete()
+            self.crear_empleados(n)
+            return lambda: self.client.get('/api/nominas/calcular-todos/', {
+                'empresa_id': self.empresa.id,
+                'periodo': 'quincenal',
+            })
+        self.medir('calcular_todos', preparar)
+
+    # =============================================
+    # FALTAS
+    # =============================================
+
+    def test_registrar_faltas(self):
+        """La unidad es la cantidad de fechas registradas de una sola vez"""
+        laborables = [
+            date(2025, mes, dia).isoformat()
+            for mes in range(1, 13) for dia in range(1, 29)
+            if date(2025, mes, dia).weekday() != 6
+        ]
+
+        def preparar(n):
+            Empleado.objects.all().delete()
+            empleado = self.crear_empleados(1)[0]
+            fechas = laborables[:n]
+            return lambda: self.client.post(
+                f'/api/empleados/{empleado.id}/faltas/registrar-faltas/',
+                {'fechas_faltas': fechas, 'tipo_falta': 'injustificada'},
+                format='json'
+            )
+        self.medir('registrar_faltas', preparar)
+
+    def test_registrar_faltas_multiples(self):
+        def preparar(n):
+            Empleado.objects.all().delete()
+            empleados = self.crear_empleados(n)
+            return lambda: self.client.post('/api/faltas/registrar-multiples/', {
+                'empleados': [e.id for e in empleados],
+                'fechas_faltas': ['2025-09-17'],
+                'tipo_falta': 'injustificada',
+            }, format='json')
+        self.medir('registrar_faltas_multiples', preparar)
+
+    # =============================================
+    # IMPORTACIÓN
+    # =============================================
+
+    def test_importar_empleados(self):
+        """La unidad es la cantidad de filas del archivo"""
+        def preparar(n):
+            Empleado.objects.all().delete()
+            filas = ['nombre,apellido_paterno,nss,rfc,periodo_nominal,salario_diario,fecha_ingreso,dias_descanso']
+            for _ in range(n):
+                filas.append(
+                    f"Importado,Prueba{self.indice},{self.indice:011d},"
+                    f"{generar_rfc(self.rng, self.indice)},SEMANAL,300,2025-01-01,6"
+                )
+                self.indice += 1
+            archivo = SimpleUploadedFile('empleados.csv', '\n'.join(filas).encode('utf-8'))
+            return lambda: self.client.post('/api/empleados/importar/', {
+                'empresa_id': self.empresa.id,
+                'archivo': archivo,
+            }, format='multipart')
+        self.medir('importar_empleados', preparar)
+
+    # =============================================
+    # LISTADOS
+    # =============================================
+
+    def crear_nominas(self, empleados):
+        Nomina.objects.bulk_create([
+            Nomina(
+                empleado=empleado, empresa=self.empresa, tipo_nomina='QUINCENAL',
+                fecha_inicio=date(2025, 9, 1), fecha_fin=date(2025, 9, 15),
+                estado='PAGADA', creado_por=self.usuario,
+                calculos={'resumen': {'neto_a_pagar': 1000.0}},
+            )
+            for empleado in empleados
+        ])
+
+    def test_listados(self):
+        def preparar_para(url):
+            def preparar(n):
+                Empleado.objects.all().delete()
+                self.crear_nominas(self.crear_empleados(n))
+                return lambda: self.client.get(url)
+            return preparar
+
+        self.medir('listar_empleados', preparar_para('/api/empleados/'))
+        self.medir('listar_nominas', preparar_para('/api/nominas/'))
+        self.medir('listar_empresas', preparar_para('/api/empresas/'))
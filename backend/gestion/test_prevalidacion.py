@@ -0,0 +1,101 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import views
+from .models import Empleado, Empresa, Nomina, User
+from .prevalidacion import ids_sin_bloqueos
+
+
+class PrevalidacionTest(TestCase):
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Empresa Previa', rfc='EPR010101AB1')
+        self.usuario = User.objects.create_user(email='previa@ejemplo.mx', password='x', tipo_usuario='EMPRESA')
+        self.empresa.usuarios.add(self.usuario)
+        self.empleados = {
+            nombre: Empleado.objects.create(
+                empresa=self.empresa, nombre=nombre, apellido_paterno='Ríos', nss=f'{12345678900 + i}',
+                rfc=f'RIOS8001{10 + i}AB1', periodo_nominal='QUINCENAL', salario_diario=Decimal('300.00'),
+                fecha_ingreso=date(2024, 1, 1), dias_descanso=[6]
+            )
+            for i, nombre in enumerate(['Ana', 'Luis', 'Eva'])
+        }
+        # Luis: falta en domingo (su descanso) y una justificada ilegible;
+        # Eva: falta ilegible (procesar_nomina falla) y un día de descanso inválido
+        Empleado.objects.filter(nombre='Luis').update(
+            fechas_faltas=['2025-09-21'], fechas_faltas_justificadas=['2025-9-22']
+        )
+        Empleado.objects.filter(nombre='Eva').update(fechas_faltas=['no-es-fecha'], dias_descanso=[6, 9])
+        Nomina.objects.create(
+            empleado=self.empleados['Ana'], empresa=self.empresa, tipo_nomina='QUINCENAL', estado='PAGADA',
+            fecha_inicio=date(2025, 9, 16), fecha_fin=date(2025, 9, 30), fecha_creacion=timezone.now(), calculos={}
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.parametros = {'tipo_periodo': 'QUINCENAL', 'periodo_id': '2025-Q2-09', 'empresa_id': self.empresa.id}
+
+    def test_reporte_de_bloqueos_y_advertencias(self):
+        with self.assertNumQueries(4):
+            respuesta = self.client.get('/api/nominas/prevalidar/', self.parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        reporte = respuesta.json()
+
+        self.assertEqual(reporte['periodo']['fecha_fin'], '2025-09-30')
+        self.assertEqual((reporte['total_empleados'], reporte['empleados_con_bloqueos']), (3, 1))
+        self.assertFalse(reporte['sin_bloqueos'])
+        self.assertEqual(
+            {(b['empleado'], b['codigo']) for b in reporte['bloqueos']},
+            {('Eva Ríos', 'fecha_mal_formada'), ('Eva Ríos', 'descanso_invalido')}
+        )
+        self.assertEqual(
+            sorted((a['empleado'], a['campo'], a['codigo']) for a in reporte['advertencias']),
+            [
+                ('Ana Ríos', 'nomina', 'nomina_cerrada'),
+                ('Luis Ríos', 'fechas_faltas', 'falta_en_descanso'),
+                ('Luis Ríos', 'fechas_faltas_justificadas', 'fecha_mal_formada'),
+            ]
+        )
+        self.assertEqual(reporte['resumen']['bloqueos'], {'fecha_mal_formada': 1, 'descanso_invalido': 1})
+
+        self.assertEqual(self.client.get('/api/nominas/prevalidar/', {'empresa_id': self.empresa.id}).status_code, 400)
+
+    def test_salarios_segun_periodo(self):
+        mensual = Empleado(id=1, periodo_nominal='MENSUAL', salario_diario=Decimal('300.00'), sueldo_mensual=None,
+                           fecha_ingreso=date(2024, 1, 1), dias_descanso=[6])
+        quincenal = Empleado(id=2, periodo_nominal='QUINCENAL', salario_diario=Decimal('300.00'),
+                             fecha_ingreso=date(2024, 1, 1), dias_descanso=[5, 6])
+        self.assertEqual(ids_sin_bloqueos([mensual, quincenal], date(2025, 9, 1), date(2025, 9, 30)), {2})
+
+    def test_procesar_omite_validate_unique_de_los_validados(self):
+        with mock.patch.object(Nomina, 'validate_unique', autospec=True) as validate_unique:
+            respuesta = self.client.post('/api/nominas/procesar_nomina/', self.parametros, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(
+            sorted(n['empleado_nombre'] for n in respuesta.json()['nominas']), ['Ana Ríos', 'Luis Ríos']
+        )
+        self.assertEqual([e['empleado'] for e in respuesta.json()['errores']], ['Eva Ríos'])
+        validate_unique.assert_not_called()
+
+    def test_validados_revisan_los_campos_calculados(self):
+        Empleado.objects.filter(nombre='Eva').delete()
+        # Un neto de 12 enteros no cabe en salario_neto (max_digits=12, 2 decimales)
+        calcular = views.calcular_nomina_empleado
+
+        def calcular_desbordado(*args, **kwargs):
+            calculo = calcular(*args, **kwargs)
+            calculo['resumen']['neto_a_pagar'] = 10 ** 11
+            return calculo
+
+        with mock.patch('gestion.views.calcular_nomina_empleado', calcular_desbordado):
+            respuesta = self.client.post('/api/nominas/procesar_nomina/', self.parametros, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['nominas'], [])
+        self.assertEqual(
+            sorted((e['empleado'], e['tipo_error']) for e in respuesta.json()['errores']),
+            [('Ana Ríos', 'ValidationError'), ('Luis Ríos', 'ValidationError')]
+        )
@@ -0,0 +1,42 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from .models import Empleado, Empresa, Nomina
+from .renderers import ORJSONRenderer
+from .utils import calcular_nomina_quincenal
+
+
+class RendererTest(TestCase):
+
+    def test_misma_salida_que_drf(self):
+        datos = {
+            'importe': Decimal('1234.50'), 'fecha': date(2025, 9, 15), 'texto': gettext_lazy('Nómina'),
+            'lista': [Decimal('0.01'), (1, 2)], 'separador': ' ', 1: 'clave numérica',
+        }
+        salida = ORJSONRenderer().render(datos)
+        self.assertEqual(json.loads(salida), json.loads(JSONRenderer().render(datos)))
+        self.assertIn(b'\\u2028', salida)
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_calculos_con_decimal_se_guardan_como_numero(self):
+        empresa = Empresa.objects.create(nombre='Empresa JSON', rfc='EJS010101AB1')
+        empleado = Empleado.objects.create(
+            empresa=empresa, nombre='Ana', apellido_paterno='Ruiz', nss='12345678901', rfc='RUIA800110AB1',
+            periodo_nominal='QUINCENAL', salario_diario=Decimal('300.00'), fecha_ingreso=date(2024, 1, 1),
+            dias_descanso=[6]
+        )
+        calculos = calcular_nomina_quincenal(empleado, fecha_referencia=date(2025, 9, 1))
+        nomina = Nomina.objects.create(
+            empleado=empleado, empresa=empresa, tipo_nomina='QUINCENAL', estado='PENDIENTE',
+            fecha_inicio=date(2025, 9, 1), fecha_fin=date(2025, 9, 15), fecha_creacion=timezone.now(),
+            calculos=calculos
+        )
+        guardados = Nomina.objects.get(pk=nomina.pk).calculos
+        self.assertEqual(json.loads(ORJSONRenderer().render(calculos)), guardados)
+        self.assertIsInstance(guardados['resumen']['neto_a_pagar'], float)
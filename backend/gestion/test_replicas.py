@@ -0,0 +1,84 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .models import Empleado, Empresa, User
+from .replicas import COOKIE_PRIMARIA, REPLICA, en_replica
+
+MIDDLEWARE_CON_REPLICA = ['gestion.replicas.ReplicaMiddleware']
+
+
+class LecturaEnReplicaTest(TransactionTestCase):
+    """
+    La réplica se agrega como un segundo alias que apunta a la misma base de
+    pruebas (como un espejo con replicación instantánea); se verifica a qué
+    conexión va cada consulta. Se da de alta antes de preparar la clase para
+    que quede dentro de databases.
+    """
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings[REPLICA] = {**connections['default'].settings_dict}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Empresa Réplica')
+        self.usuario = User.objects.create_user(email='replica@ejemplo.mx', password='x')
+        self.empresa.usuarios.add(self.usuario)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.datos = {
+            'empresa': self.empresa.id, 'nombre': 'Eva', 'apellido_paterno': 'Ruiz', 'nss': '12345678901',
+            'rfc': 'RUEV800101AB1', 'periodo_nominal': 'QUINCENAL', 'salario_diario': '400.00',
+            'fecha_ingreso': '2024-01-01', 'dias_descanso': [6],
+        }
+
+    def consultas(self, metodo, url, **kwargs):
+        with CaptureQueriesContext(connections['default']) as primaria, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            respuesta = getattr(self.client, metodo)(url, **kwargs)
+        return respuesta, len(primaria), len(replica)
+
+    def test_router_fuera_de_peticion(self):
+        self.assertEqual(Empresa.objects.all().db, 'default')
+        with en_replica():
+            self.assertEqual(Empresa.objects.all().db, REPLICA)
+            empresa = Empresa.objects.get(pk=self.empresa.pk)
+            self.assertEqual(empresa._state.db, REPLICA)
+            # Escribir devuelve las lecturas del bloque a la primaria
+            empresa.save()
+            self.assertEqual(Empresa.objects.all().db, 'default')
+
+    @override_settings(MIDDLEWARE=MIDDLEWARE_CON_REPLICA)
+    def test_vistas_y_read_your_writes(self):
+        respuesta, primaria, replica = self.consultas('get', '/api/empleados/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual((primaria, bool(replica)), (0, True))
+
+        respuesta, primaria, replica = self.consultas('post', '/api/empleados/', data=self.datos, format='json')
+        self.assertEqual(respuesta.status_code, 201, respuesta.content)
+        self.assertEqual(replica, 0)
+        self.assertIn(COOKIE_PRIMARIA, respuesta.cookies)
+
+        # Con la cookie el cliente lee de la primaria
+        respuesta, primaria, replica = self.consultas('get', '/api/empleados/')
+        self.assertEqual((bool(primaria), replica), (True, 0))
+        self.assertEqual(len(respuesta.json()), 1)
+
+        self.client.cookies.pop(COOKIE_PRIMARIA)
+        respuesta, primaria, replica = self.consultas('get', f'/api/empleados/{Empleado.objects.get().id}/')
+        self.assertEqual((respuesta.status_code, primaria), (200, 0))
+        self.assertEqual(Decimal(respuesta.json()['salario_diario']), Decimal('400.00'))
+        self.assertEqual(Empleado.objects.get().fecha_ingreso, date(2024, 1, 1))
@@ -0,0 +1,127 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .dispersion import generar_dispersion
+from .models import AcumuladoAnual, Empleado, Empresa, Nomina, UbicacionEmpresa, User
+from .shards import EmpresaEnMigracion, en_empresa, mover_empresa, rango_ids
+from .utils import calcular_nomina_quincenal
+
+SHARDS = ['shard1', 'shard2']
+
+
+@override_settings(SHARDS=SHARDS, SHARDS_CACHE_SEGUNDOS=0)
+class ShardsPorEmpresaTest(TransactionTestCase):
+    """Dos shards SQLite en memoria además de la base de pruebas"""
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        for alias in SHARDS:
+            connections.settings[alias] = {**connections['default'].settings_dict, 'NAME': ':memory:'}
+        super().setUpClass()
+        for alias in SHARDS:
+            call_command('migrate', database=alias, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in SHARDS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Empresa Shard', rfc='ESH010101AB1')
+        self.usuario = User.objects.create_user(email='shard@ejemplo.mx', password='x')
+        self.empresa.usuarios.add(self.usuario)
+        for i in range(3):
+            empleado = Empleado.objects.create(
+                empresa=self.empresa, nombre=f'Empleado{i}', apellido_paterno='Shard', nss=f'{12345678900 + i}',
+                rfc=f'SHAR8001{10 + i}AB1', periodo_nominal='QUINCENAL', salario_diario=Decimal('350.00'),
+                fecha_ingreso=date(2024, 1, 1), dias_descanso=[6]
+            )
+            Nomina.objects.create(
+                empleado=empleado, empresa=self.empresa, tipo_nomina='QUINCENAL', estado='PENDIENTE',
+                fecha_inicio=date(2025, 9, 1), fecha_fin=date(2025, 9, 15), fecha_creacion=timezone.now(),
+                creado_por=self.usuario, calculos=calcular_nomina_quincenal(empleado, fecha_referencia=date(2025, 9, 1))
+            )
+
+    def conteos(self, alias):
+        return [
+            modelo._base_manager.using(alias).count() for modelo in (Empleado, Nomina, AcumuladoAnual)
+        ]
+
+    def test_mover_empresa_y_rutear(self):
+        resumen = mover_empresa(self.empresa.id, 'shard1', lote=2, espera=0)
+        self.assertEqual(resumen['copiados'], {'Empleado': 3, 'Nomina': 3, 'AcumuladoAnual': 3})
+        self.assertEqual(self.conteos('default'), [0, 0, 0])
+        self.assertEqual(self.conteos('shard1'), [3, 3, 3])
+        self.assertEqual(UbicacionEmpresa.objects.get(empresa=self.empresa).alias, 'shard1')
+
+        # El código por empresa llega al shard sin indicar la base
+        with en_empresa(self.empresa.id):
+            self.assertEqual(Empleado.objects.count(), 3)
+            empleado = Empleado.objects.first()
+            self.assertEqual(empleado.nominas.count(), 1)
+            self.assertEqual(empleado.empresa.nombre, 'Empresa Shard')
+            nueva = Nomina.objects.create(
+                empleado=empleado, empresa=self.empresa, tipo_nomina='QUINCENAL', estado='PENDIENTE',
+                fecha_inicio=date(2025, 9, 16), fecha_fin=date(2025, 9, 30), fecha_creacion=timezone.now(),
+                calculos=calcular_nomina_quincenal(empleado, fecha_referencia=date(2025, 9, 16))
+            )
+            # Los ids nuevos salen del rango del shard: el Folio no choca con los de otras bases
+            primero, ultimo = rango_ids('shard1')
+            self.assertTrue(primero <= nueva.id <= ultimo)
+            self.assertEqual(AcumuladoAnual.objects.get(empleado=empleado).nominas, 2)
+        self.assertEqual(self.conteos('default'), [0, 0, 0])
+
+        # Los cambios de la empresa se reflejan en su copia del shard
+        self.empresa.nombre = 'Empresa Renombrada'
+        self.empresa.save()
+        self.assertEqual(Empresa.objects.using('shard1').get(pk=self.empresa.pk).nombre, 'Empresa Renombrada')
+
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        respuesta = client.get('/api/nominas/', {'empresa_id': self.empresa.id})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.json()), 4)
+        # Sin empresa_id se usa la única empresa del usuario
+        self.assertEqual(len(client.get('/api/empleados/').json()), 3)
+        # Con varias empresas no se sabe qué base leer
+        client.force_authenticate(User.objects.create_superuser(email='admin@ejemplo.mx', password='x'))
+        self.assertEqual(client.get('/api/nominas/').status_code, 400)
+        self.assertEqual(client.get('/api/async/empleados/').status_code, 400)
+        self.assertEqual(len(client.get('/api/nominas/', {'empresa_id': self.empresa.id}).json()), 4)
+
+        mover_empresa(self.empresa.id, 'shard2', lote=2, espera=0)
+        self.assertEqual(self.conteos('shard1'), [0, 0, 0])
+        self.assertEqual(self.conteos('shard2'), [3, 4, 3])
+
+    def test_dispersion_con_ids_del_shard(self):
+        Empleado.objects.update(clabe='072580001234567895')
+        mover_empresa(self.empresa.id, 'shard1', lote=2, espera=0)
+        with en_empresa(self.empresa.id):
+            for empleado in Empleado.objects.all():
+                Nomina.objects.create(
+                    empleado=empleado, empresa=self.empresa, tipo_nomina='QUINCENAL', estado='PENDIENTE',
+                    fecha_inicio=date(2025, 9, 16), fecha_fin=date(2025, 9, 30), fecha_creacion=timezone.now(),
+                    salario_neto=Decimal('1000.00'), calculos={}
+                )
+            self.assertGreater(Nomina.objects.latest('id').id, 10 ** 12)
+            for layout in ('csv', 'banorte', 'santander'):
+                with self.subTest(layout=layout):
+                    lineas = list(generar_dispersion(self.empresa, date(2025, 9, 16), date(2025, 9, 30), layout))
+                    self.assertEqual(len(lineas), 5 if layout != 'csv' else 4)
+
+    def test_escrituras_bloqueadas_durante_migracion(self):
+        UbicacionEmpresa.objects.create(empresa=self.empresa, alias='default', en_migracion=True)
+        with en_empresa(self.empresa.id):
+            self.assertEqual(Empleado.objects.count(), 3)
+            with self.assertRaises(EmpresaEnMigracion):
+                Empleado.objects.filter(empresa=self.empresa).update(activo=False)
@@ -0,0 +1,108 @@
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from .models import Empleado, Empresa, User
+from .simulacion import calcular_periodo_vectorizado
+from .utils import calcular_imss, calcular_imss_vectorizado, calcular_isr
+
+
+class MotorVectorizadoTest(SimpleTestCase):
+
+    def test_coincide_con_calculo_por_empleado(self):
+        salarios = np.array([300.0, 455.55, 812.37, 1500.0, 4321.09])
+        for periodo, dias in (('SEMANAL', 7), ('QUINCENAL', 15), ('MENSUAL', 30)):
+            resultado = calcular_periodo_vectorizado(
+                salarios, np.array([periodo] * len(salarios), dtype=object),
+                np.array(['general'] * len(salarios), dtype=object), mes=3
+            )
+            isr = [calcular_isr(round(s * dias, 2), periodo.lower(), 3) for s in salarios]
+            imss = [calcular_imss(s, dias, False)['total_deduccion_imss'] for s in salarios]
+            self.assertEqual(resultado['isr'].tolist(), isr, periodo)
+            self.assertEqual(resultado['imss'].tolist(), imss, periodo)
+
+    def test_exencion_salario_minimo(self):
+        resultado = calcular_periodo_vectorizado(
+            np.array([278.80, 300.0]), np.array(['QUINCENAL', 'QUINCENAL'], dtype=object),
+            np.array(['general', 'frontera'], dtype=object)
+        )
+        self.assertEqual(resultado['isr'].tolist(), [0.0, 0.0])
+        self.assertEqual(resultado['imss'].tolist(), [0.0, 0.0])
+        self.assertEqual(resultado['neto'].tolist(), [4182.0, 4500.0])
+
+    def test_imss_vectorizado_por_dias(self):
+        self.assertEqual(
+            calcular_imss_vectorizado([500.0, 500.0], [7, 15]).tolist(),
+            [calcular_imss(500, 7, False)['total_deduccion_imss'], calcular_imss(500, 15, False)['total_deduccion_imss']]
+        )
+
+
+class SimulacionAjusteTest(TestCase):
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Empresa Simulación')
+        self.usuario = User.objects.create_user(email='simulacion@ejemplo.mx', password='x')
+        self.empresa.usuarios.add(self.usuario)
+        self.bajo = self.crear(1, 'QUINCENAL', salario_diario=Decimal('400.00'))
+        self.alto = self.crear(2, 'QUINCENAL', salario_diario=Decimal('2000.00'))
+        self.mensual = self.crear(3, 'MENSUAL', sueldo_mensual=Decimal('15000.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def crear(self, indice, periodo, salario_diario=None, sueldo_mensual=None):
+        return Empleado.objects.create(
+            empresa=self.empresa, nombre=f'Empleado{indice}', apellido_paterno='Prueba',
+            nss=f'{indice:011d}', rfc=f'PRUE80010{indice}AB1', periodo_nominal=periodo,
+            salario_diario=salario_diario, sueldo_mensual=sueldo_mensual,
+            fecha_ingreso=date(2020, 1, 1), dias_descanso=[6]
+        )
+
+    def simular(self, reglas, **extra):
+        return self.client.post(
+            '/api/nominas/simular-ajuste/', {'empresa_id': self.empresa.id, 'reglas': reglas, **extra}, format='json'
+        )
+
+    def test_aumento_por_banda_sin_guardar(self):
+        respuesta = self.simular([
+            {'tipo': 'porcentaje', 'valor': 7, 'periodo_nominal': 'QUINCENAL', 'salario_max': 1000},
+            {'tipo': 'monto', 'valor': 50, 'periodo_nominal': 'MENSUAL'},
+        ])
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['resumen']['empleados_afectados'], 2)
+
+        quincenal = respuesta.data['por_periodo']['QUINCENAL']
+        self.assertEqual(quincenal['afectados'], 1)
+        # 400 * 1.07 * 15 días
+        self.assertEqual(quincenal['despues']['percepciones'] - quincenal['antes']['percepciones'], 420.0)
+        self.assertEqual(
+            respuesta.data['por_periodo']['MENSUAL']['despues']['percepciones'], 16500.0
+        )
+
+        diferencia = respuesta.data['totales_mensuales']['diferencia']
+        self.assertEqual(diferencia['percepciones'], 2340.0)  # 420 * 2 quincenas + 1500
+        self.assertGreater(diferencia['isr'], 0)
+        self.assertGreater(diferencia['imss'], 0)
+        self.assertEqual(
+            round(diferencia['percepciones'] - diferencia['isr'] - diferencia['imss'], 2), diferencia['neto']
+        )
+
+        self.bajo.refresh_from_db()
+        self.assertEqual(self.bajo.salario_diario, Decimal('400.00'))
+
+    def test_reglas_invalidas(self):
+        self.assertEqual(self.simular([]).status_code, 400)
+        self.assertEqual(self.simular([{'tipo': 'bono', 'valor': 1}]).status_code, 400)
+        self.assertEqual(self.simular([{'tipo': 'porcentaje', 'valor': 'x'}]).status_code, 400)
+        for valor in ('nan', 'inf', '1e300', -150):
+            self.assertEqual(self.simular([{'tipo': 'porcentaje', 'valor': valor}]).status_code, 400, valor)
+        self.assertEqual(self.simular([{'tipo': 'monto', 'valor': 10, 'periodo_nominal': 5}]).status_code, 400)
+        self.assertEqual(self.simular([{'tipo': 'porcentaje', 'valor': 100000}] * 3).status_code, 400)
+
+    def test_mes_invalido(self):
+        regla = [{'tipo': 'porcentaje', 'valor': 5}]
+        for mes in ([1], 13, 0, '1.5', True):
+            self.assertEqual(self.simular(regla, mes=mes).status_code, 400, mes)
+        self.assertEqual(self.simular(regla, mes=1).status_code, 200)
@@ -0,0 +1,50 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import Empleado, Empresa, Nomina, User
+
+
+class ProcesarNominaNdjsonTest(TestCase):
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Empresa Stream', rfc='EST010101AB1')
+        self.usuario = User.objects.create_user(email='stream@ejemplo.mx', password='x', tipo_usuario='EMPRESA')
+        self.empresa.usuarios.add(self.usuario)
+        for i, nombre in enumerate(['Ana', 'Luis', 'Eva']):
+            Empleado.objects.create(
+                empresa=self.empresa, nombre=nombre, apellido_paterno='Mora', nss=f'{12345678900 + i}',
+                rfc=f'MORA8001{10 + i}AB1', periodo_nominal='QUINCENAL', salario_diario=Decimal('300.00') * (i + 1),
+                fecha_ingreso=date(2024, 1, 1), dias_descanso=[6]
+            )
+        # Una falta ilegible hace fallar el cálculo de Eva
+        Empleado.objects.filter(nombre='Eva').update(fechas_faltas=['no-es-fecha'])
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def procesar(self, sufijo=''):
+        return self.client.post(f'/api/nominas/procesar_nomina/{sufijo}', {
+            'tipo_periodo': 'QUINCENAL', 'periodo_id': '2025-Q2-09', 'empresa_id': self.empresa.id,
+        }, format='json')
+
+    def test_un_renglon_por_nomina_y_resumen(self):
+        respuesta = self.procesar('?stream=ndjson')
+        self.assertTrue(respuesta.streaming)
+        self.assertEqual(respuesta['Content-Type'], 'application/x-ndjson')
+        renglones = [json.loads(r) for r in b''.join(respuesta.streaming_content).splitlines()]
+
+        self.assertEqual(renglones[-1]['tipo'], 'resumen')
+        nominas = sorted(r['nomina']['empleado_nombre'] for r in renglones if r['tipo'] == 'nomina')
+        self.assertEqual(nominas, ['Ana Mora', 'Luis Mora'])
+        self.assertEqual([r['empleado'] for r in renglones if r['tipo'] == 'error'], ['Eva Mora'])
+        self.assertEqual(Nomina.objects.filter(empresa=self.empresa).count(), 2)
+
+        # Mismo resumen que la respuesta completa
+        completa = self.procesar().json()
+        resumen = renglones[-1]
+        self.assertEqual(resumen['resumen_financiero'], completa['resumen_financiero'])
+        self.assertEqual(resumen['procesamiento']['total_errores'], len(completa['errores']))
+        self.assertEqual(resumen['empresa']['total_empleados'], completa['empresa']['total_empleados'])
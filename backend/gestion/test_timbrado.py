@@ -0,0 +1,100 @@
+import socketserver
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Empleado, Empresa, Nomina
+from .pac_simulado import PACSimulado
+from .timbrado import ClienteHTTP, timbrar_nominas
+from .utils import calcular_nomina_quincenal
+
+
+class TimbradoConcurrenteTest(TestCase):
+
+    def setUp(self):
+        self.pac = PACSimulado(semilla=7).iniciar_en_hilo()
+        self.addCleanup(self.pac.detener_hilo)
+        self.empresa = Empresa.objects.create(
+            nombre='Empresa Timbrado', rfc='ETI010101AB1', codigo_postal='06600',
+            registro_patronal='Y1234567890', estado='Jalisco'
+        )
+        inicio = date(2025, 9, 1)
+        for i in range(12):
+            empleado = Empleado.objects.create(
+                empresa=self.empresa, nombre=f'Empleado{i}', apellido_paterno='Prueba',
+                nss=f'{12345678900 + i}', rfc=f'PERU8001{10 + i}AB1', curp=f'PERU8001{10 + i}HJCRRR09',
+                codigo_postal='44100', periodo_nominal='QUINCENAL', salario_diario=Decimal('450.00'),
+                fecha_ingreso=date(2024, 1, 1), dias_descanso=[6]
+            )
+            Nomina.objects.create(
+                empleado=empleado, empresa=self.empresa, tipo_nomina='QUINCENAL',
+                fecha_inicio=inicio, fecha_fin=inicio + timedelta(days=14), estado='PAGADA',
+                fecha_creacion=timezone.now(), calculos=calcular_nomina_quincenal(empleado, fecha_referencia=inicio)
+            )
+
+    def timbrar(self, **opciones):
+        return timbrar_nominas(
+            Nomina.objects.filter(empresa=self.empresa), cliente=ClienteHTTP(url=self.pac.url, timeout=5),
+            concurrencia=4, espera_base=0.01, **opciones
+        )
+
+    def test_timbra_y_guarda_uuid(self):
+        resumen = self.timbrar()
+        self.assertEqual((resumen['timbrados'], resumen['errores'], resumen['invalidos']), (12, 0, 0))
+        for nomina in Nomina.objects.filter(empresa=self.empresa):
+            self.assertEqual(nomina.estado_timbrado, 'TIMBRADO')
+            self.assertEqual(nomina.uuid_cfdi, self.pac.timbrados[str(nomina.id)])
+            self.assertEqual(nomina.intentos_timbrado, 1)
+
+        # Las ya timbradas no se vuelven a enviar
+        self.assertEqual(self.timbrar()['documentos'], 0)
+        self.assertEqual(self.pac.solicitudes, 12)
+
+    def test_reintenta_fallos_temporales(self):
+        self.pac.tasa_fallos = 0.5
+        resumen = self.timbrar(reintentos=20)
+        self.assertEqual(resumen['timbrados'], 12)
+        self.assertEqual(resumen['intentos'], 12 + self.pac.fallos)
+        self.assertGreater(self.pac.fallos, 0)
+
+    def test_error_definitivo_y_reanudacion(self):
+        # Una corrida que murió a medias deja nóminas EN_PROCESO
+        Nomina.objects.filter(empresa=self.empresa).update(estado_timbrado='EN_PROCESO')
+        self.pac.tasa_fallos = 1.0
+        resumen = self.timbrar(reintentos=1)
+        self.assertEqual((resumen['timbrados'], resumen['errores']), (0, 12))
+        nomina = Nomina.objects.filter(empresa=self.empresa).first()
+        self.assertEqual((nomina.estado_timbrado, nomina.intentos_timbrado), ('ERROR', 2))
+        self.assertIn('HTTP 503', nomina.error_timbrado)
+
+        # Sin incluir_errores no se reintentan; con él se completan
+        self.pac.tasa_fallos = 0
+        self.assertEqual(self.timbrar()['documentos'], 0)
+        self.assertEqual(self.timbrar(incluir_errores=True)['timbrados'], 12)
+        self.assertFalse(Nomina.objects.filter(empresa=self.empresa).exclude(estado_timbrado='TIMBRADO').exists())
+
+    def test_rechazo_del_pac_no_se_reintenta(self):
+        cliente = ClienteHTTP(url=self.pac.url.replace('/timbrar', '/otra-ruta'), timeout=5)
+        resumen = timbrar_nominas(Nomina.objects.filter(empresa=self.empresa), cliente=cliente, reintentos=3)
+        self.assertEqual((resumen['errores'], resumen['intentos']), (12, 12))
+        self.assertIn('HTTP 404', Nomina.objects.filter(empresa=self.empresa).first().error_timbrado)
+
+    def test_respuesta_sin_linea_de_estado(self):
+        class Cerrar(socketserver.BaseRequestHandler):
+            def handle(self):
+                self.request.recv(65536)
+
+        servidor = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Cerrar)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        self.addCleanup(servidor.server_close)
+        self.addCleanup(servidor.shutdown)
+
+        cliente = ClienteHTTP(url=f'http://127.0.0.1:{servidor.server_address[1]}/timbrar', timeout=5)
+        resumen = timbrar_nominas(Nomina.objects.filter(empresa=self.empresa), cliente=cliente, reintentos=1, espera_base=0.01)
+        self.assertEqual((resumen['errores'], resumen['intentos']), (12, 24))
+        nomina = Nomina.objects.filter(empresa=self.empresa).first()
+        self.assertEqual(nomina.estado_timbrado, 'ERROR')
+        self.assertIn('Línea de estado inválida', nomina.error_timbrado)
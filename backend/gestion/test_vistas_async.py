@@ -0,0 +1,67 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Empleado, Empresa, User
+
+
+class VistasAsyncTest(TestCase):
+    """Las variantes async responden lo mismo que sus equivalentes DRF"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nombre='Empresa Async', rfc='EAS010101AB1')
+        otra = Empresa.objects.create(nombre='Otra Empresa', rfc='OEM010101AB1')
+        cls.usuario = User.objects.create_user(email='async@ejemplo.mx', password='x')
+        cls.empresa.usuarios.add(cls.usuario)
+        for i, (empresa, nombre) in enumerate([(cls.empresa, 'Ana'), (cls.empresa, 'Luis'), (otra, 'Eva')]):
+            Empleado.objects.create(
+                empresa=empresa, nombre=nombre, apellido_paterno='Lopez', nss=f'{12345678900 + i}',
+                rfc=f'LOPE8001{10 + i}AB1', periodo_nominal='SEMANAL', salario_diario=Decimal('300.00'),
+                fecha_ingreso=date(2024, 1, 1), dias_descanso=[6]
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_mismas_respuestas_que_drf(self):
+        empleado = Empleado.objects.get(nombre='Ana')
+        for ruta in (f'empleados/{empleado.id}/faltas/calendario-periodo/?fecha=2025-09-16', 'nominas/list_periodos/?tipo=SEMANAL'):
+            sincrona = self.client.get(f'/api/{ruta}')
+            self.assertEqual(sincrona.status_code, 200, sincrona.content)
+            self.assertEqual(self.client.get(f'/api/async/{ruta}').json(), sincrona.json())
+
+        calendario = self.client.get(f'/api/async/empleados/{empleado.id}/faltas/calendario-periodo/?fecha=2025-09-16').json()
+        self.assertEqual((calendario['fecha_inicio'], calendario['festivos_en_periodo']), ('2025-09-15', 1))
+
+        ajeno = Empleado.objects.get(nombre='Eva')
+        self.assertEqual(self.client.get(f'/api/async/empleados/{ajeno.id}/faltas/calendario-periodo/').status_code, 404)
+
+    def test_empresa_id_no_numerico(self):
+        for ruta in ('/api/empleados/', '/api/async/empleados/'):
+            respuesta = self.client.get(ruta, {'empresa_id': 'abc'})
+            self.assertEqual(respuesta.status_code, 400, ruta)
+            self.assertEqual(respuesta.json(), {'detail': 'empresa_id debe ser numérico'})
+
+    async def test_lista_en_streaming_con_jwt(self):
+        self.assertEqual((await self.async_client.get('/api/async/empleados/')).status_code, 401)
+        self.assertEqual((await self.async_client.get(
+            '/api/async/empleados/', headers={'Authorization': 'Bearer invalido'}
+        )).status_code, 401)
+
+        token = str(RefreshToken.for_user(self.usuario).access_token)
+        encabezados = {'Authorization': f'Bearer {token}'}
+        sincrona = (await self.async_client.get('/api/empleados/', headers=encabezados)).json()
+        respuesta = await self.async_client.get('/api/async/empleados/', headers=encabezados)
+        self.assertTrue(respuesta.streaming)
+        asincrona = json.loads(b''.join([parte async for parte in respuesta.streaming_content]))
+        self.assertEqual(asincrona, sincrona)
+        self.assertEqual([e['nombre'] for e in asincrona], ['Ana', 'Luis'])
+
+        respuesta = await self.async_client.post('/api/async/empleados/', headers=encabezados)
+        self.assertEqual(respuesta.status_code, 405)
@@ -0,0 +1,271 @@
+"""
+Timbrado concurrente de CFDI de nómina con un PAC.
+
+Los XML se generan y validan con gestion.cfdi; el envío al PAC corre en un
+event loop de asyncio con concurrencia acotada (semáforo) y reintentos con
+espera exponencial para los errores temporales. El loop corre en un hilo
+aparte y solo habla con el PAC: cada resultado pasa por una cola al hilo que
+llamó, que es el único que toca la base de datos y guarda el estado de cada
+nómina en cuanto se conoce.
+
+Reanudación: antes de enviar, las nóminas del lote se marcan EN_PROCESO; si
+el proceso muere, la siguiente corrida vuelve a tomar las que quedaron
+EN_PROCESO o SIN_TIMBRAR. El folio (id de la nómina) viaja como llave de
+idempotencia para que el PAC devuelva el mismo UUID si ya lo había timbrado.
+
+El cliente del PAC es intercambiable: cualquier subclase de ClientePAC
+configurada en settings.PAC_CLIENTE.
+"""
+import abc
+import asyncio
+import base64
+import json
+import queue
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .cfdi import ESTADOS_TIMBRABLES, cargar_documentos, generar_documentos
+from .models import Nomina
+
+ESTADOS_REANUDABLES = ('SIN_TIMBRAR', 'EN_PROCESO')
+ESPERA_BASE = 0.5
+ESPERA_MAXIMA = 30.0
+_FIN = object()
+
+
+# =============================================
+# CLIENTES PAC
+# =============================================
+
+class ErrorPAC(Exception):
+    """Error al timbrar. Los temporales se reintentan; los definitivos no."""
+    temporal = False
+
+
+class ErrorPACTemporal(ErrorPAC):
+    """Falla de red, tiempo agotado o servicio saturado"""
+    temporal = True
+
+
+class ErrorPACDefinitivo(ErrorPAC):
+    """El PAC rechazó el documento"""
+
+
+class ClientePAC(abc.ABC):
+    """
+    Interfaz de un PAC. timbrar() recibe el folio (llave de idempotencia) y
+    el XML, y devuelve el UUID del timbre o lanza ErrorPACTemporal /
+    ErrorPACDefinitivo.
+    """
+
+    @abc.abstractmethod
+    async def timbrar(self, folio, xml):
+        """UUID del timbre del documento"""
+
+    async def cerrar(self):
+        pass
+
+
+class ClienteHTTP(ClientePAC):
+    """
+    PAC por HTTP: POST del XML a settings.PAC_URL con el folio en el
+    encabezado X-Folio; responde JSON {"uuid": ...}. Cliente asyncio nativo
+    (una conexión por documento, sin hilos).
+    """
+
+    def __init__(self, url=None, usuario=None, clave=None, timeout=None):
+        self.url = urlsplit(url or settings.PAC_URL)
+        self.timeout = timeout or settings.PAC_TIMEOUT
+        usuario = settings.PAC_USUARIO if usuario is None else usuario
+        clave = settings.PAC_CLAVE if clave is None else clave
+        self.autorizacion = (
+            'Basic ' + base64.b64encode(f'{usuario}:{clave}'.encode()).decode() if usuario else None
+        )
+
+    async def timbrar(self, folio, xml):
+        try:
+            estado, cuerpo = await asyncio.wait_for(self._post(folio, xml), self.timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+            raise ErrorPACTemporal(f'Sin respuesta del PAC: {e.__class__.__name__} {e}')
+
+        try:
+            datos = json.loads(cuerpo or b'{}')
+        except ValueError:
+            datos = {}
+        if estado == 200 and datos.get('uuid'):
+            return datos['uuid']
+        mensaje = datos.get('error') or cuerpo[:200].decode('utf-8', 'replace') or f'HTTP {estado}'
+        if estado in (408, 429) or estado >= 500:
+            raise ErrorPACTemporal(f'HTTP {estado}: {mensaje}')
+        raise ErrorPACDefinitivo(f'HTTP {estado}: {mensaje}')
+
+    async def _post(self, folio, xml):
+        seguro = self.url.scheme == 'https'
+        lector, escritor = await asyncio.open_connection(
+            self.url.hostname, self.url.port or (443 if seguro else 80), ssl=True if seguro else None
+        )
+        try:
+            ruta = (self.url.path or '/') + (f'?{self.url.query}' if self.url.query else '')
+            encabezados = [
+                f'POST {ruta} HTTP/1.1', f'Host: {self.url.netloc}', 'Connection: close',
+                'Content-Type: application/xml; charset=utf-8', f'Content-Length: {len(xml)}', f'X-Folio: {folio}',
+            ]
+            if self.autorizacion:
+                encabezados.append(f'Authorization: {self.autorizacion}')
+            escritor.write(('\r\n'.join(encabezados) + '\r\n\r\n').encode('latin-1') + xml)
+            await escritor.drain()
+            respuesta = await lector.read()
+        finally:
+            escritor.close()
+
+        cabecera, _, cuerpo = respuesta.partition(b'\r\n\r\n')
+        lineas = cabecera.decode('latin-1').split('\r\n')
+        partes = lineas[0].split(' ', 2)
+        if len(partes) < 2 or not partes[0].startswith('HTTP/') or not partes[1].isdigit():
+            # ValueError: timbrar() lo trata como falla temporal
+            raise ValueError(f'Línea de estado inválida: {lineas[0][:80]!r}')
+        estado = int(partes[1])
+        if any(linea.lower().replace(' ', '') == 'transfer-encoding:chunked' for linea in lineas[1:]):
+            cuerpo = _decodificar_chunked(cuerpo)
+        return estado, cuerpo
+
+
+def _decodificar_chunked(datos):
+    partes = []
+    while datos:
+        tamano, _, datos = datos.partition(b'\r\n')
+        tamano = int(tamano.split(b';')[0], 16)
+        if not tamano:
+            break
+        partes.append(datos[:tamano])
+        datos = datos[tamano + 2:]
+    return b''.join(partes)
+
+
+def obtener_cliente():
+    return import_string(settings.PAC_CLIENTE)()
+
+
+# =============================================
+# ENVÍO CONCURRENTE
+# =============================================
+
+def espera_reintento(intento, espera_base=ESPERA_BASE):
+    """Espera exponencial con variación aleatoria (hasta +50%)"""
+    return min(ESPERA_MAXIMA, espera_base * 2 ** (intento - 1)) * (1 + random.random() / 2)
+
+
+async def _timbrar_documento(cliente, semaforo, nomina_id, contenido, reintentos, espera_base):
+    """(nomina_id, uuid, error, intentos) de un documento"""
+    intento = 0
+    while True:
+        intento += 1
+        # El lugar en el semáforo se libera durante la espera entre reintentos
+        async with semaforo:
+            try:
+                return nomina_id, await cliente.timbrar(nomina_id, contenido), '', intento
+            except ErrorPAC as e:
+                if not e.temporal or intento > reintentos:
+                    return nomina_id, None, str(e), intento
+        await asyncio.sleep(espera_reintento(intento, espera_base))
+
+
+async def _timbrar_lote(cliente, documentos, cola, concurrencia, reintentos, espera_base):
+    semaforo = asyncio.Semaphore(concurrencia)
+    tareas = [
+        asyncio.create_task(_timbrar_documento(cliente, semaforo, nomina_id, contenido, reintentos, espera_base))
+        for nomina_id, contenido in documentos
+    ]
+    try:
+        for terminada in asyncio.as_completed(tareas):
+            cola.put(await terminada)
+    finally:
+        for tarea in tareas:
+            tarea.cancel()
+        await cliente.cerrar()
+
+
+def _guardar_resultado(nomina_id, uuid, error, intentos):
+    if uuid:
+        cambios = {'estado_timbrado': 'TIMBRADO', 'uuid_cfdi': uuid, 'error_timbrado': '', 'fecha_timbrado': timezone.now()}
+    else:
+        cambios = {'estado_timbrado': 'ERROR', 'error_timbrado': error}
+    Nomina.objects.filter(pk=nomina_id).update(
+        intentos_timbrado=F('intentos_timbrado') + intentos, fecha_actualizacion=timezone.now(), **cambios
+    )
+
+
+def timbrar_nominas(nominas, cliente=None, concurrencia=None, reintentos=None,
+                    espera_base=ESPERA_BASE, incluir_errores=False, procesos=None):
+    """
+    Timbra las nóminas PENDIENTE/PAGADA del queryset que no estén timbradas.
+
+    Args:
+        nominas: queryset de Nomina (p. ej. de una empresa y periodo)
+        cliente: instancia de ClientePAC (por omisión settings.PAC_CLIENTE)
+        incluir_errores: reintentar también las que quedaron en ERROR
+        procesos: procesos para generar los XML (ver cfdi.generar_documentos)
+
+    Returns:
+        dict con documentos, timbrados, errores, invalidos, intentos y segundos
+    """
+    inicio = time.perf_counter()
+    cliente = cliente or obtener_cliente()
+    concurrencia = concurrencia or settings.PAC_CONCURRENCIA
+    reintentos = settings.PAC_REINTENTOS if reintentos is None else reintentos
+
+    estados = ESTADOS_REANUDABLES + (('ERROR',) if incluir_errores else ())
+    pendientes = nominas.filter(estado__in=ESTADOS_TIMBRABLES, estado_timbrado__in=estados)
+    ids = list(pendientes.values_list('id', flat=True))
+    Nomina.objects.filter(pk__in=ids).update(estado_timbrado='EN_PROCESO', fecha_actualizacion=timezone.now())
+
+    resumen = {'documentos': 0, 'timbrados': 0, 'errores': 0, 'invalidos': 0, 'intentos': 0}
+    validos = []
+    sin_documento = set(ids)
+    for nomina_id, _, contenido, errores in generar_documentos(cargar_documentos(Nomina.objects.filter(pk__in=ids)), procesos):
+        resumen['documentos'] += 1
+        sin_documento.discard(nomina_id)
+        if errores:
+            resumen['invalidos'] += 1
+            _guardar_resultado(nomina_id, None, 'Documento inválido: ' + '; '.join(errores), 0)
+        else:
+            validos.append((nomina_id, contenido))
+
+    if sin_documento:
+        # Sin empleado o sin fechas: no hay CFDI que generar
+        resumen['invalidos'] += len(sin_documento)
+        Nomina.objects.filter(pk__in=sin_documento).update(
+            estado_timbrado='ERROR', error_timbrado='Nómina sin empleado o sin fechas de periodo',
+            fecha_actualizacion=timezone.now()
+        )
+
+    cola = queue.Queue()
+    fallo = []
+
+    def ejecutar_loop():
+        try:
+            asyncio.run(_timbrar_lote(cliente, validos, cola, concurrencia, reintentos, espera_base))
+        except BaseException as e:  # Se relanza en el hilo que llamó
+            fallo.append(e)
+        finally:
+            cola.put(_FIN)
+
+    hilo = threading.Thread(target=ejecutar_loop, name='timbrado', daemon=True)
+    hilo.start()
+    while (resultado := cola.get()) is not _FIN:
+        _guardar_resultado(*resultado)
+        resumen['timbrados' if resultado[1] else 'errores'] += 1
+        resumen['intentos'] += resultado[3]
+    hilo.join()
+    if fallo:
+        raise fallo[0]
+
+    resumen['segundos'] = round(time.perf_counter() - inicio, 2)
+    return resumen
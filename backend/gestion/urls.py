@@ -17,6 +17,7 @@ from .views import (
     generar_calendario,
     obtener_periodos
 )
+from . import vistas_async
 
 # Router API
 router = DefaultRouter()
@@ -69,6 +70,16 @@ urlpatterns = [
         name='calendario-periodo'
     ),
 
+    # Variantes async (ASGI) de lectura; ver gestion/vistas_async.py
+    path('async/empleados/', vistas_async.listar_empleados, name='async-empleados'),
+    path(
+        'async/empleados/<int:pk>/faltas/calendario-periodo/',
+        vistas_async.calendario_periodo,
+        name='async-calendario-periodo'
+    ),
+    path('async/nominas/list_periodos/', vistas_async.listar_periodos, name='async-list-periodos'),
+    path('async/nominas/dispersion/', vistas_async.dispersion, name='async-dispersion'),
+
     # Rutas del router
     path('', include(router.urls)),
 ]
\ No newline at end of file
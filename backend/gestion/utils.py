@@ -1,9 +1,16 @@
 import csv
 import os
+from bisect import bisect_left
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 from decimal import Decimal, getcontext, InvalidOperation
 from datetime import date, datetime, timedelta
-import json
+
+from .instrumentacion import etapa
+from .renderers import CodificadorDecimal
 
 # =============================================
 # CONSTANTES Y CONFIGURACIONES
@@ -33,21 +40,24 @@ MAX_AGUINALDO_EXENTO = 30 * UMA_DIARIA_2025  # 30 días de UMA
 MAX_PRIMA_VACACIONAL_EXENTA = 15 * UMA_DIARIA_2025  # 15 días de UMA
 MAX_PRIMA_DOMINICAL_EXENTA = UMA_DIARIA_2025  # 1 UMA por domingo trabajado
 
+# Subsidio al empleo 2025: tope de ingreso mensual y montos mensual y quincenal
+LIMITE_SUBSIDIO_MENSUAL = Decimal('10171.00')
+SUBSIDIO_MENSUAL = Decimal('474.64')
+SUBSIDIO_MENSUAL_ENERO = Decimal('474.94')
+SUBSIDIO_QUINCENAL = UMA_DIARIA_2025 * Decimal('0.138') * 15
+
 # =============================================
 # CLASES AUXILIARES
 # =============================================
 
-class DecimalEncoder(json.JSONEncoder):
-    """Encoder personalizado para manejar objetos Decimal en serialización JSON"""
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
+# Encoder para Decimal en serialización JSON (ver gestion/renderers.py)
+DecimalEncoder = CodificadorDecimal
 
 class CalculadoraIMSS:
     """Clase para cálculos IMSS con factor de integración 1.0493"""
     
-    # Constantes 2025
+    # Constantes 2025 (AÑO forma parte de la llave del memo de calcular_imss)
+    AÑO = 2025
     UMA_2025 = Decimal('113.14')
     FACTOR_INTEGRACION = Decimal('1.0493')
     
@@ -102,16 +112,6 @@ class CalculadoraIMSS:
 # FUNCIONES AUXILIARES
 # =============================================
 
-def serialize_decimal(obj):
-    """Función auxiliar para convertir recursivamente Decimal a float"""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    elif isinstance(obj, dict):
-        return {k: serialize_decimal(v) for k, v in obj.items()}
-    elif isinstance(obj, (list, tuple)):
-        return [serialize_decimal(item) for item in obj]
-    return obj
-
 def es_dia_festivo(fecha):
     """Determina si una fecha es día festivo oficial"""
     return fecha in DIAS_FESTIVOS_2025
@@ -120,6 +120,48 @@ def calcular_dias_festivos(fecha_inicio, fecha_fin):
     """Calcula cuántos días festivos hay en un rango de fechas"""
     return sum(1 for dia in DIAS_FESTIVOS_2025 if fecha_inicio <= dia <= fecha_fin)
 
+# =============================================
+# CALENDARIO DEL PERIODO POR PATRÓN DE DESCANSO
+# =============================================
+
+# Domingos y festivos de un periodo solo dependen del periodo y de los días de
+# descanso (a lo más 128 patrones): se calculan una vez por (periodo, patrón)
+# y a cada empleado solo le quedan su fecha de ingreso y sus faltas.
+
+TAMANO_MEMO_CALENDARIO = 1024
+
+CalendarioPeriodo = namedtuple('CalendarioPeriodo', 'domingos festivos festivos_laborables festivos_descanso')
+
+
+def patron_descanso(dias_descanso):
+    """Días de descanso (0=lunes, 6=domingo) sin repetir y ordenados; lo que no es un día se ignora"""
+    return tuple(sorted({dia for dia in dias_descanso or () if dia in range(7)}))
+
+
+@lru_cache(maxsize=TAMANO_MEMO_CALENDARIO)
+def calendario_nomina(fecha_inicio, fecha_fin, patron):
+    """
+    Domingos y festivos (en orden) del periodo; los festivos se separan en
+    laborables y de descanso según patron (ver patron_descanso).
+    """
+    primer_domingo = fecha_inicio + timedelta(days=(6 - fecha_inicio.weekday()) % 7)
+    domingos = []
+    while primer_domingo <= fecha_fin:
+        domingos.append(primer_domingo)
+        primer_domingo += timedelta(days=7)
+    festivos = tuple(dia for dia in DIAS_FESTIVOS_2025 if fecha_inicio <= dia <= fecha_fin)
+    return CalendarioPeriodo(
+        domingos=tuple(domingos),
+        festivos=festivos,
+        festivos_laborables=tuple(dia for dia in festivos if dia.weekday() not in patron),
+        festivos_descanso=tuple(dia for dia in festivos if dia.weekday() in patron),
+    )
+
+
+def domingos_desde(calendario, fecha):
+    """Domingos del periodo a partir de fecha (p. ej. la de ingreso)"""
+    return calendario.domingos[bisect_left(calendario.domingos, fecha):]
+
 def cargar_tabla_subsidio_semanal():
     """Carga la tabla exacta de subsidio semanal desde el CSV"""
     try:
@@ -171,25 +213,9 @@ def obtener_subsidio_mensual(salario_mensual, mes_numero):
     try:
         salario = Decimal(str(salario_mensual)).quantize(Decimal('0.01'))
         
-        # Tabla de subsidio mensual 2025 según mes
-        tabla_subsidio = {
-            1: Decimal('474.94'),   # Enero
-            2: Decimal('474.64'),   # Febrero
-            3: Decimal('474.64'),   # Marzo
-            4: Decimal('474.64'),   # Abril
-            5: Decimal('474.64'),   # Mayo
-            6: Decimal('474.64'),   # Junio
-            7: Decimal('474.64'),   # Julio
-            8: Decimal('474.64'),   # Agosto
-            9: Decimal('474.64'),   # Septiembre
-            10: Decimal('474.64'),  # Octubre
-            11: Decimal('474.64'),  # Noviembre
-            12: Decimal('474.64')   # Diciembre
-        }
-        
-        # Solo aplicar subsidio si el salario es menor o igual a 10171.00
-        if salario <= Decimal('10171.00'):
-            return tabla_subsidio.get(mes_numero, Decimal('474.64')).quantize(Decimal('0.01'))
+        # Solo aplicar subsidio si el salario es menor o igual al tope (enero tiene su propio monto)
+        if salario <= LIMITE_SUBSIDIO_MENSUAL:
+            return SUBSIDIO_MENSUAL_ENERO if mes_numero == 1 else SUBSIDIO_MENSUAL
         else:
             return Decimal('0.00')
     
@@ -198,7 +224,7 @@ def obtener_subsidio_mensual(salario_mensual, mes_numero):
     except Exception as e:
         raise ValueError(f"Error al calcular subsidio mensual: {str(e)}")
     
-def calcular_prima_dominical(empleado, fecha_inicio, fecha_fin):
+def calcular_prima_dominical(empleado, fecha_inicio, fecha_fin, detalle=True):
     """
     Calcula la prima dominical para un empleado en un periodo, considerando:
     - Fecha de ingreso del empleado (no se pagan domingos anteriores al ingreso)
@@ -217,16 +243,17 @@ def calcular_prima_dominical(empleado, fecha_inicio, fecha_fin):
             - fechas_faltas_justificadas: Lista de strings con fechas de faltas justificadas
         fecha_inicio: datetime.date - Inicio del periodo
         fecha_fin: datetime.date - Fin del periodo
+        detalle: Si es False no se arman los metadatos (corridas masivas)
 
     Returns:
         dict: {
-            'prima_dominical': float,    # Total prima dominical
-            'uma_diaria': float,         # Valor UMA vigente
-            'excedente_uma': float,      # Excedente gravable para ISR
+            'prima_dominical': Decimal,  # Total prima dominical
+            'uma_diaria': Decimal,       # Valor UMA vigente
+            'excedente_uma': Decimal,    # Excedente gravable para ISR
             'domingos_trabajados': int,  # Domingos efectivamente pagados
             'domingos_faltados': int,    # Domingos con falta registrada
-            'prima_por_domingo': float,  # Prima por cada domingo
-            'excedente_por_domingo': float,  # Excedente promedio por domingo
+            'prima_por_domingo': Decimal,  # Prima por cada domingo
+            'excedente_por_domingo': Decimal,  # Excedente promedio por domingo
             'domingos_no_pagados': list, # Domingos no pagados con motivo
             'metadatos': dict            # Información detallada sobre cálculos
         }
@@ -298,7 +325,10 @@ def calcular_prima_dominical(empleado, fecha_inicio, fecha_fin):
             'prima_por_domingo': prima_por_domingo,
             'excedente_por_domingo': Decimal('0'),
             'domingos_no_pagados': [],
-            'metadatos': {
+            'metadatos': {}
+        }
+        if detalle:
+            resultado['metadatos'].update({
                 'fecha_ingreso': empleado.fecha_ingreso.strftime('%Y-%m-%d'),
                 'salario_diario_considerado': float(salario_diario),
                 'prima_porcentaje': '25%',
@@ -311,67 +341,63 @@ def calcular_prima_dominical(empleado, fecha_inicio, fecha_fin):
                 },
                 'faltas_injustificadas_detectadas': [f.strftime('%Y-%m-%d') for f in fechas_faltas_injustificadas],
                 'faltas_justificadas_detectadas': [f.strftime('%Y-%m-%d') for f in fechas_faltas_justificadas]
-            }
-        }
+            })
 
         # CASOS ESPECIALES
         # 1. Domingo es día de descanso
         if 6 in empleado.dias_descanso:
             resultado['metadatos']['motivo'] = 'domingo_es_dia_descanso'
-            return _convertir_decimales_a_float(resultado)
+            return _redondear_decimales(resultado)
 
         # 2. Empleado ingresó después del periodo
         if empleado.fecha_ingreso > fecha_fin:
             resultado['metadatos']['motivo'] = 'ingreso_posterior_al_periodo'
-            return _convertir_decimales_a_float(resultado)
+            return _redondear_decimales(resultado)
 
         # CÁLCULO PRINCIPAL (periodo donde el empleado ya estaba contratado)
         fecha_inicio_calc = max(fecha_inicio, empleado.fecha_ingreso)
-        delta_dias = (fecha_fin - fecha_inicio_calc).days
+        calendario = calendario_nomina(fecha_inicio, fecha_fin, patron_descanso(empleado.dias_descanso))
 
-        for i in range(delta_dias + 1):
-            dia_actual = fecha_inicio_calc + timedelta(days=i)
+        for dia_actual in domingos_desde(calendario, fecha_inicio_calc):
+            fecha_str = dia_actual.strftime('%Y-%m-%d')
             
-            if dia_actual.weekday() == 6:  # Es domingo
-                fecha_str = dia_actual.strftime('%Y-%m-%d')
-                
-                # Verificar faltas INJUSTIFICADAS (NO se paga prima por faltas injustificadas)
-                if dia_actual in fechas_faltas_injustificadas:
-                    resultado['domingos_faltados'] += 1
-                    resultado['domingos_no_pagados'].append({
-                        'fecha': fecha_str,
-                        'motivo': 'falta_injustificada',
-                        'dia_semana': 'Domingo',
-                        'tipo_falta': 'injustificada'
-                    })
-                    continue
-                
-                # Verificar faltas JUSTIFICADAS
-                if dia_actual in fechas_faltas_justificadas:
-                    resultado['domingos_faltados'] += 1
-                    resultado['domingos_no_pagados'].append({
-                        'fecha': fecha_str,
-                        'motivo': 'falta_justificada',
-                        'dia_semana': 'Domingo',
-                        'tipo_falta': 'justificada'
-                    })
-                    continue
-                
-                # Verificar faltas en lista general (para retrocompatibilidad)
-                if hasattr(empleado, 'fechas_faltas') and fecha_str in empleado.fechas_faltas:
-                    resultado['domingos_faltados'] += 1
-                    resultado['domingos_no_pagados'].append({
-                        'fecha': fecha_str,
-                        'motivo': 'falta_registrada',
-                        'dia_semana': 'Domingo',
-                        'tipo_falta': 'general'
-                    })
-                    continue
-                
-                # Domingo trabajado válido (sin faltas)
-                resultado['domingos_trabajados'] += 1
-                excedente_dia = max(prima_por_domingo - UMA_DIARIA, Decimal('0'))
-                resultado['excedente_uma'] += excedente_dia
+            # Verificar faltas INJUSTIFICADAS (NO se paga prima por faltas injustificadas)
+            if dia_actual in fechas_faltas_injustificadas:
+                resultado['domingos_faltados'] += 1
+                resultado['domingos_no_pagados'].append({
+                    'fecha': fecha_str,
+                    'motivo': 'falta_injustificada',
+                    'dia_semana': 'Domingo',
+                    'tipo_falta': 'injustificada'
+                })
+                continue
+            
+            # Verificar faltas JUSTIFICADAS
+            if dia_actual in fechas_faltas_justificadas:
+                resultado['domingos_faltados'] += 1
+                resultado['domingos_no_pagados'].append({
+                    'fecha': fecha_str,
+                    'motivo': 'falta_justificada',
+                    'dia_semana': 'Domingo',
+                    'tipo_falta': 'justificada'
+                })
+                continue
+            
+            # Verificar faltas en lista general (para retrocompatibilidad)
+            if hasattr(empleado, 'fechas_faltas') and fecha_str in empleado.fechas_faltas:
+                resultado['domingos_faltados'] += 1
+                resultado['domingos_no_pagados'].append({
+                    'fecha': fecha_str,
+                    'motivo': 'falta_registrada',
+                    'dia_semana': 'Domingo',
+                    'tipo_falta': 'general'
+                })
+                continue
+            
+            # Domingo trabajado válido (sin faltas)
+            resultado['domingos_trabajados'] += 1
+            excedente_dia = max(prima_por_domingo - UMA_DIARIA, Decimal('0'))
+            resultado['excedente_uma'] += excedente_dia
 
         # CÁLCULO DE TOTALES (con validación de división por cero)
         if resultado['domingos_trabajados'] > 0:
@@ -383,20 +409,21 @@ def calcular_prima_dominical(empleado, fecha_inicio, fecha_fin):
             resultado['metadatos']['motivo'] = 'no_hay_domingos_trabajados'
 
         # Agregar estadísticas detalladas
-        resultado['metadatos']['estadisticas'] = {
-            'total_domingos_periodo': resultado['domingos_trabajados'] + resultado['domingos_faltados'],
-            'domingos_pagados': resultado['domingos_trabajados'],
-            'domingos_no_pagados': resultado['domingos_faltados'],
-            'desglose_no_pagados': {
-                'por_falta_injustificada': len([d for d in resultado['domingos_no_pagados'] if d.get('tipo_falta') == 'injustificada']),
-                'por_falta_justificada': len([d for d in resultado['domingos_no_pagados'] if d.get('tipo_falta') == 'justificada']),
-                'por_falta_general': len([d for d in resultado['domingos_no_pagados'] if d.get('tipo_falta') == 'general']),
-                'por_descanso': len([d for d in resultado['domingos_no_pagados'] if d.get('motivo') == 'dia_descanso'])
+        if detalle:
+            resultado['metadatos']['estadisticas'] = {
+                'total_domingos_periodo': resultado['domingos_trabajados'] + resultado['domingos_faltados'],
+                'domingos_pagados': resultado['domingos_trabajados'],
+                'domingos_no_pagados': resultado['domingos_faltados'],
+                'desglose_no_pagados': {
+                    'por_falta_injustificada': len([d for d in resultado['domingos_no_pagados'] if d.get('tipo_falta') == 'injustificada']),
+                    'por_falta_justificada': len([d for d in resultado['domingos_no_pagados'] if d.get('tipo_falta') == 'justificada']),
+                    'por_falta_general': len([d for d in resultado['domingos_no_pagados'] if d.get('tipo_falta') == 'general']),
+                    'por_descanso': len([d for d in resultado['domingos_no_pagados'] if d.get('motivo') == 'dia_descanso'])
+                }
             }
-        }
 
-        # Conversión final a float (solo para campos numéricos)
-        return _convertir_decimales_a_float(resultado)
+        # Importes redondeados a centavos; se convierten a número al escribir el JSON
+        return _redondear_decimales(resultado)
 
     except Exception as error:
         error_msg = f"Error calculando prima dominical para {getattr(empleado, 'nombre_completo', 'empleado')}: {str(error)}"
@@ -405,32 +432,10 @@ def calcular_prima_dominical(empleado, fecha_inicio, fecha_fin):
         raise ValueError(error_msg) from error
 
 
-def _convertir_decimales_a_float(resultado):
-    """Función auxiliar para convertir campos Decimal a float"""
-    decimal_fields = ['prima_dominical', 'uma_diaria', 'excedente_uma', 
-                     'prima_por_domingo', 'excedente_por_domingo']
-    
-    converted = {}
-    for k, v in resultado.items():
-        if isinstance(v, Decimal):
-            converted[k] = float(v.quantize(Decimal('0.01')))
-        elif isinstance(v, list) and k == 'domingos_no_pagados':
-            # Mantener la lista de objetos sin conversión
-            converted[k] = v
-        elif isinstance(v, dict):
-            converted[k] = _convertir_decimales_a_float(v)
-        else:
-            converted[k] = v
-    
-    return converted
-
-def _convertir_decimales_a_float(resultado):
-    """Función auxiliar para convertir campos Decimal a float"""
-    decimal_fields = ['prima_dominical', 'uma_diaria', 'excedente_uma', 
-                     'prima_por_domingo', 'excedente_por_domingo']
-    
+def _redondear_decimales(resultado):
+    """Redondea a centavos los importes Decimal del primer nivel (siguen siendo Decimal)"""
     return {
-        k: float(v.quantize(Decimal('0.01'))) if isinstance(v, Decimal) else v
+        k: v.quantize(Decimal('0.01')) if isinstance(v, Decimal) else v
         for k, v in resultado.items()
     }
 
@@ -458,10 +463,7 @@ def calcular_descuento_faltas(empleado, fecha_inicio, fecha_fin):
     faltas_detalle = []
     
     # Días festivos en el periodo
-    festivos_en_periodo = [
-        dia for dia in DIAS_FESTIVOS_2025 
-        if fecha_inicio <= dia <= fecha_fin
-    ]
+    festivos_en_periodo = calendario_nomina(fecha_inicio, fecha_fin, patron_descanso(empleado.dias_descanso)).festivos
     
     for fecha_str in empleado.fechas_faltas:
         try:
@@ -517,6 +519,7 @@ def calcular_descuento_faltas(empleado, fecha_inicio, fecha_fin):
         faltas_detalle
     )
 
+@etapa('pago_extra')
 def calcular_pago_extra(empleado, fecha_inicio, fecha_fin):
     """
     Calcula pagos extras con precisión en:
@@ -528,17 +531,6 @@ def calcular_pago_extra(empleado, fecha_inicio, fecha_fin):
     from datetime import date, datetime, timedelta
     import locale
 
-    # Días festivos oficiales 2025 en México
-    DIAS_FESTIVOS_2025 = [
-        date(2025, 1, 1),   # Año Nuevo
-        date(2025, 2, 3),   # Día de la Constitución
-        date(2025, 3, 17),  # Natalicio de Benito Juárez
-        date(2025, 5, 1),   # Día del Trabajo
-        date(2025, 9, 16),  # Día de la Independencia
-        date(2025, 11, 17), # Día de la Revolución
-        date(2025, 12, 25)  # Navidad
-    ]
-
     # Configurar el contexto decimal para precisión adecuada
     getcontext().prec = 10
     getcontext().rounding = 'ROUND_HALF_UP'
@@ -655,48 +647,43 @@ def calcular_pago_extra(empleado, fecha_inicio, fecha_fin):
         resultado['metadatos']['prima_por_domingo'] = prima_por_domingo
 
         # 2. Calcular domingos trabajados (exentos hasta 1 UMA) - CORREGIDO
-        fecha_actual = max(fecha_inicio, empleado.fecha_ingreso)
-        while fecha_actual <= fecha_fin:
-            if fecha_actual.weekday() == 6:  # Domingo
-                fecha_str = fecha_actual.strftime('%Y-%m-%d')
-                
-                # Verificar si es día de descanso
-                if 6 in getattr(empleado, 'dias_descanso', []):
-                    resultado['metadatos']['domingos_no_pagados'].append({
-                        'fecha': fecha_str,
-                        'motivo': 'dia_descanso'
-                    })
-                # Verificar si tiene falta INJUSTIFICADA en domingo
-                elif fecha_actual in fechas_faltas_injustificadas:
-                    resultado['metadatos']['domingos_con_falta_injustificada'].append(fecha_str)
-                    resultado['metadatos']['domingos_no_pagados'].append({
-                        'fecha': fecha_str,
-                        'motivo': 'falta_injustificada'
-                    })
-                # Verificar si tiene falta justificada en domingo
-                elif fecha_str in getattr(empleado, 'fechas_faltas_justificadas', []):
-                    resultado['metadatos']['domingos_no_pagados'].append({
-                        'fecha': fecha_str,
-                        'motivo': 'falta_justificada'
-                    })
-                # Domingo trabajado válido (sin faltas)
-                else:
-                    resultado['domingos_trabajados'] += 1
-                    resultado['prima_dominical'] += prima_por_domingo
-                    excedente = max(Decimal('0'), prima_por_domingo - UMA_DIARIA)
-                    resultado['excedente_uma'] += excedente
+        calendario = calendario_nomina(fecha_inicio, fecha_fin, patron_descanso(getattr(empleado, 'dias_descanso', [])))
+        for fecha_actual in domingos_desde(calendario, max(fecha_inicio, empleado.fecha_ingreso)):
+            fecha_str = fecha_actual.strftime('%Y-%m-%d')
             
-            fecha_actual += timedelta(days=1)
+            # Verificar si es día de descanso
+            if 6 in getattr(empleado, 'dias_descanso', []):
+                resultado['metadatos']['domingos_no_pagados'].append({
+                    'fecha': fecha_str,
+                    'motivo': 'dia_descanso'
+                })
+            # Verificar si tiene falta INJUSTIFICADA en domingo
+            elif fecha_actual in fechas_faltas_injustificadas:
+                resultado['metadatos']['domingos_con_falta_injustificada'].append(fecha_str)
+                resultado['metadatos']['domingos_no_pagados'].append({
+                    'fecha': fecha_str,
+                    'motivo': 'falta_injustificada'
+                })
+            # Verificar si tiene falta justificada en domingo
+            elif fecha_str in getattr(empleado, 'fechas_faltas_justificadas', []):
+                resultado['metadatos']['domingos_no_pagados'].append({
+                    'fecha': fecha_str,
+                    'motivo': 'falta_justificada'
+                })
+            # Domingo trabajado válido (sin faltas)
+            else:
+                resultado['domingos_trabajados'] += 1
+                resultado['prima_dominical'] += prima_por_domingo
+                excedente = max(Decimal('0'), prima_por_domingo - UMA_DIARIA)
+                resultado['excedente_uma'] += excedente
 
         # 3. Calcular días festivos trabajados (pago doble) - CORREGIDO
         festivos_pagados = []
         festivos_no_pagados_falta_injustificada = []
         
-        for festivo in DIAS_FESTIVOS_2025:
+        for festivo in calendario.festivos_laborables:
             try:
-                if (fecha_inicio <= festivo <= fecha_fin and
-                    festivo >= empleado.fecha_ingreso and
-                    festivo.weekday() not in getattr(empleado, 'dias_descanso', [])):
+                if festivo >= empleado.fecha_ingreso:
                     
                     # VERIFICAR FALTAS
                     tiene_falta_justificada = festivo.strftime('%Y-%m-%d') in getattr(empleado, 'fechas_faltas_justificadas', [])
@@ -716,9 +703,8 @@ def calcular_pago_extra(empleado, fecha_inicio, fecha_fin):
 
         resultado['dias_festivos'] = len(festivos_pagados)
         resultado['metadatos']['festivos_no_pagados'] = [
-            f.strftime('%Y-%m-%d') for f in DIAS_FESTIVOS_2025 
+            f.strftime('%Y-%m-%d') for f in calendario.festivos
             if f.strftime('%Y-%m-%d') not in festivos_pagados
-            and fecha_inicio <= f <= fecha_fin
         ]
 
         # 4. Total exacto
@@ -728,15 +714,10 @@ def calcular_pago_extra(empleado, fecha_inicio, fecha_fin):
         resultado['metadatos']['festivos_no_pagados_detalle'] = {
             'por_falta_injustificada': festivos_no_pagados_falta_injustificada,
             'por_falta_justificada': resultado['metadatos']['festivos_con_falta_justificada'],
-            'por_descanso': [
-                f.strftime('%Y-%m-%d') for f in DIAS_FESTIVOS_2025 
-                if fecha_inicio <= f <= fecha_fin and 
-                f.weekday() in getattr(empleado, 'dias_descanso', [])
-            ],
+            'por_descanso': [f.strftime('%Y-%m-%d') for f in calendario.festivos_descanso],
             'por_ingreso_posterior': [
-                f.strftime('%Y-%m-%d') for f in DIAS_FESTIVOS_2025 
-                if fecha_inicio <= f <= fecha_fin and 
-                f < empleado.fecha_ingreso
+                f.strftime('%Y-%m-%d') for f in calendario.festivos
+                if f < empleado.fecha_ingreso
             ]
         }
 
@@ -767,6 +748,7 @@ def calcular_pago_extra(empleado, fecha_inicio, fecha_fin):
         raise ValueError(f"Error inesperado en cálculo de pagos extras: {str(e)}")
 
 
+@etapa('pago_extra')
 def calcular_pago_extra_semanal(empleado, fecha_inicio, fecha_fin, dias_trabajados):
     """Calcula pagos extras proporcionales a días trabajados en semana con desglose detallado"""
     try:
@@ -790,15 +772,15 @@ def calcular_pago_extra_semanal(empleado, fecha_inicio, fecha_fin, dias_trabajad
         # 4. NO tiene falta injustificada registrada en esa fecha
         festivos_trabajados = []
         festivos_no_pagados = []
+        calendario = calendario_nomina(fecha_inicio, fecha_fin, patron_descanso(dias_descanso))
         
-        for dia_festivo in DIAS_FESTIVOS_2025:
-            if (fecha_inicio <= dia_festivo <= fecha_fin and
-                dia_festivo.weekday() not in dias_descanso and
+        for dia_festivo in calendario.festivos:
+            if (dia_festivo in calendario.festivos_laborables and
                 fecha_ingreso <= dia_festivo and
                 dia_festivo not in fechas_faltas_injustificadas):  # ← CORRECCIÓN PRINCIPAL
                 
                 festivos_trabajados.append(dia_festivo)
-            elif fecha_inicio <= dia_festivo <= fecha_fin:
+            else:
                 festivos_no_pagados.append(dia_festivo)
         
         # Calcular pago por festivos (doble salario por cada festivo trabajado)
@@ -806,7 +788,7 @@ def calcular_pago_extra_semanal(empleado, fecha_inicio, fecha_fin, dias_trabajad
         
         # Calcular prima dominical (25% del salario por cada domingo trabajado)
         # Solo considerar domingos después de la fecha de ingreso
-        prima_data = calcular_prima_dominical(empleado, max(fecha_inicio, fecha_ingreso), fecha_fin)
+        prima_data = calcular_prima_dominical(empleado, max(fecha_inicio, fecha_ingreso), fecha_fin, detalle=False)
         prima_dominical = prima_data['prima_dominical']
         
         # Total pago extra
@@ -848,7 +830,7 @@ def calcular_pago_extra_semanal(empleado, fecha_inicio, fecha_fin, dias_trabajad
                 'motivo_festivos_no_pagados': motivos_festivos_no_pagados,
                 'faltas_injustificadas_en_festivos': [  # ← NUEVO CAMPO
                     d.strftime('%Y-%m-%d') for d in fechas_faltas_injustificadas 
-                    if d in DIAS_FESTIVOS_2025 and fecha_inicio <= d <= fecha_fin
+                    if d in calendario.festivos
                 ]
             }
         }
@@ -938,6 +920,7 @@ def aplicar_exenciones_salario_minimo(empleado, salario_bruto, periodo):
 def cargar_tabla_isr(periodo='quincenal'):
     """Carga tabla ISR desde CSV con manejo robusto de errores"""
     archivos = {
+        'anual': 'tarifa_anual_isr.csv',
         'mensual': 'tarifa_mensual_isr.csv',
         'quincenal': 'tarifa_quincenal_isr.csv',
         'semanal': 'tarifa_semanal_isr.csv'
@@ -960,46 +943,171 @@ def cargar_tabla_isr(periodo='quincenal'):
     except Exception as e:
         raise ValueError(f"Error al cargar tabla ISR: {str(e)}")
 
+# =============================================
+# MEMOIZACIÓN DE ISR E IMSS POR MONTO
+# =============================================
+
+# Muchos empleados ganan exactamente lo mismo (salario mínimo, tabuladores):
+# calcular_isr y calcular_imss guardan el resultado por monto en centavos y
+# el mismo cálculo no se repite dentro de una corrida ni entre corridas del
+# mismo proceso. Los montos con más de dos decimales no se memoizan.
+
+# Cambiarla al actualizar las tarifas ISR o las tablas de subsidio
+VERSION_TARIFAS_ISR = '2025'
+TAMANO_MEMO_ISR = 4096
+TAMANO_MEMO_IMSS = 4096
+
+
+def _centavos_exactos(valor):
+    """Decimal en centavos enteros, o None si tiene más de dos decimales"""
+    signo, digitos, exponente = valor.as_tuple()
+    if not isinstance(exponente, int) or exponente < -2:
+        return None
+    centavos = int(''.join(map(str, digitos))) * 10 ** (exponente + 2)
+    return -centavos if signo else centavos
+
+
+def _desde_centavos(centavos):
+    """Decimal con dos decimales, sin redondeo del contexto"""
+    return Decimal((int(centavos < 0), tuple(int(d) for d in str(abs(centavos))), -2))
+
+
+def estadisticas_memo():
+    """Aciertos, fallos y tamaño de los memos de ISR, IMSS y calendario en este proceso"""
+    return {
+        'isr': _isr_memo.cache_info()._asdict(),
+        'imss': _imss_memo.cache_info()._asdict(),
+        'calendario': calendario_nomina.cache_info()._asdict(),
+    }
+
+
+def limpiar_memo():
+    _isr_memo.cache_clear()
+    _imss_memo.cache_clear()
+    calendario_nomina.cache_clear()
+
+
+@etapa('isr')
 def calcular_isr(salario, periodo='quincenal', mes_numero=None):
     """Calcula ISR según tabla 2025 con subsidio al empleo"""
     try:
         salario_decimal = Decimal(str(float(salario)))
-        tabla = cargar_tabla_isr(periodo)
-        
-        isr_determinado = Decimal('0.00')
-        for _, rango in tabla.iterrows():
-            if rango['Limite Inferior'] <= float(salario_decimal) <= rango['Limite Superior']:
-                excedente = salario_decimal - Decimal(str(rango['Limite Inferior']))
-                porcentaje = Decimal(str(rango['Por ciento para Limite Inferior'])) / Decimal('100')
-                isr_determinado = Decimal(str(rango['Cuota fija'])) + (excedente * porcentaje)
-                break
-
-        if periodo == 'semanal':
-            subsidio = obtener_subsidio_semanal(float(salario_decimal))
-            isr_final = max(Decimal('0'), isr_determinado - subsidio)
-        elif periodo == 'mensual':
-            # PARA MENSUAL: Solo aplicar subsidio si salario <= 10171.00
-            if salario_decimal <= Decimal('10171.00'):
-                # Usar el mes proporcionado o el mes actual por defecto
-                mes = mes_numero if mes_numero is not None else datetime.now().month
-                subsidio = obtener_subsidio_mensual(float(salario_decimal), mes)
-                isr_final = max(Decimal('0'), isr_determinado - subsidio)
-            else:
-                isr_final = isr_determinado
-        else:  # quincenal
-            dias = Decimal('15')
-            salario_mensual = (salario_decimal / dias) * Decimal('30.4')
-            
-            if salario_mensual <= Decimal('10171.00'):
-                subsidio = Decimal('113.14') * Decimal('0.138') * dias
-                isr_final = max(Decimal('0'), isr_determinado - subsidio)
-            else:
-                isr_final = isr_determinado
+        # Solo el subsidio mensual depende del mes
+        if periodo == 'mensual':
+            mes = mes_numero if mes_numero is not None else datetime.now().month
+        else:
+            mes = None
 
-        return float(isr_final.quantize(Decimal('0.01')))
+        centavos = _centavos_exactos(salario_decimal)
+        if centavos is None:
+            return _calcular_isr(salario_decimal, periodo, mes)
+        return _isr_memo(centavos, periodo, mes, VERSION_TARIFAS_ISR)
     except Exception as e:
         raise ValueError(f"Error al calcular ISR: {str(e)}")
 
+
+@lru_cache(maxsize=TAMANO_MEMO_ISR)
+def _isr_memo(base_gravable_centavos, periodo, mes, version_tarifas):
+    return _calcular_isr(_desde_centavos(base_gravable_centavos), periodo, mes)
+
+
+def _calcular_isr(salario_decimal, periodo, mes):
+    tabla = cargar_tabla_isr(periodo)
+    
+    isr_determinado = Decimal('0.00')
+    for _, rango in tabla.iterrows():
+        if rango['Limite Inferior'] <= float(salario_decimal) <= rango['Limite Superior']:
+            excedente = salario_decimal - Decimal(str(rango['Limite Inferior']))
+            porcentaje = Decimal(str(rango['Por ciento para Limite Inferior'])) / Decimal('100')
+            isr_determinado = Decimal(str(rango['Cuota fija'])) + (excedente * porcentaje)
+            break
+
+    if periodo == 'semanal':
+        subsidio = obtener_subsidio_semanal(float(salario_decimal))
+        isr_final = max(Decimal('0'), isr_determinado - subsidio)
+    elif periodo == 'mensual':
+        # PARA MENSUAL: Solo aplicar subsidio si salario <= LIMITE_SUBSIDIO_MENSUAL
+        if salario_decimal <= LIMITE_SUBSIDIO_MENSUAL:
+            subsidio = obtener_subsidio_mensual(float(salario_decimal), mes)
+            isr_final = max(Decimal('0'), isr_determinado - subsidio)
+        else:
+            isr_final = isr_determinado
+    else:  # quincenal
+        dias = Decimal('15')
+        salario_mensual = (salario_decimal / dias) * Decimal('30.4')
+        
+        if salario_mensual <= LIMITE_SUBSIDIO_MENSUAL:
+            subsidio = SUBSIDIO_QUINCENAL
+            isr_final = max(Decimal('0'), isr_determinado - subsidio)
+        else:
+            isr_final = isr_determinado
+
+    return float(isr_final.quantize(Decimal('0.01')))
+
+def _dividir_redondeando(numerador, denominador):
+    """División entera de arreglos con redondeo al par, como Decimal.quantize"""
+    cociente, residuo = np.divmod(numerador, denominador)
+    sube = (2 * residuo > denominador) | ((2 * residuo == denominador) & (cociente % 2 == 1))
+    return cociente + sube
+
+def calcular_isr_vectorizado(bases, periodo='anual'):
+    """
+    ISR determinado por tarifa (sin subsidio) para un arreglo de bases
+    gravables a la vez. Mismo tramo que calcular_isr: el límite inferior más
+    alto que no excede la base.
+
+    Args:
+        bases: secuencia o numpy array de bases gravables del periodo
+        periodo: 'anual', 'mensual', 'quincenal' o 'semanal'
+
+    Returns:
+        numpy array de ISR redondeado a centavos
+    """
+    tabla = cargar_tabla_isr(periodo)
+    limites = tabla['Limite Inferior'].to_numpy(dtype=float)
+    # En centavos y diezmilésimas de punto porcentual: aritmética entera exacta
+    limites_centavos = np.rint(limites * 100).astype(np.int64)
+    cuotas_centavos = np.rint(tabla['Cuota fija'].to_numpy(dtype=float) * 100).astype(np.int64)
+    tasas = np.rint(tabla['Por ciento para Limite Inferior'].to_numpy(dtype=float) * 100).astype(np.int64)
+
+    bases = np.asarray(bases, dtype=float)
+    bases_centavos = np.rint(bases * 100).astype(np.int64)
+    tramo = np.clip(np.searchsorted(limites, bases, side='right') - 1, 0, None)
+    excedente = np.maximum(bases_centavos - limites_centavos[tramo], 0)
+    isr = _dividir_redondeando(cuotas_centavos[tramo] * 10000 + excedente * tasas[tramo], 10000)
+    return np.where(bases >= limites[0], isr / 100, 0.0)
+
+def calcular_imss_vectorizado(salarios_diarios, dias):
+    """
+    Cuota obrera IMSS para un arreglo de salarios diarios a la vez, con las
+    mismas tasas, factor de integración y redondeo por concepto que
+    CalculadoraIMSS.calcular_cuotas. Se opera en centavos enteros para que el
+    redondeo coincida con el de Decimal.
+
+    Args:
+        salarios_diarios: secuencia o numpy array de salarios diarios
+        dias: días cotizados (escalar o arreglo del mismo tamaño)
+
+    Returns:
+        numpy array con el total de la deducción IMSS
+    """
+    escala = 100000
+    centavos = np.rint(np.asarray(salarios_diarios, dtype=float) * 100).astype(np.int64)
+    dias = np.asarray(dias, dtype=np.int64)
+    factor = int(CalculadoraIMSS.FACTOR_INTEGRACION * 10000)
+    sbc = _dividir_redondeando(centavos * factor, 10000)
+    sbc_periodo = sbc * dias
+
+    total = np.zeros_like(sbc_periodo)
+    for concepto, tasa in CalculadoraIMSS.CUOTAS_IMSS.items():
+        if concepto != 'excedente_especies':
+            total += _dividir_redondeando(sbc_periodo * int(tasa * escala), escala)
+    tres_uma = int(3 * CalculadoraIMSS.UMA_2025 * 100)
+    tasa_excedente = int(CalculadoraIMSS.CUOTAS_IMSS['excedente_especies'] * escala)
+    total += _dividir_redondeando(np.maximum(sbc - tres_uma, 0) * tasa_excedente * dias, escala)
+    return total / 100
+
+@etapa('imss')
 def calcular_imss(salario_diario, dias_trabajados, incluir_detalle=True):
     """
     Calcula las deducciones del IMSS con desglose completo de cuotas y validaciones robustas
@@ -1023,84 +1131,14 @@ def calcular_imss(salario_diario, dias_trabajados, incluir_detalle=True):
         except (ValueError, TypeError) as e:
             raise ValueError("Días trabajados debe ser un número entero válido") from e
 
-        # Cálculo de cuotas IMSS
-        calculadora = CalculadoraIMSS(salario_diario_dec)
-        
-        # Calcular Salario Base de Cotización (SBC)
-        sbc_diario = calculadora.calcular_sbc().quantize(Decimal('0.01'))
-        sbc_periodo = (sbc_diario * Decimal(dias)).quantize(Decimal('0.01'))
-        
-        # Calcular todas las cuotas IMSS
-        cuotas = calculadora.calcular_cuotas(dias)
-        
-        # Calcular total de deducción
-        total_deduccion_dec = (
-            cuotas['prestaciones_dinero'] + 
-            cuotas['prestaciones_especies'] + 
-            cuotas['invalidez_vida'] + 
-            cuotas['cesantia_vejez'] +
-            cuotas['excedente_especies']
-        ).quantize(Decimal('0.01'))
-
-        # Función auxiliar para conversión segura a float
-        def safe_float(value):
-            """Convierte Decimal a float de forma segura"""
-            if isinstance(value, Decimal):
-                return float(value.quantize(Decimal('0.01')))
-            return float(value)
-        
-        # Estructura del resultado
+        # Copia de un nivel: quien llama puede modificar el resultado
         resultado = {
-            'prestaciones_dinero': safe_float(cuotas['prestaciones_dinero']),
-            'prestaciones_especies': safe_float(cuotas['prestaciones_especies']),
-            'invalidez_vida': safe_float(cuotas['invalidez_vida']),
-            'cesantia_vejez': safe_float(cuotas['cesantia_vejez']),
-            'excedente_especies': safe_float(cuotas['excedente_especies']),
-            'total_deduccion_imss': safe_float(total_deduccion_dec),
-            'sbc': {
-                'diario': safe_float(sbc_diario),
-                'periodo': safe_float(sbc_periodo),
-                'factor_integracion': float(CalculadoraIMSS.FACTOR_INTEGRACION),
-                'formula': f"{safe_float(salario_diario_dec)} × {float(CalculadoraIMSS.FACTOR_INTEGRACION)}"
-            },
-            'bases_calculo': {
-                'prestaciones': safe_float(sbc_diario),
-                'excedente': safe_float(cuotas.get('base_excedente', Decimal('0'))),
-                'tres_uma': safe_float(cuotas.get('tres_uma', Decimal('0')))
-            }
+            clave: dict(valor) if isinstance(valor, dict) else valor
+            for clave, valor in _imss_memo(_centavos_exactos(salario_diario_dec), dias, CalculadoraIMSS.AÑO).items()
         }
 
         if incluir_detalle:
-            # Calcular excedente sobre 3 UMA
-            excedente_calculado = max(Decimal('0'), sbc_diario - cuotas.get('tres_uma', Decimal('0'))).quantize(Decimal('0.01'))
-            
-            resultado.update({
-                'detalle_excedente': {
-                    'valor': safe_float(cuotas['excedente_especies']),
-                    'porcentaje': '0.40%',
-                    'base_calculo': safe_float(cuotas.get('base_excedente', Decimal('0'))),
-                    'limite': safe_float(cuotas.get('tres_uma', Decimal('0'))),
-                    'excedente_calculado': safe_float(excedente_calculado),
-                    'nota': 'Calculado sobre el excedente del SBC diario sobre 3 UMA'
-                },
-                'porcentajes': {
-                    'prestaciones_dinero': '0.25%',
-                    'prestaciones_especies': '0.375%',
-                    'invalidez_vida': '0.625%',
-                    'cesantia_vejez': '1.125%',
-                    'excedente_especies': '0.40%'
-                },
-                'metadatos': {
-                    'version_calculo': '1.3',
-                    'fecha_actualizacion': '2025-01-15',
-                    'notas': [
-                        'Cálculos según LSS vigente 2025',
-                        'Factor de integración: 1.0493',
-                        'UMA 2025: $113.14',
-                        'Todos los valores monetarios se redondean a 2 decimales'
-                    ]
-                }
-            })
+            explicar_imss(resultado, salario_diario_dec)
 
         return resultado
 
@@ -1112,6 +1150,59 @@ def calcular_imss(salario_diario, dias_trabajados, incluir_detalle=True):
             error_msg += f" - Detalles: {e.args[0]}"
         raise ValueError(error_msg) from e
 
+
+@lru_cache(maxsize=TAMANO_MEMO_IMSS)
+def _imss_memo(salario_diario_centavos, dias, año):
+    """Cuotas IMSS sin explicaciones; año solo forma parte de la llave"""
+    salario_diario_dec = _desde_centavos(salario_diario_centavos)
+
+    # Cálculo de cuotas IMSS
+    calculadora = CalculadoraIMSS(salario_diario_dec)
+    
+    # Calcular Salario Base de Cotización (SBC)
+    sbc_diario = calculadora.calcular_sbc().quantize(Decimal('0.01'))
+    sbc_periodo = (sbc_diario * Decimal(dias)).quantize(Decimal('0.01'))
+    
+    # Calcular todas las cuotas IMSS
+    cuotas = calculadora.calcular_cuotas(dias)
+    
+    # Calcular total de deducción
+    total_deduccion_dec = (
+        cuotas['prestaciones_dinero'] + 
+        cuotas['prestaciones_especies'] + 
+        cuotas['invalidez_vida'] + 
+        cuotas['cesantia_vejez'] +
+        cuotas['excedente_especies']
+    ).quantize(Decimal('0.01'))
+
+    # Función auxiliar para conversión segura a float
+    def safe_float(value):
+        """Convierte Decimal a float de forma segura"""
+        if isinstance(value, Decimal):
+            return float(value.quantize(Decimal('0.01')))
+        return float(value)
+    
+    # Estructura del resultado
+    resultado = {
+        'prestaciones_dinero': safe_float(cuotas['prestaciones_dinero']),
+        'prestaciones_especies': safe_float(cuotas['prestaciones_especies']),
+        'invalidez_vida': safe_float(cuotas['invalidez_vida']),
+        'cesantia_vejez': safe_float(cuotas['cesantia_vejez']),
+        'excedente_especies': safe_float(cuotas['excedente_especies']),
+        'total_deduccion_imss': safe_float(total_deduccion_dec),
+        'sbc': {
+            'diario': safe_float(sbc_diario),
+            'periodo': safe_float(sbc_periodo),
+            'factor_integracion': float(CalculadoraIMSS.FACTOR_INTEGRACION)
+        },
+        'bases_calculo': {
+            'prestaciones': safe_float(sbc_diario),
+            'excedente': safe_float(cuotas.get('base_excedente', Decimal('0'))),
+            'tres_uma': safe_float(cuotas.get('tres_uma', Decimal('0')))
+        }
+    }
+    return resultado
+
 from decimal import Decimal
 
 def calcular_base_gravable_isr(salario_bruto, pago_extra):
@@ -1232,7 +1323,123 @@ def verificar_pago_festivo_con_falta(empleado, fecha, pago_festivos):
     
     return pago_festivos
 
-def calcular_nomina_quincenal(empleado, dias_laborados=None, faltas_en_periodo=0, fecha_referencia=None):
+# =============================================
+# EXPLICACIONES DE LOS CÁLCULOS
+# =============================================
+# Fórmulas, porcentajes, notas y metadatos de los resultados. Salen solo de
+# los importes ya calculados, así que se arman al final del cálculo con
+# detalle=True o después, sobre los cálculos guardados de una nómina.
+
+PORCENTAJES_IMSS = {
+    'prestaciones_dinero': '0.25%',
+    'prestaciones_especies': '0.375%',
+    'invalidez_vida': '0.625%',
+    'cesantia_vejez': '1.125%',
+    'excedente_especies': '0.40%'
+}
+
+METADATOS_IMSS = {
+    'version_calculo': '1.3',
+    'fecha_actualizacion': '2025-01-15',
+    'notas': [
+        'Cálculos según LSS vigente 2025',
+        'Factor de integración: 1.0493',
+        'UMA 2025: $113.14',
+        'Todos los valores monetarios se redondean a 2 decimales'
+    ]
+}
+
+NOTAS_AJUSTES = {
+    'quincenal': {
+        'dias_no_trabajados_por_ingreso': 'Ajuste por ingreso posterior al inicio del periodo',
+        'faltas_injustificadas': 'Solo las faltas injustificadas generan descuento',
+        'faltas_justificadas': 'Las faltas justificadas no generan descuento'
+    },
+    'mensual': {
+        'dias_no_trabajados_por_ingreso': 'Días no trabajados por ingreso posterior'
+    }
+}
+
+CONFIGURACION_SEMANAL = {
+    'dias_semana': 7,
+    'factor_descuento_falta': 1.1667,
+    'version_calculo': '2.1',
+    'logica_faltas': 'compatible_con_quincenal'
+}
+
+VERSION_CALCULO_MENSUAL = '4.3'
+
+
+def _formula_sbc(salario_diario):
+    return f"{float(salario_diario)} × {float(CalculadoraIMSS.FACTOR_INTEGRACION)}"
+
+
+def explicar_imss(imss, salario_diario):
+    """Agrega a un resultado de calcular_imss sin detalle la fórmula del SBC, el excedente y los porcentajes"""
+    bases = imss.get('bases_calculo')
+    if not isinstance(bases, dict):
+        return imss  # Exento por salario mínimo: no hay cuotas que explicar
+
+    imss['sbc']['formula'] = _formula_sbc(Decimal(str(salario_diario)).quantize(Decimal('0.01')))
+    excedente_calculado = max(
+        Decimal('0'), Decimal(str(imss['sbc']['diario'])) - Decimal(str(bases['tres_uma']))
+    ).quantize(Decimal('0.01'))
+    imss.update({
+        'detalle_excedente': {
+            'valor': imss['excedente_especies'],
+            'porcentaje': PORCENTAJES_IMSS['excedente_especies'],
+            'base_calculo': bases['excedente'],
+            'limite': bases['tres_uma'],
+            'excedente_calculado': float(excedente_calculado),
+            'nota': 'Calculado sobre el excedente del SBC diario sobre 3 UMA'
+        },
+        'porcentajes': dict(PORCENTAJES_IMSS),
+        'metadatos': {**METADATOS_IMSS, 'notas': list(METADATOS_IMSS['notas'])}
+    })
+    return imss
+
+
+def explicar_calculos(calculos, fecha_calculo=None):
+    """
+    Agrega (en el mismo diccionario) las explicaciones a un resultado de
+    calcular_nomina_semanal/quincenal/mensual hecho con detalle=False o
+    guardado en Nomina.calculos. Con otras formas de cálculos no hace nada;
+    aplicarla dos veces da lo mismo.
+
+    fecha_calculo: texto 'YYYY-MM-DD HH:MM:SS' para los metadatos del cálculo
+    mensual (por omisión, ahora); si ya tiene metadatos se conservan.
+    """
+    tipo = (calculos.get('periodo') or {}).get('tipo') if isinstance(calculos, dict) else None
+    if tipo not in ('semanal', 'quincenal', 'mensual'):
+        return calculos
+
+    empleado = calculos.get('empleado') or {}
+    salario_diario = empleado.get('salario_diario')
+    if salario_diario is not None:
+        if isinstance(calculos.get('sbc'), dict):
+            calculos['sbc']['formula'] = _formula_sbc(salario_diario)
+        imss = ((calculos.get('deducciones') or {}).get('detalle') or {}).get('imss')
+        if isinstance(imss, dict):
+            explicar_imss(imss, salario_diario)
+
+    resumen = calculos.get('resumen') or {}
+    for concepto, nota in NOTAS_AJUSTES.get(tipo, {}).items():
+        ajuste = (resumen.get('ajustes') or {}).get(concepto)
+        if isinstance(ajuste, dict):
+            ajuste['nota'] = nota
+
+    if tipo == 'semanal':
+        calculos['configuracion'] = dict(CONFIGURACION_SEMANAL)
+    elif tipo == 'mensual' and resumen and 'metadatos' not in resumen:
+        resumen['metadatos'] = {
+            'version_calculo': VERSION_CALCULO_MENSUAL,
+            'fecha_calculo': fecha_calculo or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'empleado_id': empleado.get('id', 0)
+        }
+    return calculos
+
+
+def calcular_nomina_quincenal(empleado, dias_laborados=None, faltas_en_periodo=0, fecha_referencia=None, detalle=True):
     """
     Calcula la nómina quincenal para un empleado con estructura completa.
     Ahora diferencia entre faltas justificadas e injustificadas.
@@ -1242,6 +1449,7 @@ def calcular_nomina_quincenal(empleado, dias_laborados=None, faltas_en_periodo=0
         dias_laborados: Días laborados (opcional, si no se proporciona se calculan)
         faltas_en_periodo: Faltas en el periodo (opcional, si no se proporciona se calculan)
         fecha_referencia: Fecha de referencia para el cálculo (opcional, por defecto hoy)
+        detalle: Si es False se omiten fórmulas, notas y metadatos (ver explicar_calculos)
     
     Returns:
         dict: Estructura completa con todos los cálculos de nómina
@@ -1386,16 +1594,15 @@ def calcular_nomina_quincenal(empleado, dias_laborados=None, faltas_en_periodo=0
             }
             total_imss = Decimal('0')
         else:
-            imss_data = calcular_imss(empleado.salario_diario, total_dias_periodo)
+            imss_data = calcular_imss(empleado.salario_diario, total_dias_periodo, incluir_detalle=False)
             total_imss = Decimal(str(imss_data['total_deduccion_imss'])).quantize(Decimal('0.01'))
 
         # 8. Cálculo de pagos extras (festivos y prima dominical)
         pago_extra = calcular_pago_extra(empleado, fecha_inicio, fecha_fin)
         
         # APLICAR VERIFICACIÓN ADICIONAL PARA FALTAS JUSTIFICADAS EN FESTIVOS
-        for festivo in DIAS_FESTIVOS_2025:
-            if fecha_inicio <= festivo <= fecha_fin:
-                pago_extra = verificar_pago_festivo_con_falta(empleado, festivo, pago_extra)
+        for festivo in calendario_nomina(fecha_inicio, fecha_fin, patron_descanso(empleado.dias_descanso)).festivos:
+            pago_extra = verificar_pago_festivo_con_falta(empleado, festivo, pago_extra)
         
         prima_dominical = Decimal(str(pago_extra['prima_dominical'])).quantize(Decimal('0.01'))
         pago_festivos = Decimal(str(pago_extra['pago_festivos'])).quantize(Decimal('0.01'))
@@ -1480,8 +1687,7 @@ def calcular_nomina_quincenal(empleado, dias_laborados=None, faltas_en_periodo=0
             'sbc': {
                 'diario': float(sbc_diario),
                 'periodo': float(sbc_periodo),
-                'factor_integracion': float(CalculadoraIMSS.FACTOR_INTEGRACION),
-                'formula': f"{float(salario_diario)} × {float(CalculadoraIMSS.FACTOR_INTEGRACION)}"
+                'factor_integracion': float(CalculadoraIMSS.FACTOR_INTEGRACION)
             },
             'percepciones': {
                 'sueldo': float(salario_bruto),
@@ -1504,18 +1710,15 @@ def calcular_nomina_quincenal(empleado, dias_laborados=None, faltas_en_periodo=0
                 'ajustes': {
                     'dias_no_trabajados_por_ingreso': {
                         'dias': dias_no_trabajados_por_ingreso,
-                        'monto': float(descuento_ingreso),
-                        'nota': 'Ajuste por ingreso posterior al inicio del periodo'
+                        'monto': float(descuento_ingreso)
                     },
                     'faltas_injustificadas': {
                         'dias': faltas_injustificadas,
-                        'monto': float(descuento_faltas),
-                        'nota': 'Solo las faltas injustificadas generan descuento'
+                        'monto': float(descuento_faltas)
                     },
                     'faltas_justificadas': {
                         'dias': faltas_justificadas,
-                        'monto': 0.0,
-                        'nota': 'Las faltas justificadas no generan descuento'
+                        'monto': 0.0
                     },
                     'total_ajustes': float(descuento_ingreso + descuento_faltas)
                 },
@@ -1603,14 +1806,14 @@ def calcular_nomina_quincenal(empleado, dias_laborados=None, faltas_en_periodo=0
         if not mostrar_sueldo_en_resumen:
             del resultado['resumen']['total_percepciones']['Sueldo']
 
-        return serialize_decimal(resultado)
+        return explicar_calculos(resultado) if detalle else resultado
         
     except Exception as e:
         raise ValueError(f"Error en cálculo de nómina quincenal: {str(e)}")
 
 
-def calcular_nomina_semanal(empleado, dias_laborados=None, fecha_referencia=None, faltas_en_periodo=None):
-    """Calcula la nómina semanal con serialización adecuada de Decimal a float"""
+def calcular_nomina_semanal(empleado, dias_laborados=None, fecha_referencia=None, faltas_en_periodo=None, detalle=True):
+    """Calcula la nómina semanal; con detalle=False sin fórmulas ni configuración (ver explicar_calculos)"""
     try:
         # 1. Configuración inicial del periodo
         fecha_inicio = fecha_referencia if fecha_referencia else date.today() - timedelta(days=date.today().weekday())
@@ -1725,7 +1928,7 @@ def calcular_nomina_semanal(empleado, dias_laborados=None, fecha_referencia=None
             }
             total_imss = Decimal('0')
         else:
-            imss_data = calcular_imss(empleado.salario_diario, 7)
+            imss_data = calcular_imss(empleado.salario_diario, 7, incluir_detalle=False)
             total_imss = Decimal(str(imss_data['total_deduccion_imss']))
 
         # 10. Pago extra
@@ -1820,8 +2023,7 @@ def calcular_nomina_semanal(empleado, dias_laborados=None, fecha_referencia=None
             'sbc': {
                 'diario': float(sbc_diario),
                 'periodo': float(sbc_diario * Decimal('7')),
-                'factor_integracion': float(CalculadoraIMSS.FACTOR_INTEGRACION),
-                'formula': f"{float(empleado.salario_diario)} × {float(CalculadoraIMSS.FACTOR_INTEGRACION)}"
+                'factor_integracion': float(CalculadoraIMSS.FACTOR_INTEGRACION)
             },
             'percepciones': {
                 'sueldo': float(salario_bruto),
@@ -1898,25 +2100,20 @@ def calcular_nomina_semanal(empleado, dias_laborados=None, fecha_referencia=None
                 },
                 'neto_a_pagar': float(salario_neto),
                 'subsidio_aplicado': subsidio_info
-            },
-            'configuracion': {
-                'dias_semana': 7,
-                'factor_descuento_falta': 1.1667,
-                'version_calculo': '2.1',
-                'logica_faltas': 'compatible_con_quincenal'
             }
         }
 
-        return serialize_decimal(resultado)
+        return explicar_calculos(resultado) if detalle else resultado
 
     except Exception as e:
         raise ValueError(f"Error en cálculo de nómina semanal: {str(e)}")
 
 
-def calcular_nomina_mensual(empleado, dias_laborados=None, faltas_en_periodo=0, fecha_referencia=None):
+def calcular_nomina_mensual(empleado, dias_laborados=None, faltas_en_periodo=0, fecha_referencia=None, detalle=True):
     """
     Calcula nómina mensual con estructura completa.
     Aplica subsidio mensual según tabla 2025 cuando base_gravable <= 10171.00
+    Con detalle=False se omiten fórmulas, notas y metadatos (ver explicar_calculos).
     """
     from decimal import Decimal, getcontext, InvalidOperation
     from datetime import date, datetime, timedelta
@@ -1966,8 +2163,7 @@ def calcular_nomina_mensual(empleado, dias_laborados=None, faltas_en_periodo=0,
             'ajustes': {
                 'dias_no_trabajados_por_ingreso': {
                     'dias': 0,
-                    'monto': 0.0,
-                    'nota': 'Días no trabajados por ingreso posterior'
+                    'monto': 0.0
                 },
                 'total_ajustes': 0.0
             },
@@ -1984,11 +2180,6 @@ def calcular_nomina_mensual(empleado, dias_laborados=None, faltas_en_periodo=0,
                 'total_deducciones': 0.0
             },
             'neto_a_pagar': 0.0,
-            'metadatos': {
-                'version_calculo': '4.3',
-                'fecha_calculo': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'empleado_id': getattr(empleado, 'id', 0)
-            },
             'salario_bruto_efectivo': 0.0,
             'dias_trabajados_a_partir_ingreso': 0
         }
@@ -2008,8 +2199,7 @@ def calcular_nomina_mensual(empleado, dias_laborados=None, faltas_en_periodo=0,
             
             resumen['ajustes']['dias_no_trabajados_por_ingreso'] = {
                 'dias': dias_no_trabajados_por_ingreso,
-                'monto': float(monto_descuento_ingreso),
-                'nota': 'Días no trabajados por ingreso posterior'
+                'monto': float(monto_descuento_ingreso)
             }
             resumen['ajustes']['total_ajustes'] = float(monto_descuento_ingreso)
 
@@ -2081,7 +2271,7 @@ def calcular_nomina_mensual(empleado, dias_laborados=None, faltas_en_periodo=0,
             }
             total_imss = Decimal('0')
         else:
-            imss_data = calcular_imss(salario_diario, total_dias_periodo)
+            imss_data = calcular_imss(salario_diario, total_dias_periodo, incluir_detalle=False)
             total_imss = Decimal(str(imss_data['total_deduccion_imss'])).quantize(Decimal('0.01'))
 
         resumen['deducciones']['IMSS'] = float(total_imss)
@@ -2122,11 +2312,9 @@ def calcular_nomina_mensual(empleado, dias_laborados=None, faltas_en_periodo=0,
         }
 
         # 15. CÁLCULO DEL ISR CON SUBSIDIO MENSUAL
-        if aplica_exencion_isr:
-            isr_retenido = Decimal('0')
-        else:
-            # Calcular ISR pasando el mes del periodo (fecha_ref.month)
-            isr_retenido = Decimal(str(calcular_isr(float(base_gravable), 'mensual', fecha_ref.month)))
+        # Calcular ISR pasando el mes del periodo (fecha_ref.month); el determinado va al detalle aunque haya exención
+        isr_determinado = Decimal(str(calcular_isr(float(base_gravable), 'mensual', fecha_ref.month)))
+        isr_retenido = Decimal('0') if aplica_exencion_isr else isr_determinado
 
         isr_retenido = isr_retenido.quantize(Decimal('0.01'))
         resumen['deducciones']['ISR'] = float(isr_retenido)
@@ -2177,8 +2365,7 @@ def calcular_nomina_mensual(empleado, dias_laborados=None, faltas_en_periodo=0,
             'sbc': {
                 'diario': float(sbc_diario),
                 'periodo': float(sbc_periodo),
-                'factor_integracion': float(CalculadoraIMSS.FACTOR_INTEGRACION),
-                'formula': f"{float(salario_diario)} × {float(CalculadoraIMSS.FACTOR_INTEGRACION)}"
+                'factor_integracion': float(CalculadoraIMSS.FACTOR_INTEGRACION)
             },
             'percepciones': {
                 'pago_extra': float(total_pago_extra),
@@ -2194,7 +2381,7 @@ def calcular_nomina_mensual(empleado, dias_laborados=None, faltas_en_periodo=0,
                     'isr': {
                         'base_gravable': float(base_gravable),
                         'base_gravable_sin_ajuste': float(base_gravable_sin_ajuste),
-                        'isr_determinado': float(Decimal(str(calcular_isr(float(base_gravable), 'mensual', fecha_ref.month)))),
+                        'isr_determinado': float(isr_determinado),
                         'isr_final': float(isr_retenido),
                         'aplica_subsidio_mensual': base_gravable <= Decimal('10171.00'),
                         'mes_aplicado': fecha_ref.month,
@@ -2232,7 +2419,7 @@ def calcular_nomina_mensual(empleado, dias_laborados=None, faltas_en_periodo=0,
             }
         }
 
-        return serialize_decimal(resultado)
+        return explicar_calculos(resultado) if detalle else resultado
 
     except ValueError as ve:
         raise ValueError(f"Error en nómina mensual para {getattr(empleado, 'nombre_completo', 'empleado')}: {str(ve)}")
@@ -2243,28 +2430,32 @@ def calcular_nomina_mensual(empleado, dias_laborados=None, faltas_en_periodo=0,
         raise ValueError(error_msg)
 
 def calcular_nomina_empleado(empleado, periodo='quincenal', dias_laborados=None, 
-                           faltas_en_periodo=0, fecha_referencia=None):
+                           faltas_en_periodo=0, fecha_referencia=None, detalle=True):
     """
-    Función principal que redirige al cálculo específico según el periodo
+    Función principal que redirige al cálculo específico según el periodo.
+    Con detalle=False devuelve el resultado compacto (ver explicar_calculos).
     """
     if periodo == 'mensual':
         return calcular_nomina_mensual(
             empleado, 
             dias_laborados=dias_laborados,
             faltas_en_periodo=faltas_en_periodo,
-            fecha_referencia=fecha_referencia
+            fecha_referencia=fecha_referencia,
+            detalle=detalle
         )
     elif periodo == 'semanal':
         return calcular_nomina_semanal(
             empleado,
             dias_laborados=dias_laborados,
             faltas_en_periodo=faltas_en_periodo,
-            fecha_referencia=fecha_referencia
+            fecha_referencia=fecha_referencia,
+            detalle=detalle
         )
     else:  # quincenal
         return calcular_nomina_quincenal(
             empleado,
             dias_laborados=dias_laborados,
             faltas_en_periodo=faltas_en_periodo,
-            fecha_referencia=fecha_referencia
+            fecha_referencia=fecha_referencia,
+            detalle=detalle
         )
\ No newline at end of file
@@ -78,8 +78,8 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework import viewsets, status, permissions, generics
 from rest_framework.response import Response
-from rest_framework.decorators import action, permission_classes
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ParseError, PermissionDenied
 from io import StringIO
 from .permissions import IsAdminOrEmpresaOwner, IsAdminOrSameEmpresa, EsAdministradorEmpresa
 from .models import Empresa, Empleado, Nomina, User
@@ -93,7 +93,28 @@ from .serializers import (
 )
 from .permissions import IsAdminOrEmpresaOwner, IsAdminOrSameEmpresa, EsAdministradorEmpresa
 from .utils import CalculadoraIMSS, calcular_nomina_empleado, calcular_isr, calcular_imss, calcular_nomina_semanal, calcular_semana_laboral
-from .periodos import generar_periodos_nominales
+from .periodos import generar_periodos_nominales, leer_año
+from .instrumentacion import medir_etapa
+from .faltas import calendario_del_periodo, registrar_faltas_lote
+from .importacion import ErrorArchivo, importar_empleados, leer_filas
+from .models import AcumuladoAnual
+from .ajuste_anual import calcular_ajuste_anual
+from .prestaciones import calcular_prestacion, guardar_prestacion
+from .simulacion import simular_ajuste_salarial
+from .imss_patronal import lineas_liquidacion, meses_de, resumen_liquidacion
+from .cfdi import cargar_documentos, generar_documentos, nominas_del_periodo, zip_en_streaming
+from .dispersion import ErrorDispersion, generar_dispersion, obtener_plantilla, revisar_dispersion
+from .replicas import LecturaReplicaMixin
+from .shards import EmpresaShardMixin, alias_actual, ids_empresas
+from .condicional import ListaCondicionalMixin, respuesta_catalogo
+from django.http import StreamingHttpResponse
+from .serializers import AcumuladoAnualSerializer
+from rest_framework.parsers import MultiPartParser
+from . import metricas, renderers
+from .utils import estadisticas_memo
+from .prevalidacion import ids_sin_bloqueos, validar_corrida
+import time
+from itertools import islice
 from rest_framework_simplejwt.tokens import RefreshToken
 
 # 2. CustomTokenObtainPairSerializer (justo después de las importaciones)
@@ -189,9 +210,11 @@ class UserRegistrationView(generics.CreateAPIView):
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class EmpresaViewSet(viewsets.ModelViewSet):
+class EmpresaViewSet(EmpresaShardMixin, LecturaReplicaMixin, viewsets.ModelViewSet):
     queryset = Empresa.objects.all()
     serializer_class = EmpresaSerializer
+    campo_empresa_url = 'pk'
+    acciones_replica = ('list', 'retrieve', 'cuotas_imss', 'liquidacion_bimestral')
 
     def get_permissions(self):
         """
@@ -225,12 +248,51 @@ class EmpresaViewSet(viewsets.ModelViewSet):
             # Registro inicial sin usuario autenticado
             serializer.save()
 
+    def _periodo_imss(self, request, campo):
+        """(anio, valor) de la query string; ValueError si no son numéricos"""
+        anio = request.query_params.get('anio') or str(timezone.now().year)
+        valor = request.query_params.get(campo)
+        if not anio.isdigit() or not str(valor).isdigit():
+            raise ValueError(f'Se requieren anio y {campo} numéricos')
+        return int(anio), int(valor)
+
+    @action(detail=True, methods=['get'], url_path='cuotas-imss')
+    def cuotas_imss(self, request, pk=None):
+        """Cuotas obrero-patronales de la empresa por mes (?anio=&mes=) o bimestre (?anio=&bimestre=)"""
+        empresa = self.get_object()
+        campo = 'bimestre' if 'bimestre' in request.query_params else 'mes'
+        try:
+            anio, valor = self._periodo_imss(request, campo)
+            with medir_etapa('calculo'):
+                resultado = resumen_liquidacion(empresa, anio, **{campo: valor})
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado)
+
+    @action(detail=True, methods=['get'], url_path='liquidacion-bimestral')
+    def liquidacion_bimestral(self, request, pk=None):
+        """Archivo CSV de la liquidación bimestral IMSS/INFONAVIT (?anio=&bimestre=), en streaming"""
+        empresa = self.get_object()
+        try:
+            anio, bimestre = self._periodo_imss(request, 'bimestre')
+            meses_de(anio, bimestre=bimestre)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        respuesta = StreamingHttpResponse(lineas_liquidacion(empresa, anio, bimestre), content_type='text/csv')
+        respuesta['Content-Disposition'] = (
+            f'attachment; filename="liquidacion_{empresa.id}_{anio}_B{bimestre}.csv"'
+        )
+        return respuesta
+
 
 @method_decorator(csrf_exempt, name='dispatch')
-class EmpleadoViewSet(viewsets.ModelViewSet):
+class EmpleadoViewSet(EmpresaShardMixin, LecturaReplicaMixin, ListaCondicionalMixin, viewsets.ModelViewSet):
     queryset = Empleado.objects.all()
     serializer_class = EmpleadoSerializer
     permission_classes = [IsAuthenticated, IsAdminOrSameEmpresa]
+    acciones_replica = ('list', 'retrieve', 'acumulado')
+    campos_firma = ('fecha_actualizacion', 'empresa__fecha_actualizacion')
 
     def handle_exception(self, exc):
         if isinstance(exc, ValidationError) and 'rfc' in exc.message_dict:
@@ -246,9 +308,11 @@ class EmpleadoViewSet(viewsets.ModelViewSet):
         user = self.request.user
         
         if not user.is_superuser:
-            queryset = queryset.filter(empresa__usuarios=user)
+            queryset = queryset.filter(empresa_id__in=ids_empresas(user))
         
         if empresa_id := self.request.query_params.get('empresa_id'):
+            if not empresa_id.isdigit():
+                raise ParseError('empresa_id debe ser numérico')
             queryset = queryset.filter(empresa_id=empresa_id)
             
         return queryset.select_related('empresa')
@@ -300,37 +364,224 @@ class EmpleadoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=True, methods=['get'], url_path='acumulado')
+    def acumulado(self, request, pk=None):
+        """Acumulado del año (?anio=, por defecto el actual): lectura de un solo renglón"""
+        empleado = self.get_object()
+        anio = request.query_params.get('anio') or str(timezone.now().year)
+        if not anio.isdigit():
+            return Response(
+                {'error': 'anio debe ser numérico (YYYY)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= int(anio) <= 9999:
+            return Response({'error': 'El año debe estar entre 1 y 9999'}, status=status.HTTP_400_BAD_REQUEST)
+        acumulado = AcumuladoAnual.objects.filter(empleado=empleado, anio=int(anio)).first()
+        if acumulado is None:
+            acumulado = AcumuladoAnual(empleado=empleado, empresa_id=empleado.empresa_id, anio=int(anio))
+        return Response(AcumuladoAnualSerializer(acumulado).data)
+
+    @action(detail=False, methods=['post'], url_path='importar', parser_classes=[MultiPartParser])
+    def importar(self, request):
+        """
+        Importación masiva desde CSV/XLSX (campo 'archivo') para 'empresa_id'.
+        Con 'solo_validar=true' devuelve el reporte sin insertar (creados en 0;
+        200 si todas las filas son válidas, 400 si alguna no).
+        """
+        archivo = request.FILES.get('archivo')
+        empresa_id = request.data.get('empresa_id')
+        if not archivo or not empresa_id:
+            return Response(
+                {'error': 'Se requieren archivo y empresa_id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        empresas = Empresa.objects.all() if request.user.is_superuser else request.user.empresas.all()
+        empresa = empresas.filter(pk=empresa_id).first() if str(empresa_id).isdigit() else None
+        if not empresa:
+            return Response(
+                {'error': 'Empresa no encontrada o sin permisos'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        solo_validar = str(request.data.get('solo_validar', '')).lower() in ('1', 'true', 'si', 'sí')
+        try:
+            reporte = importar_empleados(leer_filas(archivo, archivo.name), empresa, solo_validar=solo_validar)
+        except ErrorArchivo as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not reporte['errores']:
+            status_code = status.HTTP_200_OK if solo_validar else status.HTTP_201_CREATED
+        elif reporte['creados'] and not solo_validar:
+            status_code = status.HTTP_207_MULTI_STATUS
+        else:
+            status_code = status.HTTP_400_BAD_REQUEST
+        return Response(dict(reporte, empresa_id=empresa.id, solo_validar=solo_validar), status=status_code)
+
+# =============================================
+# PROCESAMIENTO DE NÓMINA POR EMPLEADO
+# =============================================
+
+# Empleados que se leen por consulta en procesar_nomina?stream=ndjson
+TAMANO_LOTE_STREAMING = 500
+
+# Llaves foráneas de Nomina que clean_fields() consultaría una por una
+LLAVES_NOMINA = ['empleado', 'empresa', 'creado_por']
+
+
+def _decimal_seguro(value, default='0'):
+    """Convierte un valor a Decimal de forma segura"""
+    try:
+        return Decimal(str(value))
+    except (TypeError, ValueError, InvalidOperation):
+        return Decimal(default)
+
+
+def _valor_anidado(data, keys, default=0):
+    """Obtiene un valor anidado de un diccionario de forma segura"""
+    for key in keys:
+        try:
+            data = data[key]
+        except (KeyError, TypeError):
+            return default
+    return data
+
+
+class _TotalesNomina:
+    """Totales del resumen financiero, acumulados nómina por nómina"""
+
+    def __init__(self):
+        self.nominas = 0
+        self.total_nomina = Decimal('0')
+        self.total_percepciones = Decimal('0')
+        self.total_deducciones = Decimal('0')
+
+    def agregar(self, nomina):
+        self.nominas += 1
+        self.total_nomina += _decimal_seguro(nomina['salario_neto'])
+        self.total_percepciones += _decimal_seguro(_valor_anidado(nomina, ['calculos', 'percepciones', 'total']))
+        self.total_deducciones += _decimal_seguro(_valor_anidado(nomina, ['calculos', 'deducciones', 'total']))
+
+    def resumen(self):
+        promedio = self.total_nomina / self.nominas if self.nominas else Decimal('0')
+        return {
+            'total_nomina': str(self.total_nomina),
+            'promedio_nomina': str(promedio),
+            'total_deducciones': str(self.total_deducciones),
+            'total_percepciones': str(self.total_percepciones)
+        }
+
+
+def _fechas_del_periodo(periodo_seleccionado, tipo_periodo):
+    """
+    Fechas de inicio y fin del periodo. En la segunda quincena ajusta
+    fecha_fin (y total_dias) al último día del mes. ValueError si el
+    periodo trae fechas mal formadas.
+    """
+    fecha_inicio = datetime.strptime(periodo_seleccionado['fecha_inicio'], '%Y-%m-%d').date()
+    fecha_fin = datetime.strptime(periodo_seleccionado['fecha_fin'], '%Y-%m-%d').date()
+
+    # Validación adicional para quincenas
+    if tipo_periodo == 'QUINCENAL' and fecha_inicio.day > 15:  # Segunda quincena
+        # Calcular días exactos de la quincena
+        if fecha_inicio.month == 12:
+            siguiente_mes = date(fecha_inicio.year + 1, 1, 1)
+        else:
+            siguiente_mes = date(fecha_inicio.year, fecha_inicio.month + 1, 1)
+        ultimo_dia = (siguiente_mes - timedelta(days=1)).day
+        dias_quincena = ultimo_dia - 15
+
+        # Actualizar fecha_fin con el cálculo preciso
+        fecha_fin = date(fecha_inicio.year, fecha_inicio.month, ultimo_dia)
+        periodo_seleccionado['fecha_fin'] = fecha_fin.strftime('%Y-%m-%d')
+        periodo_seleccionado['total_dias'] = dias_quincena
+    return fecha_inicio, fecha_fin
+
+
+def _error_de_empleado(empleado, e, periodo_seleccionado):
+    """Renglón de errores de procesar_nomina para la excepción de un empleado"""
+    if isinstance(e, ValidationError):
+        metricas.incrementar('gestion_errores_nomina_total', tipo_error='ValidationError')
+        return {
+            'empleado': empleado.nombre_completo,
+            'error': str(e),
+            'tipo_error': 'ValidationError'
+        }
+
+    # Extraer solo el mensaje de error, no el objeto completo
+    error_message = str(e)
+    
+    # Si el error es un objeto con estructura problemática, extraer solo el mensaje
+    if hasattr(e, 'args') and e.args and isinstance(e.args[0], dict):
+        error_obj = e.args[0]
+        if 'error' in error_obj and isinstance(error_obj['error'], str):
+            error_message = error_obj['error']
+        elif 'message' in error_obj and isinstance(error_obj['message'], str):
+            error_message = error_obj['message']
+    
+    metricas.incrementar('gestion_errores_nomina_total', tipo_error=type(e).__name__)
+    return {
+        'empleado': empleado.nombre_completo,
+        'id_empleado': empleado.id,
+        'error': error_message,  # Solo el mensaje, no el objeto
+        'periodo': periodo_seleccionado['etiqueta'],
+        'tipo_error': type(e).__name__
+    }
+
+
+def _uso_del_memo(antes):
+    """
+    Aciertos y fallos de los memos de cálculo desde antes (una lectura de
+    estadisticas_memo()); también se suman a las métricas. Con varios hilos
+    por proceso incluye los de las corridas simultáneas.
+    """
+    uso = {}
+    for calculo, despues in estadisticas_memo().items():
+        uso[calculo] = {
+            'aciertos': despues['hits'] - antes[calculo]['hits'],
+            'fallos': despues['misses'] - antes[calculo]['misses'],
+        }
+        for resultado, cantidad in uso[calculo].items():
+            if cantidad:
+                metricas.incrementar('gestion_memo_calculos_total', cantidad, calculo=calculo, resultado=resultado)
+    return uso
+
+
 @method_decorator(csrf_exempt, name='dispatch')
-class NominaViewSet(viewsets.ModelViewSet):
+class NominaViewSet(EmpresaShardMixin, LecturaReplicaMixin, ListaCondicionalMixin, viewsets.ModelViewSet):
     queryset = Nomina.objects.all()
     serializer_class = NominaSerializer
     permission_classes = [IsAuthenticated, IsAdminOrSameEmpresa]
+    # Listas, reportes y exportaciones; calcular* escriben nóminas y van a la primaria
+    acciones_replica = ('list', 'retrieve', 'list_periodos', 'ajuste_anual', 'cfdi', 'dispersion', 'prevalidar')
+    campos_firma = ('fecha_actualizacion', 'empleado__fecha_actualizacion', 'empresa__fecha_actualizacion')
 
     def get_queryset(self):
         queryset = self.queryset
         user = self.request.user
         
         if not user.is_superuser:
-            queryset = queryset.filter(empresa__usuarios=user)
+            queryset = queryset.filter(empresa_id__in=ids_empresas(user))
             
         return queryset.select_related('empleado', 'empresa')
 
     def perform_create(self, serializer):
         serializer.save(creado_por=self.request.user)
 
+    def get_serializer_context(self):
+        """Las explicaciones de los cálculos van en el detalle de una nómina o con ?detalle=1"""
+        contexto = super().get_serializer_context()
+        contexto['detalle'] = self.action == 'retrieve' or self.request.query_params.get('detalle') == '1'
+        return contexto
+
 
     @action(detail=False, methods=['post'])
     def procesar_nomina(self, request):
-        # Al inicio de procesar_nomina
-        print("=== DEBUG TIMEZONE ===")
-        print("Timezone actual:", timezone.get_current_timezone_name())
-        print("USE_TZ:", settings.USE_TZ)
-        print("Fecha ahora:", timezone.now().date())
-        print("Fecha ahora naive:", datetime.now().date())
         """
         Procesa la nómina para todos los empleados activos de una empresa en un periodo específico
         con manejo correcto de días festivos según días de descanso del empleado.
         Incluye transacciones atómicas y manejo robusto de errores.
+        Con ?stream=ndjson responde en streaming (ver _procesar_en_streaming).
         """
         try:
             # =============================================
@@ -384,24 +635,7 @@ class NominaViewSet(viewsets.ModelViewSet):
             # 3. VALIDACIÓN Y CONFIGURACIÓN DE FECHAS
             # =============================================
             try:
-                fecha_inicio = datetime.strptime(periodo_seleccionado['fecha_inicio'], '%Y-%m-%d').date()
-                fecha_fin = datetime.strptime(periodo_seleccionado['fecha_fin'], '%Y-%m-%d').date()
-                
-                # Validación adicional para quincenas
-                if tipo_periodo == 'QUINCENAL' and fecha_inicio.day > 15:  # Segunda quincena
-                    # Calcular días exactos de la quincena
-                    if fecha_inicio.month == 12:
-                        siguiente_mes = date(fecha_inicio.year + 1, 1, 1)
-                    else:
-                        siguiente_mes = date(fecha_inicio.year, fecha_inicio.month + 1, 1)
-                    ultimo_dia = (siguiente_mes - timedelta(days=1)).day
-                    dias_quincena = ultimo_dia - 15
-                    
-                    # Actualizar fecha_fin con el cálculo preciso
-                    fecha_fin = date(fecha_inicio.year, fecha_inicio.month, ultimo_dia)
-                    periodo_seleccionado['fecha_fin'] = fecha_fin.strftime('%Y-%m-%d')
-                    periodo_seleccionado['total_dias'] = dias_quincena
-                    
+                fecha_inicio, fecha_fin = _fechas_del_periodo(periodo_seleccionado, tipo_periodo)
             except ValueError as e:
                 return Response(
                     {
@@ -419,7 +653,12 @@ class NominaViewSet(viewsets.ModelViewSet):
                 empresa=empresa,
                 activo=True
             ).select_related('empresa')
+            en_streaming = request.query_params.get('stream') == 'ndjson'
             
+            if not en_streaming:
+                with medir_etapa('carga'):
+                    list(empleados)  # Llena la caché del queryset
+
             if not empleados.exists():
                 return Response(
                     {
@@ -429,82 +668,26 @@ class NominaViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
             
+            contexto = (empresa, periodo_seleccionado, tipo_periodo, fecha_inicio, fecha_fin, request.user)
+            if en_streaming:
+                return StreamingHttpResponse(
+                    self._procesar_en_streaming(empleados, *contexto), content_type='application/x-ndjson'
+                )
+
             nominas = []
             errores = []
+            memo_inicial = estadisticas_memo()
+            # Los empleados sin bloqueos de prevalidacion no repiten validate_unique() ni las llaves foráneas
+            with medir_etapa('validacion'):
+                validados = ids_sin_bloqueos(empleados, fecha_inicio, fecha_fin)
             
             try:
-                with transaction.atomic():  # Transacción global para todo el procesamiento
+                with transaction.atomic(using=alias_actual()):  # Transacción global para todo el procesamiento
                     for empleado in empleados:
                         try:
-                            # Intenta obtener la nómina existente primero
-                            nomina, created = Nomina.objects.get_or_create(
-                                empleado=empleado,
-                                fecha_inicio=fecha_inicio,
-                                fecha_fin=fecha_fin,
-                                defaults={
-                                    'empresa': empresa,
-                                    'tipo_nomina': tipo_periodo,
-                                    'periodo_nominal': periodo_seleccionado['etiqueta'],
-                                    'estado': 'PENDIENTE',
-                                    'creado_por': request.user
-                                }
-                            )
-                            
-                            # Obtener faltas del empleado para este periodo específico
-                            faltas = len([
-                                f for f in empleado.fechas_faltas 
-                                if fecha_inicio <= datetime.strptime(f, '%Y-%m-%d').date() <= fecha_fin
-                            ])
-                            
-                            # Calcular nómina
-                            nomina_data = calcular_nomina_empleado(
-                                empleado, 
-                                periodo=tipo_periodo.lower(),
-                                dias_laborados=None,
-                                faltas_en_periodo=faltas,
-                                fecha_referencia=fecha_inicio
-                            )
-                            
-                            # Actualizar campos de la nómina
-                            nomina.faltas_en_periodo = faltas
-                            nomina.calculos = nomina_data
-                            nomina.salario_neto = Decimal(str(nomina_data['resumen'].get('neto_a_pagar', 0)))
-                            
-                            # Si ya existía, actualiza el estado
-                            if not created:
-                                nomina.estado = 'PENDIENTE'
-                            
-                            # Validación y guardado
-                            nomina.full_clean()
-                            nomina.save()
-                            
-                            nominas.append(NominaSerializer(nomina).data)
-                            
-                        except ValidationError as e:
-                            errores.append({
-                                'empleado': empleado.nombre_completo,
-                                'error': str(e),
-                                'tipo_error': 'ValidationError'
-                            })
+                            nominas.append(self._procesar_empleado(empleado, *contexto, validado=empleado.id in validados))
                         except Exception as e:
-                            # Extraer solo el mensaje de error, no el objeto completo
-                            error_message = str(e)
-                            
-                            # Si el error es un objeto con estructura problemática, extraer solo el mensaje
-                            if hasattr(e, 'args') and e.args and isinstance(e.args[0], dict):
-                                error_obj = e.args[0]
-                                if 'error' in error_obj and isinstance(error_obj['error'], str):
-                                    error_message = error_obj['error']
-                                elif 'message' in error_obj and isinstance(error_obj['message'], str):
-                                    error_message = error_obj['message']
-                            
-                            errores.append({
-                                'empleado': empleado.nombre_completo,
-                                'id_empleado': empleado.id,
-                                'error': error_message,  # Solo el mensaje, no el objeto
-                                'periodo': periodo_seleccionado['etiqueta'],
-                                'tipo_error': type(e).__name__
-                            })
+                            errores.append(_error_de_empleado(empleado, e, periodo_seleccionado))
                             
             except Exception as e:
                 return Response(
@@ -518,33 +701,9 @@ class NominaViewSet(viewsets.ModelViewSet):
             # =============================================
             # 5. CONSTRUIR RESPUESTA CON MANEJO SEGURO DE DATOS
             # =============================================
-            def safe_decimal(value, default='0'):
-                """Convierte un valor a Decimal de forma segura"""
-                try:
-                    return Decimal(str(value))
-                except (TypeError, ValueError, InvalidOperation):
-                    return Decimal(default)
-
-            def get_nested_value(data, keys, default=0):
-                """Obtiene un valor anidado de un diccionario de forma segura"""
-                for key in keys:
-                    try:
-                        data = data[key]
-                    except (KeyError, TypeError):
-                        return default
-                return data
-
-            # Calcular totales de manera segura
-            total_nomina = sum(safe_decimal(n['salario_neto']) for n in nominas)
-            total_percepciones = sum(
-                safe_decimal(get_nested_value(n, ['calculos', 'percepciones', 'total']))
-                for n in nominas
-            )
-            total_deducciones = sum(
-                safe_decimal(get_nested_value(n, ['calculos', 'deducciones', 'total']))
-                for n in nominas
-            )
-            promedio_nomina = total_nomina / len(nominas) if nominas else Decimal('0')
+            totales = _TotalesNomina()
+            for n in nominas:
+                totales.agregar(n)
 
             response_data = {
                 'periodo': periodo_seleccionado,
@@ -557,16 +716,12 @@ class NominaViewSet(viewsets.ModelViewSet):
                     'total_empleados_procesados': len(nominas),
                     'total_errores': len(errores),
                     'fecha_procesamiento': timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'usuario': request.user.email
+                    'usuario': request.user.email,
+                    'memo_calculos': _uso_del_memo(memo_inicial)
                 },
                 'nominas': nominas,
                 'errores': errores,
-                'resumen_financiero': {
-                    'total_nomina': str(total_nomina),
-                    'promedio_nomina': str(promedio_nomina),
-                    'total_deducciones': str(total_deducciones),
-                    'total_percepciones': str(total_percepciones)
-                }
+                'resumen_financiero': totales.resumen()
             }
             
             return Response(response_data, status=status.HTTP_200_OK)
@@ -581,7 +736,359 @@ class NominaViewSet(viewsets.ModelViewSet):
             if settings.DEBUG:
                 error_response['traceback'] = traceback.format_exc()
             return Response(error_response, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def _procesar_empleado(self, empleado, empresa, periodo_seleccionado, tipo_periodo, fecha_inicio, fecha_fin, usuario,
+                           validado=False):
+        """
+        Calcula y guarda la nómina del periodo de un empleado; devuelve la
+        nómina serializada. Con validado=True (el empleado pasó prevalidacion)
+        se omiten validate_unique(), que get_or_create ya garantiza, y la
+        consulta de existencia de las llaves foráneas, que son las instancias
+        recién usadas; clean_fields() sigue revisando el neto y las faltas
+        calculados y save() sigue llamando a clean().
+        """
+        # Intenta obtener la nómina existente primero
+        with medir_etapa('persistencia'):
+            nomina, created = Nomina.objects.get_or_create(
+                empleado=empleado,
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+                defaults={
+                    'empresa': empresa,
+                    'tipo_nomina': tipo_periodo,
+                    'periodo_nominal': periodo_seleccionado['etiqueta'],
+                    'estado': 'PENDIENTE',
+                    'creado_por': usuario
+                }
+            )
+        
+        # Obtener faltas del empleado para este periodo específico
+        faltas = len([
+            f for f in empleado.fechas_faltas 
+            if fecha_inicio <= datetime.strptime(f, '%Y-%m-%d').date() <= fecha_fin
+        ])
+        
+        # Calcular nómina
+        inicio_calculo = time.perf_counter()
+        with medir_etapa('calculo'):
+            nomina_data = calcular_nomina_empleado(
+                empleado, 
+                periodo=tipo_periodo.lower(),
+                dias_laborados=None,
+                faltas_en_periodo=faltas,
+                fecha_referencia=fecha_inicio,
+                detalle=False
+            )
+        metricas.observar('gestion_calculo_empleado_segundos', time.perf_counter() - inicio_calculo, tipo_periodo=tipo_periodo)
+        metricas.incrementar('gestion_empleados_calculados_total', tipo_periodo=tipo_periodo)
+        
+        # Actualizar campos de la nómina
+        nomina.faltas_en_periodo = faltas
+        nomina.calculos = nomina_data
+        nomina.salario_neto = Decimal(str(nomina_data['resumen'].get('neto_a_pagar', 0)))
+        
+        # Si ya existía, actualiza el estado
+        if not created:
+            nomina.estado = 'PENDIENTE'
+        
+        # Validación y guardado
+        with medir_etapa('persistencia'):
+            if validado:
+                nomina.clean_fields(exclude=LLAVES_NOMINA)
+            else:
+                nomina.full_clean()
+            nomina.save()
+        
+        with medir_etapa('serializacion'):
+            return NominaSerializer(nomina, context=self.get_serializer_context()).data
+
+    def _procesar_en_streaming(self, empleados, empresa, periodo_seleccionado, tipo_periodo, fecha_inicio, fecha_fin, usuario):
+        """
+        procesar_nomina?stream=ndjson: un renglón JSON por empleado en cuanto
+        su nómina queda guardada ({"tipo": "nomina"|"error", ...}) y al final
+        el resumen ({"tipo": "resumen", ...}). Cada empleado va en su propia
+        transacción y los empleados se leen por lotes, así que la memoria no
+        crece con la plantilla; un error no deshace lo ya enviado.
+        """
+        contexto = (empresa, periodo_seleccionado, tipo_periodo, fecha_inicio, fecha_fin, usuario)
+        totales = _TotalesNomina()
+        errores = 0
+        memo_inicial = estadisticas_memo()
+        try:
+            filas = empleados.iterator(chunk_size=TAMANO_LOTE_STREAMING)
+            # Cada lote leído se prevalida completo antes de procesarlo
+            while lote := list(islice(filas, TAMANO_LOTE_STREAMING)):
+                validados = ids_sin_bloqueos(lote, fecha_inicio, fecha_fin)
+                for empleado in lote:
+                    try:
+                        with transaction.atomic(using=alias_actual()):
+                            nomina = self._procesar_empleado(empleado, *contexto, validado=empleado.id in validados)
+                    except Exception as e:
+                        errores += 1
+                        yield renderers.dumps({'tipo': 'error', **_error_de_empleado(empleado, e, periodo_seleccionado)}) + b'\n'
+                        continue
+                    totales.agregar(nomina)
+                    yield renderers.dumps({'tipo': 'nomina', 'nomina': nomina}) + b'\n'
+        except Exception as e:
+            # Falla de la base a media corrida: las nóminas ya enviadas quedan guardadas
+            yield renderers.dumps({'tipo': 'error', 'error': 'Error en la transacción de nómina', 'detalle': str(e)}) + b'\n'
+
+        yield renderers.dumps({
+            'tipo': 'resumen',
+            'periodo': periodo_seleccionado,
+            'empresa': {
+                'id': empresa.id,
+                'nombre': empresa.nombre,
+                'total_empleados': totales.nominas + errores
+            },
+            'procesamiento': {
+                'total_empleados_procesados': totales.nominas,
+                'total_errores': errores,
+                'fecha_procesamiento': timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'usuario': usuario.email,
+                'memo_calculos': _uso_del_memo(memo_inicial)
+            },
+            'resumen_financiero': totales.resumen()
+        }) + b'\n'
+
+    @action(detail=False, methods=['GET'], url_path='prevalidar')
+    def prevalidar(self, request):
+        """
+        Revisa una corrida de procesar_nomina sin calcular ni guardar nada
+        (?empresa_id=&tipo_periodo=&periodo_id=). Responde los bloqueos y
+        advertencias de todos los empleados (ver prevalidacion.py).
+        """
+        tipo_periodo = request.query_params.get('tipo_periodo', '').upper()
+        periodo_id = request.query_params.get('periodo_id')
+        empresa_id = str(request.query_params.get('empresa_id', ''))
+        if tipo_periodo not in ['SEMANAL', 'QUINCENAL', 'MENSUAL'] or not empresa_id.isdigit():
+            return Response(
+                {'error': 'Se requieren empresa_id numérico y tipo_periodo SEMANAL, QUINCENAL o MENSUAL'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            empresa = Empresa.objects.get(id=empresa_id)
+            self.check_object_permissions(request, empresa)
+        except Empresa.DoesNotExist:
+            return Response({'error': 'Empresa no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+
+        periodo_seleccionado = next(
+            (p for p in generar_periodos_nominales(tipo_periodo) if p['id'] == periodo_id), None
+        )
+        if not periodo_seleccionado:
+            return Response(
+                {
+                    'error': 'Periodo no válido',
+                    'detalle': f'No se encontró el periodo {periodo_id} para tipo {tipo_periodo}'
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        fecha_inicio, fecha_fin = _fechas_del_periodo(periodo_seleccionado, tipo_periodo)
+
+        with medir_etapa('validacion'):
+            reporte = validar_corrida(empresa, tipo_periodo, fecha_inicio, fecha_fin)
+        return Response({
+            'periodo': periodo_seleccionado,
+            'empresa': {'id': empresa.id, 'nombre': empresa.nombre},
+            **reporte
+        })
     
+    @action(detail=False, methods=['GET'], url_path='ajuste-anual')
+    def ajuste_anual(self, request):
+        """Ajuste anual de ISR de una empresa (?empresa_id=&anio=)"""
+        empresa_id = request.query_params.get('empresa_id')
+        anio = request.query_params.get('anio') or str(timezone.now().year - 1)
+        if not str(empresa_id).isdigit() or not anio.isdigit():
+            return Response(
+                {'error': 'Se requieren empresa_id y anio numéricos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= int(anio) <= 9999:
+            return Response({'error': 'El año debe estar entre 1 y 9999'}, status=status.HTTP_400_BAD_REQUEST)
+
+        empresas = Empresa.objects.all() if request.user.is_superuser else request.user.empresas.all()
+        if not empresas.filter(pk=empresa_id).exists():
+            return Response(
+                {'error': 'Empresa no encontrada o sin permisos'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        with medir_etapa('calculo'):
+            resultado = calcular_ajuste_anual(int(empresa_id), int(anio))
+        return Response(resultado)
+
+    @action(detail=False, methods=['POST'], url_path='prestaciones')
+    def prestaciones(self, request):
+        """
+        Calcula aguinaldo, prima vacacional o PTU de toda la empresa.
+        Body: {empresa_id, tipo, anio, monto_ptu?, fecha_calculo?, guardar?}
+        Con guardar=true la corrida se guarda como nóminas PENDIENTE.
+        """
+        datos = request.data
+        empresa_id = str(datos.get('empresa_id', ''))
+        anio = str(datos.get('anio') or timezone.now().year)
+        if not empresa_id.isdigit() or not anio.isdigit():
+            return Response(
+                {'error': 'Se requieren empresa_id y anio numéricos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        empresas = Empresa.objects.all() if request.user.is_superuser else request.user.empresas.all()
+        empresa = empresas.filter(pk=empresa_id).first()
+        if empresa is None:
+            return Response(
+                {'error': 'Empresa no encontrada o sin permisos'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        tipo = datos.get('tipo', '')
+        fecha_calculo = datos.get('fecha_calculo')
+        if not isinstance(tipo, str) or not isinstance(fecha_calculo, (str, type(None))):
+            return Response(
+                {'error': 'tipo y fecha_calculo deben ser texto'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            monto_ptu = datos.get('monto_ptu')
+            monto_ptu = Decimal(str(monto_ptu)) if monto_ptu not in (None, '') else None
+            fecha_calculo = datetime.strptime(fecha_calculo, '%Y-%m-%d').date() if fecha_calculo else None
+            with medir_etapa('calculo'):
+                resultado = calcular_prestacion(
+                    empresa.id, tipo, int(anio), monto_ptu=monto_ptu, fecha_calculo=fecha_calculo
+                )
+        except (ValueError, TypeError, ArithmeticError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if str(datos.get('guardar', '')).lower() in ('true', '1'):
+            with medir_etapa('persistencia'):
+                creadas, omitidas = guardar_prestacion(resultado, empresa, request.user)
+            resultado['resumen'].update({'nominas_creadas': creadas, 'omitidas_pagadas': omitidas})
+            return Response(resultado, status=status.HTTP_201_CREATED)
+        return Response(resultado)
+
+    @action(detail=False, methods=['POST'], url_path='simular-ajuste')
+    def simular_ajuste(self, request):
+        """
+        Simula un ajuste salarial sin guardar nada.
+        Body: {empresa_id, reglas: [{tipo, valor, zona_salarial?, periodo_nominal?, salario_min?, salario_max?}], mes?}
+        """
+        empresa_id = str(request.data.get('empresa_id', ''))
+        if not empresa_id.isdigit():
+            return Response(
+                {'error': 'Se requiere empresa_id numérico'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        empresas = Empresa.objects.all() if request.user.is_superuser else request.user.empresas.all()
+        if not empresas.filter(pk=empresa_id).exists():
+            return Response(
+                {'error': 'Empresa no encontrada o sin permisos'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        mes = request.data.get('mes')
+        if mes not in (None, '') and not (str(mes).isdigit() and 1 <= int(mes) <= 12):
+            return Response({'error': 'mes debe ser un entero entre 1 y 12'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with medir_etapa('calculo'):
+                resultado = simular_ajuste_salarial(
+                    int(empresa_id), request.data.get('reglas'), mes=int(mes) if mes not in (None, '') else None
+                )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado)
+
+    @action(detail=False, methods=['GET'], url_path='cfdi')
+    def cfdi(self, request):
+        """
+        ZIP con los CFDI de nómina (XML sin sellar) de una empresa y periodo,
+        en streaming (?empresa_id=&fecha_inicio=&fecha_fin=). Los documentos
+        que no pasan la validación se listan en errores.txt dentro del ZIP.
+        """
+        empresa_id = str(request.query_params.get('empresa_id', ''))
+        try:
+            fecha_inicio = datetime.strptime(request.query_params.get('fecha_inicio', ''), '%Y-%m-%d').date()
+            fecha_fin = datetime.strptime(request.query_params.get('fecha_fin', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return Response(
+                {'error': 'Se requieren fecha_inicio y fecha_fin con formato YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        empresas = Empresa.objects.all() if request.user.is_superuser else request.user.empresas.all()
+        if not empresa_id.isdigit() or not empresas.filter(pk=empresa_id).exists():
+            return Response(
+                {'error': 'Empresa no encontrada o sin permisos'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        with medir_etapa('carga'):
+            documentos = cargar_documentos(nominas_del_periodo(int(empresa_id), fecha_inicio, fecha_fin))
+        respuesta = StreamingHttpResponse(
+            zip_en_streaming(generar_documentos(documentos), []), content_type='application/zip'
+        )
+        respuesta['Content-Disposition'] = f'attachment; filename="cfdi_{empresa_id}_{fecha_inicio}_{fecha_fin}.zip"'
+        return respuesta
+
+    @action(detail=False, methods=['GET'], url_path='dispersion')
+    def dispersion(self, request):
+        """
+        Archivo de dispersión bancaria con el neto de las nóminas pendientes de
+        pago del periodo, en streaming (?empresa_id=&fecha_inicio=&fecha_fin=
+        &layout=csv|bbva|banorte|santander&fecha_pago=). Las nóminas sin cuenta
+        bancaria, con cuenta de otro banco en layouts de un solo banco o sin
+        neto no se incluyen: su número sale en X-Dispersion-Omitidos y el
+        detalle con ?resumen=true, que devuelve el JSON de la revisión en vez
+        del archivo. El archivo se revisa completo antes de enviarlo; un valor
+        que no cabe en el layout es un 400.
+        """
+        empresa_id = str(request.query_params.get('empresa_id', ''))
+        try:
+            fecha_inicio = datetime.strptime(request.query_params.get('fecha_inicio', ''), '%Y-%m-%d').date()
+            fecha_fin = datetime.strptime(request.query_params.get('fecha_fin', ''), '%Y-%m-%d').date()
+            fecha_pago = request.query_params.get('fecha_pago')
+            fecha_pago = datetime.strptime(fecha_pago, '%Y-%m-%d').date() if fecha_pago else None
+        except ValueError:
+            return Response(
+                {'error': 'Se requieren fecha_inicio y fecha_fin (y fecha_pago opcional) con formato YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        empresas = Empresa.objects.all() if request.user.is_superuser else request.user.empresas.all()
+        empresa = empresas.filter(pk=empresa_id).first() if empresa_id.isdigit() else None
+        if empresa is None:
+            return Response(
+                {'error': 'Empresa no encontrada o sin permisos'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        layout = request.query_params.get('layout', 'csv')
+        try:
+            plantilla = obtener_plantilla(layout)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with medir_etapa('validacion'):
+                revision = revisar_dispersion(empresa, fecha_inicio, fecha_fin, layout, fecha_pago)
+        except ErrorDispersion as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if str(request.query_params.get('resumen', '')).lower() in ('true', '1'):
+            return Response(revision)
+
+        respuesta = StreamingHttpResponse(
+            generar_dispersion(empresa, fecha_inicio, fecha_fin, layout, fecha_pago),
+            content_type=plantilla.content_type
+        )
+        respuesta['Content-Disposition'] = (
+            f'attachment; filename="dispersion_{layout}_{empresa_id}_{fecha_fin}.{plantilla.extension}"'
+        )
+        respuesta['X-Dispersion-Registros'] = revision['registros']
+        respuesta['X-Dispersion-Omitidos'] = len(revision['omitidos'])
+        return respuesta
+
     @action(detail=False, methods=['GET'], url_path='calcular-todos')
     def calcular_todos(self, request):
         try:
@@ -659,16 +1166,23 @@ class NominaViewSet(viewsets.ModelViewSet):
                 'nominas': []
             }
 
+            with medir_etapa('carga'):
+                list(empleados)
+
             for empleado in empleados:
                 try:
-                    if periodo == 'semanal':
-                        nomina_data = calcular_nomina_semanal(
-                            empleado, 
-                            dias_trabajados=dias_trabajados,
-                            fecha_referencia=fecha_inicio
-                        )
-                    else:
-                        nomina_data = calcular_nomina_empleado(empleado, periodo)
+                    inicio_calculo = time.perf_counter()
+                    with medir_etapa('calculo'):
+                        if periodo == 'semanal':
+                            nomina_data = calcular_nomina_semanal(
+                                empleado, 
+                                dias_trabajados=dias_trabajados,
+                                fecha_referencia=fecha_inicio
+                            )
+                        else:
+                            nomina_data = calcular_nomina_empleado(empleado, periodo, detalle=False)
+                    metricas.observar('gestion_calculo_empleado_segundos', time.perf_counter() - inicio_calculo, tipo_periodo=periodo.upper())
+                    metricas.incrementar('gestion_empleados_calculados_total', tipo_periodo=periodo.upper())
                     
                     # Construir respuesta
                     resultados['nominas'].append({
@@ -691,17 +1205,19 @@ class NominaViewSet(viewsets.ModelViewSet):
                     })
                     
                     # Registrar en BD
-                    Nomina.objects.create(
-                        empleado=empleado,
-                        empresa=empresa,
-                        tipo_nomina=periodo.upper(),
-                        fecha_inicio=fecha_inicio,
-                        fecha_fin=fecha_fin,
-                        salario_neto=Decimal(str(nomina_data['salario_neto'])),
-                        calculos=nomina_data
-                    )
+                    with medir_etapa('persistencia'):
+                        Nomina.objects.create(
+                            empleado=empleado,
+                            empresa=empresa,
+                            tipo_nomina=periodo.upper(),
+                            fecha_inicio=fecha_inicio,
+                            fecha_fin=fecha_fin,
+                            salario_neto=Decimal(str(nomina_data['salario_neto'])),
+                            calculos=nomina_data
+                        )
                     
                 except Exception as e:
+                    metricas.incrementar('gestion_errores_nomina_total', tipo_error=type(e).__name__)
                     if 'errores' not in resultados:
                         resultados['errores'] = []
                     resultados['errores'].append({
@@ -761,11 +1277,13 @@ class NominaViewSet(viewsets.ModelViewSet):
                 )
 
             # Obtener empleado y verificar permisos
-            empleado = Empleado.objects.get(id=empleado_id)
+            with medir_etapa('carga'):
+                empleado = Empleado.objects.get(id=empleado_id)
             self.check_object_permissions(request, empleado)
 
             # Calcular datos de nómina
-            nomina_data = calcular_nomina_empleado(empleado, periodo)
+            with medir_etapa('calculo'):
+                nomina_data = calcular_nomina_empleado(empleado, periodo)
             sbc_diario = nomina_data['detalle_sbc']['sbc_diario']
             
             # Formatear descripción del periodo para el empleado
@@ -1003,13 +1521,15 @@ class NominaViewSet(viewsets.ModelViewSet):
                     {'error': 'Tipo de período no válido. Use SEMANAL, QUINCENAL o MENSUAL'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            
-            periodos = generar_periodos_nominales(tipo)
-            return Response({
-                'periodos': periodos,
-                'total': len(periodos),
-                'tipo': tipo
-            })
+            año = leer_año(request.query_params.get('año'))
+            if año is None:
+                return Response({'error': 'El año debe estar entre 1 y 9999'}, status=status.HTTP_400_BAD_REQUEST)
+
+            def construir():
+                periodos = generar_periodos_nominales(tipo, año)
+                return {'periodos': periodos, 'total': len(periodos), 'tipo': tipo}
+
+            return respuesta_catalogo(request, año, ('list_periodos', tipo), construir)
         except Exception as e:
             return Response(
                 {'error': f'Error al obtener períodos: {str(e)}'},
@@ -1253,24 +1773,27 @@ class NominaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
                     
+@api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def obtener_periodos(request):
     tipo_nomina = request.GET.get('tipo', 'QUINCENAL').upper()
-    año = int(request.GET.get('año', datetime.now().year))
-    
-    periodos = []
-    if tipo_nomina == "QUINCENAL":
-        periodos = [
-            {"mes": calendar.month_name[mes], "quincena": q, "año": año}
-            for mes in range(1, 13)
-            for q in ["1", "2"]
-        ]
-    elif tipo_nomina == "SEMANAL":
-        pass
-    elif tipo_nomina == "MENSUAL":
-        periodos = [{"mes": calendar.month_name[mes], "año": año} for mes in range(1, 13)]
-    
-    return Response({"periodos": periodos})
+    año = leer_año(request.GET.get('año'), datetime.now().year)
+    if año is None:
+        return Response({'error': 'El año debe estar entre 1 y 9999'}, status=status.HTTP_400_BAD_REQUEST)
+
+    def construir():
+        periodos = []
+        if tipo_nomina == "QUINCENAL":
+            periodos = [
+                {"mes": calendar.month_name[mes], "quincena": q, "año": año}
+                for mes in range(1, 13)
+                for q in ["1", "2"]
+            ]
+        elif tipo_nomina == "MENSUAL":
+            periodos = [{"mes": calendar.month_name[mes], "año": año} for mes in range(1, 13)]
+        return {"periodos": periodos}
+
+    return respuesta_catalogo(request, año, ('obtener_periodos', tipo_nomina), construir)
 
 @permission_classes([IsAuthenticated])
 def generar_calendario(request):
@@ -1321,7 +1844,7 @@ from .permissions import IsAdminOrSameEmpresa
 logger = logging.getLogger(__name__)
 
 @method_decorator(csrf_exempt, name='dispatch')
-class FaltasViewSet(viewsets.ViewSet):
+class FaltasViewSet(EmpresaShardMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated, IsAdminOrSameEmpresa]
 
     def get_empleado(self, empleado_id):
@@ -1337,13 +1860,6 @@ class FaltasViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['post'], url_path=r'empleados/(?P<empleado_id>\d+)/faltas/registrar-faltas')
     def registrar_faltas(self, request, empleado_id=None):
-        empleado = self.get_empleado(empleado_id)
-        if not empleado:
-            return Response(
-                {'error': 'Empleado no encontrado o sin permisos'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-
         # Validar tipo de falta
         tipo_falta = request.data.get('tipo_falta', 'injustificada').lower()
         if tipo_falta not in ['injustificada', 'justificada']:
@@ -1359,316 +1875,12 @@ class FaltasViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Determinar campo a usar según el tipo de falta
-        if tipo_falta == 'injustificada':
-            campo_faltas = 'fechas_faltas_injustificadas'
-            campo_opuesto = 'fechas_faltas_justificadas'
-        else:
-            campo_faltas = 'fechas_faltas_justificadas'
-            campo_opuesto = 'fechas_faltas_injustificadas'
-        
-        faltas_existentes = set(getattr(empleado, campo_faltas, []))
-
-        # Validar fechas, verificar días de descanso, fecha de ingreso y duplicados
-        fechas_faltas = []
-        dias_descanso = set(empleado.dias_descanso)
-        fecha_ingreso = empleado.fecha_ingreso
-        
-        dias_descanso_nombres = {
-            0: "Lunes",
-            1: "Martes",
-            2: "Miércoles",
-            3: "Jueves",
-            4: "Viernes",
-            5: "Sábado",
-            6: "Domingo"
-        }
-        errores_descanso = []
-        errores_fecha_ingreso = []
-        errores_duplicados = []
-        
-        # Verificar fechas duplicadas en la solicitud actual
-        fechas_solicitud = set()
-        
-        for fecha_str in request.data.get('fechas_faltas', []):
-            try:
-                fecha = datetime.strptime(fecha_str, '%Y-%m-%d').date()
-                dia_semana = fecha.weekday()
-                
-                # Verificar duplicados en la solicitud actual
-                if fecha_str in fechas_solicitud:
-                    errores_duplicados.append({
-                        'fecha': fecha_str,
-                        'dia_semana': dias_descanso_nombres[dia_semana],
-                        'mensaje': 'Fecha duplicada en esta solicitud'
-                    })
-                    continue
-                fechas_solicitud.add(fecha_str)
-                
-                # Verificar si la fecha ya está registrada
-                if fecha_str in faltas_existentes:
-                    errores_duplicados.append({
-                        'fecha': fecha_str,
-                        'dia_semana': dias_descanso_nombres[dia_semana],
-                        'mensaje': 'El empleado ya tiene registrada una falta en esta fecha'
-                    })
-                    continue
-                    
-                # Verificar si la fecha es anterior al ingreso del empleado
-                if fecha < fecha_ingreso:
-                    errores_fecha_ingreso.append({
-                        'fecha': fecha_str,
-                        'dia_semana': dias_descanso_nombres[dia_semana],
-                        'fecha_ingreso': fecha_ingreso.strftime('%Y-%m-%d'),
-                        'mensaje': 'La fecha es anterior al ingreso del empleado'
-                    })
-                    continue
-                    
-                # Verificar si es día de descanso
-                if dia_semana in dias_descanso:
-                    errores_descanso.append({
-                        'fecha': fecha_str,
-                        'dia_semana': dias_descanso_nombres[dia_semana],
-                        'mensaje': f'El empleado {empleado_id} descansa este día'
-                    })
-                    continue
-                    
-                fechas_faltas.append(fecha.isoformat())
-            except ValueError:
-                return Response(
-                    {'error': f'Formato de fecha inválido: {fecha_str}. Use YYYY-MM-DD'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-        # Si hay errores de duplicados, retornarlos primero
-        if errores_duplicados:
-            return Response(
-                {
-                    'error': 'No se pueden registrar múltiples faltas en la misma fecha',
-                    'detalle': errores_duplicados,
-                    'empleado': {
-                        'id': empleado_id,
-                        'nombre_completo': empleado.nombre_completo,
-                        'faltas_registradas': list(faltas_existentes)
-                    }
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Si hay errores de fecha de ingreso, retornarlos
-        if errores_fecha_ingreso:
-            return Response(
-                {
-                    'error': f'No se pueden registrar faltas a empleados antes de su fecha de ingreso ({fecha_ingreso.strftime("%Y-%m-%d")})',
-                    'detalle': errores_fecha_ingreso,
-                    'empleado': {
-                        'id': empleado_id,
-                        'nombre_completo': empleado.nombre_completo,
-                        'fecha_ingreso': fecha_ingreso.strftime('%Y-%m-%d'),
-                        'periodo_nominal': empleado.periodo_nominal
-                    }
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Si hay errores de días de descanso, retornarlos
-        if errores_descanso:
-            descansos_configurados = [dias_descanso_nombres[d] for d in sorted(empleado.dias_descanso)]
-            return Response(
-                {
-                    'error': f'No se pueden registrar faltas en días de descanso del empleado {empleado_id}',
-                    'detalle': errores_descanso,
-                    'dias_descanso_configurados': descansos_configurados,
-                    'empleado': {
-                        'id': empleado_id,
-                        'nombre_completo': f"{empleado.nombre} {empleado.apellido_paterno} {empleado.apellido_materno or ''}".strip(),
-                        'periodo_nominal': empleado.periodo_nominal
-                    }
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
         try:
-            # Remover la fecha del campo opuesto si existe
-            for fecha_str in fechas_faltas:
-                if fecha_str in getattr(empleado, campo_opuesto, []):
-                    getattr(empleado, campo_opuesto).remove(fecha_str)
-            
-            # Actualizar las faltas en el empleado
-            if not hasattr(empleado, campo_faltas):
-                setattr(empleado, campo_faltas, [])
-            
-            # Agregar solo faltas nuevas que no estén ya registradas
-            nuevas_faltas = [f for f in fechas_faltas if f not in getattr(empleado, campo_faltas)]
-            getattr(empleado, campo_faltas).extend(nuevas_faltas)
-            empleado.save()
-
-            # Función para determinar el periodo según la fecha y tipo de nómina
-            def determinar_periodo(fecha, tipo_nomina):
-                año = fecha.year
-                mes = fecha.month
-                dia = fecha.day
-                
-                if tipo_nomina == 'SEMANAL':
-                    inicio_semana = fecha - timedelta(days=fecha.weekday())
-                    fin_semana = inicio_semana + timedelta(days=6)
-                    semana_num = (inicio_semana.day - 1) // 7 + 1
-                    periodo_id = f"{año}-SEM-{mes:02d}-{semana_num:02d}"
-                    return {
-                        'id': periodo_id,
-                        'inicio': inicio_semana,
-                        'fin': fin_semana,
-                        'tipo': 'SEMANAL'
-                    }
-                elif tipo_nomina == 'QUINCENAL':
-                    if dia <= 15:
-                        inicio = date(año, mes, 1)
-                        fin = date(año, mes, 15)
-                        quincena = 1
-                    else:
-                        inicio = date(año, mes, 16)
-                        fin = date(año, mes + 1, 1) - timedelta(days=1) if mes < 12 else date(año + 1, 1, 1) - timedelta(days=1)
-                        quincena = 2
-                    periodo_id = f"{año}-Q{quincena}-{mes:02d}"
-                    return {
-                        'id': periodo_id,
-                        'inicio': inicio,
-                        'fin': fin,
-                        'tipo': 'QUINCENAL'
-                    }
-                else:  # MENSUAL
-                    inicio = date(año, mes, 1)
-                    fin = date(año, mes + 1, 1) - timedelta(days=1) if mes < 12 else date(año + 1, 1, 1) - timedelta(days=1)
-                    periodo_id = f"{año}-M-{mes:02d}"
-                    return {
-                        'id': periodo_id,
-                        'inicio': inicio,
-                        'fin': fin,
-                        'tipo': 'MENSUAL'
-                    }
-
-            # Procesar cada fecha de falta
-            periodos_afectados = set()
-            faltas_registradas = []
-
-            for fecha_str in fechas_faltas:
-                fecha = datetime.strptime(fecha_str, '%Y-%m-%d').date()
-                periodo = determinar_periodo(fecha, empleado.periodo_nominal)
-                periodos_afectados.add(periodo['id'])
-
-                # Buscar o crear nómina para el periodo
-                nomina, created = Nomina.objects.get_or_create(
-                    empleado=empleado,
-                    fecha_inicio=periodo['inicio'],
-                    fecha_fin=periodo['fin'],
-                    defaults={
-                        'empresa': empleado.empresa,
-                        'tipo_nomina': empleado.periodo_nominal,
-                        'estado': 'BORRADOR',
-                        'creado_por': request.user,
-                        'calculos': {
-                            'empleado': {
-                                'fechas_faltas': [],
-                                'faltas_en_periodo': 0,
-                                'dias_laborados': 0,
-                                'salario_diario': float(empleado.salario_diario) if empleado.salario_diario else 0.0
-                            }
-                        }
-                    }
-                )
-
-                # Actualizar faltas si no están ya registradas
-                calculos = nomina.calculos or {}
-                if 'empleado' not in calculos:
-                    calculos['empleado'] = {
-                        'fechas_faltas': [],
-                        'faltas_en_periodo': 0,
-                        'dias_laborados': 0,
-                        'salario_diario': float(empleado.salario_diario) if empleado.salario_diario else 0.0
-                    }
-                
-                if fecha_str not in calculos['empleado'].get('fechas_faltas', []):
-                    calculos['empleado'].setdefault('fechas_faltas', []).append(fecha_str)
-                    calculos['empleado']['faltas_en_periodo'] = len(calculos['empleado']['fechas_faltas'])
-                    
-                    # Calcular días laborados (días totales del periodo menos faltas)
-                    dias_periodo = (periodo['fin'] - periodo['inicio']).days + 1
-                    calculos['empleado']['dias_laborados'] = dias_periodo - calculos['empleado']['faltas_en_periodo']
-                    
-                    # Aplicar descuento por faltas (solo para faltas injustificadas)
-                    if tipo_falta == 'injustificada' and empleado.salario_diario:
-                        calculos['empleado']['descuento_por_faltas'] = float(empleado.salario_diario) * calculos['empleado']['faltas_en_periodo']
-                    else:
-                        calculos['empleado']['descuento_por_faltas'] = 0.0
-                    
-                    nomina.calculos = calculos
-                    nomina.save()
-                    faltas_registradas.append(fecha_str)
-
-            # Actualización CRÍTICA para forzar sincronización:
-            empleado.refresh_from_db()
-            
-            # Actualizar TODAS las nóminas pendientes del periodo actual
-            nominas_afectadas = Nomina.objects.filter(
-                empleado=empleado,
-                estado__in=['BORRADOR', 'PENDIENTE']
-            )
-
-            for nomina in nominas_afectadas:
-                try:
-                    # Filtrar faltas que corresponden a este periodo de nómina
-                    faltas_periodo = [
-                        f for f in getattr(empleado, campo_faltas)
-                        if nomina.fecha_inicio <= datetime.strptime(f, '%Y-%m-%d').date() <= nomina.fecha_fin
-                    ]
-                    
-                    # Seleccionar la función de cálculo según el tipo de nómina
-                    if empleado.periodo_nominal == 'SEMANAL':
-                        nomina_data = calcular_nomina_semanal(
-                            empleado,
-                            fecha_referencia=nomina.fecha_inicio
-                        )
-                    elif empleado.periodo_nominal == 'QUINCENAL':
-                        nomina_data = calcular_nomina_quincenal(
-                            empleado,
-                            fecha_referencia=nomina.fecha_inicio
-                        )
-                    else:  # MENSUAL
-                        nomina_data = calcular_nomina_mensual(
-                            empleado,
-                            fecha_referencia=nomina.fecha_inicio
-                        )
-                    
-                    # Actualizar campos críticos
-                    nomina.faltas_en_periodo = len(faltas_periodo)
-                    nomina.dias_laborados = nomina_data.get('dias_laborados', 0)
-                    nomina.salario_neto = nomina_data.get('salario_neto', 0.0)
-                    nomina.calculos = nomina_data
-                    nomina.save()
-
-                except Exception as e:
-                    logger.error(f"Error actualizando nómina {nomina.id}: {str(e)}", exc_info=True)
-                    continue
-
-            # Convertir el descuento total a float para la respuesta (solo para faltas injustificadas)
-            descuento_total = float(empleado.salario_diario) * len(faltas_registradas) if empleado.salario_diario and tipo_falta == 'injustificada' else 0.0
-
-            # Construir respuesta
-            return Response({
-                'success': True,
-                'empleado_id': empleado.id,
-                'nombre': empleado.nombre,
-                'apellido_paterno': empleado.apellido_paterno,
-                'apellido_materno': empleado.apellido_materno or '',
-                'empresa_id': empleado.empresa.id,
-                'usuario_id': request.user.id,
-                'tipo_falta': tipo_falta,
-                'faltas_registradas': len(faltas_registradas),
-                'fechas': nuevas_faltas,
-                'periodos_afectados': list(periodos_afectados),
-                'descuento_total': descuento_total,
-                'message': f'Faltas {tipo_falta} registradas correctamente y nóminas actualizadas'
-            })
+            # Mismo camino por conjuntos que el registro múltiple, con un solo empleado
+            _, status_code, datos = registrar_faltas_lote(
+                [empleado_id], request.data.get('fechas_faltas', []), tipo_falta, request.user
+            )[0]
+            return Response(datos, status=status_code)
 
         except Exception as e:
             logger.error(f"Error registrando faltas: {str(e)}", exc_info=True)
@@ -1687,7 +1899,6 @@ class FaltasViewSet(viewsets.ViewSet):
             empleados_ids = request.data.get('empleados', [])
             fechas_faltas = request.data.get('fechas_faltas', [])
             tipo_falta = request.data.get('tipo_falta', 'injustificada').lower()
-            motivos = request.data.get('motivos', [])
 
             if not empleados_ids:
                 return Response(
@@ -1711,42 +1922,24 @@ class FaltasViewSet(viewsets.ViewSet):
             empleados_exitosos = 0
             total_faltas_registradas = 0
 
-            # Registrar faltas para cada empleado
-            for empleado_id in empleados_ids:
-                try:
-                    # Simular la request individual
-                    empleado_request = request._request
-                    empleado_request.method = 'POST'
-                    empleado_request.data = {
-                        'fechas_faltas': fechas_faltas,
-                        'tipo_falta': tipo_falta,
-                        'motivos': motivos
-                    }
-
-                    # Llamar al método existente de registro individual
-                    response = self.registrar_faltas(empleado_request, empleado_id=empleado_id)
-                    
-                    if response.status_code == status.HTTP_200_OK:
-                        empleados_exitosos += 1
-                        total_faltas_registradas += response.data.get('faltas_registradas', 0)
-                        resultados.append({
-                            'empleado_id': empleado_id,
-                            'success': True,
-                            'data': response.data
-                        })
-                    else:
-                        resultados.append({
-                            'empleado_id': empleado_id,
-                            'success': False,
-                            'error': response.data.get('error', 'Error desconocido'),
-                            'detalle': response.data
-                        })
-
-                except Exception as e:
+            # Todos los empleados se cargan, validan y guardan por conjuntos
+            for empleado_id, status_code, datos in registrar_faltas_lote(
+                empleados_ids, fechas_faltas, tipo_falta, request.user
+            ):
+                if status_code == status.HTTP_200_OK:
+                    empleados_exitosos += 1
+                    total_faltas_registradas += datos.get('faltas_registradas', 0)
+                    resultados.append({
+                        'empleado_id': empleado_id,
+                        'success': True,
+                        'data': datos
+                    })
+                else:
                     resultados.append({
                         'empleado_id': empleado_id,
                         'success': False,
-                        'error': f'Error procesando empleado: {str(e)}'
+                        'error': datos.get('error', 'Error desconocido'),
+                        'detalle': datos
                     })
 
             # Construir respuesta consolidada
@@ -1792,34 +1985,7 @@ class FaltasViewSet(viewsets.ViewSet):
             except ValueError:
                 fecha_ref = date.today()
 
-            inicio, fin = empleado.obtener_limites_periodo(fecha_ref)
-
-            calendario = [
-                {
-                    'fecha': (inicio + timedelta(days=i)).isoformat(),
-                    'dia_semana': (inicio + timedelta(days=i)).strftime('%A'),
-                    'es_festivo': (inicio + timedelta(days=i)) in DIAS_FESTIVOS_2025,
-                    'es_descanso': (inicio + timedelta(days=i)).weekday() in empleado.dias_descanso
-                }
-                for i in range((fin - inicio).days + 1)
-            ]
-
-            response_data = {
-                'empleado_id': empleado.id,
-                'periodo_nominal': empleado.periodo_nominal,
-                'periodo_solicitado': periodo,
-                'fecha_inicio': inicio.isoformat(),
-                'fecha_fin': fin.isoformat(),
-                'dias_periodo': (fin - inicio).days + 1,
-                'dias_trabajados': empleado.dias_trabajados,
-                'faltas_en_periodo': empleado.faltas_en_periodo,
-                'calendario': calendario,
-                'dias_descanso': [empleado.get_dias_descanso_display()],
-                'festivos_en_periodo': sum(1 for dia in DIAS_FESTIVOS_2025 if inicio <= dia <= fin),
-                'dias_laborables': (fin - inicio).days + 1 - len([d for d in calendario if d['es_descanso'] or d['es_festivo']])
-            }
-
-            return Response(response_data)
+            return Response(calendario_del_periodo(empleado, fecha_ref, periodo))
 
         except Exception as e:
             return Response(
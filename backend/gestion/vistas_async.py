@@ -0,0 +1,230 @@
+"""
+Variantes async (ASGI) de los endpoints de lectura más pesados.
+
+DRF no admite vistas async, así que estas son vistas de Django que reutilizan
+los serializadores, la autenticación JWT y las funciones de cálculo de las
+vistas síncronas, y responden lo mismo. Se montan bajo /api/async/:
+
+- empleados/                                  = EmpleadoViewSet.list (en streaming)
+- empleados/<pk>/faltas/calendario-periodo/   = FaltasViewSet.calendario_periodo
+- nominas/list_periodos/                      = NominaViewSet.list_periodos
+- nominas/dispersion/                         = NominaViewSet.dispersion
+
+Bajo uvicorn (backend.asgi) una petición que espera a la base de datos no
+ocupa un worker: el ORM async ejecuta la consulta en un hilo y el ciclo de
+eventos sigue atendiendo otras peticiones. Bajo WSGI funcionan igual, solo
+que sin esa ventaja. benchmarks/vistas_async.py compara ambos despliegues.
+"""
+from datetime import date, datetime
+from functools import wraps
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .condicional import respuesta_catalogo
+from .dispersion import ErrorDispersion, generar_dispersion, obtener_plantilla, revisar_dispersion
+from .faltas import calendario_del_periodo
+from .models import Empleado, Empresa
+from .periodos import generar_periodos_nominales, leer_año
+from .renderers import ORJSONRenderer
+from .replicas import usar_replica
+from .serializers import EmpleadoSerializer
+from .shards import SIN_EMPRESA, empresa_unica, fijar_empresa, ids_empresas, shards_configurados
+
+# Filas que se leen por viaje al hilo del ORM en las respuestas en streaming
+TAMANO_LOTE = 500
+TIPOS_USUARIO = ('EMPRESA', 'CONTADOR')
+
+_renderer = ORJSONRenderer()
+
+
+def _json(datos, status=status.HTTP_200_OK):
+    return HttpResponse(_renderer.render(datos), status=status, content_type='application/json')
+
+
+# =============================================
+# AUTENTICACIÓN Y CONTEXTO
+# =============================================
+
+def _autenticar(request):
+    """Usuario de la petición con las clases de autenticación de DRF"""
+    autenticadores = [clase() for clase in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    return Request(request, authenticators=autenticadores).user
+
+
+def _fijar_empresa(usuario, empresa_id):
+    """Fija la empresa para el router de shards; devuelve su id (None si no hay una)"""
+    if shards_configurados():
+        empresa_id = int(empresa_id) if empresa_id else empresa_unica(usuario)
+        fijar_empresa(empresa_id)
+    return empresa_id
+
+
+def vista_async(vista):
+    """
+    GET autenticado con los mismos permisos que IsAdminOrSameEmpresa a nivel
+    de vista; las lecturas van a la réplica si hay una configurada.
+    """
+    @wraps(vista)
+    async def envoltura(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return _json({'detail': f'Método "{request.method}" no permitido.'}, status.HTTP_405_METHOD_NOT_ALLOWED)
+        try:
+            usuario = await sync_to_async(_autenticar)(request)
+        except exceptions.APIException as e:
+            return _json({'detail': e.detail}, e.status_code)
+        if not usuario.is_authenticated:
+            return _json({'detail': 'Las credenciales de autenticación no se proveyeron.'}, status.HTTP_401_UNAUTHORIZED)
+        if not usuario.is_superuser and usuario.tipo_usuario not in TIPOS_USUARIO:
+            return _json({'detail': 'No tiene permiso para realizar esta acción.'}, status.HTTP_403_FORBIDDEN)
+
+        request.user = usuario
+        usar_replica()
+        return await vista(request, *args, **kwargs)
+    return envoltura
+
+
+async def _empresas_visibles(usuario):
+    """Filtro de empresas del usuario (None para superusuarios)"""
+    if usuario.is_superuser:
+        return None
+    return await sync_to_async(ids_empresas)(usuario)
+
+
+async def _en_lotes(generador, tamano=TAMANO_LOTE):
+    """Consume un generador síncrono que consulta la base en el hilo del ORM, por lotes"""
+    siguiente_lote = sync_to_async(lambda: list(islice(generador, tamano)))
+    while lote := await siguiente_lote():
+        yield ''.join(lote)
+
+
+# =============================================
+# VISTAS
+# =============================================
+
+@vista_async
+async def listar_empleados(request):
+    """Lista de empleados como arreglo JSON en streaming (?empresa_id=)"""
+    empresa_id = request.GET.get('empresa_id')
+    if empresa_id and not empresa_id.isdigit():
+        return _json({'detail': 'empresa_id debe ser numérico'}, status.HTTP_400_BAD_REQUEST)
+    if await sync_to_async(_fijar_empresa)(request.user, empresa_id) is None and shards_configurados():
+        return _json({'empresa_id': [SIN_EMPRESA]}, status.HTTP_400_BAD_REQUEST)
+
+    empleados = Empleado.objects.select_related('empresa')
+    visibles = await _empresas_visibles(request.user)
+    if visibles is not None:
+        empleados = empleados.filter(empresa_id__in=visibles)
+    if empresa_id:
+        empleados = empleados.filter(empresa_id=empresa_id)
+
+    # Un solo serializador para todas las filas, como hace many=True; cada
+    # escritura lleva un lote de filas
+    serializador = EmpleadoSerializer()
+
+    async def contenido():
+        lote = []
+        separador = b'['
+        async for empleado in empleados.aiterator(chunk_size=TAMANO_LOTE):
+            lote.append(_renderer.render(serializador.to_representation(empleado)))
+            if len(lote) == TAMANO_LOTE:
+                yield separador + b','.join(lote)
+                lote, separador = [], b','
+        if lote:
+            yield separador + b','.join(lote) + b']'
+        else:
+            yield b']' if separador == b',' else b'[]'
+
+    return StreamingHttpResponse(contenido(), content_type='application/json')
+
+
+@vista_async
+async def calendario_periodo(request, pk):
+    """Calendario del periodo del empleado (?periodo=semanal&fecha=2025-01-10)"""
+    empleados = Empleado.objects.select_related('empresa').filter(pk=pk)
+    visibles = await _empresas_visibles(request.user)
+    if visibles is not None:
+        empleados = empleados.filter(empresa_id__in=visibles)
+    empleado = await empleados.afirst()
+    if empleado is None:
+        return _json({'error': 'Empleado no encontrado'}, status.HTTP_404_NOT_FOUND)
+
+    try:
+        fecha_ref = date.fromisoformat(request.GET.get('fecha', ''))
+    except ValueError:
+        fecha_ref = date.today()
+    periodo = request.GET.get('periodo', 'semanal').lower()
+    return _json(calendario_del_periodo(empleado, fecha_ref, periodo))
+
+
+@vista_async
+async def listar_periodos(request):
+    """Periodos nominales del año (?tipo=SEMANAL|QUINCENAL|MENSUAL)"""
+    tipo = request.GET.get('tipo', 'QUINCENAL').upper()
+    if tipo not in ['SEMANAL', 'QUINCENAL', 'MENSUAL']:
+        return _json(
+            {'error': 'Tipo de período no válido. Use SEMANAL, QUINCENAL o MENSUAL'},
+            status.HTTP_400_BAD_REQUEST
+        )
+    año = leer_año(request.GET.get('año'))
+    if año is None:
+        return _json({'error': 'El año debe estar entre 1 y 9999'}, status.HTTP_400_BAD_REQUEST)
+
+    def construir():
+        periodos = generar_periodos_nominales(tipo, año)
+        return {'periodos': periodos, 'total': len(periodos), 'tipo': tipo}
+
+    return respuesta_catalogo(request, año, ('list_periodos', tipo), construir, responder=_json)
+
+
+@vista_async
+async def dispersion(request):
+    """Archivo de dispersión bancaria en streaming (mismos parámetros que la vista síncrona)"""
+    empresa_id = str(request.GET.get('empresa_id', ''))
+    try:
+        fecha_inicio = datetime.strptime(request.GET.get('fecha_inicio', ''), '%Y-%m-%d').date()
+        fecha_fin = datetime.strptime(request.GET.get('fecha_fin', ''), '%Y-%m-%d').date()
+        fecha_pago = request.GET.get('fecha_pago')
+        fecha_pago = datetime.strptime(fecha_pago, '%Y-%m-%d').date() if fecha_pago else None
+    except ValueError:
+        return _json(
+            {'error': 'Se requieren fecha_inicio y fecha_fin (y fecha_pago opcional) con formato YYYY-MM-DD'},
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    empresas = Empresa.objects.all()
+    visibles = await _empresas_visibles(request.user)
+    if visibles is not None:
+        empresas = empresas.filter(pk__in=visibles)
+    empresa = await empresas.filter(pk=empresa_id).afirst() if empresa_id.isdigit() else None
+    if empresa is None:
+        return _json({'error': 'Empresa no encontrada o sin permisos'}, status.HTTP_404_NOT_FOUND)
+    await sync_to_async(_fijar_empresa)(request.user, empresa.id)
+
+    layout = request.GET.get('layout', 'csv')
+    try:
+        plantilla = obtener_plantilla(layout)
+    except ValueError as e:
+        return _json({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+
+    try:
+        revision = await sync_to_async(revisar_dispersion)(empresa, fecha_inicio, fecha_fin, layout, fecha_pago)
+    except ErrorDispersion as e:
+        return _json({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+    if request.GET.get('resumen', '').lower() in ('true', '1'):
+        return _json(revision)
+
+    respuesta = StreamingHttpResponse(
+        _en_lotes(generar_dispersion(empresa, fecha_inicio, fecha_fin, layout, fecha_pago)),
+        content_type=plantilla.content_type
+    )
+    respuesta['Content-Disposition'] = (
+        f'attachment; filename="dispersion_{layout}_{empresa_id}_{fecha_fin}.{plantilla.extension}"'
+    )
+    respuesta['X-Dispersion-Registros'] = revision['registros']
+    respuesta['X-Dispersion-Omitidos'] = len(revision['omitidos'])
+    return respuesta